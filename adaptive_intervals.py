@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Адаптивные интервалы сканирования по истории поступлений
+
+Время added_at у известных позиций — это история того, когда на сайте
+появлялись новинки. По ней для каждого сайта оценивается интенсивность
+поступлений (позиций в час) в каждый час недели: 7 × 24 ячейки, сглаженные к
+среднему по сайту, чтобы редкие наблюдения не давали нулей.
+
+Интервал выбирается наибольшим (меньше сканирований), при котором ожидаемая
+задержка обнаружения не превышает цели сайта. Новинка, пришедшая за интервал
+T, ждет в среднем T/2, а вероятность, что за T придет хоть одна, —
+1 − e^(−Λ), где Λ — ожидаемое число поступлений за следующие T часов. Условие
+(1 − e^(−Λ)) · T/2 ≤ цель дает T ≈ 2·цель на оживленных сайтах и растягивает
+интервал на тихих — в пределах [min_hours, max_hours].
+"""
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+HOURS_PER_WEEK = 7 * 24
+
+
+@dataclass(frozen=True)
+class IntervalPolicy:
+    """Цель и границы интервала сайта, в часах"""
+    target_latency_hours: float = 1.0
+    min_hours: float = 0.25
+    max_hours: float = 24.0
+
+
+def parse_site_policies(raw: str, default: IntervalPolicy) -> Dict[str, IntervalPolicy]:
+    """Разбирает переопределения вида "avito=3:1:12,korobkavinyla=0.5" (цель[:мин[:макс]])"""
+    policies: Dict[str, IntervalPolicy] = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        site, value = part.split("=", 1)
+        fields = value.split(":")
+        try:
+            numbers = [float(field) for field in fields[:3]]
+        except ValueError:
+            print(f"⚠️ Некорректная политика интервала для {site.strip()}: {value}")
+            continue
+        target = numbers[0]
+        min_hours = numbers[1] if len(numbers) > 1 else default.min_hours
+        max_hours = numbers[2] if len(numbers) > 2 else default.max_hours
+        policies[site.strip()] = IntervalPolicy(target, min_hours, max(max_hours, min_hours))
+    return policies
+
+
+def _hour_of_week(when: datetime) -> int:
+    return when.weekday() * 24 + when.hour
+
+
+class ArrivalModel:
+    """Интенсивность поступлений по сайтам и часам недели.
+
+    Первый день истории каждого сайта не учитывается: это заполнение
+    состояния при первом обходе, а не поступления. Число поступлений за один
+    календарный час ограничено burst_cap, чтобы полный обход, нашедший много
+    старых позиций разом, не выглядел всплеском новинок.
+    """
+
+    def __init__(self, history_days: int = 56, min_history_days: int = 7,
+                 prior_weeks: float = 2.0, burst_cap: int = 10):
+        self.history_days = history_days
+        self.min_history_days = min_history_days
+        self.prior_weeks = prior_weeks
+        self.burst_cap = burst_cap
+        self._arrivals: Dict[str, List[datetime]] = defaultdict(list)
+        self._rates: Dict[str, Optional[List[float]]] = {}
+        self._now: Optional[datetime] = None
+
+    @classmethod
+    def from_history(cls, arrivals: Iterable[Tuple[str, datetime]], **options) -> "ArrivalModel":
+        """Модель по парам (сайт, время поступления)"""
+        model = cls(**options)
+        for site, when in arrivals:
+            model._arrivals[site].append(when)
+        return model
+
+    def record(self, site: str, when: datetime) -> None:
+        """Новое поступление (демон дописывает найденные позиции без перечитывания состояния)"""
+        self._arrivals[site].append(when)
+        self._rates.pop(site, None)
+
+    def _hourly_rates(self, site: str, now: datetime) -> Optional[List[float]]:
+        """Позиций в час для каждого часа недели; None — истории мало"""
+        if self._now is None or abs(now - self._now) > timedelta(hours=1):
+            # Окно истории сдвигается — пересчитываем не чаще раза в час
+            self._rates.clear()
+            self._now = now
+        if site in self._rates:
+            return self._rates[site]
+
+        rates = None
+        arrivals = sorted(self._arrivals.get(site, []))
+        if arrivals:
+            seeded_until = arrivals[0] + timedelta(days=1)
+            window_start = max(now - timedelta(days=self.history_days), seeded_until)
+            observed_hours = (now - window_start).total_seconds() / 3600
+            if observed_hours >= self.min_history_days * 24:
+                per_hour: Dict[datetime, int] = defaultdict(int)
+                for when in arrivals:
+                    if window_start <= when <= now:
+                        per_hour[when.replace(minute=0, second=0, microsecond=0)] += 1
+                counts = [0.0] * HOURS_PER_WEEK
+                for hour, count in per_hour.items():
+                    counts[_hour_of_week(hour)] += min(count, self.burst_cap)
+                # Сколько раз каждый час недели попал в окно: окно не кратно неделе
+                exposure = [0.0] * HOURS_PER_WEEK
+                hour = window_start
+                while hour < now:
+                    next_hour = hour.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+                    exposure[_hour_of_week(hour)] += (min(next_hour, now) - hour).total_seconds() / 3600
+                    hour = next_hour
+                mean_rate = sum(counts) / observed_hours
+                rates = [(count + self.prior_weeks * mean_rate) / (seen + self.prior_weeks)
+                         for count, seen in zip(counts, exposure)]
+        self._rates[site] = rates
+        return rates
+
+    def has_history(self, site: str, now: datetime) -> bool:
+        return self._hourly_rates(site, now) is not None
+
+    def expected_arrivals(self, site: str, start: datetime, hours: float) -> float:
+        """Ожидаемое число поступлений за hours часов начиная со start"""
+        rates = self._hourly_rates(site, start)
+        if rates is None or hours <= 0:
+            return 0.0
+        total = 0.0
+        slot = _hour_of_week(start)
+        # Доля текущего часа, оставшаяся после start
+        chunk = min(1.0 - (start.minute * 60 + start.second) / 3600, hours)
+        remaining = hours
+        while remaining > 0:
+            total += rates[slot] * chunk
+            remaining -= chunk
+            slot = (slot + 1) % HOURS_PER_WEEK
+            chunk = min(1.0, remaining)
+        return total
+
+
+def expected_latency(model: ArrivalModel, site: str, start: datetime, hours: float) -> float:
+    """Ожидаемая задержка обнаружения при интервале hours"""
+    arrivals = model.expected_arrivals(site, start, hours)
+    return (1 - math.exp(-arrivals)) * hours / 2
+
+
+def adaptive_interval(model: ArrivalModel, site: str, policy: IntervalPolicy,
+                      now: datetime, fallback_hours: float) -> float:
+    """Наибольший интервал в границах политики, укладывающийся в цель по задержке.
+
+    Без достаточной истории возвращает fallback_hours (фиксированный интервал сайта).
+    """
+    if not model.has_history(site, now):
+        return fallback_hours
+    low, high = policy.min_hours, policy.max_hours
+    if expected_latency(model, site, now, high) <= policy.target_latency_hours:
+        return high
+    if expected_latency(model, site, now, low) > policy.target_latency_hours:
+        return low
+    # Задержка растет с интервалом — ищем границу делением пополам (до минуты)
+    while high - low > 1 / 60:
+        middle = (low + high) / 2
+        if expected_latency(model, site, now, middle) <= policy.target_latency_hours:
+            low = middle
+        else:
+            high = middle
+    return low
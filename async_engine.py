@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Асинхронный движок сканирования: все сайты прогона идут параллельно
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from browser_manager import BLOCK_RESOURCES, SITE_PROFILES, LaunchStats, ResourcePolicy
+
+
+def parse_host_limits(raw: str) -> Dict[str, int]:
+    """Разбирает лимиты вида "avito.ru=1,korobkavinyla.ru=2" """
+    limits: Dict[str, int] = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        host, value = part.split("=", 1)
+        try:
+            limits[host.strip()] = max(int(value), 1)
+        except ValueError:
+            print(f"⚠️ Некорректный лимит для {host.strip()}: {value}")
+    return limits
+
+
+class ConcurrencyLimiter:
+    """Глобальный лимит параллельных задач плюс лимит на каждый хост"""
+
+    def __init__(self, global_limit: int = 4, per_host_limit: int = 2,
+                 host_limits: Optional[Dict[str, int]] = None):
+        self.global_limit = max(global_limit, 1)
+        self.per_host_limit = max(per_host_limit, 1)
+        self.host_limits = host_limits or {}
+        self._global: Optional[asyncio.Semaphore] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.host_limits.get(host, self.per_host_limit))
+        return self._hosts[host]
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        """Занимает слот хоста, затем глобальный слот"""
+        if self._global is None:
+            # Семафоры создаются внутри работающего цикла событий
+            self._global = asyncio.Semaphore(self.global_limit)
+        async with self._host_semaphore(host):
+            async with self._global:
+                yield
+
+
+class AsyncBrowserManager(LaunchStats):
+    """Асинхронный аналог BrowserManager: один Chromium, контекст на каждую задачу"""
+
+    def __init__(self, playwright_factory: Callable, headless: bool = True,
+                 block_resources: bool = BLOCK_RESOURCES):
+        super().__init__()
+        self._playwright_factory = playwright_factory
+        self._headless = headless
+        self.block_resources = block_resources
+        self._playwright_cm = None
+        self._playwright = None
+        self._browser = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> "AsyncBrowserManager":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def browser(self):
+        """Запущенный браузер; параллельные задачи ждут один общий запуск"""
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+        async with self._launch_lock:
+            if self._browser is None:
+                started = time.monotonic()
+                self._playwright_cm = self._playwright_factory()
+                self._playwright = await self._playwright_cm.__aenter__()
+                try:
+                    self._browser = await self._playwright.chromium.launch(headless=self._headless)
+                except Exception:
+                    await self._playwright_cm.__aexit__(None, None, None)
+                    self._playwright_cm = None
+                    self._playwright = None
+                    raise
+                self.launch_seconds += time.monotonic() - started
+                self.launch_count += 1
+        return self._browser
+
+    async def new_context(self, site: str):
+        """Создает контекст с локалью и заголовками сайта"""
+        profile = SITE_PROFILES[site]
+        browser = await self.browser()
+        context = await browser.new_context(
+            locale=profile["locale"],
+            user_agent=profile["user_agent"],
+            extra_http_headers=dict(profile["extra_http_headers"]),
+        )
+        self.contexts_opened += 1
+        if self.block_resources:
+            await context.route("**/*", self._route_handler(ResourcePolicy.for_site(site)))
+        return context
+
+    def _route_handler(self, policy: ResourcePolicy) -> Callable:
+        async def handle(route):
+            request = route.request
+            if policy.should_block(request.resource_type, request.url):
+                self.requests_blocked += 1
+                await route.abort()
+            else:
+                await route.continue_()
+        return handle
+
+    @asynccontextmanager
+    async def site_page(self, site: str, timeout_ms: Optional[int] = None) -> AsyncIterator:
+        """Страница в новом контексте сайта; контекст закрывается на выходе"""
+        context = await self.new_context(site)
+        try:
+            page = await context.new_page()
+            self.watch_page(page)
+            if timeout_ms is not None:
+                page.set_default_timeout(timeout_ms)
+            yield page
+        finally:
+            try:
+                await context.close()
+            except Exception as e:
+                print(f"    Ошибка при закрытии контекста {site}: {e}")
+
+    async def close(self) -> None:
+        """Закрывает браузер и останавливает Playwright"""
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                print(f"⚠️ Ошибка при закрытии браузера: {e}")
+            self._browser = None
+        if self._playwright_cm is not None:
+            try:
+                await self._playwright_cm.__aexit__(None, None, None)
+            except Exception as e:
+                print(f"⚠️ Ошибка при остановке Playwright: {e}")
+            self._playwright_cm = None
+            self._playwright = None
+
+
+class SiteTask:
+    """Одна единица работы движка: сайт, хост и корутина сканирования"""
+
+    def __init__(self, site: str, host: str, run: Callable[[AsyncBrowserManager], Awaitable[List[Dict]]],
+                 label: str = ""):
+        self.site = site
+        self.host = host
+        self.run = run
+        self.label = label or site
+
+
+async def run_site_tasks(tasks: List[SiteTask], browser: AsyncBrowserManager,
+                         limiter: ConcurrencyLimiter) -> Tuple[Dict[str, List[Dict]], Set[str]]:
+    """Запускает все задачи параллельно с учетом лимитов.
+
+    Возвращает найденные позиции по сайтам и множество сайтов, у которых
+    хотя бы одна задача завершилась ошибкой. Ошибка одной задачи не
+    прерывает остальные.
+    """
+    results: Dict[str, List[Dict]] = {task.site: [] for task in tasks}
+    failed: Set[str] = set()
+
+    async def run_one(task: SiteTask) -> None:
+        async with limiter.slot(task.host):
+            started = time.monotonic()
+            try:
+                items = await task.run(browser)
+            except Exception as e:
+                print(f"    ❌ {task.label}: {e}")
+                failed.add(task.site)
+                return
+            print(f"    ✅ {task.label}: {len(items)} позиций за {time.monotonic() - started:.1f} с")
+            results[task.site].extend(items)
+
+    await asyncio.gather(*(run_one(task) for task in tasks))
+    return results, failed
+
+
+def run_tasks(tasks: List[SiteTask], playwright_factory: Callable,
+              limiter: ConcurrencyLimiter) -> Tuple[Dict[str, List[Dict]], Set[str]]:
+    """Синхронная точка входа для main(): поднимает цикл событий и браузер"""
+    browser = AsyncBrowserManager(playwright_factory)
+
+    async def run_all() -> Tuple[Dict[str, List[Dict]], Set[str]]:
+        async with browser:
+            return await run_site_tasks(tasks, browser, limiter)
+
+    started = time.monotonic()
+    results, failed = asyncio.run(run_all())
+    print(f"⏱️ Параллельное сканирование {len(tasks)} задач заняло {time.monotonic() - started:.1f} с")
+    print(browser.usage_report())
+    print(browser.traffic_report())
+    return results, failed
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Сравнение извлечения по карточкам с прежним обходом от ссылок
+
+Для каждого сайта одна и та же страница разбирается прежней функцией
+(от каждой ссылки вверх по родителям) и функцией по карточкам из
+SITE_ADAPTERS. Время меряется внутри страницы (performance.now), без
+обмена с Python.
+
+    python3 bench_extraction.py                            # сгенерированные страницы
+    python3 bench_extraction.py plastinka=saved/plastinka.html korobkavinyla=saved/korobka.html
+
+Сохраненные страницы — «Сохранить как…» из браузера после нескольких
+«Загрузить ещё». Без них для каждого сайта строится страница с BENCH_CARDS
+карточками в разметке сайта.
+"""
+import os
+import sys
+from pathlib import Path
+
+from playwright.sync_api import sync_playwright
+
+from vinyl_monitor import (KOROBKA_ANCHOR_JS, PLASTINKA_ANCHOR_JS,
+                           SITE_ADAPTERS, VINYLFAMILY_ANCHOR_JS,
+                           VINYLTAP_ANCHOR_JS)
+
+BENCH_CARDS = int(os.getenv("BENCH_CARDS", "1000"))
+BENCH_REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+ANCHOR_JS = {
+    "korobkavinyla": KOROBKA_ANCHOR_JS,
+    "vinyltap": VINYLTAP_ANCHOR_JS,
+    "plastinka": PLASTINKA_ANCHOR_JS,
+    "vinylfamily": VINYLFAMILY_ANCHOR_JS,
+}
+
+# Карточка в разметке сайта; {i} — номер позиции
+CARD_TEMPLATES = {
+    "korobkavinyla": """
+      <div class="t-store__card js-product"><div class="t-store__card__wrap_all">
+        <a href="https://korobkavinyla.ru/catalog/tproduct/{i}-artist-album-lp">
+          <div class="t-store__card__imgwrapper"><div class="t-store__card__bgimg"></div></div>
+          <div class="t-store__card__textwrapper">
+            <div class="t-store__card__title js-store-prod-name t-name">Artist {i} — Album {i} (LP)</div>
+          </div>
+        </a>
+        <div class="t-store__card__price-wrapper">
+          <div class="t-store__card__price t-store__card__price-item">
+            <div class="js-product-price t-store__card__price-value">{price}</div>
+            <div class="t-store__card__price-currency">р.</div>
+          </div>
+        </div>
+        <div class="t-store__card__btns-wrapper"><a href="#order" class="t-store__card__btn t-btn">Купить</a></div>
+      </div></div>""",
+    "vinyltap": """
+      <li class="grid__item"><div class="card-wrapper product-card-wrapper"><div class="card card--standard">
+        <div class="card__inner"><div class="card__media"><img alt=""></div></div>
+        <div class="card__content"><div class="card__information">
+          <h3 class="card__heading h5">
+            <a href="https://vinyltap.co.uk/products/artist-{i}-album-lp" class="full-unstyled-link">Artist {i} - Album {i} LP</a>
+          </h3>
+          <div class="card-information"><div class="price"><div class="price__container">
+            <div class="price__regular"><span class="visually-hidden">Regular price</span>
+              <span class="price-item price-item--regular">£{price}.00 GBP</span></div>
+          </div></div></div>
+        </div></div>
+      </div></div></li>""",
+    "plastinka": """
+      <div class="products-grid-item">
+        <a href="https://plastinka.com/lp/item/{i}" class="products-grid-item__image"><img alt=""></a>
+        <div class="products-grid-item__artist"><a href="https://plastinka.com/lp/artist/{i}">Artist {i}</a></div>
+        <div class="products-grid-item__title"><a href="https://plastinka.com/lp/item/{i}">Album {i}</a></div>
+        <div class="products-grid-item__params"><a href="https://plastinka.com/lp/label/{i}">Label {i}</a></div>
+        <div class="products-grid-item__price">{price} руб.</div>
+      </div>""",
+}
+CARD_TEMPLATES["vinylfamily"] = CARD_TEMPLATES["korobkavinyla"].replace("korobkavinyla.ru", "vinylfamily.shop")
+
+# Навигация и подвал, как на настоящих страницах
+PAGE_TEMPLATE = """<!doctype html><html><body>
+  <header><nav>{nav}</nav></header>
+  <main><div class="catalog-grid">{cards}</div></main>
+  <footer>{nav}</footer>
+</body></html>"""
+
+
+def generated_page(site: str, cards: int) -> str:
+    """Страница каталога с cards карточками в разметке сайта"""
+    nav = "".join(f'<a href="/section-{i}">Раздел {i}</a>' for i in range(40))
+    body = "".join(CARD_TEMPLATES[site].format(i=i, price=1000 + i) for i in range(cards))
+    return PAGE_TEMPLATE.format(nav=nav, cards=body)
+
+
+def timed_js(items_js: str) -> str:
+    """Обертка: время одного разбора в миллисекундах и число позиций"""
+    return f"""
+    () => {{
+      const extract = {items_js.strip()};
+      const started = performance.now();
+      const items = extract();
+      return [performance.now() - started, items.length];
+    }}
+    """
+
+
+def measure(page, items_js: str, repeat: int):
+    """Лучшее время из repeat прогонов и число позиций"""
+    wrapped = timed_js(items_js)
+    page.evaluate(wrapped)  # Прогрев JIT
+    runs = [page.evaluate(wrapped) for _ in range(repeat)]
+    return min(ms for ms, _ in runs), runs[0][1]
+
+
+def parse_saved_pages(args):
+    """Аргументы вида сайт=файл.html"""
+    pages = {}
+    for arg in args:
+        site, _, path = arg.partition("=")
+        if site not in ANCHOR_JS or not path:
+            raise SystemExit(f"❌ Ожидается сайт=файл.html, сайты: {', '.join(ANCHOR_JS)}")
+        pages[site] = Path(path).resolve()
+    return pages
+
+
+def main():
+    saved_pages = parse_saved_pages(sys.argv[1:])
+    sites = list(saved_pages) or list(ANCHOR_JS)
+
+    print(f"{'Сайт':<15}{'Страница':<22}{'По ссылкам, мс':>16}{'По карточкам, мс':>18}{'Ускорение':>11}  Позиции")
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        for site in sites:
+            if site in saved_pages:
+                page.goto(saved_pages[site].as_uri(), wait_until="domcontentloaded")
+                label = saved_pages[site].name
+            else:
+                page.set_content(generated_page(site, BENCH_CARDS))
+                label = f"{BENCH_CARDS} карточек"
+
+            anchor_ms, anchor_count = measure(page, ANCHOR_JS[site], BENCH_REPEAT)
+            card_ms, card_count = measure(page, SITE_ADAPTERS[site].items_js, BENCH_REPEAT)
+            speedup = anchor_ms / card_ms if card_ms else float("inf")
+            print(f"{site:<15}{label[:21]:<22}{anchor_ms:>16.1f}{card_ms:>18.1f}{speedup:>10.1f}x  "
+                  f"{anchor_count} / {card_count}")
+        browser.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Память и скорость конвейера: словари скраперов против Item со __slots__
+
+Для N синтетических позиций (как их отдают DOM и API магазинов) меряется:
+- память списка позиций после проставления источника (tracemalloc);
+- время прохода, повторяющего прогон: источник, дедупликация по ID,
+  отбор новых и множество ID прогона. Словари нормализуют URL на каждом шаге
+  заново, Item — один раз при создании.
+
+    python3 bench_item_model.py                  # 100k позиций
+    BENCH_ITEMS=20000 BENCH_REPEAT=5 python3 bench_item_model.py
+"""
+import gc
+import os
+import time
+import tracemalloc
+from decimal import Decimal
+
+from item_model import make_items
+from state_store import normalize_url
+
+BENCH_ITEMS = int(os.getenv("BENCH_ITEMS", "100000"))
+BENCH_REPEAT = int(os.getenv("BENCH_REPEAT", "3"))
+
+
+def raw_items(count: int) -> list:
+    items = []
+    for i in range(count):
+        # DOM и API отдают URL уже без завершающего слеша, но каждый десятый — с параметрами
+        url = f"https://korobkavinyla.ru/catalog/tproduct/771567999-{100000000 + i}-artist-{i % 3000}-album-{i}"
+        url += "?utm_source=catalog" if i % 10 == 0 else ""
+        items.append({"id": url, "url": url, "title": f"Artist {i % 3000} — Album {i} (LP)",
+                      "price": f"{2000 + i % 500} р.", "price_amount": Decimal(2000 + i % 500), "currency": "RUB"})
+    return items
+
+
+def dict_pipeline(raw: list, known: set) -> int:
+    items = [dict(item) for item in raw]
+    for item in items:
+        item["source"] = "korobkavinyla.ru"
+    seen, unique = set(), []
+    for item in items:
+        item_id = normalize_url(item.get("url") or item.get("id", ""))
+        if item_id not in seen:
+            seen.add(item_id)
+            item["id"] = item_id
+            unique.append(item)
+    current_ids = {normalize_url(item["id"]) for item in unique}
+    new_items = [item for item in unique if normalize_url(item["id"]) not in known]
+    return len(current_ids) + len(new_items)
+
+
+def item_pipeline(raw: list, known: set) -> int:
+    items = make_items(raw, "korobkavinyla.ru")
+    seen, unique = set(), []
+    for item in items:
+        if item.id not in seen:
+            seen.add(item.id)
+            unique.append(item)
+    current_ids = {item.id for item in unique}
+    new_items = [item for item in unique if item.id not in known]
+    return len(current_ids) + len(new_items)
+
+
+def traced_kb(build) -> float:
+    """Память, которую держит результат build() (без входных данных)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size / 1024
+
+
+def best_ms(func) -> float:
+    timings = []
+    for _ in range(BENCH_REPEAT):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main():
+    raw = raw_items(BENCH_ITEMS)
+    known = {normalize_url(item["url"]) for item in raw[: BENCH_ITEMS // 2]}
+
+    def dicts():
+        items = [dict(item) for item in raw]
+        for item in items:
+            item["source"] = "korobkavinyla.ru"
+            item["id"] = normalize_url(item.get("url") or item.get("id", ""))
+        return items
+
+    # Позиции после дедупликации (id нормализован); строки и Decimal общие с входными данными
+    dict_kb = traced_kb(dicts)
+    item_kb = traced_kb(lambda: make_items(raw, "korobkavinyla.ru"))
+    dict_ms = best_ms(lambda: dict_pipeline(raw, known))
+    item_ms = best_ms(lambda: item_pipeline(raw, known))
+    assert dict_pipeline(raw, known) == item_pipeline(raw, known)
+
+    print(f"📦 {BENCH_ITEMS} позиций, лучший из {BENCH_REPEAT}")
+    print(f"   {'вариант':<8}{'память, КБ':>12}{'байт/поз.':>11}{'конвейер, мс':>15}")
+    print(f"   {'dict':<8}{dict_kb:>12.0f}{dict_kb * 1024 / BENCH_ITEMS:>11.0f}{dict_ms:>15.0f}")
+    print(f"   {'Item':<8}{item_kb:>12.0f}{item_kb * 1024 / BENCH_ITEMS:>11.0f}{item_ms:>15.0f}")
+    print(f"   Item/dict: память {item_kb / dict_kb:.2f}×, время {item_ms / dict_ms:.2f}×")
+
+
+if __name__ == "__main__":
+    main()
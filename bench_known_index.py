@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Память и скорость проверки известных ID: множество строк против фильтров known_index.py
+
+База state.db с N позициями создается один раз во временном каталоге. Каждый
+вариант запускается в отдельном процессе, чтобы RSS не смешивался:
+
+- set — known_ids() из базы, как load_state() без KNOWN_INDEX;
+- bloom — KnownIndex с фильтром Блума и заданной долей ложных срабатываний;
+- hash — KnownIndex с отсортированными 64-битными хешами в mmap.
+
+Печатается прирост RSS после загрузки и число проверок в секунду для
+неизвестных ID (фильтр отвечает сам) и известных (каждое попадание идет в базу).
+
+    python3 bench_known_index.py                     # 100k и 1M позиций
+    BENCH_SIZES=100000 BENCH_FP_RATE=0.001 python3 bench_known_index.py
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_SIZES = [int(size) for size in os.getenv("BENCH_SIZES", "100000,1000000").split(",")]
+BENCH_FP_RATE = float(os.getenv("BENCH_FP_RATE", "0.01"))
+BENCH_LOOKUPS = int(os.getenv("BENCH_LOOKUPS", "20000"))
+
+
+def item_id(i: int) -> str:
+    return f"https://www.avito.ru/moskva/audio_i_video/plastinka_artist_{i % 3000}_album_{i}_{3000000000 + i}"
+
+
+def rss_kb() -> int:
+    """Текущий RSS процесса (Linux), КБ"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def lookups_per_sec(known, ids) -> float:
+    started = time.perf_counter()
+    sum(key in known for key in ids)
+    return len(ids) / (time.perf_counter() - started)
+
+
+def child(variant: str, db_path: Path, size: int) -> None:
+    """Один вариант в чистом процессе: JSON с приростом RSS и скоростью проверок"""
+    from known_index import KnownIndex
+    from state_store import StateStore
+
+    before = rss_kb()
+    started = time.perf_counter()
+    if variant == "set":
+        with StateStore(db_path) as store:
+            known = store.known_ids()
+    else:
+        known = KnownIndex.open(db_path, lambda: StateStore(db_path), variant, BENCH_FP_RATE)
+    load_ms = (time.perf_counter() - started) * 1000
+    step = max(size // BENCH_LOOKUPS, 1)
+    result = {"rss_kb": rss_kb() - before, "load_ms": load_ms,
+              "unknown_per_sec": lookups_per_sec(known, [item_id(size + i) for i in range(BENCH_LOOKUPS)]),
+              "known_per_sec": lookups_per_sec(known, [item_id(i) for i in range(0, size, step)])}
+    if variant != "set":
+        result["false_positives"] = known.stats["false_positives"]
+    print(json.dumps(result))
+
+
+def run_child(variant: str, db_path: Path, size: int) -> dict:
+    output = subprocess.run([sys.executable, __file__, "--child", variant, str(db_path), str(size)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    from state_store import StateStore
+
+    for size in BENCH_SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "state.db"
+            with StateStore(db_path) as store:
+                store.add_items([{"id": item_id(i), "source": "avito.ru"} for i in range(size)], "2026-03-01T10:00:00")
+            for variant in ("bloom", "hash"):
+                run_child(variant, db_path, size)  # Первый запуск строит файл индекса, меряем чтение готового
+            print(f"\n📦 {size} позиций, доля ложных срабатываний {BENCH_FP_RATE}")
+            print(f"   {'вариант':<8}{'RSS, МБ':>10}{'загрузка, мс':>15}{'неизв./с':>12}{'изв./с':>12}{'ложных':>8}")
+            for variant in ("set", "bloom", "hash"):
+                result = run_child(variant, db_path, size)
+                false_positives = f"{result['false_positives']:>8}" if "false_positives" in result else ""
+                print(f"   {variant:<8}{result['rss_kb'] / 1024:>10.1f}{result['load_ms']:>15.1f}"
+                      f"{result['unknown_per_sec']:>12.0f}{result['known_per_sec']:>12.0f}{false_positives}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        child(sys.argv[2], Path(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
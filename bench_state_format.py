@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Размер и время записи/загрузки состояния в разных форматах
+
+Для синтетического состояния из N позиций (URL и источники как у реальных
+магазинов) каждый формат state_format.py сериализуется и разбирается
+заново; печатается размер и время относительно прежнего JSON с отступами.
+
+    python3 bench_state_format.py                    # 10k, 100k и 1M позиций
+    BENCH_SIZES=10000 BENCH_REPEAT=5 python3 bench_state_format.py
+"""
+import os
+import time
+
+from state_format import decode_state, encode_state, zstandard
+
+BENCH_SIZES = [int(size) for size in os.getenv("BENCH_SIZES", "10000,100000,1000000").split(",")]
+BENCH_REPEAT = int(os.getenv("BENCH_REPEAT", "3"))
+
+SHOPS = [
+    ("korobkavinyla.ru", "https://korobkavinyla.ru/catalog/tproduct/771567999-"),
+    ("vinyltap.co.uk", "https://vinyltap.co.uk/products/"),
+    ("plastinka.com", "https://plastinka.com/lp/item/"),
+    ("vinylfamily.shop", "https://vinylfamily.shop/product/"),
+    ("avito.ru", "https://www.avito.ru/moskva/audio_i_video/"),
+]
+
+# (название, формат, словарное кодирование)
+VARIANTS = [
+    ("json (прежний)", "json", False),
+    ("compact", "compact", False),
+    ("compact + словарь", "compact", True),
+    ("gzip", "gzip", False),
+    ("gzip + словарь", "gzip", True),
+]
+if zstandard is not None:
+    VARIANTS += [("zstd", "zstd", False), ("zstd + словарь", "zstd", True)]
+
+
+def synthetic_state(count: int) -> dict:
+    known_items = {}
+    for i in range(count):
+        source, prefix = SHOPS[i % len(SHOPS)]
+        known_items[f"{prefix}{100000000 + i * 7919}-artist-{i % 3000}-album-{i}-lp"] = {
+            "added_at": f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}T10:{i % 60:02d}:00",
+            "title": f"Artist {i % 3000} — Album {i} (LP)", "source": source}
+    return {"known_items": known_items}
+
+
+def best_ms(func) -> float:
+    timings = []
+    for _ in range(BENCH_REPEAT):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main():
+    for size in BENCH_SIZES:
+        state = synthetic_state(size)
+        print(f"\n📦 {size} позиций, лучший из {BENCH_REPEAT}")
+        print(f"   {'формат':<20}{'размер':>12}{'×':>7}{'запись, мс':>13}{'×':>7}{'загрузка, мс':>15}{'×':>7}")
+        baseline = None
+        for name, fmt, dictionary in VARIANTS:
+            raw = encode_state(state, fmt, dictionary)
+            assert decode_state(raw) == state
+            save_ms = best_ms(lambda: encode_state(state, fmt, dictionary))
+            load_ms = best_ms(lambda: decode_state(raw))
+            if baseline is None:
+                baseline = (len(raw), save_ms, load_ms)
+            print(f"   {name:<20}{len(raw) / 1024:>9.0f} КБ{len(raw) / baseline[0]:>7.2f}"
+                  f"{save_ms:>13.0f}{save_ms / baseline[1]:>7.2f}{load_ms:>15.0f}{load_ms / baseline[2]:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
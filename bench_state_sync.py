@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Сравнение полной загрузки state.json из S3 с условной (If-None-Match)
+
+Первый прогон скачивает и разбирает объект и запоминает его ETag в
+локальном state.json. Следующие прогоны, пока объект не меняется, получают
+304: тело не передается и не разбирается, состояние берется из локального
+файла. Скрипт меряет байты и время на прогон в обоих режимах.
+
+    python3 bench_state_sync.py                    # moto в памяти
+    S3_ENDPOINT_URL=http://localhost:9000 S3_BUCKET=bench \\
+        S3_ACCESS_KEY=minioadmin S3_SECRET_KEY=minioadmin python3 bench_state_sync.py   # MinIO
+
+Без S3_ENDPOINT_URL бакет поднимается в moto, и время показывает только
+стоимость разбора; с настоящим хранилищем добавляется сеть.
+"""
+import json
+import os
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+BENCH_ITEMS = int(os.getenv("BENCH_ITEMS", "20000"))
+BENCH_REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+
+def synthetic_state(count: int) -> dict:
+    return {"known_items": {
+        f"https://shop.ru/catalog/artist-{i}-album-{i}-lp": {
+            "added_at": "2026-03-01T10:00:00", "title": f"Artist {i} — Album {i} (LP)", "source": "shop.ru"}
+        for i in range(count)}}
+
+
+def run(state_path: Path, use_cache: bool):
+    """Один прогон загрузки: (байт скачано, мс)"""
+    from monitor_state import STATE_STATS, JsonFileBackend, MonitorState, S3Backend
+    from s3_storage import S3Storage
+
+    STATE_STATS.__init__()
+    cache = JsonFileBackend(state_path)
+    started = time.perf_counter()
+    MonitorState.load([S3Backend(S3Storage(), cache if use_cache else None), cache])
+    return STATE_STATS.s3_bytes_down, (time.perf_counter() - started) * 1000
+
+
+def main():
+    with ExitStack() as stack:
+        if not os.getenv("S3_ENDPOINT_URL"):
+            from moto import mock_aws
+            os.environ.update({"S3_ENDPOINT_URL": "", "S3_BUCKET": "vinyl-monitor-bench", "S3_REGION": "us-east-1",
+                               "S3_ACCESS_KEY": "bench", "S3_SECRET_KEY": "bench"})
+            stack.enter_context(mock_aws())
+            import boto3
+            boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="vinyl-monitor-bench")
+
+        from s3_storage import S3Storage
+        S3Storage().upload_state(synthetic_state(BENCH_ITEMS))
+        state_path = Path(stack.enter_context(tempfile.TemporaryDirectory())) / "state.json"
+
+        full = [run(state_path, use_cache=False) for _ in range(BENCH_REPEAT)]
+        run(state_path, use_cache=True)  # Первый прогон с кэшем запоминает ETag
+        cached = [run(state_path, use_cache=True) for _ in range(BENCH_REPEAT)]
+
+    full_bytes, full_ms = full[-1][0], min(ms for _, ms in full)
+    cached_bytes, cached_ms = cached[-1][0], min(ms for _, ms in cached)
+    print(f"📦 {BENCH_ITEMS} позиций, state.json {full_bytes / 1024:.0f} КБ, лучший из {BENCH_REPEAT}")
+    print(f"   полная загрузка:  {full_bytes / 1024:8.0f} КБ  {full_ms:8.1f} мс")
+    print(f"   If-None-Match:    {cached_bytes / 1024:8.0f} КБ  {cached_ms:8.1f} мс")
+    print(f"   сэкономлено:      {(full_bytes - cached_bytes) / 1024:8.0f} КБ  {full_ms - cached_ms:8.1f} мс на прогон")
+    print(json.dumps({"items": BENCH_ITEMS, "full_bytes": full_bytes, "full_ms": round(full_ms, 1),
+                      "cached_bytes": cached_bytes, "cached_ms": round(cached_ms, 1)}))
+
+
+if __name__ == "__main__":
+    main()
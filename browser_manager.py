@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Общий браузер Playwright на один запуск монитора
+"""
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from urllib.parse import urlparse
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+_RU_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "ru-RU,ru;q=0.9,en;q=0.8",
+    "Accept-Encoding": "gzip, deflate, br",
+    "DNT": "1",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+# Блокировка ресурсов: извлечение читает только ссылки и текст, картинки и шрифты не нужны
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "true").lower() == "true"
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "facebook.net",
+    "mc.yandex.ru",
+    "an.yandex.ru",
+    "top-fwz1.mail.ru",
+    "vk.com",
+    "jivosite.com",
+    "jivo.ru",
+    "tawk.to",
+    "hotjar.com",
+    "clarity.ms",
+    "bat.bing.com",
+    "criteo.com",
+    "criteo.net",
+    "analytics.tiktok.com",
+    "monorail-edge.shopifysvc.com",
+)
+
+# Параметры контекста (локаль, User-Agent, заголовки, исключения из блокировки) для каждого сайта
+SITE_PROFILES: Dict[str, Dict] = {
+    "korobkavinyla": {
+        "locale": "ru-RU",
+        "user_agent": DEFAULT_USER_AGENT,
+        "extra_http_headers": _RU_HEADERS,
+        "allow_resource_types": (),
+        "allow_hosts": ("store.tildaapi.com",),
+    },
+    "plastinka": {
+        "locale": "ru-RU",
+        "user_agent": DEFAULT_USER_AGENT,
+        "extra_http_headers": _RU_HEADERS,
+        "allow_resource_types": (),
+        "allow_hosts": (),
+    },
+    "vinylfamily": {
+        "locale": "ru-RU",
+        "user_agent": DEFAULT_USER_AGENT,
+        "extra_http_headers": _RU_HEADERS,
+        "allow_resource_types": (),
+        "allow_hosts": (),
+    },
+    "vinyltap": {
+        "locale": "en-GB",
+        "user_agent": DEFAULT_USER_AGENT,
+        "extra_http_headers": {
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+            "Accept-Language": "en-GB,en;q=0.9,en-US;q=0.8",
+            "Accept-Encoding": "gzip, deflate, br",
+            "DNT": "1",
+            "Connection": "keep-alive",
+            "Upgrade-Insecure-Requests": "1",
+        },
+        "allow_resource_types": (),
+        "allow_hosts": (),
+    },
+    "avito": {
+        "locale": "ru-RU",
+        "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+        "extra_http_headers": {
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
+            "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
+            "Accept-Encoding": "gzip, deflate, br",
+            "DNT": "1",
+            "Connection": "keep-alive",
+            "Upgrade-Insecure-Requests": "1",
+            "Sec-Fetch-Dest": "document",
+            "Sec-Fetch-Mode": "navigate",
+            "Sec-Fetch-Site": "none",
+            "Cache-Control": "max-age=0",
+        },
+        "allow_resource_types": (),
+        "allow_hosts": (),
+    },
+}
+
+
+def _host_matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class ResourcePolicy:
+    """Какие запросы страницы пропускать: типы ресурсов и трекеры блокируются, allowlist сайта важнее"""
+
+    def __init__(self, blocked_types: Iterable[str] = BLOCKED_RESOURCE_TYPES,
+                 tracker_domains: Iterable[str] = TRACKER_DOMAINS,
+                 allow_types: Iterable[str] = (), allow_hosts: Iterable[str] = ()):
+        self.blocked_types = frozenset(blocked_types) - frozenset(allow_types)
+        self.tracker_domains = tuple(tracker_domains)
+        self.allow_hosts = tuple(allow_hosts)
+
+    @classmethod
+    def for_site(cls, site: str) -> "ResourcePolicy":
+        profile = SITE_PROFILES[site]
+        return cls(allow_types=profile.get("allow_resource_types", ()),
+                   allow_hosts=profile.get("allow_hosts", ()))
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        if _host_matches(host, self.allow_hosts):
+            return False
+        return resource_type in self.blocked_types or _host_matches(host, self.tracker_domains)
+
+
+class LaunchStats:
+    """Статистика запусков браузера и трафика за прогон (общая для sync и async менеджеров)"""
+
+    def __init__(self):
+        self.launch_count = 0
+        self.launch_seconds = 0.0
+        self.contexts_opened = 0
+        self.block_resources = BLOCK_RESOURCES
+        self.requests_blocked = 0
+        self.responses_received = 0
+        self.bytes_received = 0
+        self.page_loads = 0
+        self.page_load_seconds = 0.0
+
+    def watch_page(self, page) -> None:
+        """Считает трафик и время загрузки страниц по событиям Playwright.
+
+        Байты — размер тела ответа по сети из request.sizes() (responseBodySize, сжатый): у ответов
+        chunked и со сжатием нет Content-Length, и по заголовку они считались бы нулем.
+        """
+        navigation: Dict[str, float] = {}
+
+        def on_request(request):
+            if request.is_navigation_request() and request.frame.parent_frame is None:
+                navigation["started"] = time.monotonic()
+
+        def on_response(response):
+            self.responses_received += 1
+
+        def on_request_finished(request):
+            try:
+                sizes = request.sizes()
+            except Exception:
+                return None
+            if inspect.isawaitable(sizes):
+                # Async API: обработчик-корутину Playwright запускает сам
+                return self._count_sizes_async(sizes)
+            self._count_sizes(sizes)
+            return None
+
+        def on_load(*_):
+            started = navigation.pop("started", None)
+            if started is not None:
+                self.page_loads += 1
+                self.page_load_seconds += time.monotonic() - started
+
+        page.on("request", on_request)
+        page.on("response", on_response)
+        page.on("requestfinished", on_request_finished)
+        page.on("load", on_load)
+
+    def _count_sizes(self, sizes: Dict) -> None:
+        self.bytes_received += max(sizes.get("responseBodySize", 0), 0)
+
+    async def _count_sizes_async(self, sizes) -> None:
+        try:
+            self._count_sizes(await sizes)
+        except Exception:
+            pass
+
+    def traffic_report(self) -> str:
+        """Строка для лога о трафике и загрузке страниц за прогон"""
+        mode = "блокировка ресурсов включена" if self.block_resources else "блокировка ресурсов выключена"
+        average = self.page_load_seconds / self.page_loads if self.page_loads else 0.0
+        return (
+            f"🌐 Трафик ({mode}): {self.responses_received} ответов, "
+            f"≈{self.bytes_received / 1024 / 1024:.1f} МБ тел ответов по сети (request.sizes), "
+            f"заблокировано {self.requests_blocked} запросов; "
+            f"загрузка страниц: {self.page_loads}, в среднем {average:.1f} с"
+        )
+
+    def launch_time_saved(self) -> float:
+        """Оценка сэкономленного времени: каждый контекст сверх запусков раньше стоил свой запуск"""
+        if not self.launch_count:
+            return 0.0
+        average_launch = self.launch_seconds / self.launch_count
+        return max(self.contexts_opened - self.launch_count, 0) * average_launch
+
+    def usage_report(self) -> str:
+        """Строка для лога о запусках браузера за прогон"""
+        if not self.launch_count:
+            return "🚀 Chromium не запускался"
+        return (
+            f"🚀 Chromium: {self.launch_count} запуск(ов) за {self.launch_seconds:.1f} с, "
+            f"{self.contexts_opened} контекст(ов); сэкономлено ≈{self.launch_time_saved():.1f} с на запусках"
+        )
+
+
+class BrowserManager(LaunchStats):
+    """Один запуск Chromium на весь прогон, отдельный контекст для каждого сайта.
+
+    Браузер запускается лениво — при первом запросе контекста, поэтому
+    прогон, в котором ни один сайт не нужно сканировать, Chromium не поднимает.
+    """
+
+    def __init__(self, playwright_factory: Callable, headless: bool = True,
+                 block_resources: bool = BLOCK_RESOURCES):
+        super().__init__()
+        self._playwright_factory = playwright_factory
+        self._headless = headless
+        self.block_resources = block_resources
+        self._playwright_cm = None
+        self._playwright = None
+        self._browser = None
+
+    def __enter__(self) -> "BrowserManager":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @property
+    def browser(self):
+        """Запущенный браузер (запускается при первом обращении)"""
+        if self._browser is not None and not self._browser.is_connected():
+            # Chromium упал — в долгоживущем демоне поднимаем его заново
+            print("⚠️ Браузер отключился, перезапускаем")
+            self.close()
+        if self._browser is None:
+            self._launch()
+        return self._browser
+
+    def _launch(self) -> None:
+        started = time.monotonic()
+        self._playwright_cm = self._playwright_factory()
+        self._playwright = self._playwright_cm.__enter__()
+        try:
+            self._browser = self._playwright.chromium.launch(headless=self._headless)
+        except Exception:
+            self._playwright_cm.__exit__(None, None, None)
+            self._playwright_cm = None
+            self._playwright = None
+            raise
+        self.launch_seconds += time.monotonic() - started
+        self.launch_count += 1
+
+    def new_context(self, site: str):
+        """Создает контекст с локалью и заголовками сайта"""
+        profile = SITE_PROFILES[site]
+        context = self.browser.new_context(
+            locale=profile["locale"],
+            user_agent=profile["user_agent"],
+            extra_http_headers=dict(profile["extra_http_headers"]),
+        )
+        self.contexts_opened += 1
+        if self.block_resources:
+            context.route("**/*", self._route_handler(ResourcePolicy.for_site(site)))
+        return context
+
+    def _route_handler(self, policy: ResourcePolicy) -> Callable:
+        def handle(route):
+            request = route.request
+            if policy.should_block(request.resource_type, request.url):
+                self.requests_blocked += 1
+                route.abort()
+            else:
+                route.continue_()
+        return handle
+
+    @contextmanager
+    def site_page(self, site: str, timeout_ms: Optional[int] = None) -> Iterator:
+        """Страница в новом контексте сайта; контекст закрывается на выходе"""
+        context = self.new_context(site)
+        try:
+            page = context.new_page()
+            self.watch_page(page)
+            if timeout_ms is not None:
+                page.set_default_timeout(timeout_ms)
+            yield page
+        finally:
+            try:
+                context.close()
+            except Exception as e:
+                print(f"    Ошибка при закрытии контекста {site}: {e}")
+
+    def close(self) -> None:
+        """Закрывает браузер и останавливает Playwright"""
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception as e:
+                print(f"⚠️ Ошибка при закрытии браузера: {e}")
+            self._browser = None
+        if self._playwright_cm is not None:
+            try:
+                self._playwright_cm.__exit__(None, None, None)
+            except Exception as e:
+                print(f"⚠️ Ошибка при остановке Playwright: {e}")
+            self._playwright_cm = None
+            self._playwright = None
+
+
+@contextmanager
+def shared_or_own_browser(browser: Optional[BrowserManager], playwright_factory: Callable) -> Iterator[BrowserManager]:
+    """Общий браузер прогона, либо собственный, если скрапер вызван отдельно"""
+    if browser is not None:
+        yield browser
+        return
+    with BrowserManager(playwright_factory) as own_browser:
+        yield own_browser
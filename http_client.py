@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+HTTP-сессия с пулом соединений для источников без браузера
+"""
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from rate_limiter import RATE_LIMITER, HostRateLimiter
+
+# Повторы ответа 429 в limited_get: каждый идет через лимитер, уже замедленный этим ответом
+RATE_LIMITED_RETRIES = 2
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+def make_session(headers: Optional[Dict[str, str]] = None) -> requests.Session:
+    """Сессия с пулом соединений и повторами для временных ошибок сервера.
+
+    429 urllib3 не повторяет: ответ возвращается в limited_get, и лимитер хоста замедляется.
+    """
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=1, status_forcelist=(500, 502, 503, 504),
+                  allowed_methods=("GET",), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT})
+    session.headers.update(headers or {})
+    return session
+
+
+def limited_get(session: requests.Session, url: str, limiter: Optional[HostRateLimiter] = None,
+                **kwargs) -> requests.Response:
+    """GET с учетом лимита частоты хоста; 429/403 замедляют следующие запросы к нему.
+
+    429 повторяется до RATE_LIMITED_RETRIES раз, каждый повтор ждет очереди у замедленного лимитера.
+    """
+    limiter = limiter or RATE_LIMITER
+    for _ in range(RATE_LIMITED_RETRIES + 1):
+        limiter.wait(url)
+        response = session.get(url, **kwargs)
+        limiter.feedback(url, response.status_code)
+        if response.status_code != 429:
+            break
+    return response
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Инкрементальное извлечение карточек при подгрузке «Загрузить ещё»
+
+Страница разбирается целиком один раз. Затем MutationObserver копит
+вставленные узлы, и после каждого нажатия функция извлечения сайта
+запускается только по ним; в Python возвращаются только позиции,
+которых еще не было. Функции извлечения сайтов принимают необязательный
+список корней: без него они разбирают весь document.
+"""
+from typing import Callable, Dict, Iterable, List, Optional
+
+OBSERVER_INSTALL_JS = r"""
+    (seenIds) => {
+      if (window.__vmObserver) window.__vmObserver.disconnect();
+      window.__vmSeen = new Set(seenIds || []);
+      window.__vmAdded = [];
+      window.__vmObserver = new MutationObserver(mutations => {
+        for (const m of mutations) {
+          for (const node of m.addedNodes) {
+            if (node.nodeType === Node.ELEMENT_NODE) window.__vmAdded.push(node);
+          }
+        }
+      });
+      window.__vmObserver.observe(document.body, { childList: true, subtree: true });
+    }
+    """
+
+
+def drain_js(extract_js: str) -> str:
+    """JS, который разбирает накопленные узлы функцией сайта и отдает только новые позиции"""
+    return f"""
+    () => {{
+      const extract = {extract_js.strip()};
+      const added = (window.__vmAdded || []).splice(0).filter(node => node.isConnected);
+      // Узлы внутри других вставленных узлов разберутся вместе с родителем
+      const roots = added.filter(node => !added.some(other => other !== node && other.contains(node)));
+      if (!roots.length) return [];
+      const fresh = [];
+      for (const item of extract(roots)) {{
+        if (window.__vmSeen.has(item.id)) continue;
+        window.__vmSeen.add(item.id);
+        fresh.push(item);
+      }}
+      return fresh;
+    }}
+    """
+
+
+class IncrementalExtractor:
+    """Наблюдатель за вставленными карточками на одной странице"""
+
+    def __init__(self, page, extract_js: str):
+        self.page = page
+        self._drain_js = drain_js(extract_js)
+
+    def install(self, items: Iterable[Dict]) -> None:
+        """Ставит наблюдатель; items — позиции полного разбора, они считаются уже отданными"""
+        self.page.evaluate(OBSERVER_INSTALL_JS, [item["id"] for item in items])
+
+    def new_items(self) -> List[Dict]:
+        """Позиции из карточек, вставленных с прошлого вызова"""
+        return list(self.page.evaluate(self._drain_js) or [])
+
+    async def install_async(self, items: Iterable[Dict]) -> None:
+        await self.page.evaluate(OBSERVER_INSTALL_JS, [item["id"] for item in items])
+
+    async def new_items_async(self) -> List[Dict]:
+        return list(await self.page.evaluate(self._drain_js) or [])
+
+
+def _load_more_button(page, labels):
+    btn = page.locator(f"text={labels[0]}")
+    for label in labels[1:]:
+        btn = btn.or_(page.locator(f"text={label}"))
+    return btn
+
+
+def click_load_more(page, labels, max_clicks: int, wait_ms: int, extractor: IncrementalExtractor,
+                    items: List[Dict], should_stop: Optional[Callable[[List[Dict]], bool]] = None) -> int:
+    """Нажимает «Загрузить ещё», после каждого нажатия дописывает в items только новые позиции.
+
+    should_stop получает последнюю порцию (сначала — сами items) и может
+    прекратить подгрузку. Возвращает число нажатий.
+    """
+    clicks = 0
+    batch = items
+    while clicks < max_clicks:
+        if should_stop and should_stop(batch):
+            print("    Новых позиций нет, подгрузку не продолжаем")
+            break
+        try:
+            btn = _load_more_button(page, labels)
+            if btn.count() == 0:
+                break
+            btn.first.scroll_into_view_if_needed()
+            btn.first.click()
+        except Exception as e:
+            print(f"    Ошибка при нажатии кнопки 'Load more': {e}")
+            break
+        clicks += 1
+        page.wait_for_timeout(wait_ms)
+        batch = extractor.new_items()
+        items.extend(batch)
+    return clicks
+
+
+async def click_load_more_async(page, labels, max_clicks: int, wait_ms: int, extractor: IncrementalExtractor,
+                                items: List[Dict], should_stop: Optional[Callable[[List[Dict]], bool]] = None) -> int:
+    """Асинхронный вариант click_load_more"""
+    clicks = 0
+    batch = items
+    while clicks < max_clicks:
+        if should_stop and should_stop(batch):
+            print("    Новых позиций нет, подгрузку не продолжаем")
+            break
+        try:
+            btn = _load_more_button(page, labels)
+            if await btn.count() == 0:
+                break
+            await btn.first.scroll_into_view_if_needed()
+            await btn.first.click()
+        except Exception as e:
+            print(f"    Ошибка при нажатии кнопки 'Load more': {e}")
+            break
+        clicks += 1
+        await page.wait_for_timeout(wait_ms)
+        batch = await extractor.new_items_async()
+        items.extend(batch)
+    return clicks
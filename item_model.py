@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Позиция каталога: один тип на весь конвейер от скрапера до уведомления
+
+Скраперы (DOM, API Tilda и Shopify, Авито) отдают словари, а источник,
+нормализованный ID и цена раньше дописывались и пересчитывались по дороге
+несколькими копиями одного и того же кода. Item собирает это в одном месте:
+канонический ID (normalize_url от url, а без него — от id) вычисляется один раз
+при создании, источник задается при создании, цена хранится и строкой
+магазина, и числом (из API или price_parser.py).
+
+Item — компактный объект со __slots__, но ведет себя как словарь позиции
+(item["title"], item.get("price", ""), in, ==): форматирование сообщений,
+состояние и тесты работают с ним так же, как со словарями скраперов.
+Отсутствующее поле хранится как None и в ключах не видно.
+"""
+from collections.abc import MutableMapping
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from state_store import normalize_url
+
+# Поля позиции, которые хранятся в слотах; остальные ключи скраперов — в extra
+ITEM_FIELDS = ("id", "url", "source", "title", "price", "price_amount", "price_original", "currency", "query",
+               "release_id")
+_FIELD_SET = frozenset(ITEM_FIELDS)
+
+
+class Item(MutableMapping):
+    """Позиция каталога со слотами; id — канонический (нормализованный URL)"""
+    __slots__ = ITEM_FIELDS + ("extra",)
+
+    def __init__(self, id: str = "", url: Optional[str] = None, source: Optional[str] = None,
+                 title: Optional[str] = None, price: Optional[str] = None,
+                 price_amount: Optional[Decimal] = None, price_original: Optional[Decimal] = None,
+                 currency: Optional[str] = None, query: Optional[str] = None,
+                 release_id: Optional[str] = None, extra: Optional[Dict[str, Any]] = None):
+        self.url = url
+        self.id = normalize_url(url or id)
+        self.source = source
+        self.title = title
+        self.price = price  # Как на сайте: "2 500 р.", "£25.00", "3000 руб. → 2500 руб."
+        self.price_amount = price_amount  # Сумма к оплате (API или price_parser)
+        self.price_original = price_original  # Сумма до скидки
+        self.currency = currency
+        self.query = query  # Поисковый запрос Авито
+        self.release_id = release_id  # Релиз, общий для магазинов (release_matching.py)
+        self.extra = extra or None  # Прочие ключи скрапера; None — их нет (без лишнего словаря)
+
+    @classmethod
+    def from_dict(cls, data, source: Optional[str] = None) -> "Item":
+        """Позиция из словаря скрапера; source задает источник, если он известен вызывающему"""
+        if not isinstance(data, dict):  # Проверка dict дешевле, чем isinstance с ABC
+            if source:
+                data.source = source
+            return data
+        get = data.get
+        extra = None
+        if not _FIELD_SET.issuperset(data):
+            extra = {key: value for key, value in data.items() if key not in _FIELD_SET}
+        return cls(get("id", ""), get("url"), source or get("source"), get("title"), get("price"),
+                   get("price_amount"), get("price_original"), get("currency"), get("query"),
+                   get("release_id"), extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ITEM_FIELDS:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == "id":
+            self.id = normalize_url(value)
+        elif key in ITEM_FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key == "id":
+            raise KeyError("id позиции не удаляется")
+        if key in ITEM_FIELDS and getattr(self, key) is not None:
+            setattr(self, key, None)
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in ITEM_FIELDS:
+            if getattr(self, key) is not None:
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"Item({self.to_dict()!r})"
+
+
+def make_items(items: Iterable, source: Optional[str] = None) -> List[Item]:
+    """Позиции скрапера одним списком Item с заданным источником"""
+    return [Item.from_dict(item, source) for item in items]
+
+
+def canonical_id(item) -> str:
+    """Канонический ID позиции: у Item уже вычислен, у словаря — по url, а без него по id"""
+    if isinstance(item, Item):
+        return item.id
+    return normalize_url(item.get("url") or item.get("id", ""))
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Индекс известных позиций без множества строк в памяти
+
+load_state() по умолчанию держит все известные нормализованные URL множеством
+полных строк — с годами оборота Авито это заметная часть памяти маленькой
+машины. С KNOWN_INDEX (вместе со STATE_BACKEND=sqlite) вместо множества
+работает KnownIndex: компактный фильтр в памяти и база state.db как точное
+хранилище. Отрицательный ответ фильтра окончательный, в базу ходим только при
+попадании — там сверяется полный ключ.
+
+Фильтры:
+- bloom — фильтр Блума (около 10 бит на позицию при 1% ложных срабатываний),
+  файл state.bloom читается в память целиком;
+- hash — отсортированные 64-битные хеши ID в state.idx (8 байт на позицию),
+  файл отображается в память (mmap) и ищется двоичным поиском; новые хеши
+  вливаются линейным слиянием при сохранении.
+
+Файл фильтра пересобирается потоком ID из базы, если его нет, он переполнен или
+число позиций в базе не совпадает с записанным (базу изменили в обход фильтра).
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from state_store import StateStore, normalize_url
+
+BLOOM_MAGIC = b"VMBF"
+BLOOM_VERSION = 1
+# Магия, версия, число бит, число хешей, емкость, добавлено позиций, позиций в базе при записи
+BLOOM_HEADER = struct.Struct("<4sBQBQQQ")
+HASH_INDEX_MAGIC = b"VMHX"
+HASH_INDEX_VERSION = 1
+# Магия, версия, число хешей, позиций в базе при записи; 32 байта — хеши после заголовка выровнены по 8
+HASH_INDEX_HEADER = struct.Struct("<4sI8xQQ")
+
+
+class BloomFilter:
+    """Фильтр Блума: k позиций бита из двух половин blake2b (двойное хеширование)"""
+    suffix = ".bloom"
+    label = "🌸 Фильтр Блума"
+
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        if not 0 < fp_rate < 1:
+            raise ValueError(f"Доля ложных срабатываний должна быть в (0, 1): {fp_rate}")
+        self.capacity = max(int(capacity), 1)
+        self.fp_rate = fp_rate
+        # m = -n·ln p / (ln 2)², k = m/n · ln 2
+        self.num_bits = max(8, math.ceil(-self.capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def update(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    @classmethod
+    def build(cls, keys: Iterable[str], count: int, fp_rate: float = 0.01) -> "BloomFilter":
+        """Фильтр по ID из базы; запас емкости вдвое — не пересобирать после каждого прогона"""
+        bloom = cls(max(2 * count, 10000), fp_rate)
+        bloom.update(keys)
+        return bloom
+
+    @property
+    def full(self) -> bool:
+        """Добавлено больше расчетной емкости: ложных срабатываний больше заданной доли"""
+        return self.count > self.capacity
+
+    def copy(self) -> "BloomFilter":
+        clone = object.__new__(BloomFilter)
+        clone.__dict__.update(self.__dict__, bits=bytearray(self.bits))
+        return clone
+
+    def save(self, path: Path, store_count: int = 0) -> None:
+        """Атомарно записывает фильтр; store_count — позиций в базе на момент записи"""
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, BLOOM_VERSION, self.num_bits, self.num_hashes,
+                                      self.capacity, self.count, store_count))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, fp_rate: float = 0.01):
+        """Читает фильтр из файла; возвращает (фильтр, позиций в базе при записи) или (None, 0)"""
+        try:
+            raw = path.read_bytes()
+            magic, version, num_bits, num_hashes, capacity, count, store_count = BLOOM_HEADER.unpack_from(raw)
+        except (OSError, struct.error):
+            return None, 0
+        if magic != BLOOM_MAGIC or version != BLOOM_VERSION or len(raw) != BLOOM_HEADER.size + (num_bits + 7) // 8:
+            return None, 0
+        bloom = object.__new__(cls)
+        bloom.capacity, bloom.fp_rate, bloom.num_bits, bloom.num_hashes = capacity, fp_rate, num_bits, num_hashes
+        bloom.bits = bytearray(raw[BLOOM_HEADER.size:])
+        bloom.count = count
+        return bloom, store_count
+
+
+def key_hash(key: str) -> int:
+    """64-битный хеш нормализованного ID"""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class SortedHashIndex:
+    """Отсортированные 64-битные хеши ID в файле, отображенном в память.
+
+    Поиск — двоичный по mmap (страницы подгружает ОС), новые хеши до save()
+    лежат во множестве. Совпадение хеша не доказывает, что ID известен:
+    KnownIndex сверяет полный ключ с базой.
+    """
+    suffix = ".idx"
+    label = "🔢 Индекс хешей"
+    full = False  # Емкость не ограничена: файл растет слиянием
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.pending: Set[int] = set()
+        self._mm: Optional[mmap.mmap] = None
+        self._hashes = memoryview(b"").cast("Q")
+        if path is not None and path.exists():
+            self._map(path)
+
+    def _map(self, path: Path) -> None:
+        self._unmap()
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        count = HASH_INDEX_HEADER.unpack_from(self._mm)[2]
+        self._hashes = memoryview(self._mm)[HASH_INDEX_HEADER.size:HASH_INDEX_HEADER.size + 8 * count].cast("Q")
+        self.path = path
+
+    def _unmap(self) -> None:
+        self._hashes.release()
+        self._hashes = memoryview(b"").cast("Q")
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    @property
+    def count(self) -> int:
+        return len(self._hashes) + len(self.pending)
+
+    def _has_hash(self, value: int) -> bool:
+        if value in self.pending:
+            return True
+        pos = bisect_left(self._hashes, value)
+        return pos < len(self._hashes) and self._hashes[pos] == value
+
+    def __contains__(self, key: str) -> bool:
+        return self._has_hash(key_hash(key))
+
+    def add(self, key: str) -> None:
+        value = key_hash(key)
+        if not self._has_hash(value):
+            self.pending.add(value)
+
+    def copy(self) -> "SortedHashIndex":
+        clone = SortedHashIndex()
+        if self.path is not None and self._mm is not None:
+            clone._map(self.path)
+        clone.pending = set(self.pending)
+        return clone
+
+    @classmethod
+    def build(cls, keys: Iterable[str], count: int, fp_rate: float = 0.01) -> "SortedHashIndex":
+        """Индекс по ID из базы; fp_rate не нужен — ложные срабатывания только у совпавших хешей"""
+        index = cls()
+        index.pending = {key_hash(key) for key in keys}
+        return index
+
+    def save(self, path: Path, store_count: int = 0) -> None:
+        """Вливает новые хеши в файл линейным слиянием и отображает новый файл"""
+        new_hashes = sorted(self.pending)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(HASH_INDEX_HEADER.pack(HASH_INDEX_MAGIC, HASH_INDEX_VERSION,
+                                           len(self._hashes) + len(new_hashes), store_count))
+            start = 0
+            for value in new_hashes:
+                # Отрезки старого файла копируются целиком, между ними — новые хеши
+                pos = bisect_left(self._hashes, value, start)
+                f.write(self._hashes[start:pos])
+                f.write(value.to_bytes(8, "little"))
+                start = pos
+            f.write(self._hashes[start:])
+        self._unmap()
+        os.replace(tmp_path, path)
+        self.pending = set()
+        self._map(path)
+
+    @classmethod
+    def load(cls, path: Path, fp_rate: float = 0.01):
+        """Отображает файл индекса; возвращает (индекс, позиций в базе при записи) или (None, 0)"""
+        try:
+            with open(path, "rb") as f:
+                header = f.read(HASH_INDEX_HEADER.size)
+            magic, version, count, store_count = HASH_INDEX_HEADER.unpack(header)
+            if magic != HASH_INDEX_MAGIC or version != HASH_INDEX_VERSION or \
+                    path.stat().st_size != HASH_INDEX_HEADER.size + 8 * count:
+                return None, 0
+        except (OSError, struct.error):
+            return None, 0
+        return cls(path), store_count
+
+
+# KNOWN_INDEX → фильтр
+KNOWN_INDEX_KINDS = {"bloom": BloomFilter, "hash": SortedHashIndex}
+
+
+class KnownIndex:
+    """Множество известных ID для прогона: фильтр перед точной проверкой в базе.
+
+    Поддерживает то, что прогон делает с known: in, len, |=, union(). Позиции,
+    добавленные за прогон, держатся в памяти, пока их не сохранит save_state().
+    """
+
+    def __init__(self, index_filter, open_store: Callable[[], StateStore], store_count: int,
+                 path: Optional[Path] = None):
+        self.filter = index_filter
+        self.open_store = open_store
+        self.store_count = store_count
+        self.path = path
+        self.added: Set[str] = set()  # Добавлены за прогон и еще не сохранены
+        self.stats = {"lookups": 0, "filter_negative": 0, "exact_checks": 0, "false_positives": 0}
+        self._local = threading.local()  # Соединение с базой на поток: API магазинов проверяют ID из потоков
+
+    @classmethod
+    def open(cls, db_path: Path, open_store: Callable[[], StateStore], kind: str = "bloom",
+             fp_rate: float = 0.01) -> "KnownIndex":
+        """Загружает фильтр kind из файла рядом с базой или пересобирает его по базе"""
+        filter_cls = KNOWN_INDEX_KINDS[kind]
+        path = db_path.with_suffix(filter_cls.suffix)
+        store = open_store()
+        store_count = len(store)
+        index_filter, saved_count = filter_cls.load(path, fp_rate)
+        if index_filter is None or index_filter.full or saved_count != store_count:
+            index_filter = filter_cls.build(store.iter_ids(), store_count, fp_rate)
+            index_filter.save(path, store_count)
+            print(f"{filter_cls.label}: {path.name} пересобран по базе, {store_count} позиций, "
+                  f"{path.stat().st_size // 1024} КБ")
+        index = cls(index_filter, open_store, store_count, path)
+        index._local.store = store
+        return index
+
+    def _store(self) -> StateStore:
+        store = getattr(self._local, "store", None)
+        if store is None:
+            store = self._local.store = self.open_store()
+        return store
+
+    def __contains__(self, item_id: str) -> bool:
+        item_id = normalize_url(item_id)
+        self.stats["lookups"] += 1
+        if item_id in self.added:
+            return True
+        if item_id not in self.filter:
+            self.stats["filter_negative"] += 1
+            return False
+        self.stats["exact_checks"] += 1
+        if self._store().get(item_id):
+            return True
+        self.stats["false_positives"] += 1
+        return False
+
+    def __len__(self) -> int:
+        return self.store_count + len(self.added)
+
+    def add(self, item_id: str) -> None:
+        item_id = normalize_url(item_id)
+        if item_id in self.added:
+            return
+        if item_id not in self.filter:
+            # Фильтр пополняется и для ID, уже записанного в базу: save() зовется после сохранения состояния
+            self.filter.add(item_id)
+            self.added.add(item_id)
+        elif not self._store().get(item_id):
+            self.added.add(item_id)  # Ложное срабатывание фильтра: ID помним сами
+
+    def update(self, item_ids: Iterable[str]) -> None:
+        for item_id in item_ids:
+            self.add(item_id)
+
+    def __ior__(self, item_ids: Iterable[str]) -> "KnownIndex":
+        self.update(item_ids)
+        return self
+
+    def union(self, item_ids: Iterable[str]) -> "KnownIndex":
+        """Копия индекса с добавленными ID; исходный не меняется"""
+        clone = KnownIndex(self.filter.copy(), self.open_store, self.store_count, self.path)
+        clone.added = set(self.added)
+        clone._local.store = self._store()
+        clone.update(item_ids)
+        return clone
+
+    def info(self, item_id: str) -> Dict:
+        """Информация о позиции из базы; {} — позиции нет"""
+        return self._store().get(item_id)
+
+    def save(self) -> None:
+        """Записывает фильтр после сохранения состояния: добавленные позиции уже в базе"""
+        self.store_count = len(self._store())
+        self.added = set()
+        if self.filter.full:
+            self.filter = type(self.filter).build(self._store().iter_ids(), self.store_count, self.filter.fp_rate)
+        self.filter.save(self.path, self.store_count)
+
+    def report(self) -> str:
+        stats = self.stats
+        return (f"{self.filter.label}: {stats['lookups']} проверок, {stats['filter_negative']} отсечено без базы, "
+                f"{stats['exact_checks']} в базе, ложных срабатываний {stats['false_positives']}")
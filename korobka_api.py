@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Быстрый источник korobkavinyla.ru через API магазина Tilda (без браузера)
+
+Кнопка "Загрузить ещё" в каталоге Tilda запрашивает страницы (slice) у
+store.tildaapi.com/api/getproductslist. Здесь тот же эндпоинт вызывается
+напрямую, а фильтры каталога (tfc_*) переводятся в параметры API.
+"""
+import os
+import re
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+import requests
+
+from http_client import limited_get
+from http_client import make_session as make_http_session
+from state_store import normalize_url
+
+TILDA_API_URL = "https://store.tildaapi.com/api/getproductslist/"
+TILDA_PAGE_SIZE = int(os.getenv("KOROBKA_TILDA_PAGE_SIZE", "36"))
+TILDA_MAX_SLICES = int(os.getenv("KOROBKA_TILDA_MAX_SLICES", "30"))
+TILDA_TIMEOUT_SEC = 30
+KOROBKA_TILDA_RECID = os.getenv("KOROBKA_TILDA_RECID", "771567999")  # Блок каталога (виден в /tproduct/<recid>-...)
+KOROBKA_TILDA_STOREPARTUID = os.getenv("KOROBKA_TILDA_STOREPARTUID", "")  # Пусто — ищется на странице каталога
+KOROBKA_CURRENCY = "RUB"
+
+_TFC_PARAM = re.compile(r"^tfc_(\w+)\[(\d+)\]$")
+_STOREPART_PATTERNS = (
+    re.compile(r"""storepart(?:uid)?["']?\s*[:=]\s*["'](\d{6,})["']"""),
+    re.compile(r"""data-storepart-uid=["'](\d{6,})["']"""),
+)
+
+# Найденные на странице каталога storepartuid, чтобы не загружать ее повторно
+_storepart_cache: Dict[str, str] = {}
+
+
+class TildaStoreError(Exception):
+    """API магазина Tilda недоступен или вернул неожиданный ответ"""
+
+
+def make_session(referer: str = "https://korobkavinyla.ru/") -> requests.Session:
+    """Сессия с пулом соединений; API Tilda ожидает Referer/Origin сайта магазина"""
+    parsed = urlparse(referer)
+    return make_http_session({
+        "Accept": "application/json, text/javascript, */*; q=0.01",
+        "Accept-Language": "ru-RU,ru;q=0.9,en;q=0.8",
+        "Referer": referer,
+        "Origin": f"{parsed.scheme}://{parsed.netloc}",
+    })
+
+
+def catalog_filters(catalog_url: str) -> Tuple[str, Dict[str, str]]:
+    """Переводит фильтры каталога (tfc_*[recid]) в параметры getproductslist.
+
+    Возвращает recid блока и параметры. Без явной сортировки берется
+    "сначала новые", чтобы остановка на известных позициях была корректной.
+    """
+    recid = KOROBKA_TILDA_RECID
+    params: Dict[str, str] = {}
+    for key, value in parse_qsl(urlparse(catalog_url).query, keep_blank_values=True):
+        match = _TFC_PARAM.match(key)
+        if not match:
+            continue
+        name, recid = match.group(1), match.group(2)
+        if name == "div":
+            continue
+        if name == "sort":
+            field, _, direction = value.partition(":")
+            params[f"sort[{field}]"] = direction or "desc"
+        elif name == "storepartuid":
+            params["filters[storepartuid][0]"] = value
+        else:
+            params[f"filters[{name}]"] = value
+    if not any(key.startswith("sort[") for key in params):
+        params["sort[created]"] = "desc"
+    return recid, params
+
+
+def resolve_storepartuid(session: requests.Session, catalog_url: str) -> str:
+    """storepartuid каталога: из окружения, из кэша или со страницы каталога"""
+    if KOROBKA_TILDA_STOREPARTUID:
+        return KOROBKA_TILDA_STOREPARTUID
+    page_url = catalog_url.split("?")[0]
+    if page_url in _storepart_cache:
+        return _storepart_cache[page_url]
+    try:
+        response = limited_get(session, page_url, timeout=TILDA_TIMEOUT_SEC, headers={"Accept": "text/html"})
+        response.raise_for_status()
+    except requests.RequestException as e:
+        raise TildaStoreError(f"{page_url}: {e}") from e
+    for pattern in _STOREPART_PATTERNS:
+        match = pattern.search(response.text)
+        if match:
+            _storepart_cache[page_url] = match.group(1)
+            return match.group(1)
+    raise TildaStoreError(f"{page_url}: storepartuid не найден на странице")
+
+
+def fetch_products_slice(session: requests.Session, storepartuid: str, recid: str,
+                         params: Dict[str, str], slice_no: int) -> Dict:
+    """Одна страница (slice) списка товаров"""
+    query = {
+        "storepartuid": storepartuid,
+        "recid": recid,
+        "c": str(int(time.time() * 1000)),
+        "getparts": "true",
+        "getoptions": "true",
+        "slice": str(slice_no),
+        "size": str(TILDA_PAGE_SIZE),
+        **params,
+    }
+    try:
+        response = limited_get(session, TILDA_API_URL, params=query, timeout=TILDA_TIMEOUT_SEC)
+        response.raise_for_status()
+        data = response.json()
+    except (requests.RequestException, ValueError) as e:
+        raise TildaStoreError(f"slice {slice_no}: {e}") from e
+    if not isinstance(data, dict) or not isinstance(data.get("products"), list):
+        raise TildaStoreError(f"slice {slice_no}: в ответе нет списка products")
+    return data
+
+
+def format_rub(amount: Decimal) -> str:
+    """2500.0000 -> "2 500 р." """
+    return f"{amount:,.0f}".replace(",", " ") + " р."
+
+
+def product_to_item(product: Dict) -> Optional[Dict]:
+    """Позиция в формате скраперов; id совпадает с тем, что дает DOM"""
+    url = normalize_url(product.get("url") or "")
+    if not url:
+        return None
+    try:
+        amount: Optional[Decimal] = Decimal(str(product.get("price")))
+    except (InvalidOperation, TypeError):
+        amount = None
+    return {
+        "id": url,
+        "url": url,
+        "title": (product.get("title") or "").strip(),
+        "price": format_rub(amount) if amount is not None else "",
+        "price_amount": amount,
+        "currency": KOROBKA_CURRENCY,
+    }
+
+
+def fetch_catalog_items(session: requests.Session, catalog_url: str,
+                        known_ids: Optional[Set[str]] = None,
+                        max_slices: int = TILDA_MAX_SLICES) -> List[Dict]:
+    """Все позиции каталога (с фильтрами из URL) постранично.
+
+    Останавливается на последней странице или на странице, где все позиции
+    уже известны: товары идут от новых к старым, дальше новых не будет.
+    """
+    storepartuid = resolve_storepartuid(session, catalog_url)
+    recid, params = catalog_filters(catalog_url)
+    items: List[Dict] = []
+    seen: Set[str] = set()
+    slice_no = 1
+    for _ in range(max_slices):
+        data = fetch_products_slice(session, storepartuid, recid, params, slice_no)
+        page_items = [item for item in map(product_to_item, data["products"]) if item]
+        for item in page_items:
+            if item["id"] not in seen:
+                seen.add(item["id"])
+                items.append(item)
+
+        if known_ids and page_items and all(item["id"] in known_ids for item in page_items):
+            print(f"    Страница {slice_no}: все позиции уже известны, дальше не листаем")
+            break
+        next_slice = data.get("nextslice")
+        if next_slice:
+            try:
+                slice_no = int(next_slice)
+            except (TypeError, ValueError) as e:
+                # Не TildaStoreError — и прогон упал бы, не перейдя на браузер
+                raise TildaStoreError(f"slice {slice_no}: некорректный nextslice {next_slice!r}") from e
+        elif len(data["products"]) < TILDA_PAGE_SIZE:
+            break
+        else:
+            slice_no += 1
+    return items
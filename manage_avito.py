@@ -30,6 +30,9 @@ def show_config():
     print(f"  Включен: {config.get('enabled', True)}")
     print(f"  Интервал: {config.get('monitor_interval_hours', 6)} часов")
     print(f"  Базовый URL: {config.get('base_url', 'https://www.avito.ru/sankt_peterburg_i_lo')}")
+    rate_limit = config.get('rate_limit', {})
+    print(f"  Лимит частоты: {rate_limit.get('requests_per_minute', 1)} запросов в минуту, "
+          f"запас {rate_limit.get('burst', 1)}, разброс {rate_limit.get('jitter_sec', 0)} с")
     print("  Поисковые запросы:")
     for i, query in enumerate(config.get('search_queries', []), 1):
         print(f"    {i}. {query}")
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Состояние прогона в памяти
+
+Раньше состояние разбиралось заново на каждом шаге: load_state скачивал его
+из S3, сохранение в S3 скачивало тот же объект еще раз, локальное сохранение
+перечитывало state.json, а get_item_info открывал файл при каждом вызове.
+Теперь MonitorState загружается один раз — из первого хранилища, где есть
+позиции, — и держит и множество известных ID, и информацию о позициях. Все
+чтения идут из памяти, а сохранение записывает состояние во все хранилища
+(S3, state.json или SQLite) без повторной загрузки.
+
+STATE_STATS считает разборы JSON и GET-запросы к S3 за процесс, чтобы было
+видно: на прогон приходится по одному.
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from state_format import (decode_state, encode_state, latest_state_file,
+                          state_file_name)
+from state_store import StateStore, normalize_url, state_items
+
+
+@dataclass
+class StateStats:
+    """Счетчики обращений к сохраненному состоянию"""
+    json_parses: int = 0
+    s3_gets: int = 0
+    s3_puts: int = 0
+    s3_not_modified: int = 0  # Условных GET, ответивших 304
+    s3_bytes_down: int = 0
+    s3_bytes_up: int = 0
+    s3_bytes_saved: int = 0  # Не скачано благодаря 304
+    s3_ms_saved: float = 0.0  # Разница с последней полной загрузкой и разбором
+    journal_events: int = 0  # Событий журнала, проигранных при загрузке
+
+    def report(self) -> str:
+        report = (f"📊 Состояние: разборов JSON {self.json_parses}, "
+                  f"GET из S3 {self.s3_gets}, PUT в S3 {self.s3_puts}")
+        if self.journal_events:
+            report += f", событий журнала {self.journal_events}"
+        if self.s3_not_modified:
+            report += (f"; S3 не изменился (304): сэкономлено {self.s3_bytes_saved / 1024:.0f} КБ "
+                       f"и ~{self.s3_ms_saved:.0f} мс")
+        return report
+
+
+STATE_STATS = StateStats()
+
+
+class StateConflictError(Exception):
+    """Условная запись отклонена: state.json в S3 изменился после нашей загрузки"""
+
+
+EVENT_OPS = ("add", "update", "remove")
+
+
+def parse_state_json(raw) -> Dict:
+    """Разбирает state.json любого формата из строки, байтов или открытого файла (с учетом в STATE_STATS)"""
+    STATE_STATS.json_parses += 1
+    return decode_state(raw if isinstance(raw, (str, bytes)) else raw.read())
+
+
+def apply_events(items: Dict[str, Dict], events: Iterable[Dict]) -> int:
+    """Применяет события add/update/remove к позициям; возвращает число примененных"""
+    applied = 0
+    for event in events:
+        op, item_id = event.get("op"), event.get("id")
+        if op not in EVENT_OPS or not item_id:
+            continue
+        if op == "remove":
+            items.pop(item_id, None)
+        else:
+            items[item_id] = {**items.get(item_id, {}), **event.get("info", {})}
+        applied += 1
+    return applied
+
+
+def items_from_state(data: Dict) -> Dict[str, Dict]:
+    """Позиции разобранного state.json (любого формата) по нормализованным ID"""
+    return {normalize_url(item_id): info for item_id, info in state_items(data) if item_id}
+
+
+class JsonFileBackend:
+    """Локальный state.json; перед записью чистится от дублей по названию.
+
+    Файл разбирается один раз, даже если его читают и S3Backend (как кэш), и загрузка.
+    Сжатое состояние пишется в state.json.gz / state.json.zst; читается самый свежий файл
+    под любым из имен (state_format.latest_state_file).
+    """
+    name = "state.json"
+    optional = False
+
+    def __init__(self, path: Path, clean: Optional[Callable[[Dict], Dict]] = None, fmt: str = "json"):
+        self.base_path = path
+        self.path = path.with_name(state_file_name(path.name, fmt))
+        self.clean = clean
+        self.fmt = fmt  # Формат записи (state_format.py); читается любой
+        self.s3_meta: Dict = {}  # ETag, размер и время загрузки копии S3, на которой основан файл
+        self._items: Optional[Dict[str, Dict]] = None
+
+    def load(self) -> Dict[str, Dict]:
+        if self._items is None:
+            self._items = {}
+            path = latest_state_file(self.base_path, self.path)
+            if path is not None:
+                with open(path, "rb") as f:
+                    data = parse_state_json(f)
+                self._items = items_from_state(data)
+                self.s3_meta = data.get("s3") or {}
+        return dict(self._items)
+
+    def save(self, state: "MonitorState") -> None:
+        self.write(state.items)
+
+    def write(self, items: Dict[str, Dict]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"known_items": dict(items)}
+        if self.s3_meta:
+            data["s3"] = self.s3_meta
+        if self.clean:
+            data = self.clean(data)
+        with open(self.path, "wb") as f:
+            f.write(encode_state(data, self.fmt))
+
+
+class S3Backend:
+    """state.json в S3: одна загрузка на прогон, сохранение — целиком без повторного GET.
+
+    С локальным state.json (cache) загрузка условная: файл хранит ETag копии S3, на
+    которой он основан, и если объект не менялся (304), состояние берется из файла —
+    без скачивания и разбора тела. Запись тоже условная (If-Match): если между нашей
+    загрузкой и записью объект изменил другой прогон, его версия скачивается, поверх
+    нее применяются наши несохраненные события, и запись повторяется.
+    """
+    name = "S3"
+    optional = True  # Сбой S3 не мешает локальному сохранению
+    conflict_retries = 3
+
+    def __init__(self, s3, cache: Optional[JsonFileBackend] = None):
+        self.s3 = s3
+        self.cache = cache
+        self.etag: Optional[str] = None
+
+    def load(self) -> Dict[str, Dict]:
+        cached = self.cache.load() if self.cache else {}
+        etag = self.cache.s3_meta.get("etag") if cached else None
+        started = time.perf_counter()
+        data, self.etag = self.s3.fetch_state(etag)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if data is None:
+            STATE_STATS.s3_bytes_saved += self.cache.s3_meta.get("size", 0)
+            STATE_STATS.s3_ms_saved += max(self.cache.s3_meta.get("fetch_ms", 0) - elapsed_ms, 0)
+            print("📦 state.json в S3 не изменился, используем локальную копию")
+            return cached
+        items = items_from_state(data)
+        # Локальная копия догоняет S3 сразу, чтобы следующий прогон получил 304. Только если объект
+        # в S3 есть (без ETag его нет) и не пуст при непустой локальной истории: иначе тихий прогон
+        # без сохранения оставил бы state.json пустым, и следующий прислал бы все позиции заново
+        if self.cache and self.etag and (items or not cached):
+            self.cache.s3_meta = {"etag": self.etag, "size": self.s3.object_size,
+                                  "fetch_ms": round(elapsed_ms)}
+            self.cache.write(items)
+        return items
+
+    def save(self, state: "MonitorState") -> None:
+        for _ in range(self.conflict_retries):
+            try:
+                self.etag = self.s3.put_state({"known_items": state.items}, self.etag)
+                break
+            except StateConflictError as e:
+                print(f"⚠️ {e}: объединяем с версией из S3")
+                data, self.etag = self.s3.fetch_state()
+                merged = items_from_state(data)
+                apply_events(merged, state.pending)
+                state.replace_items(merged)
+        else:
+            raise StateConflictError("state.json в S3 меняется быстрее, чем мы успеваем записать")
+        if self.cache:
+            self.cache.s3_meta = {**self.cache.s3_meta, "etag": self.etag, "size": self.s3.object_size}
+
+
+class SqliteBackend:
+    """База state_store.py: сохранение дописывает только новые позиции"""
+    name = "SQLite"
+    optional = False
+
+    def __init__(self, open_store: Callable[[], StateStore]):
+        self.open_store = open_store
+
+    def load(self) -> Dict[str, Dict]:
+        with self.open_store() as store:
+            return store.items()
+
+    def save(self, state: "MonitorState") -> None:
+        with self.open_store() as store:
+            store.add_items([{"id": event["id"], **event["info"]} for event in state.pending if event["op"] != "remove"])
+            store.remove_items([event["id"] for event in state.pending if event["op"] == "remove"])
+
+
+class MonitorState:
+    """Известные позиции прогона; хранилища получают изменения при save()"""
+
+    def __init__(self, items: Optional[Dict[str, Dict]] = None, backends: Iterable = ()):
+        self.items: Dict[str, Dict] = dict(items or {})
+        self.known_ids: Set[str] = set(self.items)
+        self.backends = list(backends)
+        self.pending: List[Dict] = []  # События add/update/remove после последнего сохранения
+
+    @classmethod
+    def load(cls, backends: Iterable) -> "MonitorState":
+        """Загружает состояние из первого хранилища, в котором есть позиции"""
+        backends = list(backends)
+        for backend in backends:
+            try:
+                items = backend.load()
+            except Exception as e:
+                print(f"⚠️ Ошибка загрузки из {backend.name}: {e}")
+                continue
+            if items:
+                print(f"📚 Загружено {len(items)} известных позиций из {backend.name}")
+                return cls(items, backends)
+        return cls({}, backends)
+
+    def replace_items(self, items: Dict[str, Dict]) -> None:
+        """Подменяет позиции объединенной версией; несохраненные события остаются"""
+        self.items = items
+        self.known_ids = set(items)
+
+    def load_sources(self, sources: Iterable[str]) -> Set[str]:
+        """Догружает позиции источников, которых нет в частично загруженном состоянии.
+
+        Спрашивает первое хранилище, умеющее грузить по источникам (шарды); возвращает новые ID.
+        """
+        for backend in self.backends:
+            if not hasattr(backend, "load_sources"):
+                continue
+            try:
+                items = backend.load_sources(sources)
+            except Exception as e:
+                print(f"⚠️ Ошибка загрузки из {backend.name}: {e}")
+                continue
+            added = set(items) - self.known_ids
+            for item_id in added:
+                self.items[item_id] = items[item_id]
+            self.known_ids |= added
+            return added
+        return set()
+
+    def info(self, item_id: str) -> Dict:
+        """Информация о позиции; {} — позиция неизвестна"""
+        return self.items.get(normalize_url(item_id), {})
+
+    def add_items(self, new_items: List[Dict], added_at: Optional[str] = None) -> None:
+        """Добавляет новые позиции в память; в хранилища они попадут при save()"""
+        added_at = added_at or datetime.now().isoformat()
+        for item in new_items:
+            item_id = normalize_url(item.get("id", ""))
+            if not item_id:
+                continue
+            info = {"added_at": added_at, "title": item.get("title", ""), "source": item.get("source", "")}
+            op = "update" if item_id in self.items else "add"
+            self.items[item_id] = info
+            self.known_ids.add(item_id)
+            self.pending.append({"op": op, "id": item_id, "info": info})
+
+    def remove_items(self, item_ids: Iterable[str]) -> None:
+        """Убирает позиции из состояния; в хранилища это попадет при save()"""
+        for item_id in map(normalize_url, item_ids):
+            info = self.items.pop(item_id, None)
+            if info is not None:
+                self.known_ids.discard(item_id)
+                self.pending.append({"op": "remove", "id": item_id, "source": info.get("source", "")})
+
+    def save(self) -> None:
+        """Записывает состояние во все хранилища.
+
+        Ошибка необязательного хранилища (S3) только печатается, ошибка локального
+        поднимается: без него новые позиции прогона потерялись бы.
+        """
+        for backend in self.backends:
+            try:
+                backend.save(self)
+            except Exception as e:
+                if not backend.optional:
+                    raise
+                print(f"⚠️ Ошибка сохранения в {backend.name}: {e}")
+        self.pending = []
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Разбор цен магазинов в число и валюту
+
+Цены приходят строками в формате каждого магазина: "2 500 р." (API Tilda),
+"2500 руб." (DOM), "3000 руб. → 2500 руб." (скидка plastinka), "£26.95" и
+"Regular price £50,95 EUR Sale price £45,00 EUR" (Shopify), "12 000 ₽" (Авито).
+parse_price() превращает любую из них в ParsedPrice(amount, currency,
+original_amount): сумма к оплате, ISO-код валюты и сумма до скидки (если есть).
+
+Разбор кешируется по строке: на витринах цены повторяются, и прогон разбирает
+каждую строку один раз. parse_prices() проставляет результат позициям всего
+прогона, дальше дедупликация и уведомления работают с числами.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional
+
+PRICE_CACHE_SIZE = 65536
+
+# Магазины с одной валютой: ее берем, даже если витрина показала другой символ
+# (vinyltap.co.uk по геолокации рисует € у цен в фунтах)
+STORE_CURRENCIES = {
+    "korobkavinyla.ru": "RUB",
+    "plastinka.com": "RUB",
+    "vinylfamily.shop": "RUB",
+    "avito.ru": "RUB",
+    "vinyltap.co.uk": "GBP",
+}
+
+CURRENCY_SYMBOLS = {"RUB": "₽", "GBP": "£", "EUR": "€", "USD": "$"}
+
+_CURRENCY_PATTERNS = (
+    ("GBP", re.compile(r"£|\bGBP\b", re.I)),
+    ("EUR", re.compile(r"€|\bEUR\b", re.I)),
+    ("USD", re.compile(r"\$|\bUSD\b", re.I)),
+    ("RUB", re.compile(r"₽|руб|\bр\.|\bRUB\b", re.I)),
+)
+# Тысячи через пробел (в том числе неразрывный) или запятую; дробная часть — до двух знаков через точку или запятую
+_NUMBER = re.compile(r"(?<![\d.,])(?:\d{1,3}(?:[ \u00a0\u202f\u2009]\d{3})+(?:[.,]\d{1,2})?"
+                     r"|\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?"
+                     r"|\d+(?:[.,]\d{1,2})?)(?![\d])")
+# Скидка: "старая → новая" или Shopify "Regular price … Sale price …"
+_DISCOUNT_MARKER = re.compile(r"→|->|sale price", re.I)
+_UNIT_PRICE = re.compile(r"unit price.*$", re.I)
+
+
+class ParsedPrice(NamedTuple):
+    amount: Decimal  # К оплате
+    currency: str  # ISO-код; "" — валюта не указана
+    original_amount: Optional[Decimal] = None  # До скидки
+
+
+def _to_decimal(number: str) -> Optional[Decimal]:
+    number = re.sub(r"[ \u00a0\u202f\u2009]", "", number)
+    if re.search(r",\d{1,2}$", number):
+        number = number.replace(",", ".")  # Десятичная запятая: "50,95"
+    else:
+        number = number.replace(",", "")  # Разделитель тысяч: "1,234.50"
+    try:
+        return Decimal(number)
+    except InvalidOperation:
+        return None
+
+
+def _detect_currency(text: str) -> str:
+    found = [(match.start(), code) for code, pattern in _CURRENCY_PATTERNS for match in [pattern.search(text)] if match]
+    return min(found)[1] if found else ""
+
+
+@lru_cache(maxsize=PRICE_CACHE_SIZE)
+def parse_price(raw: str, currency: Optional[str] = None) -> Optional[ParsedPrice]:
+    """Цена из строки магазина; currency — валюта магазина, если она одна. None — числа нет"""
+    if not raw:
+        return None
+    text = _UNIT_PRICE.sub("", raw)  # "Unit price / per" — цена за единицу, не наша
+    amounts: List[Decimal] = []
+    for match in _NUMBER.finditer(text):
+        amount = _to_decimal(match.group())
+        if amount is not None and amount not in amounts:
+            amounts.append(amount)  # Shopify повторяет одну цену несколько раз
+    if not amounts:
+        return None
+    currency = currency or _detect_currency(text)
+    if len(amounts) > 1 and _DISCOUNT_MARKER.search(text):
+        return ParsedPrice(amounts[-1], currency, amounts[0])
+    return ParsedPrice(amounts[0], currency)
+
+
+def item_price(item, source: Optional[str] = None) -> Optional[ParsedPrice]:
+    """Цена позиции: уже разобранная (parse_prices, API) или разбор строки price"""
+    amount = item.get("price_amount")
+    source = source or item.get("source")
+    if amount is not None:
+        return ParsedPrice(amount, item.get("currency") or STORE_CURRENCIES.get(source, ""),
+                           item.get("price_original"))
+    return parse_price(item.get("price") or "", STORE_CURRENCIES.get(source))
+
+
+def parse_prices(items: Iterable) -> List:
+    """Проставляет price_amount, currency и price_original всем позициям прогона"""
+    items = list(items)
+    for item in items:
+        parsed = item_price(item)
+        if parsed is not None:
+            item["price_amount"], item["currency"] = parsed.amount, parsed.currency
+            if parsed.original_amount is not None:
+                item["price_original"] = parsed.original_amount
+    return items
+
+
+def format_amount(amount: Decimal, currency: str) -> str:
+    """2500 RUB → "2 500 ₽", 26.95 GBP → "£26.95" """
+    if currency == "RUB" or not currency:
+        text = f"{amount:,.0f}" if amount == amount.to_integral_value() else f"{amount:,.2f}"
+        text = text.replace(",", " ")
+        return f"{text} ₽" if currency else text
+    return f"{CURRENCY_SYMBOLS.get(currency, currency + ' ')}{amount:,.2f}"
+
+
+def format_price(price: ParsedPrice) -> str:
+    """Цена для сообщения; со скидкой — "старая → новая" """
+    current = format_amount(price.amount, price.currency)
+    if price.original_amount is not None:
+        return f"{format_amount(price.original_amount, price.currency)} → {current}"
+    return current
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Ограничение частоты запросов по хостам (token bucket)
+
+У каждого хоста своя корзина на burst запросов, которая пополняется со
+скоростью requests_per_minute. Запрос ждет, только если корзина пуста, поэтому
+после последнего запроса паузы нет. Ответ 429/403, капча или страница
+файрвола увеличивают интервал хоста в backoff_factor раз (до max_backoff_sec),
+а успешные ответы так же постепенно возвращают его к обычному. Хосты без
+настроек не ограничиваются, пока не начнут отвечать блокировкой.
+
+Лимиты задаются в окружении (RATE_LIMITS="avito.ru=2,vinyltap.co.uk=60" —
+запросов в минуту) и для Авито — в секции rate_limit файла avito_config.json;
+окружение важнее файла.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+RATE_LIMITS = os.getenv("RATE_LIMITS", "")  # host=запросов в минуту через запятую
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "1"))
+RATE_LIMIT_JITTER_SEC = float(os.getenv("RATE_LIMIT_JITTER_SEC", "0"))
+RATE_LIMIT_MAX_BACKOFF_SEC = float(os.getenv("RATE_LIMIT_MAX_BACKOFF_SEC", "900"))
+# Частота для хоста без настроек, который начал отвечать блокировкой
+RATE_LIMIT_BLOCKED_PER_MIN = float(os.getenv("RATE_LIMIT_BLOCKED_PER_MIN", "6"))
+
+BLOCKED_STATUSES = (403, 429)
+
+# Капча или страница файрвола вместо выдачи (Авито: «Доступ ограничен: проблема с IP»)
+BLOCKED_PAGE_JS = r"""
+    () => {
+      if (document.querySelector('[class*="firewall"], [class*="captcha"], iframe[src*="captcha"]')) return true;
+      const text = (document.title + ' ' + (document.body ? document.body.innerText.slice(0, 2000) : '')).toLowerCase();
+      return ['доступ ограничен', 'проблема с ip', 'не робот', 'captcha', 'too many requests']
+        .some(marker => text.includes(marker));
+    }
+    """
+
+
+def host_of(url: str) -> str:
+    """Хост без www.; принимает URL или уже готовый хост"""
+    host = urlparse(url).hostname if "://" in url else url
+    host = host or url
+    return host[4:] if host.startswith("www.") else host
+
+
+@dataclass(frozen=True)
+class HostLimit:
+    """Лимит одного хоста"""
+    requests_per_minute: float
+    burst: int = RATE_LIMIT_BURST
+    jitter_sec: float = RATE_LIMIT_JITTER_SEC  # Случайная добавка к каждой паузе
+    backoff_factor: float = 2.0
+    max_backoff_sec: float = RATE_LIMIT_MAX_BACKOFF_SEC
+
+    @classmethod
+    def from_dict(cls, data: Dict, default: "HostLimit") -> "HostLimit":
+        """Лимит из секции конфигурации; отсутствующие поля берутся из default"""
+        fields = {}
+        for name, cast in (("requests_per_minute", float), ("burst", int), ("jitter_sec", float),
+                           ("backoff_factor", float), ("max_backoff_sec", float)):
+            if name in data:
+                try:
+                    fields[name] = cast(data[name])
+                except (TypeError, ValueError):
+                    print(f"⚠️ Некорректное значение rate_limit.{name}: {data[name]}")
+        return replace(default, **fields)
+
+    @property
+    def interval_sec(self) -> float:
+        return 60.0 / self.requests_per_minute if self.requests_per_minute > 0 else 0.0
+
+
+def parse_rate_limits(raw: str) -> Dict[str, HostLimit]:
+    """Разбирает лимиты вида "avito.ru=2,vinyltap.co.uk=60" (запросов в минуту)"""
+    limits: Dict[str, HostLimit] = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        host, value = part.split("=", 1)
+        try:
+            limits[host_of(host.strip())] = HostLimit(float(value))
+        except ValueError:
+            print(f"⚠️ Некорректный лимит частоты для {host.strip()}: {value}")
+    return limits
+
+
+class _Bucket:
+    """Корзина токенов хоста; отрицательный остаток — очередь уже обещанных запросов"""
+
+    def __init__(self, limit: HostLimit, now: float):
+        self.limit = limit
+        self.tokens = float(max(limit.burst, 1))
+        self.updated = now
+        self.penalty = 1.0  # Множитель интервала после блокировок
+
+    @property
+    def interval(self) -> float:
+        return self.limit.interval_sec * self.penalty
+
+    def reserve(self, now: float) -> float:
+        """Забирает токен и возвращает, сколько секунд ждать до запроса"""
+        interval = self.interval
+        if interval <= 0:
+            return 0.0
+        self.tokens = min(float(max(self.limit.burst, 1)), self.tokens + (now - self.updated) / interval)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens * interval + random.uniform(0, self.limit.jitter_sec)
+
+
+class HostRateLimiter:
+    """Общий для всех источников лимитер; безопасен для потоков и asyncio"""
+
+    def __init__(self, limits: Optional[Dict[str, HostLimit]] = None,
+                 blocked_limit: Optional[HostLimit] = None):
+        self._lock = threading.Lock()
+        self._limits: Dict[str, HostLimit] = dict(limits or {})
+        self._pinned = set(self._limits)  # Хосты из окружения: файл конфигурации их не меняет
+        self._blocked_limit = blocked_limit or HostLimit(RATE_LIMIT_BLOCKED_PER_MIN)
+        self._buckets: Dict[str, _Bucket] = {}
+        self.waited_sec = 0.0
+        self.backoffs = 0
+
+    @classmethod
+    def from_env(cls) -> "HostRateLimiter":
+        return cls(parse_rate_limits(RATE_LIMITS))
+
+    def configure(self, host: str, limit: HostLimit) -> None:
+        """Задает лимит хоста из файла конфигурации; лимиты из окружения не перезаписываются"""
+        host = host_of(host)
+        with self._lock:
+            if host in self._pinned:
+                return
+            self._limits[host] = limit
+            if host in self._buckets:
+                self._buckets[host].limit = limit
+
+    def limit_for(self, host: str) -> Optional[HostLimit]:
+        return self._limits.get(host_of(host))
+
+    def reserve(self, host: str) -> float:
+        """Бронирует запрос к хосту; возвращает паузу перед ним в секундах"""
+        host = host_of(host)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                if host not in self._limits:
+                    return 0.0
+                bucket = self._buckets[host] = _Bucket(self._limits[host], now)
+            delay = bucket.reserve(now)
+            self.waited_sec += delay
+            return delay
+
+    def wait(self, host: str, label: str = "") -> float:
+        """Ждет своей очереди к хосту (для синхронного кода и потоков)"""
+        delay = self.reserve(host)
+        if delay > 0:
+            if delay >= 1:
+                print(f"    ⏳ {label or host_of(host)}: ожидание {delay:.0f} с перед следующим запросом...")
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, host: str, label: str = "") -> float:
+        """Асинхронный вариант wait: не блокирует цикл событий"""
+        delay = self.reserve(host)
+        if delay > 0:
+            if delay >= 1:
+                print(f"    ⏳ {label or host_of(host)}: ожидание {delay:.0f} с перед следующим запросом...")
+            await asyncio.sleep(delay)
+        return delay
+
+    def backoff(self, host: str) -> None:
+        """Хост ответил блокировкой: увеличивает интервал и обнуляет запас запросов"""
+        host = host_of(host)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = _Bucket(self._limits.get(host, self._blocked_limit), now)
+            limit = bucket.limit
+            max_penalty = max(limit.max_backoff_sec / limit.interval_sec, 1.0) if limit.interval_sec else 1.0
+            bucket.penalty = min(bucket.penalty * limit.backoff_factor, max_penalty)
+            bucket.tokens = min(bucket.tokens, 0.0)
+            bucket.updated = now
+            self.backoffs += 1
+        print(f"    🐢 {host}: признаки блокировки, интервал увеличен до {bucket.interval:.0f} с")
+
+    def success(self, host: str) -> None:
+        """Обычный ответ: интервал возвращается к настроенному"""
+        host = host_of(host)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None or bucket.penalty == 1.0:
+                return
+            bucket.penalty = max(bucket.penalty / bucket.limit.backoff_factor, 1.0)
+            if bucket.penalty == 1.0 and host not in self._limits:
+                # Хост без настроек снова не ограничивается
+                del self._buckets[host]
+
+    def feedback(self, host: str, status: Optional[int] = None, blocked: bool = False) -> bool:
+        """Учитывает ответ хоста; возвращает True, если это была блокировка"""
+        blocked = blocked or status in BLOCKED_STATUSES
+        if blocked:
+            self.backoff(host)
+        else:
+            self.success(host)
+        return blocked
+
+    def report(self) -> str:
+        """Итог за прогон: суммарные паузы и число замедлений"""
+        return f"🚦 Лимиты частоты: паузы {self.waited_sec:.0f} с, замедлений после блокировок {self.backoffs}"
+
+
+# Один лимитер на процесс: его делят браузерные и HTTP-источники
+RATE_LIMITER = HostRateLimiter.from_env()
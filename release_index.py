@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Релизы и последние цены магазинов в SQLite (PRICE_INDEX=true)
+
+Чтобы в уведомлении о новой позиции сразу было видно, дешевле ли она, чем в
+других магазинах, нужен индекс релиз → цены по источникам. Пересобирать его
+каждый прогон по всей истории дорого, поэтому ReleaseIndex хранится в базе:
+блоки и представители релизов (release_matching.py) и последняя увиденная
+цена каждого источника для каждого релиза.
+
+Индекс строится по known_items один раз, при создании базы. В known_items
+цен нет, поэтому история дает только релизы; цены копятся с каждым прогоном,
+в котором позиция была на витрине. Дальше каждый прогон дописывает свои
+позиции одной транзакцией, а поиск для новой позиции — несколько запросов по
+первичному ключу. Цены в разных валютах не сравниваются.
+"""
+import sqlite3
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from price_parser import item_price
+from release_matching import ReleaseMatcher
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS releases (
+    release_id TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS blocks (
+    block TEXT NOT NULL,
+    release_id TEXT NOT NULL,
+    PRIMARY KEY (block, release_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS prices (
+    release_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    seen_at TEXT NOT NULL,
+    PRIMARY KEY (release_id, source)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+UPSERT_PRICE_SQL = """
+INSERT INTO prices (release_id, source, amount, currency, item_id, seen_at)
+VALUES (:release_id, :source, :amount, :currency, :item_id, :seen_at)
+ON CONFLICT (release_id, source) DO UPDATE SET
+    amount = excluded.amount, currency = excluded.currency,
+    item_id = excluded.item_id, seen_at = excluded.seen_at
+"""
+
+
+class Offer(NamedTuple):
+    """Последняя увиденная цена релиза в магазине"""
+    source: str
+    amount: Decimal
+    currency: str
+    item_id: str
+    seen_at: str
+
+
+class ReleaseIndex(ReleaseMatcher):
+    """ReleaseMatcher с релизами, блоками и ценами в базе; используется как контекстный менеджер"""
+
+    def __init__(self, path: Path):
+        super().__init__()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def __enter__(self) -> "ReleaseIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM releases").fetchone()[0]
+
+    def _block(self, block: str) -> Set[str]:
+        return {row[0] for row in self._conn.execute("SELECT release_id FROM blocks WHERE block = ?", (block,))}
+
+    def _representative(self, release_id: str) -> str:
+        return self._conn.execute("SELECT key FROM releases WHERE release_id = ?", (release_id,)).fetchone()[0]
+
+    def _remember(self, release_id: str, key: str, keys: List[str]) -> None:
+        self._conn.execute("INSERT OR IGNORE INTO releases (release_id, key) VALUES (?, ?)", (release_id, key))
+        self._conn.executemany("INSERT OR IGNORE INTO blocks (block, release_id) VALUES (?, ?)",
+                               ((block, release_id) for block in keys))
+
+    @property
+    def built(self) -> bool:
+        """Индекс уже построен по known_items"""
+        return self._conn.execute("SELECT 1 FROM meta WHERE key = 'built_at'").fetchone() is not None
+
+    def build(self, known_items: Dict[str, Dict]) -> int:
+        """Разовое построение по known_items одной транзакцией; возвращает число релизов"""
+        with self._conn:
+            for info in known_items.values():
+                self.match(info.get("title", ""))
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('built_at', ?)",
+                               (datetime.now().isoformat(),))
+        return len(self)
+
+    def record(self, items: Iterable, seen_at: Optional[str] = None) -> int:
+        """Проставляет позициям прогона release_id и запоминает их цены по источникам; возвращает число цен"""
+        seen_at = seen_at or datetime.now().isoformat()
+        rows = []
+        with self._conn:  # Одна транзакция на прогон
+            for item in items:
+                release_id = item.get("release_id") or self.match(item.get("title", ""))
+                parsed = item_price(item)
+                if not release_id or parsed is None or not item.get("source"):
+                    continue
+                item["release_id"] = release_id
+                rows.append({"release_id": release_id, "source": item["source"], "amount": str(parsed.amount),
+                             "currency": parsed.currency, "item_id": item.get("id", ""), "seen_at": seen_at})
+            self._conn.executemany(UPSERT_PRICE_SQL, rows)
+        return len(rows)
+
+    def prices(self, release_id: str) -> List[Offer]:
+        """Последние цены релиза по источникам"""
+        return [Offer(source, Decimal(amount), currency, item_id, seen_at)
+                for source, amount, currency, item_id, seen_at in self._conn.execute(
+                    "SELECT source, amount, currency, item_id, seen_at FROM prices WHERE release_id = ?",
+                    (release_id,))]
+
+    def cheapest_elsewhere(self, item) -> Optional[Offer]:
+        """Самая низкая цена того же релиза в другом магазине (в валюте позиции); None — сравнить не с чем"""
+        parsed = item_price(item)
+        release_id = item.get("release_id")
+        if not release_id or parsed is None or not parsed.currency:
+            return None
+        offers = [offer for offer in self.prices(release_id)
+                  if offer.source != item.get("source") and offer.currency == parsed.currency]
+        return min(offers, key=lambda offer: offer.amount, default=None)
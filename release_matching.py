@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Один и тот же релиз в разных магазинах
+
+advanced_deduplication ловит только точные совпадения названия и цены, а
+clean_duplicates_in_state — точные совпадения названия. Одна и та же пластинка
+на korobkavinyla, plastinka и Авито называется по-разному: «Кино — Группа крови
+(LP, black vinyl)», «KINO: Gruppa Krovi», «Пластинка Кино Группа крови б/у».
+
+Здесь название нормализуется (регистр, пунктуация, кириллица в латиницу,
+слова формата и состояния: LP, vinyl, black, used, б/у...), а похожие
+названия сводятся в один релиз с release_id. Попарно названия не
+сравниваются: кандидаты берутся из блоков — отсортированные токены и
+MinHash-подписи по символьным триграммам (полосы по две строки). Сравнение
+по сходству Жаккара идет только внутри блоков, поэтому сопоставление
+остается почти линейным.
+"""
+import hashlib
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Set
+
+# Кириллица → латиница (упрощенная транслитерация, как на обложках)
+TRANSLIT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh", "з": "z", "и": "i",
+    "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t",
+    "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y",
+    "ь": "", "э": "e", "ю": "yu", "я": "ya",
+}
+_TRANSLIT_TABLE = str.maketrans(TRANSLIT)
+
+# Слова формата, состояния и служебные: на релиз не влияют. Цвет, кроме черного, — другой тираж, его не трогаем
+NOISE_WORDS = {
+    "lp", "2lp", "3lp", "4lp", "ep", "vinyl", "record", "black", "used", "new", "sealed",
+    "винил", "виниловая", "виниловые", "пластинка", "пластинки", "черный", "черная", "черное", "бу", "б/у",
+    "новая", "новый", "запечатана", "запечатанная", "и",
+}
+# Артикли убираются, только если начинают название или его часть («The Doors — The Doors»): в «Kid A» «A» — часть
+# названия, и «Kid A» с «Kid B» — разные релизы
+ARTICLES = {"the", "a", "an"}
+# Слова тиража: цвет, переиздание, юбилейное издание. Похожие названия с разными такими словами
+# (и номерами: «50th», год, «II», «Vol. 2») — разные релизы, как бы ни было велико сходство
+VARIANT_WORDS = {
+    "red", "blue", "green", "yellow", "white", "clear", "transparent", "orange", "purple", "pink", "gold", "silver",
+    "splatter", "marble", "picture", "coloured", "colored", "deluxe", "anniversary", "remastered", "remaster",
+    "mono", "stereo", "edition", "reissue",
+    "красный", "красная", "синий", "синяя", "зеленый", "зеленая", "желтый", "желтая", "белый", "белая",
+    "прозрачный", "прозрачная", "цветной", "цветная", "юбилейное", "переиздание", "ремастер",
+    # Номер тома или части словом: «Vol. One», «Часть первая»
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "первая", "вторая", "третья", "первый", "второй", "третий",
+}
+# Части «артист — альбом: подзаголовок»
+_TITLE_PARTS = re.compile(r"\s+[-–—]\s+|:\s*")
+_SEPARATORS = re.compile(r"[^\w/]+")
+# Римский номер тома: «Led Zeppelin II», «Use Your Illusion I»
+_ROMAN = re.compile(r"m{0,3}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})")
+
+MINHASH_BANDS = 6
+MINHASH_ROWS = 2
+_PRIME = (1 << 61) - 1
+# Постоянные коэффициенты: ключи блоков одинаковы между прогонами (индекс можно хранить)
+_MINHASH_COEFFS = [(1 + 2 * i * 0x9E3779B1 % _PRIME, 7 + i * 0x85EBCA77 % _PRIME)
+                   for i in range(MINHASH_BANDS * MINHASH_ROWS)]
+
+
+def title_tokens(title: str) -> List[str]:
+    """Значимые токены названия в латинице"""
+    tokens = []
+    title = re.sub(r"['’`]", "", title.lower().replace("ё", "е"))  # «Pepper's» и «Peppers» — один токен
+    for part in _TITLE_PARTS.split(title):
+        part_tokens = [token.strip("/_") for token in _SEPARATORS.split(part)]
+        part_tokens = [token for token in part_tokens if token and token not in NOISE_WORDS]
+        if part_tokens and part_tokens[0] in ARTICLES and len(part_tokens) > 1:
+            part_tokens = part_tokens[1:]
+        tokens.extend(token.translate(_TRANSLIT_TABLE) for token in part_tokens)
+    return tokens
+
+
+def normalize_title(title: str) -> str:
+    """Ключ названия: значимые токены в латинице, по алфавиту (порядок «артист — альбом» не важен)"""
+    return " ".join(sorted(title_tokens(title)))
+
+
+_VARIANT_TOKENS = {word.translate(_TRANSLIT_TABLE) for word in VARIANT_WORDS}
+
+
+def is_variant_token(token: str) -> bool:
+    """Цвет, издание, номер тома или части (число, римская цифра, одна буква)"""
+    return (token in _VARIANT_TOKENS or len(token) == 1 or any(ch.isdigit() for ch in token)
+            or _ROMAN.fullmatch(token) is not None)
+
+
+def variant_tokens(key: str) -> Set[str]:
+    """Токены, отличающие тираж или том: у одного релиза они совпадают"""
+    return {token for token in key.split() if is_variant_token(token)}
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: str, b: str) -> float:
+    """Сходство Жаккара по символьным триграммам нормализованных названий"""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    return len(grams_a & grams_b) / len(grams_a | grams_b) if grams_a or grams_b else 1.0
+
+
+def blocking_keys(key: str) -> List[str]:
+    """Блоки для поиска кандидатов: сам ключ и полосы MinHash по триграммам"""
+    hashes = [zlib.crc32(gram.encode("utf-8")) for gram in trigrams(key)]
+    signature = [min((a * h + b) % _PRIME for h in hashes) for a, b in _MINHASH_COEFFS]
+    keys = [f"t:{key}"]
+    for band in range(MINHASH_BANDS):
+        rows = signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+        keys.append(f"m{band}:" + ":".join(map(str, rows)))
+    return keys
+
+
+def release_id_for(key: str) -> str:
+    return "r" + hashlib.blake2b(key.encode("utf-8"), digest_size=6).hexdigest()
+
+
+class ReleaseMatcher:
+    """Сопоставление названий с релизами; индекс блоков пополняется с каждым названием.
+
+    Первое название релиза становится его представителем, release_id — хеш его
+    ключа. Новое название сравнивается только с представителями релизов из
+    общих блоков. Релизы и блоки хранятся в словарях; хранимый индекс
+    (release_index.py) подменяет _block, _representative и _remember.
+    """
+    threshold = 0.7
+
+    def __init__(self):
+        self.releases: Dict[str, str] = {}  # release_id → ключ названия-представителя
+        self.blocks: Dict[str, Set[str]] = {}  # ключ блока → release_id
+        self.comparisons = 0
+
+    def match(self, title: str) -> str:
+        """release_id названия; "" — в названии нет значимых слов"""
+        key = normalize_title(title or "")
+        if not key:
+            return ""
+        keys = blocking_keys(key)
+        exact = self._block(keys[0])
+        release_id = min(exact) if exact else self._best_candidate(key, keys[1:])
+        if release_id is None:
+            release_id = release_id_for(key)
+        self._remember(release_id, key, keys)
+        return release_id
+
+    def _block(self, block: str) -> Set[str]:
+        return self.blocks.get(block, set())
+
+    def _representative(self, release_id: str) -> str:
+        return self.releases[release_id]
+
+    def _remember(self, release_id: str, key: str, keys: List[str]) -> None:
+        self.releases.setdefault(release_id, key)
+        for block in keys:
+            self.blocks.setdefault(block, set()).add(release_id)
+
+    def _best_candidate(self, key: str, keys: List[str]) -> Optional[str]:
+        candidates: Set[str] = set()
+        for block in keys:
+            candidates |= self._block(block)
+        best, best_score = None, self.threshold
+        variant = variant_tokens(key)
+        for release_id in sorted(candidates):
+            other = self._representative(release_id)
+            if variant_tokens(other) != variant:
+                continue
+            self.comparisons += 1
+            score = similarity(key, other)
+            if score >= best_score:
+                best, best_score = release_id, score
+        return best
+
+    def assign(self, items: Iterable) -> Dict[str, List]:
+        """Проставляет release_id позициям; возвращает релизы, найденные в нескольких источниках"""
+        by_release: Dict[str, List] = {}
+        for item in items:
+            release_id = self.match(item.get("title", ""))
+            if release_id:
+                item["release_id"] = release_id
+                by_release.setdefault(release_id, []).append(item)
+        return {release_id: group for release_id, group in by_release.items()
+                if len({item.get("source") for item in group}) > 1}
@@ -2,14 +2,21 @@
 """
 Модуль для работы с S3 хранилищем state.json
 """
-import json
+import os
 import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 from pathlib import Path
-from typing import Dict, Set
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 import logging
 from dotenv import load_dotenv
 
+from monitor_state import (STATE_STATS, MonitorState, S3Backend,
+                           StateConflictError, items_from_state,
+                           parse_state_json)
+from state_format import content_type, encode_state, state_file_name
+from state_shards import S3ShardStore, ShardedBackend
+from state_journal import delta_key
+
 # Загружаем переменные окружения
 load_dotenv()
 
@@ -17,13 +24,19 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
 class S3Storage:
     def __init__(self):
-        # Параметры S3 из изображения
-        self.endpoint_url = "https://s3.twcstorage.ru"
-        self.bucket_name = "6ddcc6a4-ac782675-1c0e-4e0c-b26f-32ab5d7e6ff3"
-        self.region = "ru-1"
-        self.object_key = "vinyl-monitor/state.json"
+        # Параметры S3 из изображения; S3_ENDPOINT_URL="" — AWS (и moto в тестах), MinIO — свой URL
+        self.endpoint_url = os.getenv("S3_ENDPOINT_URL", "https://s3.twcstorage.ru") or None
+        self.bucket_name = os.getenv("S3_BUCKET", "6ddcc6a4-ac782675-1c0e-4e0c-b26f-32ab5d7e6ff3")
+        self.region = os.getenv("S3_REGION", "ru-1")
+        self.state_format = os.getenv("STATE_FORMAT", "json").lower()  # Формат записи (state_format.py)
+        self.legacy_key = "vinyl-monitor/state.json"  # Прежний ключ: сжатое состояние раньше лежало и под ним
+        self.object_key = state_file_name(self.legacy_key, self.state_format)  # state.json.gz для gzip
+        self.journal_prefix = "vinyl-monitor/journal/"  # Дельты журнала состояния
+        self.etag: Optional[str] = None  # ETag последней загрузки state.json
+        self.object_size = 0  # Размер state.json при последнем GET или PUT, байт
         
         # Инициализируем S3 клиент
         self.s3_client = boto3.client(
@@ -52,89 +65,181 @@ class S3Storage:
             raise ValueError("S3_SECRET_KEY не установлен в переменных окружения")
         return key
     
-    def download_state(self) -> Dict:
-        """Загружает state.json из S3"""
+    def fetch_state(self, etag: Optional[str] = None) -> Tuple[Optional[Dict], Optional[str]]:
+        """GET state.json; с etag — условный (If-None-Match).
+
+        Возвращает (состояние, ETag). (None, etag) — объект не менялся (304): тело не
+        скачивается и не разбирается, актуальна локальная копия. Если объекта под ключом
+        формата еще нет, читается прежний ключ без ETag: первая запись создаст новый объект.
+        """
+        STATE_STATS.s3_gets += 1
         try:
             response = self.s3_client.get_object(
                 Bucket=self.bucket_name,
-                Key=self.object_key
+                Key=self.object_key,
+                **({'IfNoneMatch': etag} if etag else {})
             )
-            content = response['Body'].read().decode('utf-8')
-            return json.loads(content)
         except ClientError as e:
             error_code = e.response['Error']['Code']
-            if error_code == 'NoSuchKey':
-                logger.info("state.json не найден в S3, возвращаем пустое состояние")
-                return {"known_items": {}}
-            else:
-                logger.error(f"Ошибка загрузки из S3: {e}")
+            if error_code in ('304', 'NotModified'):
+                STATE_STATS.s3_not_modified += 1
+                return None, etag
+            if error_code != 'NoSuchKey':
                 raise
+            legacy, _ = self.read_object(self.legacy_key) if self.object_key != self.legacy_key else (None, None)
+            if legacy is None:
+                logger.info(f"{self.object_key} не найден в S3, возвращаем пустое состояние")
+                return {"known_items": {}}, None
+            logger.info(f"{self.object_key} не найден в S3, читаем прежний {self.legacy_key}")
+            self.object_size = len(legacy)
+            return parse_state_json(legacy), None
+        body = response['Body'].read()
+        self.object_size = len(body)
+        STATE_STATS.s3_bytes_down += len(body)
+        return parse_state_json(body), response.get('ETag')
+
+    def download_state(self) -> Dict:
+        """Загружает state.json из S3"""
+        try:
+            data, self.etag = self.fetch_state()
+            return data
         except Exception as e:
-            logger.error(f"Неожиданная ошибка при загрузке из S3: {e}")
+            logger.error(f"Ошибка загрузки из S3: {e}")
             raise
-    
-    def upload_state(self, state_data: Dict) -> bool:
-        """Загружает state.json в S3"""
+
+    def put_state(self, state_data: Dict, etag: Optional[str]) -> str:
+        """Условная запись state.json; возвращает новый ETag.
+
+        С etag запись пройдет, только если объект не менялся с нашей загрузки (If-Match),
+        без etag — только если объекта еще нет (If-None-Match: *). Иначе — StateConflictError.
+        """
+        body = encode_state(state_data, self.state_format)
+        new_etag = self.write_object(self.object_key, body, etag)
+        self.object_size = len(body)
+        return new_etag
+
+    def read_object(self, key: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """Тело и ETag объекта; (None, None) — объекта нет"""
+        STATE_STATS.s3_gets += 1
         try:
-            json_content = json.dumps(state_data, ensure_ascii=False, indent=2)
-            
-            self.s3_client.put_object(
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchKey':
+                return None, None
+            raise
+        body = response['Body'].read()
+        STATE_STATS.s3_bytes_down += len(body)
+        return body, response.get('ETag')
+
+    def write_object(self, key: str, body: bytes, etag: Optional[str]) -> str:
+        """Условная запись объекта (If-Match / If-None-Match: *, как put_state); возвращает ETag"""
+        condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+        STATE_STATS.s3_puts += 1
+        try:
+            response = self.s3_client.put_object(
                 Bucket=self.bucket_name,
-                Key=self.object_key,
-                Body=json_content.encode('utf-8'),
-                ContentType='application/json'
+                Key=key,
+                Body=body,
+                ContentType=content_type(self.state_format),
+                **condition
             )
-            
-            logger.info("state.json успешно загружен в S3")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Ошибка загрузки в S3: {e}")
-            return False
-    
-    def load_known_items(self) -> Set[str]:
-        """Загружает список известных ID из S3"""
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code in ('PreconditionFailed', 'ConditionalRequestConflict', '412', '409'):
+                raise StateConflictError(f"{key} в S3 изменен другим прогоном ({error_code})") from e
+            if error_code != 'NotImplemented':
+                raise
+            # Хранилище без условной записи: пишем как раньше, без защиты от гонки
+            logger.warning(f"S3 не поддерживает условную запись, {key} перезаписывается без проверки")
+            response = self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=body,
+                ContentType=content_type(self.state_format)
+            )
+        STATE_STATS.s3_bytes_up += len(body)
+        return response.get('ETag')
+
+    def load_known_items(self, sources: Optional[Iterable[str]] = None) -> Set[str]:
+        """Известные ID: из шардов источников (если состояние разложено по шардам) или из state.json"""
         try:
-            data = self.download_state()
-            if "known_items" in data and isinstance(data["known_items"], dict):
-                # Импортируем normalize_url из основного модуля
-                from vinyl_monitor import normalize_url
-                return {normalize_url(item_id) for item_id in data["known_items"].keys()}
-            else:
-                return set()
+            backend = ShardedBackend(S3ShardStore(self), sources)
+            if backend.manifest():
+                return set(backend.load())
+            return set(items_from_state(self.download_state()))
         except Exception as e:
             logger.error(f"Ошибка загрузки известных элементов: {e}")
             return set()
-    
+
     def save_new_items(self, known_ids: Set[str], new_items: list) -> bool:
-        """Сохраняет новые элементы в S3"""
+        """Сохраняет новые элементы в state.json в S3 (условная запись, как в прогоне); known_ids не нужен"""
+        try:
+            backend = S3Backend(self)
+            state = MonitorState(backend.load())
+            state.add_items(new_items or [])
+            backend.save(state)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сохранения новых элементов: {e}")
+            return False
+
+    def upload_state(self, state_data: Dict) -> bool:
+        """Загружает state.json в S3"""
         try:
-            # Загружаем текущее состояние
-            existing_data = self.download_state()
+            body = encode_state(state_data, self.state_format)
             
-            # Добавляем новые элементы
-            if new_items:
-                from datetime import datetime
-                current_time = datetime.now().isoformat()
-                
-                for item in new_items:
-                    item_id = item.get("id", "")
-                    if item_id:
-                        from vinyl_monitor import normalize_url
-                        normalized_id = normalize_url(item_id)
-                        existing_data.setdefault("known_items", {})[normalized_id] = {
-                            "added_at": current_time,
-                            "title": item.get("title", ""),
-                            "source": item.get("source", "")
-                        }
+            STATE_STATS.s3_puts += 1
+            STATE_STATS.s3_bytes_up += len(body)
+            response = self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=self.object_key,
+                Body=body,
+                ContentType=content_type(self.state_format)
+            )
+            self.etag = response.get('ETag')
+            self.object_size = len(body)
             
-            # Сохраняем обратно в S3
-            return self.upload_state(existing_data)
+            logger.info("state.json успешно загружен в S3")
+            return True
             
         except Exception as e:
-            logger.error(f"Ошибка сохранения новых элементов: {e}")
+            logger.error(f"Ошибка загрузки в S3: {e}")
             return False
     
+    def list_journal(self) -> List[str]:
+        """Ключи дельт журнала в порядке записи"""
+        keys = []
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=self.journal_prefix):
+            keys.extend(obj['Key'] for obj in page.get('Contents', []))
+        return sorted(keys)
+
+    def download_journal_entry(self, key: str) -> str:
+        """Содержимое одной дельты (JSONL)"""
+        STATE_STATS.s3_gets += 1
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        return response['Body'].read().decode('utf-8')
+
+    def upload_journal_entry(self, body: str) -> str:
+        """Записывает дельту отдельным объектом; возвращает ее ключ"""
+        key = delta_key(self.journal_prefix)
+        STATE_STATS.s3_puts += 1
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            Body=body.encode('utf-8'),
+            ContentType='application/x-ndjson'
+        )
+        return key
+
+    def delete_journal_entries(self, keys: List[str]) -> None:
+        """Удаляет свернутые в снимок дельты (по 1000 ключей за запрос)"""
+        for start in range(0, len(keys), 1000):
+            self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in keys[start:start + 1000]], 'Quiet': True}
+            )
+
     def test_connection(self) -> bool:
         """Тестирует подключение к S3"""
         try:
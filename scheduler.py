@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Расписание сайтов для режима демона: мин-куча сроков
+
+В куче лежат пары (срок, сайт). Перепланирование не ищет старую запись:
+актуальный срок сайта хранится отдельно, а устаревшие записи отбрасываются,
+когда оказываются на вершине кучи.
+"""
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+
+class DueScheduler:
+    """Сроки следующего сканирования по сайтам (время — time.time())"""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, str]] = []
+        self._due: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, site: str) -> bool:
+        return site in self._due
+
+    def schedule(self, site: str, due_at: float) -> None:
+        """Назначает (или переназначает) срок сайта"""
+        self._due[site] = due_at
+        heapq.heappush(self._heap, (due_at, site))
+
+    def sites(self) -> List[str]:
+        """Сайты в расписании"""
+        return list(self._due)
+
+    def cancel(self, site: str) -> None:
+        """Убирает сайт из расписания"""
+        self._due.pop(site, None)
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def peek(self) -> Optional[Tuple[float, str]]:
+        """Ближайший срок и сайт; None — расписание пусто"""
+        self._drop_stale()
+        return self._heap[0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[str]:
+        """Сайты, срок которых наступил, в порядке сроков; они снимаются с расписания"""
+        due = []
+        while True:
+            head = self.peek()
+            if head is None or head[0] > now:
+                return due
+            heapq.heappop(self._heap)
+            del self._due[head[1]]
+            due.append(head[1])
+
+    def seconds_until_next(self, now: float) -> Optional[float]:
+        """Сколько спать до ближайшего срока; None — расписание пусто"""
+        head = self.peek()
+        return None if head is None else max(head[0] - now, 0.0)
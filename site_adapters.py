@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Декларативное описание сайтов-каталогов
+
+Сайт задается данными: страницы, функция извлечения (своя или собранная
+из селекторов карточки, ссылки, названия и цены), подгрузка «Загрузить ещё»,
+интервал.
+Загрузку, повторы, подгрузку и извлечение выполняет общий движок
+(scrape_site_with_playwright / scrape_catalog_page_async в vinyl_monitor.py).
+Локаль и заголовки контекста берутся из SITE_PROFILES по имени сайта.
+"""
+import json
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+LOAD_MORE_LABELS_RU = ("Load more", "Загрузить ещё", "Показать ещё")
+LOAD_MORE_LABELS_EN = ("Load more", "Show more", "More")
+
+DEFAULT_TITLE_SELECTOR = 'h1,h2,h3,.title,.product-title,[class*="title"]'
+DEFAULT_PRICE_SELECTOR = '.price,[class*="price"]'
+
+
+@dataclass(frozen=True)
+class SiteAdapter:
+    """Сайт-каталог для общего движка"""
+    name: str  # Имя сайта: профиль контекста, last_check_<name>.txt
+    source: str  # Поле source у позиций
+    urls: Tuple[str, ...]
+    items_js: str  # (roots) => [{id, url, title, price}], без roots — весь document
+    interval_hours: float
+    load_more_labels: Tuple[str, ...] = LOAD_MORE_LABELS_RU  # Пусто — без подгрузки
+    max_clicks: int = 3
+    wait_until: str = "load"
+    incremental: bool = True  # Листать только до известных позиций
+    api: str = ""  # Источник без браузера ("tilda", "shopify"); пусто — только браузер
+    enabled: bool = True
+
+
+def anchor_items_js(link_patterns: Sequence[str], title_selector: str = DEFAULT_TITLE_SELECTOR,
+                    price_selector: str = DEFAULT_PRICE_SELECTOR, card_selector: str = "",
+                    min_title_length: int = 0, refine_js: str = "") -> str:
+    """Функция извлечения по селекторам.
+
+    Карточка — ссылка, чей href содержит один из link_patterns. Название и
+    цена ищутся в ближайшей карточке card_selector, а без него — в пяти
+    ближайших родителях ссылки. refine_js — необязательная JS-функция
+    (container, item) => item или null: доработка позиции под сайт или отсев;
+    container — карточка, а без нее — сама ссылка.
+    """
+    return r"""
+    (roots) => {
+      const LINK_PATTERNS = %s;
+      const TITLE_SELECTOR = %s;
+      const PRICE_SELECTOR = %s;
+      const CARD_SELECTOR = %s;
+      const MIN_TITLE_LENGTH = %d;
+      const refine = %s;
+      // roots — вставленные узлы при инкрементальном извлечении, без них разбирается весь document
+      const anchors = (roots ? roots.flatMap(r => r.matches('a') ? [r] : Array.from(r.querySelectorAll('a')))
+                             : Array.from(document.querySelectorAll('a')))
+        .filter(a => a.href && LINK_PATTERNS.some(p => a.href.includes(p)) && a.textContent.trim().length > 0);
+
+      const findNear = (a, selector, accept) => {
+        const card = CARD_SELECTOR ? a.closest(CARD_SELECTOR) : null;
+        if (card) {
+          const found = card.querySelector(selector);
+          return found && accept(found) ? found : null;
+        }
+        let el = a;
+        for (let i = 0; i < 5 && el; i++) {
+          if (el.querySelector) {
+            const found = el.querySelector(selector);
+            if (found && accept(found)) return found;
+          }
+          el = el.parentElement;
+        }
+        return null;
+      };
+
+      const items = [];
+      const seen = new Set();
+
+      for (const a of anchors) {
+        // Нормализуем URL: убираем параметры запроса и якоря, убираем trailing slash
+        const url = a.href.split('?')[0].split('#')[0].replace(/\/$/, '');
+        if (seen.has(url)) continue;
+        seen.add(url);
+
+        const t = findNear(a, TITLE_SELECTOR, node => node.textContent.trim().length > 3);
+        const title = t ? t.textContent.trim() : a.textContent.trim();
+        const p = findNear(a, PRICE_SELECTOR, node => node.textContent);
+        const price = p ? p.textContent.trim().replace(/\s+/g, ' ') : '';
+
+        let item = { id: url, url, title, price };
+        if (refine) item = refine((CARD_SELECTOR && a.closest(CARD_SELECTOR)) || a, item);
+        if (item && item.title.length >= MIN_TITLE_LENGTH) items.push(item);
+      }
+      return items;
+    }
+    """ % (json.dumps(list(link_patterns)), json.dumps(title_selector), json.dumps(price_selector),
+           json.dumps(card_selector), min_title_length, refine_js.strip() or "null")
+
+
+def card_items_js(card_selector: str, link_patterns: Sequence[str], title_selector: str = "",
+                  price_selector: str = DEFAULT_PRICE_SELECTOR, min_title_length: int = 0,
+                  refine_js: str = "", fallback_js: str = "") -> str:
+    """Функция извлечения по карточкам товаров.
+
+    Карточки card_selector находятся одним запросом, и название, цена и
+    ссылка читаются внутри каждой карточки за один проход — без подъема по
+    родителям от каждой ссылки. Ссылка — первая в карточке, чей href
+    содержит один из link_patterns; название — title_selector, а без него
+    или без совпадения — текст ссылки. refine_js — как у anchor_items_js.
+
+    fallback_js (обычно прежняя функция по ссылкам) вызывается, если на
+    странице нет ни одной карточки — например, после смены верстки.
+    """
+    return r"""
+    (roots) => {
+      const CARD_SELECTOR = %s;
+      const LINK_PATTERNS = %s;
+      const TITLE_SELECTOR = %s;
+      const PRICE_SELECTOR = %s;
+      const MIN_TITLE_LENGTH = %d;
+      const refine = %s;
+      const fallback = %s;
+      // roots — вставленные узлы при инкрементальном извлечении, без них разбирается весь document
+      let cards;
+      if (roots) {
+        const found = new Set();
+        for (const root of roots) {
+          const own = root.closest(CARD_SELECTOR);
+          if (own) found.add(own);
+          else root.querySelectorAll(CARD_SELECTOR).forEach(card => found.add(card));
+        }
+        cards = Array.from(found);
+      } else {
+        cards = Array.from(document.querySelectorAll(CARD_SELECTOR));
+      }
+      // Запасной разбор — только если карточек нет на всей странице, а не в очередной порции
+      if (!cards.length) {
+        return fallback && !document.querySelector(CARD_SELECTOR) ? fallback(roots) : [];
+      }
+
+      const items = [];
+      const seen = new Set();
+
+      for (const card of cards) {
+        const link = Array.from(card.querySelectorAll('a[href]'))
+          .find(a => LINK_PATTERNS.some(p => a.href.includes(p)));
+        if (!link) continue;
+        // Нормализуем URL: убираем параметры запроса и якоря, убираем trailing slash
+        const url = link.href.split('?')[0].split('#')[0].replace(/\/$/, '');
+        if (seen.has(url)) continue;
+        seen.add(url);
+
+        const t = TITLE_SELECTOR ? card.querySelector(TITLE_SELECTOR) : null;
+        const title = (t && t.textContent.trim()) || link.textContent.trim();
+        const p = card.querySelector(PRICE_SELECTOR);
+        const price = p ? p.textContent.trim().replace(/\s+/g, ' ') : '';
+
+        let item = { id: url, url, title, price };
+        if (refine) item = refine(card, item);
+        if (item && item.title.length >= MIN_TITLE_LENGTH) items.push(item);
+      }
+      return items;
+    }
+    """ % (json.dumps(card_selector), json.dumps(list(link_patterns)), json.dumps(title_selector),
+           json.dumps(price_selector), min_title_length, refine_js.strip() or "null",
+           fallback_js.strip() or "null")
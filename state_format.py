@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Форматы файла состояния
+
+Исторически state.json пишется как JSON с отступами, и у каждой позиции в
+ключе повторяется длинный префикс URL, а в значении — название источника.
+Формат 2 пишет то же состояние компактно: без отступов, а при словарном
+кодировании (STATE_FORMAT_DICT=true) позиция хранится строкой [префикс,
+хвост URL, название, источник, added_at], где префикс и источник — номера
+в общих списках. Поверх можно сжать gzip или zstd (если установлен
+zstandard). Сжатие и так убирает повторы, поэтому словарь вместе с ним
+почти ничего не дает (см. bench_state_format.py) и по умолчанию выключен.
+
+Загрузка определяет формат сама — по сигнатуре сжатия и полю "format", —
+поэтому старые state.json и state_backup*.json читаются как раньше. Сжатое
+состояние пишется под именем с суффиксом сжатия (state.json.gz,
+state.json.zst), а читается самый свежий из файлов под любым из имен — так
+файл, записанный прежней версией под именем state.json, тоже находится.
+
+    STATE_FORMAT=json      # по умолчанию: прежний JSON с отступами
+    STATE_FORMAT=compact   # формат 2 без сжатия
+    STATE_FORMAT=gzip      # формат 2 + gzip
+    STATE_FORMAT=zstd      # формат 2 + zstd
+"""
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:  # zstd необязателен: без него пишем gzip
+    zstandard = None
+
+FORMAT_VERSION = 2
+STATE_FORMATS = ("json", "compact", "gzip", "zstd")
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+CONTENT_TYPES = {"json": "application/json", "compact": "application/json",
+                 "gzip": "application/gzip", "zstd": "application/zstd"}
+COMPRESSED_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+ITEM_FIELDS = ("title", "source", "added_at")
+STATE_FORMAT_DICT = os.getenv("STATE_FORMAT_DICT", "false").lower() == "true"
+
+
+def split_url(url: str) -> Tuple[str, str]:
+    """Префикс URL (по последний '/') и хвост; префикс + хвост == url"""
+    head, sep, tail = url.rpartition("/")
+    return head + sep, tail
+
+
+def pack_items(known_items: Dict[str, Dict]) -> Dict:
+    """Словарное кодирование known_items: строки позиций и общие списки префиксов и источников"""
+    prefixes: Dict[str, int] = {}
+    sources: Dict[Optional[str], int] = {}
+    rows: List[list] = []
+    for url, info in known_items.items():
+        prefix, tail = split_url(url)
+        # Отсутствующее поле — null, чтобы старые записи вида {"added_at": ...} не менялись
+        row = [prefixes.setdefault(prefix, len(prefixes)), tail, info.get("title"),
+               sources.setdefault(info.get("source"), len(sources)), info.get("added_at")]
+        extra = {key: value for key, value in info.items() if key not in ITEM_FIELDS}
+        if extra:
+            row.append(extra)
+        rows.append(row)
+    return {"prefixes": list(prefixes), "sources": list(sources), "items": rows}
+
+
+def unpack_items(packed: Dict) -> Dict[str, Dict]:
+    """Обратно к known_items"""
+    prefixes, sources = packed["prefixes"], packed["sources"]
+    known_items = {}
+    for row in packed["items"]:
+        info = {field: value for field, value in zip(ITEM_FIELDS, (row[2], sources[row[3]], row[4]))
+                if value is not None}
+        if len(row) > 5:
+            info.update(row[5])
+        known_items[prefixes[row[0]] + row[1]] = info
+    return known_items
+
+
+def encode_state(data: Dict, fmt: str = "json", dictionary: Optional[bool] = None) -> bytes:
+    """Сериализует разобранный state.json в выбранном формате; dictionary=None — по STATE_FORMAT_DICT"""
+    if fmt not in STATE_FORMATS:
+        raise ValueError(f"неизвестный формат состояния: {fmt} (доступны: {', '.join(STATE_FORMATS)})")
+    if fmt == "json":
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    body = {key: value for key, value in data.items() if key != "known_items"}
+    body["format"] = FORMAT_VERSION
+    if STATE_FORMAT_DICT if dictionary is None else dictionary:
+        body.update(pack_items(data.get("known_items", {})))
+    else:
+        body["known_items"] = data.get("known_items", {})
+    raw = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if fmt == "zstd" and zstandard is None:
+        print("⚠️ zstandard не установлен, состояние сжимается gzip")
+        fmt = "gzip"
+    if fmt == "gzip":
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+    if fmt == "zstd":
+        return zstandard.ZstdCompressor(level=6).compress(raw)
+    return raw
+
+
+def decode_state(raw: Union[str, bytes]) -> Dict:
+    """Разбирает состояние любого формата: сжатое, формат 2 или прежний JSON"""
+    if isinstance(raw, bytes):
+        if raw.startswith(GZIP_MAGIC):
+            raw = gzip.decompress(raw)
+        elif raw.startswith(ZSTD_MAGIC):
+            if zstandard is None:
+                raise RuntimeError("состояние сжато zstd, установите zstandard")
+            raw = zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+    data = json.loads(raw)
+    if data.get("format") == FORMAT_VERSION:
+        data.pop("format")
+        if "items" in data:
+            data["known_items"] = unpack_items(data)
+            for key in ("prefixes", "sources", "items"):
+                data.pop(key)
+    return data
+
+
+def state_file_name(name: str, fmt: str) -> str:
+    """Имя файла (ключа S3) состояния в формате fmt: сжатому — суффикс сжатия (state.json.gz)"""
+    if fmt == "zstd" and zstandard is None:
+        fmt = "gzip"  # encode_state пишет gzip
+    return name + COMPRESSED_SUFFIXES.get(fmt, "")
+
+
+def state_file_names(name: str) -> List[str]:
+    """Имена, под которыми может лежать состояние name: без суффикса и со всеми суффиксами сжатия"""
+    return [name] + [name + suffix for suffix in COMPRESSED_SUFFIXES.values()]
+
+
+def latest_state_file(path: Path, preferred: Optional[Path] = None) -> Optional[Path]:
+    """Самый свежий из существующих файлов состояния path под любым из имен; None — файлов нет.
+
+    При равном времени изменения берется preferred — файл текущего формата.
+    """
+    existing = [candidate for candidate in (path.with_name(name) for name in state_file_names(path.name))
+                if candidate.exists()]
+    return max(existing, key=lambda candidate: (candidate.stat().st_mtime_ns, candidate == preferred), default=None)
+
+
+def content_type(fmt: str) -> str:
+    """Content-Type объекта состояния в S3"""
+    return CONTENT_TYPES.get(fmt, "application/json")
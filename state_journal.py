@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Журнал изменений состояния: снимок плюс дописываемые дельты
+
+Полная перезапись state.json (локально и в S3) ради нескольких новых позиций
+стоит тем дороже, чем длиннее история. С журналом прогон дописывает только
+свою дельту — события add/update/remove в формате JSONL — одной записью:
+строкой в файл state.journal.jsonl или отдельным маленьким объектом в S3.
+Загрузка читает снимок (обычный state.json) и проигрывает поверх него
+журнал. Когда журнал перерастает порог, он сворачивается в новый снимок.
+
+События идемпотентны, поэтому повторное проигрывание безопасно: если прогон
+упал между записью снимка и очисткой журнала, свернутые события просто
+применятся еще раз.
+"""
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from monitor_state import (STATE_STATS, apply_events, items_from_state,
+                           parse_state_json)
+from state_format import encode_state, latest_state_file, state_file_name
+
+
+def replay(items: Dict[str, Dict], events: Iterable[Dict]) -> None:
+    """Проигрывает журнал при загрузке (с учетом в STATE_STATS)"""
+    STATE_STATS.journal_events += apply_events(items, events)
+
+
+def encode_events(events: Iterable[Dict]) -> str:
+    """События в JSONL (по строке на событие)"""
+    return "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in events)
+
+
+def decode_events(text: str) -> List[Dict]:
+    """Разбирает JSONL; оборванная последняя строка (прогон упал на записи) пропускается"""
+    events = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            print(f"⚠️ Пропущена поврежденная строка журнала: {line[:80]}")
+    return events
+
+
+class JournalFileBackend:
+    """Локальный снимок state.json и журнал state.journal.jsonl рядом с ним"""
+    name = "state.json + журнал"
+    optional = False
+
+    def __init__(self, snapshot_path: Path, compact_bytes: int = 256 * 1024,
+                 clean: Optional[Callable[[Dict], Dict]] = None, fmt: str = "json"):
+        self.base_path = snapshot_path
+        self.snapshot_path = snapshot_path.with_name(state_file_name(snapshot_path.name, fmt))
+        self.journal_path = snapshot_path.with_name(snapshot_path.stem + ".journal.jsonl")
+        self.compact_bytes = compact_bytes
+        self.clean = clean
+        self.fmt = fmt  # Формат снимка (state_format.py)
+
+    def load(self) -> Dict[str, Dict]:
+        items: Dict[str, Dict] = {}
+        snapshot_path = latest_state_file(self.base_path, self.snapshot_path)
+        if snapshot_path is not None:
+            with open(snapshot_path, "rb") as f:
+                items = items_from_state(parse_state_json(f))
+        if self.journal_path.exists():
+            replay(items, decode_events(self.journal_path.read_text(encoding="utf-8")))
+        return items
+
+    def save(self, state) -> None:
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        if state.pending:
+            # Вся дельта прогона — одна запись в конец файла
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(encode_events(state.pending))
+                f.flush()
+                os.fsync(f.fileno())
+        if not self.snapshot_path.exists() or self._journal_size() >= self.compact_bytes:
+            self.compact(state.items)
+
+    def _journal_size(self) -> int:
+        return self.journal_path.stat().st_size if self.journal_path.exists() else 0
+
+    def compact(self, items: Dict[str, Dict]) -> None:
+        """Сворачивает журнал в новый снимок: снимок заменяется атомарно, затем журнал очищается"""
+        data = {"known_items": dict(items)}
+        if self.clean:
+            data = self.clean(data)
+        tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(encode_state(data, self.fmt))
+        os.replace(tmp_path, self.snapshot_path)
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+        print(f"🗜️ Журнал состояния свернут в {self.snapshot_path.name}: {len(data['known_items'])} позиций")
+
+
+class S3JournalBackend:
+    """Снимок state.json в S3 и дельты отдельными объектами под journal/"""
+    name = "S3 (журнал)"
+    optional = True
+
+    def __init__(self, s3, compact_deltas: int = 50):
+        self.s3 = s3
+        self.compact_deltas = compact_deltas
+        self._deltas: List[str] = []  # Дельты, уже учтенные в состоянии в памяти
+
+    def load(self) -> Dict[str, Dict]:
+        items = items_from_state(self.s3.download_state())
+        self._deltas = self.s3.list_journal()
+        for key in self._deltas:
+            replay(items, decode_events(self.s3.download_journal_entry(key)))
+        return items
+
+    def save(self, state) -> None:
+        if state.pending:
+            self._deltas.append(self.s3.upload_journal_entry(encode_events(state.pending)))
+        if len(self._deltas) >= self.compact_deltas:
+            self.compact(state.items)
+
+    def compact(self, items: Dict[str, Dict]) -> None:
+        """Новый снимок, затем удаление свернутых дельт.
+
+        Удаляются только дельты, прочитанные или записанные этим процессом: дельта,
+        которую параллельный прогон дописал после загрузки, останется и проиграется
+        поверх нового снимка.
+        """
+        if not self.s3.upload_state({"known_items": dict(items)}):
+            raise RuntimeError("не удалось записать снимок state.json в S3")
+        self.s3.delete_journal_entries(self._deltas)
+        print(f"🗜️ Журнал S3 свернут: {len(self._deltas)} дельт в снимок из {len(items)} позиций")
+        self._deltas = []
+
+
+def delta_key(prefix: str) -> str:
+    """Ключ дельты: сортируется по времени записи, не совпадает у параллельных прогонов"""
+    return f"{prefix}{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.jsonl"
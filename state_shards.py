@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Состояние по источникам: отдельный файл на магазин и манифест над ними
+
+В одном state.json вперемешку лежат позиции korobkavinyla, vinyltap, Авито и
+plastinka, и прогон, который пересканировал только Авито, все равно скачивает,
+разбирает и записывает историю всех магазинов. С STATE_SHARDS=true у каждого
+источника свой объект (локально — файл в state.shards/, в S3 — ключ под
+vinyl-monitor/shards/), а маленький manifest.json перечисляет их с числом
+позиций и недавними временами добавления (для адаптивных интервалов).
+
+Прогон загружает только шарды сайтов, которые пора сканировать, и записывает
+только шарды, в которых появились изменения. Если манифеста еще нет, первое
+обращение раскладывает по шардам прежний state.json (legacy-хранилище).
+"""
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from monitor_state import (StateConflictError, apply_events, items_from_state,
+                           parse_state_json)
+from state_format import encode_state, state_file_name
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def shard_source(item_id: str, info: Dict) -> str:
+    """Источник позиции; у старых записей без source — хост URL"""
+    source = info.get("source")
+    if source:
+        return source
+    host = urlparse(item_id).hostname or ""
+    return host[4:] if host.startswith("www.") else host or "unknown"
+
+
+def shard_name(source: str, fmt: str = "json") -> str:
+    """Имя файла шарда: источник, безопасный для пути и ключа S3, с суффиксом сжатия формата"""
+    return state_file_name(re.sub(r"[^a-z0-9._-]", "_", source.lower()) + ".json", fmt)
+
+
+def recent_added(items: Dict[str, Dict], days: float) -> List[str]:
+    """Времена добавления за последние days дней (по возрастанию)"""
+    since = datetime.now() - timedelta(days=days)
+    recent = []
+    for info in items.values():
+        try:
+            if datetime.fromisoformat(info.get("added_at", "")) >= since:
+                recent.append(info["added_at"])
+        except (TypeError, ValueError):
+            continue  # "unknown"
+    return sorted(recent)
+
+
+class LocalShardStore:
+    """Шарды в каталоге рядом со state.json; запись атомарная"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.name = f"{directory.name}/"
+
+    def read(self, name: str) -> Tuple[Optional[bytes], Optional[str]]:
+        path = self.directory / name
+        return (path.read_bytes() if path.exists() else None), None
+
+    def write(self, name: str, body: bytes, etag: Optional[str]) -> Optional[str]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.directory / (name + ".tmp")
+        tmp_path.write_bytes(body)
+        os.replace(tmp_path, self.directory / name)
+        return None
+
+
+class S3ShardStore:
+    """Шарды в S3 под отдельным префиксом; запись условная (If-Match)"""
+
+    def __init__(self, s3, prefix: str = "vinyl-monitor/shards/"):
+        self.s3 = s3
+        self.prefix = prefix
+        self.name = f"S3 {prefix}"
+
+    def read(self, name: str) -> Tuple[Optional[bytes], Optional[str]]:
+        return self.s3.read_object(self.prefix + name)
+
+    def write(self, name: str, body: bytes, etag: Optional[str]) -> Optional[str]:
+        return self.s3.write_object(self.prefix + name, body, etag)
+
+
+class ShardedBackend:
+    """Хранилище состояния из шардов по источникам.
+
+    sources — источники, которые загружаются сразу (None — все); остальные
+    догружаются через load_sources(), если прогон нашел их позиции. Сохранение
+    пишет только шарды источников из несохраненных событий и манифест.
+    """
+    conflict_retries = 3
+
+    def __init__(self, store, sources: Optional[Iterable[str]] = None, legacy=None, fmt: str = "json",
+                 clean: Optional[Callable[[Dict], Dict]] = None, recent_days: float = 56,
+                 optional: bool = False):
+        self.store = store
+        self.name = f"шарды {store.name}"
+        self.sources = set(sources) if sources is not None else None
+        self.legacy = legacy  # Прежнее хранилище целиком: из него шарды создаются при первом обращении
+        self.fmt = fmt
+        self.clean = clean
+        self.recent_days = recent_days
+        self.optional = optional
+        self.loaded: Set[str] = set()  # Источники, чьи шарды уже в памяти
+        self._manifest: Optional[Dict] = None
+        self._manifest_etag: Optional[str] = None
+        self._etags: Dict[str, Optional[str]] = {}
+        self._touched: Dict[str, Dict] = {}  # Записи манифеста, измененные с последней записи манифеста
+
+    def manifest(self) -> Dict:
+        """Манифест {source: {"file", "count", "updated_at", "recent"}}; читается один раз"""
+        if self._manifest is None:
+            raw, self._manifest_etag = self.store.read(MANIFEST_NAME)
+            self._manifest = json.loads(raw)["shards"] if raw else {}
+            if not self._manifest and self.legacy is not None:
+                self._migrate()
+        return self._manifest
+
+    def _migrate(self) -> None:
+        """Раскладывает прежнее состояние целиком по шардам"""
+        items = self.legacy.load()
+        if not items:
+            return
+        by_source: Dict[str, Dict[str, Dict]] = {}
+        for item_id, info in items.items():
+            by_source.setdefault(shard_source(item_id, info), {})[item_id] = info
+        for source, shard_items in by_source.items():
+            self._write_shard(source, shard_items)
+        self._write_manifest()
+        print(f"🗂️ {self.legacy.name} разложен по шардам {self.store.name}: {len(by_source)} источников")
+
+    def load(self) -> Dict[str, Dict]:
+        sources = set(self.manifest()) if self.sources is None else self.sources
+        return self.load_sources(sources)
+
+    def load_sources(self, sources: Iterable[str]) -> Dict[str, Dict]:
+        """Позиции источников, которые еще не загружены"""
+        items: Dict[str, Dict] = {}
+        for source in set(sources) - self.loaded:
+            items.update(self._read_shard(source))
+            self.loaded.add(source)
+        return items
+
+    def _read_shard(self, source: str) -> Dict[str, Dict]:
+        entry = self.manifest().get(source)
+        if not entry:
+            return {}
+        raw, self._etags[source] = self.store.read(entry["file"])
+        return items_from_state(parse_state_json(raw)) if raw else {}
+
+    def save(self, state) -> None:
+        dirty: Dict[str, List[Dict]] = {}
+        for event in state.pending:
+            source = event.get("source") or shard_source(event["id"], event.get("info", {}))
+            dirty.setdefault(source, []).append(event)
+        if not dirty:
+            return
+        for source, events in dirty.items():
+            if source not in self.loaded:
+                # Шард не загружали: сначала его позиции, иначе запись затрет историю
+                for item_id, info in self.load_sources([source]).items():
+                    state.items.setdefault(item_id, info)
+                    state.known_ids.add(item_id)
+            shard_items = {item_id: info for item_id, info in state.items.items()
+                           if shard_source(item_id, info) == source}
+            written = self._write_shard(source, shard_items, events)
+            for item_id in written.keys() - state.known_ids:
+                # Позиции, которые параллельный прогон успел дописать в этот шард
+                state.items[item_id] = written[item_id]
+                state.known_ids.add(item_id)
+        self._write_manifest()
+
+    def _write_shard(self, source: str, items: Dict[str, Dict],
+                     events: Optional[List[Dict]] = None) -> Dict[str, Dict]:
+        """Записывает шард (при конфликте — объединив с чужой версией); возвращает записанные позиции"""
+        name = shard_name(source, self.fmt)
+        entry = self.manifest().get(source)
+        if entry and entry["file"] != name:
+            # Формат сменился: шард пишется новым объектом, ETag прежнего файла к нему не относится
+            self._etags.pop(source, None)
+        for _ in range(self.conflict_retries):
+            data = {"known_items": items}
+            if self.clean:
+                data = self.clean(data)
+            try:
+                self._etags[source] = self.store.write(name, encode_state(data, self.fmt), self._etags.get(source))
+                break
+            except StateConflictError as e:
+                # Шард изменил другой прогон: его версия плюс наши события
+                print(f"⚠️ {source}: {e}, объединяем")
+                raw, self._etags[source] = self.store.read(name)
+                items = items_from_state(parse_state_json(raw)) if raw else {}
+                apply_events(items, events or [])
+        else:
+            raise StateConflictError(f"шард {source} меняется быстрее, чем мы успеваем записать")
+        entry = {"file": name, "count": len(items), "updated_at": datetime.now().isoformat(),
+                 "recent": recent_added(items, self.recent_days)}
+        self.manifest()[source] = self._touched[source] = entry
+        return items
+
+    def _write_manifest(self) -> None:
+        for _ in range(self.conflict_retries):
+            body = json.dumps({"version": MANIFEST_VERSION, "shards": self._manifest},
+                              ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            try:
+                self._manifest_etag = self.store.write(MANIFEST_NAME, body, self._manifest_etag)
+                self._touched = {}
+                return
+            except StateConflictError:
+                # Другой прогон записал свои шарды: берем его манифест и поверх — наши записи
+                raw, self._manifest_etag = self.store.read(MANIFEST_NAME)
+                self._manifest = {**(json.loads(raw)["shards"] if raw else {}), **self._touched}
+        raise StateConflictError("манифест шардов меняется быстрее, чем мы успеваем записать")
+
+
+def shard_arrivals(backends: Iterable) -> Optional[List[Tuple[str, str]]]:
+    """Пары (источник, added_at) из манифеста первого шардового хранилища; None — шардов нет"""
+    for backend in backends:
+        if not isinstance(backend, ShardedBackend):
+            continue
+        try:
+            manifest = backend.manifest()
+        except Exception as e:
+            print(f"⚠️ Не удалось прочитать манифест {backend.name}: {e}")
+            continue
+        if manifest:
+            return [(source, added_at) for source, entry in manifest.items() for added_at in entry.get("recent", [])]
+    return None
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Состояние мониторинга в SQLite вместо state.json
+
+state.json читается целиком при каждой загрузке и переписывается целиком
+при каждом сохранении, поэтому с ростом истории оба шага дорожают. Здесь
+известные позиции лежат в таблице с индексами: нормализованный URL —
+первичный ключ, отдельные индексы по источнику, названию и времени
+добавления. База работает в режиме WAL (чтение не ждет записи), а новые
+позиции прогона вставляются одной транзакцией.
+
+Разовый перенос из state.json (оба формата — known_items и старый known_ids):
+
+    python3 state_store.py [state.json] [state.db]
+"""
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from state_format import decode_state
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    source TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '',
+    added_at TEXT NOT NULL DEFAULT 'unknown'
+);
+CREATE INDEX IF NOT EXISTS items_source ON items (source);
+CREATE INDEX IF NOT EXISTS items_title ON items (title);
+CREATE INDEX IF NOT EXISTS items_added_at ON items (added_at);
+"""
+
+# ID вставляется всегда, даже если название уже есть под другим URL: база — единственное множество
+# известных ID, и пропущенный ID приходил бы как новый каждый прогон. Дубли по названию отсекает уведомление
+UPSERT_SQL = """
+INSERT INTO items (id, source, title, added_at)
+VALUES (:id, :source, :title, :added_at)
+ON CONFLICT (id) DO UPDATE SET
+    source = CASE WHEN excluded.source != '' THEN excluded.source ELSE items.source END,
+    title = CASE WHEN excluded.title != '' THEN excluded.title ELSE items.title END
+"""
+
+# Перенос не теряет ни одного ID (иначе позиция снова придет как новая); записи базы важнее
+IMPORT_SQL = """
+INSERT OR IGNORE INTO items (id, source, title, added_at)
+VALUES (:id, :source, :title, :added_at)
+"""
+
+
+def normalize_url(url: str) -> str:
+    """Нормализует URL, убирая параметры запроса и якоря"""
+    if not url:
+        return url
+
+    normalized = url.split('?')[0].split('#')[0]
+    normalized = normalized.rstrip('/')
+
+    return normalized
+
+
+def state_items(data: Dict) -> Iterator[Tuple[str, Dict]]:
+    """Позиции из разобранного state.json любого формата: (id, информация)"""
+    known_items = data.get("known_items")
+    if isinstance(known_items, dict):
+        for item_id, info in known_items.items():
+            yield item_id, info if isinstance(info, dict) else {}
+    elif isinstance(data.get("known_ids"), list):
+        # Старый формат — массив ID без времени добавления
+        for item_id in data["known_ids"]:
+            yield item_id, {"added_at": "unknown"}
+
+
+class StateStore:
+    """Известные позиции в SQLite; используется как контекстный менеджер"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def __enter__(self) -> "StateStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def known_ids(self) -> Set[str]:
+        """Все известные ID"""
+        return {row[0] for row in self._conn.execute("SELECT id FROM items")}
+
+    def iter_ids(self) -> Iterator[str]:
+        """Известные ID потоком, без множества в памяти"""
+        for row in self._conn.execute("SELECT id FROM items"):
+            yield row[0]
+
+    def recent_arrivals(self, since: str) -> List[Tuple[str, str]]:
+        """Пары (источник, added_at) позиций, добавленных не раньше since (по индексу added_at)"""
+        return [(row[0], row[1]) for row in self._conn.execute(
+            "SELECT source, added_at FROM items WHERE added_at >= ? AND added_at != 'unknown'", (since,))]
+
+    def get(self, item_id: str) -> Dict:
+        """Информация о позиции в формате known_items; {} — позиции нет"""
+        row = self._conn.execute("SELECT source, title, added_at FROM items WHERE id = ?",
+                                 (normalize_url(item_id),)).fetchone()
+        return dict(row) if row else {}
+
+    def relisted_ids(self, items: Iterable[Dict]) -> Set[str]:
+        """ID позиций, чье название уже известно у того же источника под другим URL (по индексу title)"""
+        relisted = set()
+        for item in items:
+            item_id, title = normalize_url(item.get("id", "")), item.get("title", "") or ""
+            if title and self._conn.execute(
+                    "SELECT 1 FROM items WHERE title = ? AND source = ? AND id != ? LIMIT 1",
+                    (title, item.get("source", "") or "", item_id)).fetchone():
+                relisted.add(item_id)
+        return relisted
+
+    def items(self) -> Dict[str, Dict]:
+        """Все позиции в формате known_items"""
+        return {row["id"]: {"added_at": row["added_at"], "title": row["title"], "source": row["source"]}
+                for row in self._conn.execute("SELECT id, source, title, added_at FROM items ORDER BY rowid")}
+
+    def _write(self, sql: str, rows: Iterable[Dict]) -> int:
+        before = self._conn.total_changes
+        with self._conn:  # Одна транзакция на пакет
+            self._conn.executemany(sql, rows)
+        return self._conn.total_changes - before
+
+    def add_items(self, items: List[Dict], added_at: Optional[str] = None) -> int:
+        """Добавляет новые позиции прогона одной транзакцией; возвращает число измененных строк.
+
+        added_at позиции важнее общего; время добавления уже известной позиции не меняется,
+        а название и источник обновляются, если пришли непустыми.
+        """
+        added_at = added_at or datetime.now().isoformat()
+        return self._write(UPSERT_SQL, (
+            {"id": normalize_url(item["id"]), "source": item.get("source", "") or "",
+             "title": item.get("title", "") or "", "added_at": item.get("added_at") or added_at}
+            for item in items if item.get("id")))
+
+    def remove_items(self, item_ids: List[str]) -> int:
+        """Удаляет позиции одной транзакцией; возвращает число удаленных"""
+        return self._write("DELETE FROM items WHERE id = :id", ({"id": normalize_url(item_id)} for item_id in item_ids))
+
+    def import_state(self, data: Dict) -> int:
+        """Переносит позиции из разобранного state.json; возвращает число новых строк"""
+        return self._write(IMPORT_SQL, (
+            {"id": normalize_url(item_id), "source": info.get("source", "") or "",
+             "title": info.get("title", "") or "", "added_at": info.get("added_at", "unknown") or "unknown"}
+            for item_id, info in state_items(data) if item_id))
+
+
+def import_json(json_path: Path, db_path: Path) -> int:
+    """Разовый перенос state.json в базу; возвращает число перенесенных позиций"""
+    data = decode_state(json_path.read_bytes())
+    with StateStore(db_path) as store:
+        imported = store.import_state(data)
+        print(f"✅ Перенесено {imported} позиций из {json_path} в {db_path} (всего в базе {len(store)})")
+    return imported
+
+
+if __name__ == "__main__":
+    source_path = Path(sys.argv[1] if len(sys.argv) > 1 else "state.json")
+    target_path = Path(sys.argv[2]) if len(sys.argv) > 2 else source_path.with_suffix(".db")
+    import_json(source_path, target_path)
@@ -0,0 +1,31 @@
+"""
+Общие фикстуры тестов
+"""
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import http_client  # noqa: E402
+import vinyl_monitor  # noqa: E402
+from rate_limiter import HostRateLimiter  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limiter():
+    """Свой лимитер частоты на каждый тест: с замоканным sleep часы стоят, и долг корзины
+    хоста иначе перешел бы в следующий тест настоящей паузой"""
+    limiter = HostRateLimiter()
+    with patch.object(http_client, 'RATE_LIMITER', limiter), patch.object(vinyl_monitor, 'RATE_LIMITER', limiter):
+        yield limiter
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    """Состояние прогона загружается заново в каждом тесте (тесты подменяют STATE_PATH)"""
+    with patch.object(vinyl_monitor, '_state', None):
+        yield
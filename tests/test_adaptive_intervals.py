@@ -0,0 +1,164 @@
+"""
+Тесты для adaptive_intervals.py
+"""
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from adaptive_intervals import (ArrivalModel, IntervalPolicy,  # noqa: E402
+                                adaptive_interval, expected_latency,
+                                parse_site_policies)
+
+# Понедельник, полдень
+NOW = datetime(2026, 3, 2, 12, 0)
+POLICY = IntervalPolicy(target_latency_hours=1, min_hours=0.25, max_hours=24)
+
+
+def hourly_history(site="shop", days=28, per_hour=1, hours=range(24)):
+    """Равномерные поступления за days дней до NOW: per_hour позиций в каждый из указанных часов суток"""
+    arrivals = []
+    for offset in range(days * 24, 0, -1):
+        start = NOW - timedelta(hours=offset, minutes=50)
+        if start.hour in hours:
+            arrivals.extend((site, start + timedelta(minutes=i)) for i in range(per_hour))
+    return arrivals
+
+
+class TestPolicies:
+    """Тесты для разбора политик"""
+
+    def test_parse_site_policies(self):
+        """Цель обязательна, границы — по умолчанию; ошибки пропускаются"""
+        policies = parse_site_policies("avito=3:1:12, korobkavinyla=0.5,bad=x,junk", POLICY)
+
+        assert policies["avito"] == IntervalPolicy(3, 1, 12)
+        assert policies["korobkavinyla"] == IntervalPolicy(0.5, 0.25, 24)
+        assert set(policies) == {"avito", "korobkavinyla"}
+
+
+class TestArrivalModel:
+    """Тесты для оценки интенсивности поступлений"""
+
+    def test_rate_per_hour(self):
+        """Равномерная история дает ее интенсивность"""
+        model = ArrivalModel.from_history(hourly_history(per_hour=2))
+
+        assert abs(model.expected_arrivals("shop", NOW, 3) - 6) < 0.1
+
+    def test_hour_of_day_profile(self):
+        """Ночные часы без поступлений тише дневных"""
+        model = ArrivalModel.from_history(hourly_history(hours=range(9, 21)))
+
+        night = model.expected_arrivals("shop", NOW.replace(hour=0), 6)
+        day = model.expected_arrivals("shop", NOW.replace(hour=10), 6)
+        assert night < day / 3
+
+    def test_seeding_day_ignored(self):
+        """Заполнение состояния при первом обходе не считается поступлениями"""
+        seeding = [("shop", NOW - timedelta(days=20, minutes=i)) for i in range(300)]
+        model = ArrivalModel.from_history(seeding + [("shop", NOW - timedelta(days=3))])
+
+        assert model.expected_arrivals("shop", NOW, 24) < 0.1
+
+    def test_burst_capped(self):
+        """Сотня позиций за один час считается как burst_cap"""
+        burst = [("shop", NOW - timedelta(days=7, minutes=i % 50)) for i in range(100)]
+        model = ArrivalModel.from_history([("shop", NOW - timedelta(days=30))] + burst, burst_cap=10)
+        uncapped = ArrivalModel.from_history([("shop", NOW - timedelta(days=30))] + burst, burst_cap=1000)
+
+        assert model.expected_arrivals("shop", NOW, 168) < uncapped.expected_arrivals("shop", NOW, 168) / 5
+
+    def test_short_history(self):
+        """Меньше min_history_days наблюдений — модели нет"""
+        model = ArrivalModel.from_history(hourly_history(days=5))
+
+        assert model.has_history("shop", NOW) is False
+        assert model.has_history("other", NOW) is False
+
+    def test_record_invalidates_cache(self):
+        """Новое поступление сразу учитывается в оценке"""
+        model = ArrivalModel.from_history(hourly_history(per_hour=0) + [("shop", NOW - timedelta(days=20))])
+        before = model.expected_arrivals("shop", NOW, 24)
+
+        for minute in range(10):
+            model.record("shop", NOW - timedelta(minutes=minute))
+
+        assert model.expected_arrivals("shop", NOW, 24) > before
+
+
+class TestAdaptiveInterval:
+    """Тесты для выбора интервала"""
+
+    def test_busy_site_near_double_target(self):
+        """На оживленном сайте интервал около двух целей и укладывается в цель"""
+        model = ArrivalModel.from_history(hourly_history(per_hour=5))
+
+        interval = adaptive_interval(model, "shop", POLICY, NOW, fallback_hours=6)
+
+        assert 1.9 <= interval <= 2.0
+        assert expected_latency(model, "shop", NOW, interval) <= 1
+
+    def test_quiet_site_stretched(self):
+        """Редкие поступления растягивают интервал; без поступлений — до максимума"""
+        sparse = [("shop", NOW - timedelta(days=day, hours=3)) for day in range(1, 29, 2)]
+        quiet = adaptive_interval(ArrivalModel.from_history(sparse), "shop", POLICY, NOW, 6)
+        busy = adaptive_interval(ArrivalModel.from_history(hourly_history(per_hour=5)), "shop", POLICY, NOW, 6)
+        idle = [("shop", NOW - timedelta(days=30)), ("shop", NOW - timedelta(days=29))]
+
+        assert quiet > busy * 2
+        assert adaptive_interval(ArrivalModel.from_history(idle), "shop", POLICY, NOW, 6) == 24
+
+    def test_clamped_to_min(self):
+        """Цель, недостижимая при минимальном интервале, дает минимальный"""
+        model = ArrivalModel.from_history(hourly_history(per_hour=10))
+
+        assert adaptive_interval(model, "shop", IntervalPolicy(0.05, 0.5, 24), NOW, 6) == 0.5
+
+    def test_fallback_without_history(self):
+        """Без истории действует фиксированный интервал"""
+        assert adaptive_interval(ArrivalModel(), "shop", POLICY, NOW, fallback_hours=6) == 6
+
+
+class TestMonitorIntegration:
+    """Тесты для подключения к vinyl_monitor"""
+
+    def test_load_arrival_history(self, tmp_path):
+        """История берется из state.json: источник — в сайт, без added_at — пропуск"""
+        from vinyl_monitor import load_arrival_history
+        state_path = tmp_path / "state.json"
+        state_path.write_text(json.dumps({"known_items": {
+            "a": {"source": "avito.ru", "added_at": "2026-03-01T10:00:00"},
+            "b": {"source": "avito.ru", "added_at": "unknown"},
+            "c": {"added_at": "2026-03-01T10:00:00"},
+            "d": {"source": "elsewhere.com", "added_at": "2026-03-01T10:00:00"},
+        }}), encoding="utf-8")
+
+        with patch('vinyl_monitor.STATE_PATH', state_path):
+            assert load_arrival_history() == [("avito", datetime(2026, 3, 1, 10))]
+
+    def test_disabled_keeps_fixed_interval(self):
+        """Без ADAPTIVE_INTERVALS интервал фиксированный, история не читается"""
+        from vinyl_monitor import monitor_interval
+
+        with patch('vinyl_monitor.ADAPTIVE_INTERVALS', False), \
+                patch('vinyl_monitor.load_arrival_history') as mock_history:
+            assert monitor_interval("avito", 6) == 6
+        mock_history.assert_not_called()
+
+    def test_enabled_uses_site_policy(self):
+        """С ADAPTIVE_INTERVALS интервал считается от последней проверки по политике сайта"""
+        from vinyl_monitor import monitor_interval
+        model = ArrivalModel.from_history(hourly_history(site="avito", per_hour=5))
+
+        with patch('vinyl_monitor.ADAPTIVE_INTERVALS', True), \
+                patch('vinyl_monitor._arrival_model', model), \
+                patch('vinyl_monitor.ADAPTIVE_SITE_POLICIES', {"avito": IntervalPolicy(0.5, 0.25, 24)}), \
+                patch('vinyl_monitor.read_last_check_time', return_value=NOW):
+            interval = monitor_interval("avito", 6)
+
+        assert 0.9 <= interval <= 1.05
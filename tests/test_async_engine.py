@@ -0,0 +1,202 @@
+"""
+Тесты для async_engine.py
+"""
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from async_engine import (AsyncBrowserManager, ConcurrencyLimiter,  # noqa: E402
+                          SiteTask, parse_host_limits, run_site_tasks,
+                          run_tasks)
+
+
+def make_async_playwright_factory():
+    """Фабрика async_playwright с замоканным браузером"""
+    browser = MagicMock()
+    browser.close = AsyncMock()
+    context = MagicMock()
+    context.new_page = AsyncMock(return_value=MagicMock())
+    context.close = AsyncMock()
+    context.route = AsyncMock()
+    browser.new_context = AsyncMock(return_value=context)
+
+    playwright = MagicMock()
+    playwright.chromium.launch = AsyncMock(return_value=browser)
+    playwright_cm = MagicMock()
+    playwright_cm.__aenter__ = AsyncMock(return_value=playwright)
+    playwright_cm.__aexit__ = AsyncMock(return_value=None)
+    factory = MagicMock(return_value=playwright_cm)
+    return factory, browser
+
+
+def sleeping_task(site, host, delay, tracker, items=None):
+    """Задача, которая спит delay секунд и отмечает число одновременных задач"""
+
+    async def run(browser):
+        tracker["active"] += 1
+        tracker["peak"] = max(tracker["peak"], tracker["active"])
+        tracker.setdefault(host, 0)
+        tracker[host] += 1
+        tracker[f"{host}_peak"] = max(tracker.get(f"{host}_peak", 0), tracker[host])
+        await asyncio.sleep(delay)
+        tracker["active"] -= 1
+        tracker[host] -= 1
+        return list(items or [])
+
+    return SiteTask(site, host, run)
+
+
+class TestParseHostLimits:
+    """Тесты для разбора лимитов по хостам"""
+
+    def test_parse_host_limits(self):
+        """Корректные пары разбираются, некорректные пропускаются"""
+        assert parse_host_limits("avito.ru=1, korobkavinyla.ru=3") == {"avito.ru": 1, "korobkavinyla.ru": 3}
+        assert parse_host_limits("") == {}
+        assert parse_host_limits("bad,avito.ru=x,plastinka.com=0") == {"plastinka.com": 1}
+
+
+class TestRunSiteTasks:
+    """Тесты для параллельного запуска задач"""
+
+    def test_wall_clock_is_slowest_task(self):
+        """Время прогона ≈ самая медленная задача, а не сумма"""
+        tracker = {"active": 0, "peak": 0}
+        tasks = [
+            sleeping_task("korobkavinyla", "korobkavinyla.ru", 0.2, tracker),
+            sleeping_task("vinyltap", "vinyltap.co.uk", 0.2, tracker),
+            sleeping_task("avito", "avito.ru", 0.2, tracker),
+            sleeping_task("plastinka", "plastinka.com", 0.2, tracker),
+        ]
+
+        started = time.monotonic()
+        asyncio.run(run_site_tasks(tasks, MagicMock(), ConcurrencyLimiter(4, 2)))
+        elapsed = time.monotonic() - started
+
+        assert elapsed < 0.5
+        assert tracker["peak"] == 4
+
+    def test_global_limit(self):
+        """Глобальный лимит ограничивает число одновременных задач"""
+        tracker = {"active": 0, "peak": 0}
+        tasks = [sleeping_task(f"site{i}", f"host{i}", 0.05, tracker) for i in range(6)]
+
+        asyncio.run(run_site_tasks(tasks, MagicMock(), ConcurrencyLimiter(2, 2)))
+
+        assert tracker["peak"] == 2
+
+    def test_per_host_limit(self):
+        """Лимит хоста действует даже при свободных глобальных слотах"""
+        tracker = {"active": 0, "peak": 0}
+        tasks = [sleeping_task("vinyltap", "vinyltap.co.uk", 0.05, tracker) for _ in range(4)]
+        tasks += [sleeping_task("avito", "avito.ru", 0.05, tracker) for _ in range(3)]
+
+        limiter = ConcurrencyLimiter(10, 2, {"avito.ru": 1})
+        asyncio.run(run_site_tasks(tasks, MagicMock(), limiter))
+
+        assert tracker["vinyltap.co.uk_peak"] == 2
+        assert tracker["avito.ru_peak"] == 1
+
+    def test_results_grouped_by_site(self):
+        """Результаты нескольких задач одного сайта объединяются"""
+        tracker = {"active": 0, "peak": 0}
+        tasks = [
+            sleeping_task("korobkavinyla", "korobkavinyla.ru", 0, tracker, [{"id": "a"}]),
+            sleeping_task("korobkavinyla", "korobkavinyla.ru", 0, tracker, [{"id": "b"}]),
+            sleeping_task("avito", "avito.ru", 0, tracker, [{"id": "c"}]),
+        ]
+
+        results, failed = asyncio.run(run_site_tasks(tasks, MagicMock(), ConcurrencyLimiter()))
+
+        assert sorted(it["id"] for it in results["korobkavinyla"]) == ["a", "b"]
+        assert results["avito"] == [{"id": "c"}]
+        assert failed == set()
+
+    def test_failure_is_isolated(self):
+        """Ошибка одной задачи не прерывает остальные"""
+        tracker = {"active": 0, "peak": 0}
+
+        async def broken(browser):
+            raise RuntimeError("Network error")
+
+        tasks = [
+            SiteTask("plastinka", "plastinka.com", broken),
+            sleeping_task("vinyltap", "vinyltap.co.uk", 0, tracker, [{"id": "x"}]),
+        ]
+
+        results, failed = asyncio.run(run_site_tasks(tasks, MagicMock(), ConcurrencyLimiter()))
+
+        assert failed == {"plastinka"}
+        assert results["plastinka"] == []
+        assert results["vinyltap"] == [{"id": "x"}]
+
+
+class TestAsyncBrowserManager:
+    """Тесты для асинхронного менеджера браузера"""
+
+    def test_single_launch_for_concurrent_contexts(self):
+        """Параллельные задачи используют один запуск Chromium"""
+        factory, browser = make_async_playwright_factory()
+
+        async def scenario():
+            async with AsyncBrowserManager(factory) as manager:
+                async def open_page(site):
+                    async with manager.site_page(site, 1000):
+                        await asyncio.sleep(0)
+
+                await asyncio.gather(*(open_page(site) for site in ("korobkavinyla", "vinyltap", "avito")))
+                return manager
+
+        manager = asyncio.run(scenario())
+
+        assert factory.call_count == 1
+        assert browser.new_context.await_count == 3
+        assert manager.launch_count == 1
+        assert manager.contexts_opened == 3
+        browser.close.assert_awaited_once()
+
+    def test_run_tasks_entry_point(self):
+        """run_tasks поднимает цикл событий и закрывает браузер"""
+        factory, browser = make_async_playwright_factory()
+
+        async def fetch(manager):
+            async with manager.site_page("plastinka"):
+                return [{"id": "p1"}]
+
+        results, failed = run_tasks([SiteTask("plastinka", "plastinka.com", fetch)], factory, ConcurrencyLimiter())
+
+        assert results == {"plastinka": [{"id": "p1"}]}
+        assert failed == set()
+        browser.close.assert_awaited_once()
+
+    def test_async_route_blocks(self):
+        """Асинхронный обработчик route блокирует картинки и пропускает документы"""
+        factory, browser = make_async_playwright_factory()
+        context = browser.new_context.return_value
+
+        async def scenario():
+            async with AsyncBrowserManager(factory, block_resources=True) as manager:
+                await manager.new_context("plastinka")
+                _, handler = context.route.await_args[0]
+                image = MagicMock()
+                image.request.resource_type = "image"
+                image.request.url = "https://plastinka.com/cover.jpg"
+                image.abort = AsyncMock()
+                await handler(image)
+                document = MagicMock()
+                document.request.resource_type = "document"
+                document.request.url = "https://plastinka.com/lp"
+                document.continue_ = AsyncMock()
+                await handler(document)
+                return manager, image, document
+
+        manager, image, document = asyncio.run(scenario())
+
+        image.abort.assert_awaited_once()
+        document.continue_.assert_awaited_once()
+        assert manager.requests_blocked == 1
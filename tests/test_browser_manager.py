@@ -0,0 +1,267 @@
+"""
+Тесты для browser_manager.py
+"""
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from browser_manager import (SITE_PROFILES, BrowserManager,  # noqa: E402
+                             ResourcePolicy, shared_or_own_browser)
+
+
+def make_playwright_factory():
+    """Фабрика sync_playwright с замоканным браузером"""
+    factory = MagicMock()
+    browser = MagicMock()
+    factory.return_value.__enter__.return_value.chromium.launch.return_value = browser
+    return factory, browser
+
+
+class TestBrowserManager:
+    """Тесты для общего браузера на прогон"""
+
+    def test_lazy_launch(self):
+        """Браузер не запускается, пока не запрошен контекст"""
+        factory, _ = make_playwright_factory()
+
+        with BrowserManager(factory) as manager:
+            assert manager.launch_count == 0
+
+        factory.assert_not_called()
+        assert manager.usage_report() == "🚀 Chromium не запускался"
+
+    def test_single_launch_for_many_contexts(self):
+        """Несколько сайтов используют один запуск Chromium"""
+        factory, browser = make_playwright_factory()
+
+        with BrowserManager(factory) as manager:
+            for site in ("korobkavinyla", "vinyltap", "avito", "plastinka"):
+                with manager.site_page(site, 1000) as page:
+                    page.goto("https://example.com")
+
+        assert factory.call_count == 1
+        assert browser.new_context.call_count == 4
+        assert manager.launch_count == 1
+        assert manager.contexts_opened == 4
+        browser.close.assert_called_once()
+
+    def test_site_profile_locale(self):
+        """Контекст создается с локалью и заголовками сайта"""
+        factory, browser = make_playwright_factory()
+
+        with BrowserManager(factory) as manager:
+            manager.new_context("vinyltap")
+
+        kwargs = browser.new_context.call_args.kwargs
+        assert kwargs["locale"] == "en-GB"
+        assert kwargs["extra_http_headers"] == SITE_PROFILES["vinyltap"]["extra_http_headers"]
+
+    def test_site_page_closes_context(self):
+        """Контекст закрывается даже при ошибке на странице"""
+        factory, browser = make_playwright_factory()
+        context = browser.new_context.return_value
+
+        with BrowserManager(factory) as manager:
+            with pytest.raises(RuntimeError):
+                with manager.site_page("avito") as page:
+                    page.set_default_timeout.assert_not_called()
+                    raise RuntimeError("boom")
+
+        context.close.assert_called_once()
+
+    def test_launch_error_propagates(self):
+        """Ошибка запуска браузера пробрасывается и Playwright останавливается"""
+        factory, _ = make_playwright_factory()
+        playwright_cm = factory.return_value
+        playwright_cm.__enter__.return_value.chromium.launch.side_effect = Exception("Browser failed")
+
+        manager = BrowserManager(factory)
+        with pytest.raises(Exception, match="Browser failed"):
+            manager.new_context("korobkavinyla")
+
+        playwright_cm.__exit__.assert_called_once()
+        assert manager.launch_count == 0
+
+    def test_launch_time_saved(self):
+        """Экономия считается как число лишних запусков на среднее время запуска"""
+        manager = BrowserManager(MagicMock())
+        manager.launch_count = 1
+        manager.launch_seconds = 2.5
+        manager.contexts_opened = 4
+
+        assert manager.launch_time_saved() == pytest.approx(7.5)
+        assert "сэкономлено ≈7.5 с" in manager.usage_report()
+
+
+class TestSharedOrOwnBrowser:
+    """Тесты для выбора общего или собственного браузера"""
+
+    def test_uses_shared_browser(self):
+        """Переданный менеджер используется как есть и не закрывается"""
+        factory = MagicMock()
+        shared = MagicMock()
+
+        with shared_or_own_browser(shared, factory) as manager:
+            assert manager is shared
+
+        factory.assert_not_called()
+        shared.close.assert_not_called()
+
+    def test_creates_own_browser(self):
+        """Без общего менеджера создается и закрывается собственный"""
+        factory, browser = make_playwright_factory()
+
+        with shared_or_own_browser(None, factory) as manager:
+            manager.new_context("plastinka")
+
+        assert isinstance(manager, BrowserManager)
+        browser.close.assert_called_once()
+
+
+class TestResourcePolicy:
+    """Тесты для блокировки ресурсов"""
+
+    def test_blocks_heavy_types(self):
+        """Картинки, медиа и шрифты блокируются, документы и XHR проходят"""
+        policy = ResourcePolicy()
+
+        assert policy.should_block("image", "https://korobkavinyla.ru/cover.jpg")
+        assert policy.should_block("media", "https://korobkavinyla.ru/clip.mp4")
+        assert policy.should_block("font", "https://fonts.gstatic.com/a.woff2")
+        assert not policy.should_block("document", "https://korobkavinyla.ru/catalog")
+        assert not policy.should_block("xhr", "https://korobkavinyla.ru/api")
+
+    def test_blocks_trackers_with_subdomains(self):
+        """Трекеры блокируются по домену и поддоменам"""
+        policy = ResourcePolicy()
+
+        assert policy.should_block("script", "https://www.googletagmanager.com/gtm.js")
+        assert policy.should_block("script", "https://mc.yandex.ru/metrika/tag.js")
+        assert not policy.should_block("script", "https://notvk.com/app.js")
+
+    def test_site_allowlist(self):
+        """Allowlist сайта важнее общих правил"""
+        policy = ResourcePolicy(allow_types=("image",), allow_hosts=("mc.yandex.ru",))
+
+        assert not policy.should_block("image", "https://plastinka.com/cover.jpg")
+        assert not policy.should_block("script", "https://mc.yandex.ru/metrika/tag.js")
+        assert policy.should_block("font", "https://plastinka.com/a.woff2")
+
+    def test_for_site(self):
+        """Политика сайта берет allowlist из SITE_PROFILES"""
+        policy = ResourcePolicy.for_site("korobkavinyla")
+
+        assert not policy.should_block("xhr", "https://store.tildaapi.com/api/getproductslist/")
+        assert policy.should_block("image", "https://static.tildacdn.com/cover.jpg")
+
+
+class TestTrafficStats:
+    """Тесты для маршрутизации запросов и учета трафика"""
+
+    def test_route_installed_and_blocks(self):
+        """Контекст получает обработчик route, который блокирует и считает запросы"""
+        factory, browser = make_playwright_factory()
+        context = browser.new_context.return_value
+
+        with BrowserManager(factory, block_resources=True) as manager:
+            manager.new_context("vinyltap")
+            pattern, handler = context.route.call_args[0]
+
+            image = MagicMock()
+            image.request.resource_type = "image"
+            image.request.url = "https://vinyltap.co.uk/cover.jpg"
+            handler(image)
+            document = MagicMock()
+            document.request.resource_type = "document"
+            document.request.url = "https://vinyltap.co.uk/collections/new-releases"
+            handler(document)
+
+        assert pattern == "**/*"
+        image.abort.assert_called_once()
+        document.continue_.assert_called_once()
+        assert manager.requests_blocked == 1
+
+    def test_blocking_disabled(self):
+        """Без блокировки route не устанавливается"""
+        factory, browser = make_playwright_factory()
+
+        with BrowserManager(factory, block_resources=False) as manager:
+            manager.new_context("avito")
+
+        browser.new_context.return_value.route.assert_not_called()
+        assert "блокировка ресурсов выключена" in manager.traffic_report()
+
+    def test_watch_page(self):
+        """Ответы, байты и время загрузки страницы считаются по событиям"""
+        manager = BrowserManager(MagicMock())
+        page = MagicMock()
+        manager.watch_page(page)
+        handlers = {call[0][0]: call[0][1] for call in page.on.call_args_list}
+
+        navigation = MagicMock()
+        navigation.is_navigation_request.return_value = True
+        navigation.frame.parent_frame = None
+        handlers["request"](navigation)
+        for body_size in (1048576, 0, -1):
+            # Chunked/сжатый ответ без Content-Length считается по размеру тела из request.sizes()
+            handlers["response"](MagicMock(headers={}))
+            request = MagicMock()
+            request.sizes.return_value = {"responseBodySize": body_size, "responseHeadersSize": 200}
+            handlers["requestfinished"](request)
+        failed = MagicMock()
+        failed.sizes.side_effect = Exception("Response not received")
+        handlers["requestfinished"](failed)
+        handlers["load"](page)
+        handlers["load"](page)
+
+        assert manager.responses_received == 3
+        assert manager.bytes_received == 1048576
+        assert manager.page_loads == 1
+        assert "3 ответов, ≈1.0 МБ тел ответов по сети (request.sizes)" in manager.traffic_report()
+
+    def test_watch_page_async_sizes(self):
+        """В async API request.sizes() — корутина: обработчик возвращает корутину, Playwright ее запускает"""
+        import asyncio
+
+        manager = BrowserManager(MagicMock())
+        page = MagicMock()
+        manager.watch_page(page)
+        handlers = {call[0][0]: call[0][1] for call in page.on.call_args_list}
+
+        async def sizes():
+            return {"responseBodySize": 2048}
+
+        request = MagicMock()
+        request.sizes.return_value = sizes()
+        asyncio.run(handlers["requestfinished"](request))
+
+        assert manager.bytes_received == 2048
+
+
+class TestSharedBrowserInScrapers:
+    """Скраперы vinyl_monitor используют переданный браузер"""
+
+    @patch('vinyl_monitor.sync_playwright')
+    def test_vinyltap_keeps_browser_open_between_urls(self, mock_playwright):
+        """vinyltap не закрывает браузер внутри цикла по URL"""
+        from vinyl_monitor import scrape_vinyltap_with_playwright
+
+        factory, browser = make_playwright_factory()
+        page = browser.new_context.return_value.new_page.return_value
+        page.locator.return_value.or_.return_value.or_.return_value.count.return_value = 0
+
+        with patch('vinyl_monitor.extract_site_items') as mock_extract, patch('vinyl_monitor.time.sleep'):
+            mock_extract.return_value = [{"id": "x", "url": "x", "title": "LP", "price": "£1"}]
+            with BrowserManager(factory) as manager:
+                result = scrape_vinyltap_with_playwright(manager, ["https://vinyltap.co.uk/a", "https://vinyltap.co.uk/b"])
+                browser.close.assert_not_called()
+
+        assert len(result) == 2
+        assert page.goto.call_count == 2
+        browser.close.assert_called_once()
+        mock_playwright.assert_not_called()
@@ -0,0 +1,133 @@
+"""
+Бюджет времени импорта и быстрый выход, когда ни одному сайту не пора
+"""
+import os
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from vinyl_monitor import SITE_SOURCES  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+# Модули, которые нужны только сканированию и состоянию в S3
+HEAVY_MODULES = ("playwright", "requests", "urllib3", "boto3", "botocore")
+# Потолок с запасом для медленных CI; без ленивых импортов выходило в 2–3 раза больше
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "400"))
+
+
+def run_python(code, env=None):
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True,
+                          text=True, timeout=60, env={**os.environ, "USE_PLAYWRIGHT": "true", **(env or {})})
+
+
+def imported_modules(importtime_log):
+    """Модули и их суммарное время импорта (мкс) из вывода -X importtime"""
+    modules = {}
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+class TestImportTime:
+    """Тесты для ленивых импортов"""
+
+    def test_import_skips_heavy_modules_within_budget(self):
+        """import vinyl_monitor не тянет Playwright, requests и boto3 и укладывается в бюджет"""
+        result = run_python("import vinyl_monitor")
+        modules = imported_modules(result.stderr)
+
+        assert result.returncode == 0, result.stderr[-2000:]
+        heavy = sorted(name for name in modules if name.split(".")[0] in HEAVY_MODULES)
+        assert heavy == []
+        assert modules["vinyl_monitor"] / 1000 < IMPORT_BUDGET_MS
+
+    def test_no_op_run_stays_light(self, tmp_path):
+        """Прогон, в котором всем сайтам рано, выходит без состояния, S3 и браузера"""
+        now = datetime.now().isoformat()
+        for site in SITE_SOURCES:
+            (tmp_path / f"last_check_{site}.txt").write_text(now)
+
+        result = run_python("import vinyl_monitor; vinyl_monitor.main()",
+                            {"STATE_PATH": str(tmp_path / "state.json"), "S3_ACCESS_KEY": "key",
+                             "S3_SECRET_KEY": "secret"})
+
+        assert result.returncode == 0, result.stderr[-2000:]
+        assert "Ни одному сайту еще не пора" in result.stdout
+        heavy = sorted(name for name in imported_modules(result.stderr) if name.split(".")[0] in HEAVY_MODULES)
+        assert heavy == []
+        assert not (tmp_path / "state.json").exists()
+
+
+class TestEarlyExit:
+    """Тесты для быстрого выхода при синхронном сканировании"""
+
+    def test_second_run_right_after_first_exits(self, tmp_path):
+        """Первый прогон записывает время проверки всех сайтов, второй сразу после него ничего не сканирует"""
+        import vinyl_monitor
+
+        with patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"), \
+                patch('vinyl_monitor.USE_PLAYWRIGHT', True), patch('vinyl_monitor.ASYNC_ENGINE', False), \
+                patch('vinyl_monitor.ADAPTIVE_INTERVALS', False), \
+                patch('vinyl_monitor.BrowserManager', MagicMock()), \
+                patch('vinyl_monitor.load_state', return_value=set()) as mock_load, \
+                patch('vinyl_monitor.scrape_site', return_value=[]) as mock_scrape_site, \
+                patch('vinyl_monitor.scrape_avito', return_value=[]) as mock_scrape_avito, \
+                patch('vinyl_monitor.send_telegram'):
+            vinyl_monitor.main()
+            scanned = {call.args[0].name for call in mock_scrape_site.call_args_list}
+            assert "plastinka" in scanned and mock_scrape_avito.called
+            assert vinyl_monitor.sites_maybe_due(vinyl_monitor.load_avito_config()) == []
+
+            mock_load.reset_mock()
+            mock_scrape_site.reset_mock()
+            mock_scrape_avito.reset_mock()
+            vinyl_monitor.main()
+
+        assert not mock_load.called
+        assert not mock_scrape_site.called and not mock_scrape_avito.called
+
+    def test_adaptive_second_run_exits(self, tmp_path):
+        """С ADAPTIVE_INTERVALS срок следующей проверки записывается при сканировании, и второй прогон
+        выходит, не загружая состояние, вместо того чтобы считать каждый сайт возможно пора"""
+        import vinyl_monitor
+        from adaptive_intervals import ArrivalModel
+
+        with patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"), \
+                patch('vinyl_monitor.USE_PLAYWRIGHT', True), patch('vinyl_monitor.ASYNC_ENGINE', False), \
+                patch('vinyl_monitor.ADAPTIVE_INTERVALS', True), \
+                patch('vinyl_monitor._arrival_model', ArrivalModel()), \
+                patch('vinyl_monitor.BrowserManager', MagicMock()), \
+                patch('vinyl_monitor.load_state', return_value=set()) as mock_load, \
+                patch('vinyl_monitor.scrape_site', return_value=[]) as mock_scrape_site, \
+                patch('vinyl_monitor.scrape_avito', return_value=[]), \
+                patch('vinyl_monitor.send_telegram'):
+            vinyl_monitor.main()
+            assert (tmp_path / "last_check_next_plastinka.txt").exists()
+            assert vinyl_monitor.sites_maybe_due(vinyl_monitor.load_avito_config()) == []
+
+            mock_load.reset_mock()
+            mock_scrape_site.reset_mock()
+            vinyl_monitor.main()
+
+        assert not mock_load.called
+        assert not mock_scrape_site.called
+
+    def test_adaptive_next_check_due(self, tmp_path):
+        """Записанный срок наступил — сайт возможно пора сканировать"""
+        import vinyl_monitor
+
+        for name in SITE_SOURCES:
+            (tmp_path / f"last_check_next_{name}.txt").write_text(datetime(2100, 1, 1).isoformat())
+        (tmp_path / "last_check_next_vinyltap.txt").write_text(datetime(2000, 1, 1).isoformat())
+
+        with patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"), \
+                patch('vinyl_monitor.ADAPTIVE_INTERVALS', True):
+            assert vinyl_monitor.sites_maybe_due(vinyl_monitor.load_avito_config()) == ["vinyltap"]
@@ -0,0 +1,117 @@
+"""
+Тесты для incremental_extractor.py
+"""
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from incremental_extractor import (OBSERVER_INSTALL_JS,  # noqa: E402
+                                   IncrementalExtractor, click_load_more,
+                                   click_load_more_async, drain_js)
+
+EXTRACT_JS = "(roots) => []"
+
+
+def make_page(batches, button_count=1):
+    """Страница, у которой evaluate отдает порции новых позиций"""
+    page = MagicMock()
+    page.evaluate.side_effect = batches
+    page.locator.return_value.or_.return_value.count.return_value = button_count
+    return page
+
+
+class TestIncrementalExtractor:
+    """Тесты для наблюдателя за вставленными карточками"""
+
+    def test_drain_js_embeds_extract(self):
+        """Функция извлечения сайта вызывается по вставленным корням"""
+        js = drain_js(EXTRACT_JS)
+
+        assert "const extract = (roots) => [];" in js
+        assert "extract(roots)" in js
+        assert "__vmSeen" in js
+
+    def test_install_passes_known_ids(self):
+        """Позиции полного разбора передаются наблюдателю как уже отданные"""
+        page = MagicMock()
+
+        IncrementalExtractor(page, EXTRACT_JS).install([{"id": "a"}, {"id": "b"}])
+
+        page.evaluate.assert_called_once_with(OBSERVER_INSTALL_JS, ["a", "b"])
+
+    def test_new_items(self):
+        """new_items возвращает список, пустой ответ — пустой список"""
+        page = MagicMock()
+        page.evaluate.side_effect = [[{"id": "c"}], None]
+        extractor = IncrementalExtractor(page, EXTRACT_JS)
+
+        assert extractor.new_items() == [{"id": "c"}]
+        assert extractor.new_items() == []
+
+
+class TestClickLoadMore:
+    """Тесты для подгрузки с инкрементальным извлечением"""
+
+    def test_appends_only_new_batches(self):
+        """После каждого нажатия в items дописывается только новая порция"""
+        page = make_page([[{"id": "b"}], [{"id": "c"}]])
+        items = [{"id": "a"}]
+
+        clicks = click_load_more(page, ("Load more", "Загрузить ещё"), 2, 0,
+                                 IncrementalExtractor(page, EXTRACT_JS), items)
+
+        assert clicks == 2
+        assert [item["id"] for item in items] == ["a", "b", "c"]
+        assert page.evaluate.call_count == 2
+
+    def test_no_button(self):
+        """Без кнопки подгрузка не выполняется"""
+        page = make_page([], button_count=0)
+        items = [{"id": "a"}]
+
+        assert click_load_more(page, ("Load more", "Загрузить ещё"), 5, 0,
+                               IncrementalExtractor(page, EXTRACT_JS), items) == 0
+        assert items == [{"id": "a"}]
+
+    def test_click_error_stops(self):
+        """Ошибка нажатия прекращает подгрузку, собранные позиции сохраняются"""
+        page = make_page([])
+        page.locator.return_value.or_.return_value.first.click.side_effect = Exception("detached")
+        items = [{"id": "a"}]
+
+        assert click_load_more(page, ("Load more", "Загрузить ещё"), 5, 0,
+                               IncrementalExtractor(page, EXTRACT_JS), items) == 0
+        assert items == [{"id": "a"}]
+
+    def test_should_stop_on_batch(self):
+        """should_stop получает последнюю порцию и прекращает подгрузку"""
+        page = make_page([[{"id": "known"}], [{"id": "x"}]])
+        items = [{"id": "a"}]
+
+        clicks = click_load_more(page, ("Load more", "Загрузить ещё"), 5, 0,
+                                 IncrementalExtractor(page, EXTRACT_JS), items,
+                                 should_stop=lambda batch: batch[0]["id"] == "known")
+
+        assert clicks == 1
+        assert [item["id"] for item in items] == ["a", "known"]
+
+    def test_async(self):
+        """Асинхронный вариант дописывает порции так же"""
+        page = MagicMock()
+        page.evaluate = AsyncMock(side_effect=[[{"id": "b"}], []])
+        page.wait_for_timeout = AsyncMock()
+        btn = page.locator.return_value.or_.return_value
+        btn.count = AsyncMock(return_value=1)
+        btn.first.scroll_into_view_if_needed = AsyncMock()
+        btn.first.click = AsyncMock()
+        items = [{"id": "a"}]
+
+        clicks = asyncio.run(click_load_more_async(page, ("Load more", "Загрузить ещё"), 2, 0,
+                                                   IncrementalExtractor(page, EXTRACT_JS), items))
+
+        assert clicks == 2
+        assert [item["id"] for item in items] == ["a", "b"]
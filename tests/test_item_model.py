@@ -0,0 +1,55 @@
+"""
+Тесты для item_model.py
+"""
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from item_model import Item, canonical_id, make_items  # noqa: E402
+
+RAW = {"id": "https://shop.ru/lp/a/?utm=1", "url": "https://shop.ru/lp/a/?utm=1#top", "title": "A",
+       "price": "2 500 р.", "price_amount": Decimal("2500"), "currency": "RUB", "image": "a.jpg"}
+
+
+class TestItem:
+    """Тесты для позиции со слотами"""
+
+    def test_canonical_id_once(self):
+        """ID нормализуется при создании; без url — из id"""
+        assert Item.from_dict(RAW).id == "https://shop.ru/lp/a"
+        assert Item(id="https://shop.ru/b/?x=1").id == "https://shop.ru/b"
+        assert canonical_id({"id": "https://shop.ru/b/#x"}) == "https://shop.ru/b"
+
+    def test_behaves_like_scraper_dict(self):
+        """Доступ как к словарю: ключи без отсутствующих полей, лишние ключи сохраняются"""
+        item = Item.from_dict(RAW, "shop.ru")
+
+        assert item["source"] == "shop.ru" and item["image"] == "a.jpg"
+        assert item.get("query", "") == "" and "query" not in item
+        assert item == {**RAW, "id": "https://shop.ru/lp/a", "source": "shop.ru"}
+        with pytest.raises(KeyError):
+            item["query"]
+
+    def test_setitem_and_slots(self):
+        """Присвоение id нормализует его; новых атрибутов у объекта нет"""
+        item = Item(url="https://shop.ru/a")
+        item["id"] = "https://shop.ru/c/"
+        item["note"] = "x"
+
+        assert item.id == "https://shop.ru/c" and item.extra == {"note": "x"}
+        assert not hasattr(item, "__dict__")
+        with pytest.raises(AttributeError):
+            item.other = 1
+
+    def test_make_items_sets_source(self):
+        """Источник задается при создании, Item повторно не копируется"""
+        item = Item(url="https://shop.ru/a")
+        items = make_items([RAW, item], "shop.ru")
+
+        assert [it.source for it in items] == ["shop.ru", "shop.ru"]
+        assert items[1] is item
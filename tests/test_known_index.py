@@ -0,0 +1,194 @@
+"""
+Тесты для known_index.py
+"""
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from known_index import BloomFilter, KnownIndex, SortedHashIndex, key_hash  # noqa: E402
+from state_store import StateStore  # noqa: E402
+
+IDS = [f"https://shop.ru/item-{i}" for i in range(2000)]
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Путь к базе с 2000 позициями"""
+    path = tmp_path / "state.db"
+    with StateStore(path) as store:
+        store.add_items([{"id": item_id, "source": "shop.ru"} for item_id in IDS], "2026-03-01T10:00:00")
+    return path
+
+
+class TestBloomFilter:
+    """Тесты для фильтра Блума"""
+
+    def test_no_false_negatives_and_fp_rate(self):
+        """Добавленное всегда находится, чужое — с долей ложных срабатываний около заданной"""
+        bloom = BloomFilter(len(IDS), fp_rate=0.01)
+        bloom.update(IDS)
+
+        assert all(item_id in bloom for item_id in IDS)
+        false_positives = sum(f"https://other.ru/{i}" in bloom for i in range(20000))
+        assert false_positives / 20000 < 0.02
+
+    def test_size_follows_formula(self):
+        """1% ложных срабатываний — около 9.6 бита и 7 хешей на позицию"""
+        bloom = BloomFilter(100000, fp_rate=0.01)
+
+        assert 9.5 < bloom.num_bits / 100000 < 9.7
+        assert bloom.num_hashes == 7
+
+    def test_save_and_load(self, tmp_path):
+        """Файл читается обратно тем же фильтром; испорченный файл — None"""
+        bloom = BloomFilter(100)
+        bloom.update(IDS[:100])
+        bloom.save(tmp_path / "state.bloom", store_count=100)
+
+        loaded, store_count = BloomFilter.load(tmp_path / "state.bloom")
+        assert (loaded.bits, loaded.num_hashes, loaded.count, store_count) == (bloom.bits, bloom.num_hashes, 100, 100)
+        (tmp_path / "state.bloom").write_bytes(b"VMBF\x01")
+        assert BloomFilter.load(tmp_path / "state.bloom") == (None, 0)
+
+    def test_invalid_fp_rate(self):
+        with pytest.raises(ValueError):
+            BloomFilter(100, fp_rate=0)
+
+
+class TestSortedHashIndex:
+    """Тесты для отсортированных хешей в mmap"""
+
+    def test_build_and_search(self, tmp_path):
+        """Файл — заголовок и отсортированные хеши; поиск находит все добавленное и только его"""
+        index = SortedHashIndex.build(IDS, len(IDS))
+        index.save(tmp_path / "state.idx", store_count=len(IDS))
+
+        assert (tmp_path / "state.idx").stat().st_size == 32 + 8 * len(IDS)
+        assert list(index._hashes) == sorted(map(key_hash, IDS))
+        assert all(item_id in index for item_id in IDS)
+        assert not any(f"https://other.ru/{i}" in index for i in range(5000))
+
+    def test_linear_merge_on_save(self, tmp_path):
+        """Новые хеши вливаются в файл по порядку, без дублей; загрузка — только mmap"""
+        path = tmp_path / "state.idx"
+        SortedHashIndex.build(IDS[:1000], 1000).save(path, 1000)
+        index, store_count = SortedHashIndex.load(path)
+        assert index._mm is not None and len(index._hashes) == 1000
+        index.add(IDS[5])
+        for item_id in IDS[1000:]:
+            index.add(item_id)
+        assert len(index.pending) == 1000
+
+        index.save(path, 2000)
+        reloaded, store_count = SortedHashIndex.load(path)
+        assert list(reloaded._hashes) == sorted(map(key_hash, IDS)) and store_count == 2000
+        assert reloaded.pending == set()
+
+    def test_corrupted_file(self, tmp_path):
+        """Обрезанный файл не отображается: индекс пересоберут по базе"""
+        path = tmp_path / "state.idx"
+        SortedHashIndex.build(IDS[:10], 10).save(path, 10)
+        path.write_bytes(path.read_bytes()[:-4])
+
+        assert SortedHashIndex.load(path) == (None, 0)
+
+
+@pytest.mark.parametrize("kind", ["bloom", "hash"])
+class TestKnownIndex:
+    """Тесты для фильтра перед базой"""
+
+    def test_rebuild_then_reuse(self, db, kind):
+        """Первое открытие пересобирает фильтр по базе, второе читает файл"""
+        index = KnownIndex.open(db, lambda: StateStore(db), kind)
+        assert len(index) == 2000 and index.path.exists()
+
+        with patch.object(StateStore, 'iter_ids', side_effect=AssertionError("пересборка не нужна")):
+            reopened = KnownIndex.open(db, lambda: StateStore(db), kind)
+        assert "https://shop.ru/item-5/?utm=1" in reopened
+
+    def test_exact_store_only_on_hits(self, db, kind):
+        """Отрицательный ответ фильтра не доходит до базы; ложные срабатывания отсекает база"""
+        index = KnownIndex.open(db, lambda: StateStore(db), kind, fp_rate=0.01)
+
+        unknown = [f"https://other.ru/{i}" for i in range(5000)]
+        assert not any(item_id in index for item_id in unknown)
+        assert all(item_id in index for item_id in IDS[:100])
+        assert index.stats["exact_checks"] == 100 + index.stats["false_positives"]
+        assert index.stats["filter_negative"] + index.stats["false_positives"] == 5000
+
+    def test_added_ids_and_stale_file(self, db, kind):
+        """|= и union видят новые ID сразу; база, измененная в обход фильтра, пересобирает его"""
+        index = KnownIndex.open(db, lambda: StateStore(db), kind)
+        index |= {"https://shop.ru/new"}
+        updated = index.union({"https://shop.ru/newer"})
+
+        assert "https://shop.ru/new" in index and "https://shop.ru/newer" not in index
+        assert "https://shop.ru/newer" in updated and len(updated) == 2002
+
+        with StateStore(db) as store:
+            store.add_items([{"id": "https://shop.ru/outside"}])
+        assert "https://shop.ru/outside" in KnownIndex.open(db, lambda: StateStore(db), kind)
+
+    def test_lookup_from_thread(self, db, kind):
+        """API магазинов проверяют ID из потоков: у каждого потока свое соединение с базой"""
+        index = KnownIndex.open(db, lambda: StateStore(db), kind)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(IDS[7] in index))
+        thread.start()
+        thread.join()
+
+        assert results == [True]
+
+
+class TestMonitorIntegration:
+    """Тесты для KNOWN_INDEX в vinyl_monitor"""
+
+    @pytest.mark.parametrize("kind", ["bloom", "hash"])
+    def test_run_with_index(self, tmp_path, kind):
+        """Прогон не загружает позиции в память; новые позиции попадают и в базу, и в фильтр"""
+        import vinyl_monitor
+        with StateStore(tmp_path / "state.db") as store:
+            store.add_items([{"id": "https://shop.ru/a", "title": "A", "source": "shop.ru"}])
+
+        with patch('vinyl_monitor.KNOWN_INDEX', kind), patch('vinyl_monitor.STATE_BACKEND', "sqlite"), \
+                patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"), \
+                patch('vinyl_monitor._state', None), patch('vinyl_monitor._known_index', None), \
+                patch('s3_storage.S3Storage', side_effect=AssertionError("S3 в этом режиме не нужен")):
+            known = vinyl_monitor.load_state()
+            assert isinstance(known, KnownIndex)
+            assert vinyl_monitor.current_state().items == {}
+            assert "https://shop.ru/a" in known and vinyl_monitor.get_item_info("https://shop.ru/a")["title"] == "A"
+
+            vinyl_monitor.save_state(known, [{"id": "https://shop.ru/b", "title": "B", "source": "shop.ru"}])
+            reloaded = vinyl_monitor.load_state()
+
+        assert "https://shop.ru/b" in reloaded and len(reloaded) == 2
+        assert reloaded.stats["false_positives"] == 0
+
+    @pytest.mark.parametrize("kind", ["bloom", "hash"])
+    def test_main_does_not_copy_index(self, tmp_path, capsys, kind):
+        """main сохраняет новые позиции без копии индекса: число известных — len(known) + новые"""
+        import vinyl_monitor
+        with StateStore(tmp_path / "state.db") as store:
+            store.add_items([{"id": "https://shop.ru/a", "title": "A", "source": "shop.ru"}])
+        items = [{"id": "https://shop.ru/a", "url": "https://shop.ru/a", "title": "A", "source": "shop.ru"},
+                 {"id": "https://shop.ru/b", "url": "https://shop.ru/b", "title": "B", "source": "shop.ru"}]
+
+        with patch('vinyl_monitor.KNOWN_INDEX', kind), patch('vinyl_monitor.STATE_BACKEND', "sqlite"), \
+                patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"), \
+                patch('vinyl_monitor._state', None), patch('vinyl_monitor._known_index', None), \
+                patch('vinyl_monitor.USE_PLAYWRIGHT', False), \
+                patch('vinyl_monitor.scrape_registry_sites', return_value=items), \
+                patch('vinyl_monitor.send_telegram'), \
+                patch.object(KnownIndex, 'union', side_effect=AssertionError("копия индекса не нужна")):
+            vinyl_monitor.main()
+            reloaded = vinyl_monitor.load_state()
+
+        assert "💾 Состояние обновлено: 2 известных позиций" in capsys.readouterr().out
+        assert "https://shop.ru/b" in reloaded and len(reloaded) == 2
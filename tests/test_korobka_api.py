@@ -0,0 +1,272 @@
+"""
+Тесты для korobka_api.py
+"""
+import os
+import sys
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import korobka_api  # noqa: E402
+from korobka_api import (TILDA_PAGE_SIZE, TildaStoreError,  # noqa: E402
+                         catalog_filters, fetch_catalog_items, format_rub,
+                         product_to_item, resolve_storepartuid)
+
+SALE_URL = ("https://korobkavinyla.ru/catalog?tfc_sort%5B771567999%5D=created:desc"
+            "&tfc_quantity%5B771567999%5D=y&tfc_storepartuid%5B771567999%5D=Sale&tfc_div=:::")
+
+
+def make_product(n, price="2500.0000"):
+    """Товар в формате ответа getproductslist"""
+    return {
+        "uid": str(n),
+        "title": f"Artist - Album {n}",
+        "price": price,
+        "url": f"https://korobkavinyla.ru/catalog/tproduct/771567999-{n}-album/",
+    }
+
+
+def make_response(products, nextslice=None):
+    response = MagicMock()
+    data = {"products": products, "total": 100}
+    if nextslice:
+        data["nextslice"] = nextslice
+    response.json.return_value = data
+    return response
+
+
+@pytest.fixture(autouse=True)
+def storepartuid():
+    """storepartuid задан, страницу каталога не загружаем"""
+    with patch('korobka_api.KOROBKA_TILDA_STOREPARTUID', "123456789012"):
+        yield
+
+
+class TestCatalogFilters:
+    """Тесты для перевода фильтров каталога в параметры API"""
+
+    def test_sale_url(self):
+        """Фильтры KOROBKA_SALE_URL переходят в sort/filters"""
+        recid, params = catalog_filters(SALE_URL)
+
+        assert recid == "771567999"
+        assert params == {
+            "sort[created]": "desc",
+            "filters[quantity]": "y",
+            "filters[storepartuid][0]": "Sale",
+        }
+
+    def test_plain_catalog_sorted_by_newest(self):
+        """Каталог без фильтров запрашивается от новых к старым"""
+        recid, params = catalog_filters("https://korobkavinyla.ru/catalog")
+
+        assert recid == "771567999"
+        assert params == {"sort[created]": "desc"}
+
+
+class TestResolveStorepartuid:
+    """Тесты для поиска storepartuid на странице каталога"""
+
+    def test_found_on_page_and_cached(self):
+        """storepartuid берется из HTML и кэшируется"""
+        session = MagicMock()
+        session.get.return_value.text = "<script>t_store_init('771567999', {storepart: '555666777888'});</script>"
+
+        with patch('korobka_api.KOROBKA_TILDA_STOREPARTUID', ""), patch.dict(korobka_api._storepart_cache, clear=True):
+            assert resolve_storepartuid(session, SALE_URL) == "555666777888"
+            assert resolve_storepartuid(session, "https://korobkavinyla.ru/catalog") == "555666777888"
+
+        session.get.assert_called_once()
+        assert session.get.call_args[0][0] == "https://korobkavinyla.ru/catalog"
+
+    def test_not_found(self):
+        """Без storepartuid на странице — TildaStoreError"""
+        session = MagicMock()
+        session.get.return_value.text = "<html></html>"
+
+        with patch('korobka_api.KOROBKA_TILDA_STOREPARTUID', ""), patch.dict(korobka_api._storepart_cache, clear=True):
+            with pytest.raises(TildaStoreError):
+                resolve_storepartuid(session, "https://korobkavinyla.ru/catalog")
+
+
+class TestProductToItem:
+    """Тесты для преобразования товара"""
+
+    def test_item_matches_dom_id(self):
+        """id совпадает с нормализованным URL из DOM, цена числовая"""
+        item = product_to_item(make_product(135655172622, "2490.0000"))
+
+        assert item == {
+            "id": "https://korobkavinyla.ru/catalog/tproduct/771567999-135655172622-album",
+            "url": "https://korobkavinyla.ru/catalog/tproduct/771567999-135655172622-album",
+            "title": "Artist - Album 135655172622",
+            "price": "2 490 р.",
+            "price_amount": Decimal("2490.0000"),
+            "currency": "RUB",
+        }
+
+    def test_without_url(self):
+        """Товар без URL пропускается"""
+        assert product_to_item({"title": "x", "price": "1"}) is None
+
+    def test_format_rub(self):
+        """Цена форматируется с разделителем тысяч"""
+        assert format_rub(Decimal("12500")) == "12 500 р."
+
+
+class TestFetchCatalogItems:
+    """Тесты для постраничной загрузки каталога"""
+
+    def test_pages_until_end(self):
+        """Страницы запрашиваются по nextslice до последней"""
+        session = MagicMock()
+        session.get.side_effect = [
+            make_response([make_product(i) for i in range(TILDA_PAGE_SIZE)], nextslice=2),
+            make_response([make_product(1000), make_product(1001)]),
+        ]
+
+        items = fetch_catalog_items(session, SALE_URL)
+
+        assert len(items) == TILDA_PAGE_SIZE + 2
+        assert session.get.call_count == 2
+        params = session.get.call_args.kwargs["params"]
+        assert params["slice"] == "2"
+        assert params["storepartuid"] == "123456789012"
+        assert params["filters[storepartuid][0]"] == "Sale"
+
+    def test_stops_on_known_page(self):
+        """Страница, где все позиции известны, завершает листание"""
+        first = [make_product(i) for i in range(TILDA_PAGE_SIZE)]
+        session = MagicMock()
+        session.get.return_value = make_response(first, nextslice=2)
+        known = {product_to_item(p)["id"] for p in first}
+
+        items = fetch_catalog_items(session, "https://korobkavinyla.ru/catalog", known)
+
+        assert session.get.call_count == 1
+        assert len(items) == TILDA_PAGE_SIZE
+
+    def test_continues_while_new_items(self):
+        """Страница с новыми позициями листается дальше"""
+        first = [make_product(i) for i in range(TILDA_PAGE_SIZE)]
+        session = MagicMock()
+        session.get.side_effect = [make_response(first, nextslice=2), make_response([])]
+        known = {product_to_item(p)["id"] for p in first[1:]}
+
+        fetch_catalog_items(session, "https://korobkavinyla.ru/catalog", known)
+
+        assert session.get.call_count == 2
+
+    def test_malformed_nextslice(self):
+        """Нечисловой nextslice — TildaStoreError, чтобы сработал переход на браузер"""
+        session = MagicMock()
+        session.get.return_value = make_response([make_product(i) for i in range(TILDA_PAGE_SIZE)],
+                                                 nextslice="next")
+
+        with pytest.raises(TildaStoreError, match="nextslice"):
+            fetch_catalog_items(session, SALE_URL)
+
+    def test_max_slices(self):
+        """Число страниц ограничено"""
+        session = MagicMock()
+        session.get.return_value = make_response([make_product(i) for i in range(TILDA_PAGE_SIZE)])
+
+        fetch_catalog_items(session, "https://korobkavinyla.ru/catalog", max_slices=3)
+
+        assert session.get.call_count == 3
+
+    def test_http_error(self):
+        """Ошибка HTTP превращается в TildaStoreError"""
+        session = MagicMock()
+        session.get.return_value.raise_for_status.side_effect = requests.HTTPError("403")
+
+        with pytest.raises(TildaStoreError):
+            fetch_catalog_items(session, "https://korobkavinyla.ru/catalog")
+
+    def test_unexpected_payload(self):
+        """Ответ без списка products считается ошибкой"""
+        session = MagicMock()
+        session.get.return_value.json.return_value = {"error": "wrong storepartuid"}
+
+        with pytest.raises(TildaStoreError):
+            fetch_catalog_items(session, "https://korobkavinyla.ru/catalog")
+
+
+class TestScrapeKorobka:
+    """Тесты для выбора API или браузера в vinyl_monitor"""
+
+    @patch('vinyl_monitor.scrape_site_with_playwright')
+    @patch('vinyl_monitor.fetch_catalog_items')
+    def test_api_success_skips_browser(self, mock_fetch, mock_playwright):
+        """Если API отвечает, браузер не используется; known передается дальше"""
+        from vinyl_monitor import scrape_korobka
+
+        mock_fetch.return_value = [{"id": "k1", "title": "K", "price": "1 р."}]
+        known = {"k0"}
+
+        result = scrape_korobka(None, known)
+
+        assert len(result) == 2
+        assert all(item["source"] == "korobkavinyla.ru" for item in result)
+        assert mock_fetch.call_args[0][2] is known
+        mock_playwright.assert_not_called()
+
+    @patch('vinyl_monitor.scrape_site_with_playwright')
+    @patch('vinyl_monitor.fetch_catalog_items')
+    def test_fallback_only_for_failed_pages(self, mock_fetch, mock_playwright):
+        """Браузер сканирует только страницы, где API не ответил"""
+        from vinyl_monitor import KOROBKA_SALE_URL, SITE_ADAPTERS, scrape_korobka
+
+        mock_fetch.side_effect = [[{"id": "k1", "title": "K"}], TildaStoreError("403")]
+        mock_playwright.return_value = [{"id": "s1", "title": "S", "source": "korobkavinyla.ru"}]
+        browser = MagicMock()
+
+        result = scrape_korobka(browser)
+
+        assert [item["id"] for item in result] == ["k1", "s1"]
+        mock_playwright.assert_called_once_with(SITE_ADAPTERS["korobkavinyla"], browser, [KOROBKA_SALE_URL], None)
+
+    @patch('vinyl_monitor.scrape_site_with_playwright')
+    @patch('vinyl_monitor.fetch_catalog_items')
+    def test_api_disabled(self, mock_fetch, mock_playwright):
+        """KOROBKA_TILDA_API=false возвращает старое поведение"""
+        from vinyl_monitor import SITE_ADAPTERS, scrape_korobka
+
+        mock_playwright.return_value = []
+        with patch('vinyl_monitor.KOROBKA_TILDA_API', False):
+            scrape_korobka()
+
+        mock_fetch.assert_not_called()
+        mock_playwright.assert_called_once_with(SITE_ADAPTERS["korobkavinyla"], None, known_ids=None)
+
+    @patch('vinyl_monitor.send_telegram')
+    @patch('vinyl_monitor.save_state')
+    @patch('vinyl_monitor.load_state', return_value=set())
+    @patch('vinyl_monitor.update_last_check_time')
+    @patch('vinyl_monitor.should_monitor_site', return_value=True)
+    @patch('vinyl_monitor.BrowserManager')
+    @patch('vinyl_monitor.scrape_site_with_playwright')
+    @patch('vinyl_monitor.fetch_catalog_items')
+    def test_main_without_playwright(self, mock_fetch, mock_playwright, mock_browser, mock_should_monitor,
+                                     mock_update, mock_load, mock_save, mock_send):
+        """USE_PLAYWRIGHT=false: каталог читается через API Tilda, браузерные сайты и упавшие страницы пропускаются"""
+        from vinyl_monitor import main
+
+        mock_fetch.side_effect = [[{"id": "https://korobkavinyla.ru/catalog/tproduct/1-album/",
+                                    "url": "https://korobkavinyla.ru/catalog/tproduct/1-album/",
+                                    "title": "Artist - Album", "price": "2 500 р."}], TildaStoreError("403")]
+
+        with patch('vinyl_monitor.USE_PLAYWRIGHT', False), patch('vinyl_monitor.VINYLTAP_JSON_API', False), \
+                patch('vinyl_monitor.load_avito_config', return_value={}):
+            main()
+
+        assert mock_fetch.call_count == 2
+        mock_playwright.assert_not_called()
+        mock_browser.assert_not_called()
+        mock_update.assert_any_call("korobkavinyla")
+        assert "Artist - Album" in mock_send.call_args[0][0]
@@ -0,0 +1,257 @@
+"""
+Тесты для monitor_state.py
+"""
+import json
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import boto3
+import pytest
+from moto import mock_aws
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import monitor_state  # noqa: E402
+from monitor_state import (JsonFileBackend, MonitorState,  # noqa: E402
+                           S3Backend, StateStats)
+
+BUCKET = "vinyl-monitor-test"
+STATE_KEY = "vinyl-monitor/state.json"
+REMOTE = {"known_items": {"https://shop.ru/a/": {"added_at": "2026-03-01T10:00:00", "title": "A",
+                                                 "source": "shop.ru"}}}
+
+
+@pytest.fixture
+def stats():
+    fresh = StateStats()
+    with patch.object(monitor_state, 'STATE_STATS', fresh):
+        yield fresh
+
+
+@pytest.fixture
+def s3_bucket():
+    """Пустой бакет в moto"""
+    env = {"S3_ACCESS_KEY": "key", "S3_SECRET_KEY": "secret", "S3_ENDPOINT_URL": "",
+           "S3_BUCKET": BUCKET, "S3_REGION": "us-east-1"}
+    with patch.dict(os.environ, env), mock_aws(), \
+            patch('s3_storage.STATE_STATS', monitor_state.STATE_STATS):
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def s3_client(s3_bucket):
+    """S3 с одним объектом state.json"""
+    s3_bucket.put_object(Bucket=BUCKET, Key=STATE_KEY, Body=json.dumps(REMOTE).encode())
+    return s3_bucket
+
+
+def remote_ids(client):
+    return set(json.loads(client.get_object(Bucket=BUCKET, Key=STATE_KEY)["Body"].read())["known_items"])
+
+
+class TestMonitorState:
+    """Тесты для состояния в памяти"""
+
+    def test_load_from_first_nonempty_backend(self, tmp_path, stats):
+        """Пустое первое хранилище пропускается, ошибка загрузки не роняет прогон"""
+        broken = MagicMock(name="broken")
+        broken.load.side_effect = OSError("нет сети")
+        empty = MagicMock(name="empty")
+        empty.load.return_value = {}
+        local = tmp_path / "state.json"
+        local.write_text(json.dumps({"known_ids": ["https://shop.ru/b/"]}), encoding="utf-8")
+
+        state = MonitorState.load([broken, empty, JsonFileBackend(local)])
+
+        assert state.known_ids == {"https://shop.ru/b"}
+        assert stats.json_parses == 1
+
+    def test_save_writes_through_all_backends(self, tmp_path):
+        """Сохранение пишет в каждое хранилище; сбой S3 не мешает локальному"""
+        failing = MagicMock(optional=True)
+        failing.save.side_effect = RuntimeError("S3 недоступно")
+        local = JsonFileBackend(tmp_path / "state.json")
+        state = MonitorState({}, [failing, local])
+
+        state.add_items([{"id": "https://shop.ru/new?x=1", "title": "New", "source": "shop.ru"}], "2026-03-02T12:00:00")
+        state.save()
+
+        saved = json.loads((tmp_path / "state.json").read_text(encoding="utf-8"))
+        assert saved["known_items"]["https://shop.ru/new"]["title"] == "New"
+        failing.save.assert_called_once_with(state)
+        assert state.pending == []
+        assert state.info("https://shop.ru/new/") == {"added_at": "2026-03-02T12:00:00", "title": "New",
+                                                      "source": "shop.ru"}
+
+    def test_local_save_error_raised(self, tmp_path):
+        """Ошибка локального сохранения не глотается"""
+        local = MagicMock(optional=False)
+        local.save.side_effect = OSError("Disk full")
+
+        with pytest.raises(OSError):
+            MonitorState({}, [local]).save()
+
+
+class TestOneLoadPerRun:
+    """Состояние разбирается и скачивается один раз за прогон"""
+
+    def test_one_get_and_one_parse(self, tmp_path, stats, s3_client):
+        """Загрузка, чтения и сохранение прогона: один GET из S3 и один разбор JSON"""
+        from vinyl_monitor import get_item_info, load_arrival_history, load_state, save_state
+
+        with patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"):
+            known = load_state()
+            get_item_info("https://shop.ru/a")
+            get_item_info("https://shop.ru/missing")
+            load_arrival_history()
+            save_state(known, [{"id": "https://shop.ru/new", "title": "New", "source": "shop.ru"}])
+
+        assert known == {"https://shop.ru/a"}
+        assert (stats.s3_gets, stats.json_parses, stats.s3_puts) == (1, 1, 1)
+        assert remote_ids(s3_client) == {"https://shop.ru/a", "https://shop.ru/new"}
+        local = json.loads((tmp_path / "state.json").read_text(encoding="utf-8"))
+        assert set(local["known_items"]) == {"https://shop.ru/a", "https://shop.ru/new"}
+
+    def test_daemon_flushes_without_reloading(self, tmp_path, stats, s3_client):
+        """Повторные сохранения демона не скачивают состояние заново"""
+        from vinyl_monitor import load_state, save_state
+
+        with patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"):
+            known = load_state()
+            for i in range(3):
+                save_state(known, [{"id": f"https://shop.ru/{i}", "title": f"T{i}", "source": "shop.ru"}])
+
+        assert (stats.s3_gets, stats.json_parses, stats.s3_puts) == (1, 1, 3)
+
+
+def new_item(name):
+    return {"id": f"https://shop.ru/{name}", "title": name.upper(), "source": "shop.ru"}
+
+
+class TestETagSync:
+    """Условные GET и PUT state.json (moto)"""
+
+    def test_not_modified_skips_download_and_parse(self, tmp_path, stats, s3_client):
+        """Повторный прогон без изменений в S3: 304, тело не скачивается, разбирается только state.json"""
+        from vinyl_monitor import load_state
+
+        with patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"):
+            load_state()
+            first_bytes = stats.s3_bytes_down
+            stats.__init__()
+            known = load_state()
+
+        assert known == {"https://shop.ru/a"}
+        assert first_bytes > 0
+        assert (stats.s3_gets, stats.s3_not_modified, stats.s3_bytes_down) == (1, 1, 0)
+        assert stats.json_parses == 1
+        assert stats.s3_bytes_saved == first_bytes
+        assert "304" in stats.report()
+
+    def test_changed_object_downloaded(self, tmp_path, stats, s3_client):
+        """Объект изменился после прошлого прогона — ETag не совпал, скачивается новая версия"""
+        from vinyl_monitor import load_state
+
+        with patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"):
+            load_state()
+            s3_client.put_object(Bucket=BUCKET, Key=STATE_KEY, Body=json.dumps(
+                {"known_items": {"https://shop.ru/z": {"title": "Z"}}}).encode())
+            known = load_state()
+
+        assert known == {"https://shop.ru/z"}
+        assert stats.s3_not_modified == 0
+
+    def test_missing_object_keeps_local_history(self, tmp_path, stats, s3_bucket):
+        """В S3 нет state.json: локальная история не затирается пустым состоянием"""
+        from vinyl_monitor import load_state
+        (tmp_path / "state.json").write_text(json.dumps(REMOTE))
+
+        with patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"):
+            known = load_state()
+            assert known == {"https://shop.ru/a"}
+            assert load_state() == {"https://shop.ru/a"}
+
+        assert set(json.loads((tmp_path / "state.json").read_text())["known_items"]) == {"https://shop.ru/a/"}
+
+    def test_empty_remote_keeps_local_history(self, tmp_path, stats, s3_bucket):
+        """Пустой объект в S3 не заменяет непустую локальную историю"""
+        from vinyl_monitor import load_state
+        s3_bucket.put_object(Bucket=BUCKET, Key=STATE_KEY, Body=json.dumps({"known_items": {}}).encode())
+        (tmp_path / "state.json").write_text(json.dumps(REMOTE))
+
+        with patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"):
+            assert load_state() == {"https://shop.ru/a"}
+
+        assert json.loads((tmp_path / "state.json").read_text())["known_items"]
+
+    def test_concurrent_writers_merged(self, stats, s3_client):
+        """Второй писатель получает 412 на If-Match и объединяет свои позиции с чужими"""
+        from s3_storage import S3Storage
+        first = MonitorState.load([S3Backend(S3Storage())])
+        second = MonitorState.load([S3Backend(S3Storage())])
+
+        first.add_items([new_item("b")])
+        first.save()
+        second.add_items([new_item("c")])
+        second.save()
+
+        assert stats.s3_puts == 3
+        assert remote_ids(s3_client) == {"https://shop.ru/a", "https://shop.ru/b", "https://shop.ru/c"}
+        assert second.known_ids == remote_ids(s3_client)
+
+    def test_first_create_is_conditional(self, stats, s3_bucket):
+        """Объекта еще нет: запись с If-None-Match: * не затирает того, кто успел создать его первым"""
+        from s3_storage import S3Storage
+        first = MonitorState.load([S3Backend(S3Storage())])
+        second = MonitorState.load([S3Backend(S3Storage())])
+
+        first.add_items([new_item("b")])
+        first.save()
+        second.add_items([new_item("c")])
+        second.save()
+
+        assert remote_ids(s3_bucket) == {"https://shop.ru/b", "https://shop.ru/c"}
+
+
+    def test_compressed_key_falls_back_to_legacy(self, stats, s3_bucket):
+        """STATE_FORMAT=gzip пишет state.json.gz; пока его нет, читается прежний state.json (в т.ч. сжатый)"""
+        from s3_storage import S3Storage
+        from state_format import encode_state
+        s3_bucket.put_object(Bucket=BUCKET, Key=STATE_KEY, Body=encode_state(REMOTE, "gzip"))
+
+        with patch.dict(os.environ, {"STATE_FORMAT": "gzip"}):
+            state = MonitorState.load([S3Backend(S3Storage())])
+            state.add_items([new_item("b")])
+            state.save()
+            reloaded = MonitorState.load([S3Backend(S3Storage())])
+
+        body = s3_bucket.get_object(Bucket=BUCKET, Key=STATE_KEY + ".gz")["Body"].read()
+        assert body.startswith(b"\x1f\x8b")
+        assert reloaded.known_ids == {"https://shop.ru/a", "https://shop.ru/b"}
+
+
+class TestS3StorageCompat:
+    """Тесты для старого интерфейса S3Storage (moto)"""
+
+    def test_load_known_items_and_save_new_items(self, stats, s3_client):
+        """load_known_items и save_new_items работают поверх нового состояния"""
+        from s3_storage import S3Storage
+        storage = S3Storage()
+
+        assert storage.load_known_items() == {"https://shop.ru/a"}
+        assert storage.save_new_items({"https://shop.ru/a"}, [new_item("b")]) is True
+        assert remote_ids(s3_client) == {"https://shop.ru/a", "https://shop.ru/b"}
+        assert S3Storage().load_known_items() == {"https://shop.ru/a", "https://shop.ru/b"}
+
+    def test_errors_logged_not_raised(self, stats, s3_client):
+        """Сбой S3 в старом интерфейсе не поднимается: пустое множество и False, как раньше"""
+        from s3_storage import S3Storage
+        storage = S3Storage()
+        storage.bucket_name = "missing-bucket"
+
+        assert storage.load_known_items() == set()
+        assert storage.save_new_items(set(), [new_item("b")]) is False
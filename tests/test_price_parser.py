@@ -0,0 +1,89 @@
+"""
+Тесты для price_parser.py
+"""
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from item_model import Item  # noqa: E402
+from price_parser import (ParsedPrice, format_price, parse_price,  # noqa: E402
+                          parse_prices)
+
+
+class TestParsePrice:
+    """Тесты для разбора цен"""
+
+    @pytest.mark.parametrize("raw, expected", [
+        ("2 500 р.", ParsedPrice(Decimal("2500"), "RUB")),
+        ("1000 руб", ParsedPrice(Decimal("1000"), "RUB")),
+        ("12 000 ₽", ParsedPrice(Decimal("12000"), "RUB")),
+        ("£26.95", ParsedPrice(Decimal("26.95"), "GBP")),
+        ("$1,234.50", ParsedPrice(Decimal("1234.50"), "USD")),
+        ("3000 руб. → 2500 руб.", ParsedPrice(Decimal("2500"), "RUB", Decimal("3000"))),
+        ("Regular price £30.00 Sale price £25.00", ParsedPrice(Decimal("25.00"), "GBP", Decimal("30.00"))),
+        ("Regular price £50,95 EUR Regular price Sale price £50,95 EUR Unit price / per",
+         ParsedPrice(Decimal("50.95"), "GBP")),
+        ("100", ParsedPrice(Decimal("100"), "")),
+    ])
+    def test_store_formats(self, raw, expected):
+        """Форматы всех магазинов, включая скидку plastinka и повторы Shopify"""
+        assert parse_price(raw) == expected
+
+    def test_no_number(self):
+        assert parse_price("") is None
+        assert parse_price("Цена по запросу") is None
+
+    def test_store_currency_wins(self):
+        """vinyltap.co.uk продает в фунтах, даже если витрина показала €"""
+        assert parse_price("€32.50", "GBP") == ParsedPrice(Decimal("32.50"), "GBP")
+
+    def test_cached_by_raw_string(self):
+        """Одна и та же строка разбирается один раз"""
+        parse_price.cache_clear()
+        for _ in range(100):
+            parse_price("2 500 р.")
+
+        assert parse_price.cache_info().hits == 99
+
+    def test_format(self):
+        assert format_price(ParsedPrice(Decimal("2500"), "RUB", Decimal("3000"))) == "3 000 ₽ → 2 500 ₽"
+        assert format_price(ParsedPrice(Decimal("26.9"), "GBP")) == "£26.90"
+
+
+class TestPipeline:
+    """Тесты для цен в дедупликации и сообщениях"""
+
+    def test_parse_prices_fills_items(self):
+        """Разобранная цена проставляется позициям; цена из API не пересчитывается"""
+        items = parse_prices([Item(url="https://plastinka.com/lp/1", source="plastinka.com",
+                                   price="3000 руб. → 2500 руб."),
+                              Item(url="https://korobkavinyla.ru/a", source="korobkavinyla.ru", price="2 500 р.",
+                                   price_amount=Decimal("2499"), currency="RUB")])
+
+        assert (items[0].price_amount, items[0].price_original, items[0].currency) == (
+            Decimal("2500"), Decimal("3000"), "RUB")
+        assert items[1].price_amount == Decimal("2499")
+
+    def test_dedup_by_amount(self):
+        """Дубликат по содержимому — то же название и та же сумма, как бы ни была записана цена"""
+        from vinyl_monitor import advanced_deduplication
+        items = [{"id": "https://a.ru/1", "title": "LP", "price": "£25.00"},
+                 {"id": "https://a.ru/2", "title": "lp", "price": "Regular price £25 Sale price £25"},
+                 {"id": "https://a.ru/3", "title": "LP", "price": "£26.00"}]
+
+        assert [it["id"] for it in advanced_deduplication(items)] == ["https://a.ru/1", "https://a.ru/3"]
+
+    def test_message_uses_numbers(self):
+        """Сообщение строится из разобранной цены: £ у vinyltap, скидка plastinka"""
+        from vinyl_monitor import format_item_message
+
+        assert format_item_message({"url": "https://vinyltap.co.uk/products/a", "title": "A", "price": "€32.50"},
+                                   "vinyltap.co.uk") == '- <a href="https://vinyltap.co.uk/products/a">A</a> — £32.50'
+        assert format_item_message({"url": "https://plastinka.com/lp/1", "title": "B",
+                                    "price": "3000 руб. → 2500 руб."}, "plastinka.com").endswith(
+            "— 💰 3 000 ₽ → 2 500 ₽")
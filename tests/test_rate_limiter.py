@@ -0,0 +1,287 @@
+"""
+Тесты для rate_limiter.py
+"""
+import asyncio
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from http_client import RATE_LIMITED_RETRIES, limited_get, make_session  # noqa: E402
+from rate_limiter import (HostLimit, HostRateLimiter,  # noqa: E402
+                          host_of, parse_rate_limits)
+
+
+class FakeClock:
+    """Часы, которые идут только во время пауз"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch('rate_limiter.time.monotonic', fake.monotonic), patch('rate_limiter.time.sleep', fake.sleep):
+        yield fake
+
+
+def make_limiter(**limit):
+    """Лимитер с одним настроенным хостом example.com"""
+    return HostRateLimiter({"example.com": HostLimit(**{"requests_per_minute": 2, "burst": 1,
+                                                        "jitter_sec": 0, **limit})},
+                           blocked_limit=HostLimit(6, burst=1, jitter_sec=0))
+
+
+def limiter_sleeps(mock_sleep):
+    """Паузы лимитера без двухсекундных ожиданий отрисовки страницы (time — общий модуль)"""
+    return [c.args[0] for c in mock_sleep.call_args_list if c.args[0] != 2]
+
+
+class TestConfig:
+    """Тесты для разбора настроек"""
+
+    def test_host_of(self):
+        """Хост берется из URL без www., готовый хост не меняется"""
+        assert host_of("https://www.avito.ru/sankt_peterburg_i_lo/") == "avito.ru"
+        assert host_of("avito.ru") == "avito.ru"
+
+    def test_parse_rate_limits(self):
+        """Лимиты из окружения: запросов в минуту по хостам, ошибки пропускаются"""
+        limits = parse_rate_limits("www.avito.ru=2, vinyltap.co.uk=60,bad=x,junk")
+
+        assert set(limits) == {"avito.ru", "vinyltap.co.uk"}
+        assert limits["avito.ru"].requests_per_minute == 2.0
+
+    def test_from_dict(self):
+        """Секция rate_limit дополняет лимит по умолчанию"""
+        default = HostLimit(1, burst=1, jitter_sec=0)
+
+        limit = HostLimit.from_dict({"requests_per_minute": "3", "burst": 2, "jitter_sec": "oops"}, default)
+
+        assert (limit.requests_per_minute, limit.burst, limit.jitter_sec) == (3.0, 2, 0)
+
+    def test_env_limit_wins_over_file(self):
+        """Лимит из окружения не перезаписывается файлом конфигурации"""
+        limiter = make_limiter()
+
+        limiter.configure("https://www.example.com/", HostLimit(100))
+        limiter.configure("other.com", HostLimit(100))
+
+        assert limiter.limit_for("example.com").requests_per_minute == 2
+        assert limiter.limit_for("other.com").requests_per_minute == 100
+
+
+class TestTokenBucket:
+    """Тесты для корзины токенов"""
+
+    def test_unconfigured_host_not_limited(self, clock):
+        """Хост без настроек не ждет"""
+        limiter = make_limiter()
+
+        assert [limiter.reserve("free.org") for _ in range(5)] == [0.0] * 5
+
+    def test_burst_then_rate(self, clock):
+        """Первые burst запросов сразу, дальше — по интервалу"""
+        limiter = make_limiter(burst=2)
+
+        assert [limiter.reserve("example.com") for _ in range(4)] == [0.0, 0.0, 30.0, 60.0]
+
+    def test_no_wait_after_last_request(self, clock):
+        """Пауза только перед запросом: три запроса — две паузы"""
+        limiter = make_limiter()
+
+        for _ in range(3):
+            limiter.wait("https://example.com/search")
+
+        assert clock.sleeps == [30.0, 30.0]
+
+    def test_idle_refills_bucket(self, clock):
+        """После простоя запрос идет сразу"""
+        limiter = make_limiter()
+        limiter.wait("example.com")
+        clock.now += 120
+
+        assert limiter.wait("example.com") == 0.0
+
+    def test_jitter_only_on_waits(self, clock):
+        """Случайная добавка прибавляется только к паузам"""
+        limiter = make_limiter(jitter_sec=5)
+
+        with patch('rate_limiter.random.uniform', return_value=4.0):
+            assert limiter.reserve("example.com") == 0.0
+            assert limiter.reserve("example.com") == 34.0
+
+    def test_async_wait(self, clock):
+        """Асинхронная пауза не блокирует цикл событий"""
+        limiter = make_limiter()
+        sleeps = []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+
+        async def run():
+            with patch('rate_limiter.asyncio.sleep', fake_sleep):
+                await limiter.wait_async("example.com")
+                await limiter.wait_async("example.com")
+
+        asyncio.run(run())
+        assert sleeps == [30.0]
+
+
+class TestBackoff:
+    """Тесты для замедления после блокировок"""
+
+    def test_blocked_doubles_interval(self, clock):
+        """429 удваивает интервал и обнуляет запас, успех возвращает обратно"""
+        limiter = make_limiter(burst=3)
+
+        assert limiter.feedback("example.com", 429) is True
+        assert limiter.reserve("example.com") == 60.0
+
+        assert limiter.feedback("example.com", 200) is False
+        clock.now += 1000
+        limiter.reserve("example.com")
+        limiter.reserve("example.com")
+        limiter.reserve("example.com")
+        assert limiter.reserve("example.com") == 30.0
+        assert limiter.backoffs == 1
+
+    def test_backoff_capped(self, clock):
+        """Интервал не растет больше max_backoff_sec"""
+        limiter = make_limiter(max_backoff_sec=100)
+
+        for _ in range(10):
+            limiter.backoff("example.com")
+
+        assert limiter.reserve("example.com") == 100.0
+
+    def test_unconfigured_host_slowed_while_blocked(self, clock):
+        """Хост без настроек замедляется после блокировки и освобождается после успеха"""
+        limiter = make_limiter()
+
+        limiter.feedback("free.org", blocked=True)
+        assert limiter.reserve("free.org") == 20.0
+
+        limiter.feedback("free.org", 200)
+        assert limiter.reserve("free.org") == 0.0
+
+
+class TestLimitedGet:
+    """Тесты для HTTP-запросов через лимитер"""
+
+    def test_feedback_from_status(self, clock):
+        """Ответ 429 замедляет хост; повторы идут через лимитер с растущими паузами"""
+        limiter = make_limiter()
+        session = MagicMock()
+        session.get.return_value.status_code = 429
+
+        response = limited_get(session, "https://example.com/products.json", limiter, timeout=5)
+
+        assert response is session.get.return_value
+        assert session.get.call_count == RATE_LIMITED_RETRIES + 1
+        session.get.assert_called_with("https://example.com/products.json", timeout=5)
+        assert limiter.backoffs == RATE_LIMITED_RETRIES + 1
+        assert clock.sleeps == sorted(clock.sleeps) and clock.sleeps[-1] > 30
+
+    def test_retry_after_429_succeeds(self, clock):
+        """После 429 повтор проходит, и лимитер снова разгоняется"""
+        limiter = make_limiter()
+        session = MagicMock()
+        session.get.side_effect = [MagicMock(status_code=429), MagicMock(status_code=200)]
+
+        response = limited_get(session, "https://example.com/products.json", limiter)
+
+        assert response.status_code == 200 and session.get.call_count == 2
+        assert limiter.backoffs == 1
+
+    def test_429_from_real_session_reaches_limiter(self, clock):
+        """Сессия make_session не глотает 429 своими повторами: ответ доходит до лимитера"""
+        hits = []
+
+        class TooManyRequests(BaseHTTPRequestHandler):
+            def do_GET(self):
+                hits.append(self.path)
+                self.send_response(429)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), TooManyRequests)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/products.json"
+            limiter = HostRateLimiter({"127.0.0.1": HostLimit(60, burst=1, jitter_sec=0)},
+                                      blocked_limit=HostLimit(6, burst=1, jitter_sec=0))
+            response = limited_get(make_session(), url, limiter, timeout=5)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert response.status_code == 429
+        assert len(hits) == RATE_LIMITED_RETRIES + 1
+        assert limiter.backoffs == RATE_LIMITED_RETRIES + 1
+
+
+class TestAvito:
+    """Тесты для лимита частоты Авито"""
+
+    @patch('vinyl_monitor.update_last_check_time')
+    @patch('vinyl_monitor.should_monitor_site', return_value=True)
+    @patch('vinyl_monitor.load_avito_config')
+    @patch('vinyl_monitor.time.sleep')
+    def test_queries_paced_by_config(self, mock_sleep, mock_config, mock_should_monitor, mock_update, clock):
+        """Запросы идут по лимиту из конфигурации, после последнего паузы нет"""
+        from vinyl_monitor import scrape_avito_with_playwright
+        mock_config.return_value = {
+            "search_queries": ["a", "b", "c"],
+            "base_url": "https://www.avito.ru/spb/",
+            "rate_limit": {"requests_per_minute": 4, "burst": 2, "jitter_sec": 0},
+        }
+        browser = MagicMock()
+        page = browser.site_page.return_value.__enter__.return_value
+        page.goto.return_value.status = 200
+        page.evaluate.side_effect = lambda js, *args: [{"id": args[0], "url": args[0], "title": "LP"}] if args else False
+
+        with patch('vinyl_monitor.RATE_LIMITER', HostRateLimiter()):
+            items = scrape_avito_with_playwright(browser)
+
+        assert [item["id"] for item in items] == ["a", "b", "c"]
+        assert limiter_sleeps(mock_sleep) == [15.0]
+
+    @patch('vinyl_monitor.update_last_check_time')
+    @patch('vinyl_monitor.should_monitor_site', return_value=True)
+    @patch('vinyl_monitor.load_avito_config')
+    @patch('vinyl_monitor.time.sleep')
+    def test_captcha_slows_down(self, mock_sleep, mock_config, mock_should_monitor, mock_update, clock):
+        """Капча вместо выдачи пропускает запрос и замедляет следующие"""
+        from vinyl_monitor import scrape_avito_with_playwright
+        mock_config.return_value = {"search_queries": ["a", "b"], "base_url": "https://www.avito.ru/spb/",
+                                    "rate_limit": {"requests_per_minute": 6, "burst": 2, "jitter_sec": 0}}
+        browser = MagicMock()
+        page = browser.site_page.return_value.__enter__.return_value
+        page.evaluate.side_effect = lambda js, *args: [] if args else True
+        limiter = HostRateLimiter()
+
+        with patch('vinyl_monitor.RATE_LIMITER', limiter):
+            assert scrape_avito_with_playwright(browser) == []
+
+        assert limiter.backoffs == 2
+        assert limiter_sleeps(mock_sleep) == [20.0]
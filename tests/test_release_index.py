@@ -0,0 +1,152 @@
+"""
+Тесты для release_index.py
+"""
+import os
+import sys
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from item_model import Item  # noqa: E402
+from release_index import Offer, ReleaseIndex  # noqa: E402
+from release_matching import ReleaseMatcher  # noqa: E402
+
+KNOWN_ITEMS = {
+    "https://korobkavinyla.ru/1": {"title": "Кино — Группа крови (LP, black vinyl)", "source": "korobkavinyla.ru"},
+    "https://plastinka.com/2": {"title": "Metallica - Master Of Puppets", "source": "plastinka.com"},
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    with ReleaseIndex(tmp_path / "state.releases.db") as index:
+        yield index
+
+
+class TestReleaseIndex:
+    """Тесты для индекса релизов и цен"""
+
+    def test_same_release_ids_as_matcher(self, index):
+        """Индекс в базе сопоставляет так же, как ReleaseMatcher в памяти"""
+        titles = ["KINO: Gruppa Krovi", "Кино - Группа крови б/у", "Кино - Группа крови (red vinyl)",
+                  "Pink Floyd - Dark Side Of The Moon", "Pink Floyd – Dark Side of the Mon"]
+        matcher = ReleaseMatcher()
+
+        assert [index.match(title) for title in titles] == [matcher.match(title) for title in titles]
+        assert len(index) == 3
+
+    def test_build_once_and_persist(self, tmp_path, index):
+        """Построение по known_items — один раз; релизы и цены переживают переоткрытие"""
+        assert not index.built
+        assert index.build(KNOWN_ITEMS) == 2 and index.built
+        index.record([Item(url="https://plastinka.com/3", title="KINO: Gruppa Krovi", source="plastinka.com",
+                           price="2 300 руб.")])
+        index.close()
+
+        with ReleaseIndex(tmp_path / "state.releases.db") as reopened:
+            assert reopened.built and len(reopened) == 2
+            release_id = reopened.match("Кино - Группа крови")
+            assert [offer.amount for offer in reopened.prices(release_id)] == [Decimal("2300")]
+
+    def test_last_price_per_source(self, index):
+        """На источник хранится последняя цена; у позиции — release_id"""
+        item = Item(url="https://plastinka.com/3", title="KINO: Gruppa Krovi", source="plastinka.com",
+                    price="2 500 руб.")
+        index.record([item], seen_at="2026-03-01T10:00:00")
+        index.record([Item(url="https://plastinka.com/3", title="KINO: Gruppa Krovi", source="plastinka.com",
+                           price="2 300 руб.")], seen_at="2026-03-02T10:00:00")
+
+        assert item["release_id"]
+        assert index.prices(item["release_id"]) == [
+            Offer("plastinka.com", Decimal("2300"), "RUB", "https://plastinka.com/3", "2026-03-02T10:00:00")]
+
+    def test_cheapest_elsewhere(self, index):
+        """Дешевле всего в другом магазине и в той же валюте; свой магазин не считается"""
+        index.record([
+            Item(url="https://plastinka.com/3", title="KINO: Gruppa Krovi", source="plastinka.com", price="2 300 руб."),
+            Item(url="https://avito.ru/4", title="Пластинка Кино Группа крови б/у", source="avito.ru",
+                 price="1 800 ₽"),
+            Item(url="https://vinyltap.co.uk/5", title="Kino - Gruppa Krovi", source="vinyltap.co.uk",
+                 price="£10.00"),
+            Item(url="https://korobkavinyla.ru/6", title="Кино — Группа крови", source="korobkavinyla.ru",
+                 price="1 500 р."),
+        ])
+        item = Item(url="https://korobkavinyla.ru/7", title="Кино — Группа крови (LP)", source="korobkavinyla.ru",
+                    price="2 500 р.")
+        index.assign([item])
+
+        offer = index.cheapest_elsewhere(item)
+        assert (offer.source, offer.amount, offer.currency) == ("avito.ru", Decimal("1800"), "RUB")
+        assert index.cheapest_elsewhere(Item(url="https://x.ru/1", title="Unknown Album", price="100 руб.")) is None
+
+    @pytest.mark.parametrize("other_title, new_title", [
+        ("Led Zeppelin II", "Led Zeppelin III"),
+        ("Guns N' Roses - Use Your Illusion I", "Guns N' Roses - Use Your Illusion II"),
+        ("Radiohead - Kid B", "Radiohead - Kid A"),
+        ("Кино - Группа крови (red vinyl)", "Кино - Группа крови (LP, black vinyl)"),
+        ("Pink Floyd - Dark Side Of The Moon 50th Anniversary", "Pink Floyd - Dark Side Of The Moon"),
+    ])
+    def test_other_volume_or_variant_never_offered(self, index, other_title, new_title):
+        """Другой том или тираж не выдается за тот же релиз дешевле в другом магазине"""
+        index.record([Item(url="https://plastinka.com/1", title=other_title, source="plastinka.com",
+                           price="100 руб.")])
+        item = Item(url="https://korobkavinyla.ru/2", title=new_title, source="korobkavinyla.ru", price="5 000 р.")
+        index.record([item])
+
+        assert index.cheapest_elsewhere(item) is None
+
+
+class TestMonitorIntegration:
+    """Тесты для PRICE_INDEX в vinyl_monitor"""
+
+    def test_notify_shows_cheapest_elsewhere(self, tmp_path):
+        """Новая позиция сравнивается с ценами других магазинов, в том числе из этого же прогона"""
+        import vinyl_monitor
+        from monitor_state import MonitorState
+        state = MonitorState(dict(KNOWN_ITEMS))
+        items = [
+            {"id": "https://plastinka.com/3", "url": "https://plastinka.com/3", "title": "KINO: Gruppa Krovi",
+             "source": "plastinka.com", "price": "2 300 руб."},
+            {"id": "https://korobkavinyla.ru/7", "url": "https://korobkavinyla.ru/7",
+             "title": "Кино — Группа крови (LP)", "source": "korobkavinyla.ru", "price": "2 500 р."},
+        ]
+
+        with patch('vinyl_monitor.PRICE_INDEX', True), patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"), \
+                patch('vinyl_monitor._release_index', None), patch('vinyl_monitor._state', state), \
+                patch('vinyl_monitor.send_telegram') as send:
+            vinyl_monitor.notify_new_items(items, {"https://plastinka.com/3"})
+            index = vinyl_monitor._release_index
+            assert index.built and len(index) == 2
+            index.close()
+
+        message = send.call_args[0][0]
+        assert "Группа крови (LP)</a> — 2 500 ₽ (дешевле всего в другом магазине: 2 300 ₽ на plastinka.com)" \
+            in message
+
+    def test_notify_skips_other_volume(self, tmp_path):
+        """В уведомлении о «Led Zeppelin III» нет цены «Led Zeppelin II» из другого магазина"""
+        import vinyl_monitor
+        from monitor_state import MonitorState
+        items = [
+            {"id": "https://plastinka.com/3", "url": "https://plastinka.com/3", "title": "Led Zeppelin II",
+             "source": "plastinka.com", "price": "1 000 руб."},
+            {"id": "https://korobkavinyla.ru/7", "url": "https://korobkavinyla.ru/7", "title": "Led Zeppelin III",
+             "source": "korobkavinyla.ru", "price": "4 000 р."},
+        ]
+
+        with patch('vinyl_monitor.PRICE_INDEX', True), patch('vinyl_monitor.STATE_PATH', tmp_path / "state.json"), \
+                patch('vinyl_monitor._release_index', None), patch('vinyl_monitor._state', MonitorState()), \
+                patch('vinyl_monitor.send_telegram') as send:
+            vinyl_monitor.notify_new_items(items, {"https://plastinka.com/3"})
+            vinyl_monitor._release_index.close()
+
+        assert "другом магазине" not in send.call_args[0][0]
+
+    def test_format_without_offer(self):
+        from vinyl_monitor import format_item_message
+        assert "другом магазине" not in format_item_message(
+            {"url": "https://plastinka.com/lp/1", "title": "B", "price": "2 500 руб."}, "plastinka.com")
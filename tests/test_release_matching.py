@@ -0,0 +1,93 @@
+"""
+Тесты для release_matching.py
+"""
+import os
+import sys
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from item_model import Item  # noqa: E402
+from release_matching import (ReleaseMatcher, blocking_keys,  # noqa: E402
+                              normalize_title, similarity)
+
+
+class TestNormalizeTitle:
+    """Тесты для нормализации названий"""
+
+    def test_translit_and_noise_words(self):
+        """Кириллица и латиница, формат, состояние и порядок слов дают один ключ"""
+        titles = ["Кино — Группа крови (LP, black vinyl)", "KINO: Gruppa Krovi",
+                  "Пластинка Кино Группа крови б/у", "Gruppa Krovi - Kino [Vinyl, used]"]
+
+        assert {normalize_title(title) for title in titles} == {"gruppa kino krovi"}
+
+    def test_variant_words_kept(self):
+        """Цвет, кроме черного, и юбилейное издание остаются в ключе"""
+        assert normalize_title("Кино - Группа крови (red vinyl)") == "gruppa kino krovi red"
+        assert "50th" in normalize_title("Pink Floyd - Dark Side Of The Moon 50th Anniversary")
+
+    def test_similarity(self):
+        assert similarity("dark floyd moon pink side", "dark floyd moon pink side") == 1.0
+        assert similarity("dark floyd mon pink side", "dark floyd moon pink side") > 0.7
+        assert similarity("gruppa kino krovi", "master metallica puppets") < 0.1
+
+
+class TestReleaseMatcher:
+    """Тесты для сопоставления релизов"""
+
+    def test_fuzzy_match(self):
+        """Опечатка и служебные слова — тот же релиз; другой тираж — другой"""
+        matcher = ReleaseMatcher()
+        release_id = matcher.match("Pink Floyd - The Dark Side Of The Moon (LP)")
+
+        assert matcher.match("Pink Floyd – Dark Side of the Mon [Vinyl]") == release_id
+        assert matcher.match("Pink Floyd — Dark Side Of The Moon 50th Anniversary") != release_id
+        assert matcher.match("Кино - Группа крови") != matcher.match("Кино - Группа крови (red vinyl)")
+        assert matcher.match("LP, vinyl") == ""
+
+    def test_volumes_and_letters_are_distinct(self):
+        """Римский номер, буква и номер тома — другой релиз; артикль в начале названия не важен"""
+        pairs = [("Led Zeppelin II", "Led Zeppelin III"),
+                 ("Guns N' Roses - Use Your Illusion I", "Guns N' Roses - Use Your Illusion II"),
+                 ("Radiohead - Kid A", "Radiohead - Kid B"),
+                 ("Queen - Greatest Hits Vol. 1", "Queen - Greatest Hits Vol. 2"),
+                 ("Tarantino - Kill Bill Vol. One", "Tarantino - Kill Bill Vol. Two")]
+        for first, second in pairs:
+            matcher = ReleaseMatcher()
+            assert matcher.match(first) != matcher.match(second), (first, second)
+
+        matcher = ReleaseMatcher()
+        assert matcher.match("The Beatles - Sgt. Pepper's Lonely Hearts Club Band") == \
+            matcher.match("Beatles: Sgt Peppers Lonely Hearts Club Band LP")
+        assert matcher.match("Radiohead - Kid A") == matcher.match("Radiohead – Kid A (Vinyl)")
+
+    def test_release_id_is_stable(self):
+        """release_id не зависит от прогона: хеш ключа первого названия"""
+        assert ReleaseMatcher().match("KINO: Gruppa Krovi") == ReleaseMatcher().match("Кино - Группа крови")
+        assert blocking_keys("gruppa kino krovi") == blocking_keys("gruppa kino krovi")
+
+    def test_comparisons_stay_near_linear(self):
+        """Различные названия не сравниваются попарно: сравнений много меньше n²"""
+        matcher = ReleaseMatcher()
+        titles = [f"Artist {i} - Album {i * 7919 % 10007} Vol {i % 13}" for i in range(2000)]
+        release_ids = {matcher.match(title) for title in titles}
+
+        assert len(release_ids) > 1900
+        assert matcher.comparisons < 2000 * 20
+
+    def test_assign_across_stores(self):
+        """Позиции получают release_id; возвращаются релизы из нескольких магазинов"""
+        items = [
+            Item(url="https://korobkavinyla.ru/1", title="Кино — Группа крови (LP, black vinyl)",
+                 source="korobkavinyla.ru"),
+            Item(url="https://plastinka.com/2", title="KINO: Gruppa Krovi", source="plastinka.com"),
+            {"id": "https://avito.ru/3", "title": "Пластинка Кино Группа крови б/у", "source": "avito.ru"},
+            Item(url="https://plastinka.com/4", title="Metallica - Master Of Puppets", source="plastinka.com"),
+        ]
+
+        cross_store = ReleaseMatcher().assign(items)
+
+        assert len({item["release_id"] for item in items[:3]}) == 1
+        assert list(cross_store) == [items[0]["release_id"]] and len(cross_store[items[0]["release_id"]]) == 3
+        assert Item.from_dict(items[2])["release_id"] == items[0].release_id
@@ -0,0 +1,137 @@
+"""
+Тесты для scheduler.py и режима демона
+"""
+import os
+import sys
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from scheduler import DueScheduler  # noqa: E402
+from vinyl_monitor import MonitorDaemon  # noqa: E402
+
+NOW = 1_700_000_000.0
+INTERVALS = {"korobkavinyla": 3, "avito": 0.5}
+
+
+class TestDueScheduler:
+    """Тесты для мин-кучи сроков"""
+
+    def test_pop_due_in_order(self):
+        """Наступившие сроки отдаются по порядку, будущие остаются"""
+        scheduler = DueScheduler()
+        scheduler.schedule("b", 20)
+        scheduler.schedule("a", 10)
+        scheduler.schedule("c", 30)
+
+        assert scheduler.pop_due(25) == ["a", "b"]
+        assert scheduler.sites() == ["c"]
+        assert scheduler.seconds_until_next(25) == 5
+
+    def test_reschedule_replaces_old_due(self):
+        """Повторное назначение отменяет прежний срок"""
+        scheduler = DueScheduler()
+        scheduler.schedule("a", 10)
+        scheduler.schedule("a", 50)
+
+        assert scheduler.pop_due(20) == []
+        assert scheduler.peek() == (50, "a")
+        assert len(scheduler) == 1
+
+    def test_cancel_and_empty(self):
+        """Снятый сайт не отдается; у пустого расписания нет срока"""
+        scheduler = DueScheduler()
+        scheduler.schedule("a", 10)
+        scheduler.cancel("a")
+
+        assert scheduler.pop_due(100) == []
+        assert scheduler.seconds_until_next(100) is None
+        assert "a" not in scheduler
+
+
+def make_daemon(clock_value=NOW):
+    """Демон с замоканными часами и загруженной конфигурацией"""
+    daemon = MonitorDaemon(MagicMock(), clock=lambda: clock_value)
+    last_checks = {"korobkavinyla": datetime.fromtimestamp(NOW - 3600)}
+    with patch('vinyl_monitor.load_avito_config', return_value={}), \
+            patch('vinyl_monitor.site_intervals', return_value=dict(INTERVALS)), \
+            patch('vinyl_monitor.read_last_check_time', side_effect=last_checks.get):
+        daemon.reload_config()
+    return daemon
+
+
+class TestMonitorDaemon:
+    """Тесты для демона с расписанием"""
+
+    def test_due_from_last_check(self):
+        """Срок — последняя проверка плюс интервал; без файла — сразу"""
+        daemon = make_daemon()
+
+        assert daemon.scheduler.peek() == (NOW, "avito")
+        assert daemon.scheduler.pop_due(NOW + 2 * 3600) == ["avito", "korobkavinyla"]
+
+    def test_reload_drops_disabled_sites(self):
+        """После перечитывания конфигурации выключенный сайт уходит из расписания"""
+        daemon = make_daemon()
+
+        with patch('vinyl_monitor.load_avito_config', return_value={"enabled": False}), \
+                patch('vinyl_monitor.site_intervals', return_value={"korobkavinyla": 3}), \
+                patch('vinyl_monitor.read_last_check_time', return_value=None):
+            daemon.reload_config()
+
+        assert daemon.scheduler.sites() == ["korobkavinyla"]
+
+    @patch('vinyl_monitor.save_state')
+    @patch('vinyl_monitor.notify_new_items')
+    @patch('vinyl_monitor.scrape_site_now')
+    def test_run_due_scrapes_and_reschedules(self, mock_scrape, mock_notify, mock_save):
+        """Наступившие сайты сканируются, получают новый срок, новые позиции сохраняются"""
+        daemon = make_daemon()
+        mock_scrape.return_value = [{"id": "https://avito.ru/1"}]
+        mock_notify.return_value = ([{"id": "https://avito.ru/1"}], {"https://avito.ru/1"})
+
+        daemon.run_due()
+
+        mock_scrape.assert_called_once_with("avito", daemon.browser, daemon.known, {})
+        assert daemon.scheduler.peek() == (NOW + 0.5 * 3600, "avito")
+        assert "https://avito.ru/1" in daemon.known
+        mock_save.assert_called_once_with(daemon.known, [{"id": "https://avito.ru/1"}])
+        assert daemon.pending == []
+
+    @patch('vinyl_monitor.DAEMON_SAVE_INTERVAL_MINUTES', 30)
+    @patch('vinyl_monitor.save_state')
+    @patch('vinyl_monitor.notify_new_items', return_value=([{"id": "x"}], {"x"}))
+    @patch('vinyl_monitor.scrape_site_now', return_value=[{"id": "x"}])
+    def test_stop_flushes_pending(self, mock_scrape, mock_notify, mock_save):
+        """SIGTERM: текущий цикл завершается, накопленные позиции сохраняются при выходе"""
+        daemon = make_daemon()
+        mock_scrape.side_effect = lambda *args: daemon.request_stop() or [{"id": "x"}]
+
+        with patch('vinyl_monitor.load_state', return_value=set()), \
+                patch.object(MonitorDaemon, 'reload_config'):
+            daemon.run()
+
+        mock_scrape.assert_called_once()
+        mock_save.assert_called_once_with({"x"}, [{"id": "x"}])
+
+    def test_reload_signal_wakes(self):
+        """SIGHUP будит спящий демон и помечает перечитывание конфигурации"""
+        daemon = make_daemon()
+
+        daemon.request_reload()
+
+        assert daemon._reload is True
+        assert daemon._wake.is_set()
+
+    @patch('vinyl_monitor.update_last_check_time')
+    @patch('vinyl_monitor.scrape_avito', return_value=[{"id": "a"}])
+    @patch('vinyl_monitor.should_monitor_site')
+    def test_scrape_site_now_ignores_interval(self, mock_should_monitor, mock_avito, mock_update):
+        """Сайт из расписания сканируется без проверки last_check, файл обновляется"""
+        from vinyl_monitor import scrape_site_now
+
+        assert scrape_site_now("avito", MagicMock(), set(), {}) == [{"id": "a"}]
+        mock_should_monitor.assert_not_called()
+        mock_update.assert_called_once_with("avito")
@@ -0,0 +1,151 @@
+"""
+Тесты для site_adapters.py и реестра сайтов
+"""
+import os
+import sys
+from dataclasses import replace
+from unittest.mock import MagicMock, patch
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from browser_manager import SITE_PROFILES  # noqa: E402
+from site_adapters import (SiteAdapter, anchor_items_js,  # noqa: E402
+                           card_items_js)
+from vinyl_monitor import (INCREMENTAL_SITES, PLASTINKA_ANCHOR_JS,  # noqa: E402
+                           SITE_ADAPTERS,
+                           SITE_SOURCES, scrape_due_site,
+                           scrape_site_with_playwright)
+
+
+def make_adapter(**overrides):
+    """Описание сайта для тестов движка"""
+    adapter = SiteAdapter("testsite", "test.shop", ("https://test.shop/a", "https://test.shop/b"),
+                          "(roots) => []", 6)
+    return replace(adapter, **overrides)
+
+
+class TestAnchorItemsJs:
+    """Тесты для функции извлечения по селекторам"""
+
+    def test_selectors_embedded(self):
+        """Селекторы и шаблоны ссылок встраиваются как JSON-литералы"""
+        js = anchor_items_js(["/catalog/", "/lp/"], title_selector='.t[data-x="1"]',
+                             price_selector=".p", card_selector=".card", min_title_length=4)
+
+        assert 'const LINK_PATTERNS = ["/catalog/", "/lp/"];' in js
+        assert 'const TITLE_SELECTOR = ".t[data-x=\\"1\\"]";' in js
+        assert 'const CARD_SELECTOR = ".card";' in js
+        assert "const MIN_TITLE_LENGTH = 4;" in js
+
+    def test_accepts_roots(self):
+        """Функция принимает корни для инкрементального извлечения"""
+        assert anchor_items_js(["/x/"]).strip().startswith("(roots) =>")
+
+    def test_refine_embedded(self):
+        """Доработка позиции встраивается как функция, без нее — null"""
+        assert "const refine = null;" in anchor_items_js(["/x/"])
+        assert "const refine = (card, item) => item;" in anchor_items_js(["/x/"], refine_js=" (card, item) => item ")
+
+
+class TestCardItemsJs:
+    """Тесты для функции извлечения по карточкам"""
+
+    def test_selectors_embedded(self):
+        """Селекторы карточки, названия и цены встраиваются как JSON-литералы"""
+        js = card_items_js(".card", ["/item/"], title_selector=".name", price_selector=".cost", min_title_length=2)
+
+        assert 'const CARD_SELECTOR = ".card";' in js
+        assert 'const LINK_PATTERNS = ["/item/"];' in js
+        assert 'const TITLE_SELECTOR = ".name";' in js
+        assert 'const PRICE_SELECTOR = ".cost";' in js
+        assert "const MIN_TITLE_LENGTH = 2;" in js
+        assert js.strip().startswith("(roots) =>")
+
+    def test_fallback_embedded(self):
+        """Запасная функция по ссылкам встраивается целиком, без нее — null"""
+        fallback = anchor_items_js(["/item/"])
+
+        assert "const fallback = null;" in card_items_js(".card", ["/item/"])
+        assert "const fallback = " + fallback.strip() + ";" in card_items_js(".card", ["/item/"], fallback_js=fallback)
+
+
+class TestRegistry:
+    """Тесты для реестра сайтов"""
+
+    def test_every_adapter_has_profile(self):
+        """У каждого сайта есть профиль контекста (локаль, заголовки)"""
+        for name, adapter in SITE_ADAPTERS.items():
+            assert adapter.name == name
+            assert name in SITE_PROFILES
+            assert adapter.urls
+
+    def test_catalogs_use_cards(self):
+        """Каталоги разбираются по карточкам, прежний обход по ссылкам — запасной"""
+        plastinka_js = SITE_ADAPTERS["plastinka"].items_js
+
+        assert 'const CARD_SELECTOR = ".products-grid-item";' in plastinka_js
+        assert PLASTINKA_ANCHOR_JS.strip() in plastinka_js
+        # Запасной обход plastinka.com — тот же anchor_items_js: только товары, без пунктов меню
+        assert 'const LINK_PATTERNS = ["/item/"];' in PLASTINKA_ANCHOR_JS
+        assert '"новые поступления"' in PLASTINKA_ANCHOR_JS
+        for adapter in SITE_ADAPTERS.values():
+            assert "const CARD_SELECTOR = " in adapter.items_js
+            assert "const fallback = null;" not in adapter.items_js
+
+    def test_sources(self):
+        """Источники — включенные сайты реестра и Авито"""
+        assert SITE_SOURCES["korobkavinyla"] == "korobkavinyla.ru"
+        assert SITE_SOURCES["avito"] == "avito.ru"
+        assert "avito" not in INCREMENTAL_SITES
+        assert "vinylfamily" not in SITE_SOURCES
+
+
+class TestSiteEngine:
+    """Тесты для общего движка"""
+
+    @patch('vinyl_monitor.time.sleep')
+    def test_pages_without_load_more(self, mock_sleep):
+        """Без подгрузки каждая страница разбирается один раз, источник проставляется"""
+        browser = MagicMock()
+        page = browser.site_page.return_value.__enter__.return_value
+        page.evaluate.side_effect = [[{"id": "1", "url": "1", "title": "A"}], [{"id": "2", "url": "2", "title": "B"}]]
+
+        items = scrape_site_with_playwright(make_adapter(load_more_labels=()), browser)
+
+        assert [item["id"] for item in items] == ["1", "2"]
+        assert all(item["source"] == "test.shop" for item in items)
+        browser.site_page.assert_called_once()
+        assert browser.site_page.call_args[0][0] == "testsite"
+        page.locator.assert_not_called()
+
+    @patch('vinyl_monitor.time.sleep')
+    def test_failed_page_skipped(self, mock_sleep):
+        """Страница, не загрузившаяся за три попытки, не разбирается"""
+        browser = MagicMock()
+        page = browser.site_page.return_value.__enter__.return_value
+        page.goto.side_effect = [Exception("timeout")] * 3 + [None]
+        page.evaluate.return_value = [{"id": "2", "url": "2", "title": "B"}]
+
+        items = scrape_site_with_playwright(make_adapter(load_more_labels=()), browser)
+
+        assert [item["id"] for item in items] == ["2"]
+        assert page.evaluate.call_count == 1
+
+    @patch('vinyl_monitor.update_last_check_time')
+    @patch('vinyl_monitor.scrape_site')
+    @patch('vinyl_monitor.should_monitor_site')
+    def test_due_site_interval(self, mock_should_monitor, mock_scrape_site, mock_update):
+        """Сайт сканируется, только если подошел его интервал; время проверки записывается после скана"""
+        adapter = make_adapter()
+        mock_scrape_site.return_value = [{"id": "1"}]
+
+        mock_should_monitor.return_value = False
+        assert scrape_due_site(adapter) == []
+        mock_should_monitor.assert_called_with("testsite", 6)
+        mock_scrape_site.assert_not_called()
+        mock_update.assert_not_called()
+
+        mock_should_monitor.return_value = True
+        assert scrape_due_site(adapter) == [{"id": "1"}]
+        mock_update.assert_called_once_with("testsite")
@@ -0,0 +1,108 @@
+"""
+Тесты для state_format.py
+"""
+import gzip
+import json
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import state_format  # noqa: E402
+from monitor_state import JsonFileBackend, MonitorState  # noqa: E402
+from state_format import (decode_state, encode_state,  # noqa: E402
+                          latest_state_file, state_file_name)
+
+ROOT = Path(__file__).resolve().parent.parent
+STATE = {"known_items": {
+    "https://korobkavinyla.ru/catalog/tproduct/771567999-1-a": {"added_at": "2026-03-01T10:00:00", "title": "A",
+                                                               "source": "korobkavinyla.ru"},
+    "https://korobkavinyla.ru/catalog/tproduct/771567999-2-b": {"added_at": "unknown"},
+    "https://vinyltap.co.uk/products/c": {"added_at": "2026-03-02T10:00:00", "title": "C",
+                                          "source": "vinyltap.co.uk", "price": "25.00"},
+}, "s3": {"etag": '"abc"'}}
+
+
+class TestStateFormat:
+    """Тесты для форматов состояния"""
+
+    @pytest.mark.parametrize("fmt", ["json", "compact", "gzip"])
+    @pytest.mark.parametrize("dictionary", [True, False])
+    def test_roundtrip(self, fmt, dictionary):
+        """Любой формат читается обратно без потерь, включая неполные и дополнительные поля"""
+        assert decode_state(encode_state(STATE, fmt, dictionary)) == STATE
+
+    def test_dictionary_shares_prefixes_and_sources(self):
+        """Префиксы URL и источники хранятся по одному разу"""
+        body = json.loads(encode_state(STATE, "compact", dictionary=True))
+
+        assert body["format"] == 2
+        assert body["prefixes"] == ["https://korobkavinyla.ru/catalog/tproduct/", "https://vinyltap.co.uk/products/"]
+        assert body["items"][0] == [0, "771567999-1-a", "A", 0, "2026-03-01T10:00:00"]
+        assert encode_state(STATE, "compact", dictionary=True).count(b"korobkavinyla.ru/catalog") == 1
+
+    def test_gzip_smaller_and_deterministic(self):
+        """Сжатое состояние меньше прежнего и не зависит от времени записи (ETag не меняется зря)"""
+        packed = encode_state(STATE, "gzip")
+
+        assert packed.startswith(b"\x1f\x8b")
+        assert len(gzip.decompress(packed)) < len(encode_state(STATE, "json"))
+        assert packed == encode_state(STATE, "gzip")
+
+    def test_backup_files_still_load(self):
+        """Старые state_backup*.json читаются как раньше"""
+        for path in ROOT.glob("state_backup*.json"):
+            raw = path.read_bytes()
+            assert decode_state(raw) == json.loads(raw)
+
+    def test_zstd_without_module(self):
+        """Без zstandard запись уходит в gzip, а zstd-файл дает понятную ошибку"""
+        with patch.object(state_format, 'zstandard', None):
+            assert encode_state(STATE, "zstd").startswith(b"\x1f\x8b")
+            with pytest.raises(RuntimeError, match="zstandard"):
+                decode_state(b"\x28\xb5\x2f\xfd" + b"\x00" * 8)
+
+    def test_unknown_format(self):
+        """Опечатка в STATE_FORMAT не превращается в молчаливую запись JSON"""
+        with pytest.raises(ValueError):
+            encode_state(STATE, "xz")
+
+    def test_file_backend_writes_and_detects(self, tmp_path):
+        """Состояние в gzip пишется в state.json.gz и загружается тем же хранилищем"""
+        path = tmp_path / "state.json"
+        state = MonitorState({}, [JsonFileBackend(path, fmt="gzip")])
+        state.add_items([{"id": "https://shop.ru/a", "title": "A", "source": "shop.ru"}], "2026-03-01T10:00:00")
+        state.save()
+
+        assert not path.exists()
+        assert (tmp_path / "state.json.gz").read_bytes().startswith(b"\x1f\x8b")
+        assert MonitorState.load([JsonFileBackend(path)]).items == {
+            "https://shop.ru/a": {"added_at": "2026-03-01T10:00:00", "title": "A", "source": "shop.ru"}}
+
+    def test_file_names(self):
+        """Суффикс имени следует формату; zstd без модуля пишется gzip и называется .gz"""
+        assert state_file_name("state.json", "json") == "state.json"
+        assert state_file_name("state.json", "compact") == "state.json"
+        assert state_file_name("state.json", "gzip") == "state.json.gz"
+        with patch.object(state_format, 'zstandard', None):
+            assert state_file_name("state.json", "zstd") == "state.json.gz"
+
+    def test_legacy_name_read_and_newest_wins(self, tmp_path):
+        """gzip под прежним именем state.json читается; после записи берется новый state.json.gz"""
+        path = tmp_path / "state.json"
+        path.write_bytes(encode_state(STATE, "gzip"))
+        backend = JsonFileBackend(path, fmt="gzip")
+
+        assert latest_state_file(path) == path
+        assert set(backend.load()) == set(STATE["known_items"])
+
+        backend.write({"https://shop.ru/new": {"title": "New"}})
+        os.utime(path, (0, 0))  # Прежний файл старше записанного
+
+        assert latest_state_file(path) == tmp_path / "state.json.gz"
+        assert set(JsonFileBackend(path).load()) == {"https://shop.ru/new"}
@@ -0,0 +1,191 @@
+"""
+Тесты для state_journal.py
+"""
+import json
+import os
+import sys
+from unittest.mock import patch
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from monitor_state import MonitorState, apply_events  # noqa: E402
+from state_journal import (JournalFileBackend, S3JournalBackend,  # noqa: E402
+                           decode_events, delta_key, encode_events)
+
+SNAPSHOT = {"known_items": {"https://shop.ru/a": {"added_at": "2026-03-01T10:00:00", "title": "A",
+                                                  "source": "shop.ru"}}}
+
+
+def new_item(name):
+    return {"id": f"https://shop.ru/{name}", "title": name.upper(), "source": "shop.ru"}
+
+
+class FakeS3:
+    """S3Storage в памяти: снимок и дельты журнала"""
+
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot or {"known_items": {}}
+        self.deltas = {}
+        self.snapshot_uploads = 0
+
+    def download_state(self):
+        return json.loads(json.dumps(self.snapshot))
+
+    def upload_state(self, data):
+        self.snapshot = data
+        self.snapshot_uploads += 1
+        return True
+
+    def list_journal(self):
+        return sorted(self.deltas)
+
+    def download_journal_entry(self, key):
+        return self.deltas[key]
+
+    def upload_journal_entry(self, body):
+        key = delta_key("journal/")
+        self.deltas[key] = body
+        return key
+
+    def delete_journal_entries(self, keys):
+        for key in keys:
+            self.deltas.pop(key, None)
+
+
+class TestEvents:
+    """Тесты для событий журнала"""
+
+    def test_replay(self):
+        """add добавляет, update дополняет, remove убирает"""
+        items = {"a": {"title": "A", "added_at": "t0"}}
+        events = [{"op": "add", "id": "b", "info": {"title": "B"}},
+                  {"op": "update", "id": "a", "info": {"title": "A2"}},
+                  {"op": "remove", "id": "b"},
+                  {"op": "bogus", "id": "c"}]
+
+        assert apply_events(items, events) == 3
+        assert items == {"a": {"title": "A2", "added_at": "t0"}}
+
+    def test_torn_line_skipped(self):
+        """Оборванная запись в конце журнала не ломает загрузку"""
+        text = encode_events([{"op": "add", "id": "a", "info": {}}]) + '{"op": "add", "id": "b'
+
+        assert decode_events(text) == [{"op": "add", "id": "a", "info": {}}]
+
+
+class TestJournalFileBackend:
+    """Тесты для локального журнала"""
+
+    def test_run_appends_only_delta(self, tmp_path):
+        """Прогон дописывает свои события в журнал, снимок не переписывается"""
+        snapshot_path = tmp_path / "state.json"
+        snapshot_path.write_text(json.dumps(SNAPSHOT), encoding="utf-8")
+        backend = JournalFileBackend(snapshot_path)
+        state = MonitorState.load([backend])
+        before = snapshot_path.read_text(encoding="utf-8")
+
+        state.add_items([new_item("b"), new_item("c")])
+        state.save()
+        state.remove_items(["https://shop.ru/a/"])
+        state.save()
+
+        assert snapshot_path.read_text(encoding="utf-8") == before
+        assert len(backend.journal_path.read_text(encoding="utf-8").splitlines()) == 3
+        assert set(MonitorState.load([backend]).items) == {"https://shop.ru/b", "https://shop.ru/c"}
+
+    def test_compaction_at_threshold(self, tmp_path):
+        """Журнал больше порога сворачивается в снимок и удаляется"""
+        snapshot_path = tmp_path / "state.json"
+        snapshot_path.write_text(json.dumps(SNAPSHOT), encoding="utf-8")
+        backend = JournalFileBackend(snapshot_path, compact_bytes=200)
+        state = MonitorState.load([backend])
+
+        state.add_items([new_item("b")])
+        state.save()
+        assert backend.journal_path.exists()
+        state.add_items([new_item("c"), new_item("d")])
+        state.save()
+
+        assert not backend.journal_path.exists()
+        saved = json.loads(snapshot_path.read_text(encoding="utf-8"))
+        assert set(saved["known_items"]) == {"https://shop.ru/a", "https://shop.ru/b",
+                                             "https://shop.ru/c", "https://shop.ru/d"}
+
+    def test_first_save_writes_snapshot(self, tmp_path):
+        """Без снимка первое сохранение сразу создает его"""
+        backend = JournalFileBackend(tmp_path / "nested" / "state.json")
+        state = MonitorState({}, [backend])
+
+        state.add_items([new_item("a")])
+        state.save()
+
+        assert (tmp_path / "nested" / "state.json").exists()
+        assert not backend.journal_path.exists()
+
+    def test_compressed_snapshot_name(self, tmp_path):
+        """Сжатый снимок пишется в state.json.gz; снимок под прежним именем читается до первой свертки"""
+        snapshot_path = tmp_path / "state.json"
+        snapshot_path.write_text(json.dumps(SNAPSHOT), encoding="utf-8")
+        backend = JournalFileBackend(snapshot_path, fmt="gzip")
+        state = MonitorState.load([backend])
+
+        state.add_items([new_item("b")])
+        state.save()
+
+        assert (tmp_path / "state.json.gz").read_bytes().startswith(b"\x1f\x8b")
+        assert MonitorState.load([JournalFileBackend(snapshot_path)]).known_ids == {
+            "https://shop.ru/a", "https://shop.ru/b"}
+
+
+class TestS3JournalBackend:
+    """Тесты для журнала в S3"""
+
+    def test_delta_is_separate_object(self):
+        """Сохранение — одна маленькая дельта, снимок не перезаписывается"""
+        s3 = FakeS3(SNAPSHOT)
+        state = MonitorState.load([S3JournalBackend(s3)])
+
+        state.add_items([new_item("b")])
+        state.save()
+
+        assert s3.snapshot_uploads == 0
+        (body,) = s3.deltas.values()
+        assert [event["id"] for event in decode_events(body)] == ["https://shop.ru/b"]
+        assert set(MonitorState.load([S3JournalBackend(s3)]).items) == {"https://shop.ru/a", "https://shop.ru/b"}
+
+    def test_compaction_keeps_foreign_deltas(self):
+        """Сворачиваются только учтенные дельты; дельта параллельного прогона остается"""
+        s3 = FakeS3(SNAPSHOT)
+        state = MonitorState.load([S3JournalBackend(s3, compact_deltas=2)])
+        other = MonitorState.load([S3JournalBackend(s3)])
+
+        state.add_items([new_item("b")])
+        state.save()
+        other.add_items([new_item("x")])
+        other.save()
+        state.add_items([new_item("c")])
+        state.save()
+
+        assert s3.snapshot_uploads == 1
+        assert len(s3.deltas) == 1
+        assert set(MonitorState.load([S3JournalBackend(s3)]).items) == {
+            "https://shop.ru/a", "https://shop.ru/b", "https://shop.ru/c", "https://shop.ru/x"}
+
+
+class TestMonitorIntegration:
+    """Тесты для STATE_JOURNAL в vinyl_monitor"""
+
+    def test_save_state_appends_journal(self, tmp_path):
+        """С STATE_JOURNAL сохранение прогона дописывает журнал рядом со state.json"""
+        from vinyl_monitor import load_state, save_state
+        state_path = tmp_path / "state.json"
+        state_path.write_text(json.dumps(SNAPSHOT), encoding="utf-8")
+
+        with patch('vinyl_monitor.STATE_JOURNAL', True), patch('vinyl_monitor.STATE_PATH', state_path), \
+                patch('s3_storage.S3Storage', side_effect=ValueError("no creds")):
+            known = load_state()
+            save_state(known, [new_item("b")])
+
+        assert (tmp_path / "state.journal.jsonl").exists()
+        assert json.loads(state_path.read_text(encoding="utf-8")) == SNAPSHOT
@@ -0,0 +1,180 @@
+"""
+Тесты для state_shards.py
+"""
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import boto3
+import pytest
+from moto import mock_aws
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from monitor_state import JsonFileBackend, MonitorState, S3Backend  # noqa: E402
+from state_shards import (LocalShardStore, S3ShardStore,  # noqa: E402
+                          ShardedBackend, shard_source)
+
+BUCKET = "vinyl-monitor-test"
+RECENT = (datetime.now() - timedelta(days=1)).replace(microsecond=0).isoformat()
+LEGACY = {"known_items": {
+    "https://korobkavinyla.ru/catalog/tproduct/1-a": {"added_at": RECENT, "title": "A",
+                                                      "source": "korobkavinyla.ru"},
+    "https://korobkavinyla.ru/catalog/tproduct/2-b": {"added_at": "unknown"},
+    "https://vinyltap.co.uk/products/c": {"added_at": RECENT, "title": "C", "source": "vinyltap.co.uk"},
+    "https://www.avito.ru/moskva/d": {"added_at": RECENT, "title": "D", "source": "avito.ru"},
+}}
+
+
+class SpyStore(LocalShardStore):
+    """Локальные шарды со списком прочитанных и записанных файлов"""
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.reads, self.writes = [], []
+
+    def read(self, name):
+        self.reads.append(name)
+        return super().read(name)
+
+    def write(self, name, body, etag):
+        self.writes.append(name)
+        return super().write(name, body, etag)
+
+
+@pytest.fixture
+def shards(tmp_path):
+    """Каталог шардов, разложенный из прежнего state.json"""
+    legacy_path = tmp_path / "state.json"
+    legacy_path.write_text(json.dumps(LEGACY), encoding="utf-8")
+    ShardedBackend(LocalShardStore(tmp_path / "state.shards"), legacy=JsonFileBackend(legacy_path)).manifest()
+    return SpyStore(tmp_path / "state.shards")
+
+
+def new_item(source, name):
+    return {"id": f"https://{source}/{name}", "title": name.upper(), "source": source}
+
+
+class TestShardedBackend:
+    """Тесты для шардов по источникам"""
+
+    def test_source_fallback_to_host(self):
+        """У записей без source шард выбирается по хосту URL"""
+        assert shard_source("https://www.avito.ru/x", {}) == "avito.ru"
+        assert shard_source("https://shop.ru/x", {"source": "vinyltap.co.uk"}) == "vinyltap.co.uk"
+
+    def test_migration_from_legacy(self, shards):
+        """Без манифеста прежний state.json раскладывается по источникам"""
+        manifest = json.loads((shards.directory / "manifest.json").read_text(encoding="utf-8"))["shards"]
+
+        assert {source: entry["count"] for source, entry in manifest.items()} == {
+            "korobkavinyla.ru": 2, "vinyltap.co.uk": 1, "avito.ru": 1}
+        assert manifest["avito.ru"]["recent"] == [RECENT]
+        assert MonitorState.load([ShardedBackend(shards)]).items == LEGACY["known_items"]
+
+    def test_loads_only_requested_sources(self, shards):
+        """Прогон только по Авито читает манифест и один шард"""
+        state = MonitorState.load([ShardedBackend(shards, sources=["avito.ru"])])
+
+        assert state.known_ids == {"https://www.avito.ru/moskva/d"}
+        assert shards.reads == ["manifest.json", "avito.ru.json"]
+
+    def test_save_writes_only_dirty_shards(self, shards):
+        """Сохранение переписывает шард с новыми позициями и манифест, остальные не трогает"""
+        state = MonitorState.load([ShardedBackend(shards, sources=["avito.ru"])])
+
+        state.add_items([new_item("avito.ru", "e")])
+        state.save()
+
+        assert shards.writes == ["avito.ru.json", "manifest.json"]
+        full = MonitorState.load([ShardedBackend(LocalShardStore(shards.directory))])
+        assert len(full.items) == 5
+
+    def test_unloaded_shard_not_overwritten(self, shards):
+        """Новая позиция источника, шард которого не загружали: старая история сохраняется"""
+        state = MonitorState.load([ShardedBackend(shards, sources=["avito.ru"])])
+
+        state.add_items([new_item("vinyltap.co.uk", "f")])
+        state.save()
+
+        reloaded = MonitorState.load([ShardedBackend(LocalShardStore(shards.directory), sources=["vinyltap.co.uk"])])
+        assert reloaded.known_ids == {"https://vinyltap.co.uk/products/c", "https://vinyltap.co.uk/f"}
+
+    def test_load_sources_extends_state(self, shards):
+        """Догрузка шарда источника, найденного прогоном"""
+        state = MonitorState.load([ShardedBackend(shards, sources=["avito.ru"])])
+
+        assert state.load_sources(["vinyltap.co.uk", "avito.ru"]) == {"https://vinyltap.co.uk/products/c"}
+        assert state.info("https://vinyltap.co.uk/products/c")["title"] == "C"
+
+
+    def test_format_switch_writes_suffixed_shard(self, shards):
+        """После смены формата на gzip шард пишется как avito.ru.json.gz, прежний .json читается по манифесту"""
+        state = MonitorState.load([ShardedBackend(shards, sources=["avito.ru"], fmt="gzip")])
+
+        state.add_items([new_item("avito.ru", "e")])
+        state.save()
+
+        assert shards.reads == ["manifest.json", "avito.ru.json"]
+        assert shards.writes == ["avito.ru.json.gz", "manifest.json"]
+        assert (shards.directory / "avito.ru.json.gz").read_bytes().startswith(b"\x1f\x8b")
+        reloaded = MonitorState.load([ShardedBackend(LocalShardStore(shards.directory), sources=["avito.ru"])])
+        assert reloaded.known_ids == {"https://www.avito.ru/moskva/d", "https://avito.ru/e"}
+
+
+class TestS3Shards:
+    """Шарды в S3 (moto)"""
+
+    @pytest.fixture
+    def s3(self):
+        env = {"S3_ACCESS_KEY": "key", "S3_SECRET_KEY": "secret", "S3_ENDPOINT_URL": "",
+               "S3_BUCKET": BUCKET, "S3_REGION": "us-east-1"}
+        with patch.dict(os.environ, env), mock_aws():
+            boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+            from s3_storage import S3Storage
+            storage = S3Storage()
+            storage.upload_state(LEGACY)
+            yield storage
+
+    def test_concurrent_writers(self, s3):
+        """Два прогона пишут в один шард и в разные: ничья позиция и запись манифеста не теряются"""
+        from s3_storage import S3Storage
+        first = MonitorState.load([ShardedBackend(S3ShardStore(s3), ["avito.ru"], S3Backend(s3))])
+        second = MonitorState.load([ShardedBackend(S3ShardStore(S3Storage()), ["avito.ru"])])
+
+        first.add_items([new_item("avito.ru", "e"), new_item("vinyltap.co.uk", "g")])
+        first.save()
+        second.add_items([new_item("avito.ru", "f")])
+        second.save()
+
+        assert S3Storage().load_known_items(["avito.ru"]) == {
+            "https://www.avito.ru/moskva/d", "https://avito.ru/e", "https://avito.ru/f"}
+        assert len(S3Storage().load_known_items()) == 7
+
+    def test_load_known_items_without_shards(self, s3):
+        """Пока шардов нет, load_known_items читает прежний state.json"""
+        assert len(s3.load_known_items()) == 4
+
+
+class TestMonitorIntegration:
+    """Тесты для STATE_SHARDS в vinyl_monitor"""
+
+    def test_partial_run_and_arrival_history(self, tmp_path):
+        """Прогон по одному источнику; история поступлений берется из манифеста, без загрузки шардов"""
+        from vinyl_monitor import load_arrival_history, load_state, save_state
+        state_path = tmp_path / "state.json"
+        state_path.write_text(json.dumps(LEGACY), encoding="utf-8")
+
+        with patch('vinyl_monitor.STATE_SHARDS', True), patch('vinyl_monitor.STATE_PATH', state_path), \
+                patch('s3_storage.S3Storage', side_effect=ValueError("no creds")):
+            known = load_state(["avito.ru"])
+            save_state(known, [new_item("avito.ru", "e")])
+            with patch('state_shards.ShardedBackend._read_shard', side_effect=AssertionError("шард читать незачем")):
+                history = load_arrival_history()
+
+        assert known == {"https://www.avito.ru/moskva/d"}
+        assert sorted(site for site, _ in history) == ["avito", "avito", "korobkavinyla", "vinyltap"]
+        assert json.loads(state_path.read_text(encoding="utf-8")) == LEGACY
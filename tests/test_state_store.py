@@ -0,0 +1,162 @@
+"""
+Тесты для state_store.py
+"""
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from state_store import StateStore, import_json  # noqa: E402
+
+NEW_FORMAT = {"known_items": {
+    "https://shop.ru/a/": {"added_at": "2026-03-01T10:00:00", "title": "A", "source": "shop.ru"},
+    "https://shop.ru/b?utm=1": {"added_at": "unknown"},
+}}
+OLD_FORMAT = {"known_ids": ["https://shop.ru/a", "https://shop.ru/c"]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    with StateStore(tmp_path / "state.db") as opened:
+        yield opened
+
+
+class TestStateStore:
+    """Тесты для базы состояния"""
+
+    def test_wal_and_indexes(self, store):
+        """База в режиме WAL, индексы по источнику, названию и времени добавления"""
+        indexes = {row[0] for row in store._conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+        assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert {"items_source", "items_title", "items_added_at"} <= indexes
+
+    def test_import_both_formats(self, store):
+        """Перенос понимает known_items и старый known_ids; ID нормализуются, база важнее"""
+        assert store.import_state(NEW_FORMAT) == 2
+        assert store.import_state(OLD_FORMAT) == 1
+
+        assert store.known_ids() == {"https://shop.ru/a", "https://shop.ru/b", "https://shop.ru/c"}
+        assert store.get("https://shop.ru/a")["title"] == "A"
+        assert store.get("https://shop.ru/c") == {"source": "", "title": "", "added_at": "unknown"}
+
+    def test_add_items_one_transaction(self, store):
+        """Новые позиции прогона — одна транзакция на весь пакет"""
+        statements = []
+        store._conn.set_trace_callback(statements.append)
+
+        store.add_items([{"id": f"https://shop.ru/{i}", "title": f"T{i}", "source": "shop.ru"} for i in range(50)],
+                        added_at="2026-03-02T12:00:00")
+
+        assert len(store) == 50
+        assert sum(statement.startswith("BEGIN") for statement in statements) == 1
+        assert store.get("https://shop.ru/7") == {"source": "shop.ru", "title": "T7", "added_at": "2026-03-02T12:00:00"}
+
+    def test_add_items_keeps_added_at_and_title_duplicates(self, store):
+        """Повтор не сдвигает время добавления; другой URL с тем же названием тоже запоминается"""
+        store.add_items([{"id": "https://shop.ru/a", "title": "", "source": "shop.ru"}], added_at="2026-03-01T10:00:00")
+        store.add_items([{"id": "https://shop.ru/a/", "title": "A", "source": "shop.ru"},
+                         {"id": "https://shop.ru/a-copy", "title": "A", "source": "shop.ru"},
+                         {"id": "https://other.ru/a", "title": "A", "source": "other.ru"}],
+                        added_at="2026-03-02T10:00:00")
+
+        assert store.get("https://shop.ru/a") == {"source": "shop.ru", "title": "A", "added_at": "2026-03-01T10:00:00"}
+        assert store.known_ids() == {"https://shop.ru/a", "https://shop.ru/a-copy", "https://other.ru/a"}
+
+    def test_relisted_ids(self, store):
+        """Название, известное у того же источника под другим URL, — повтор; у другого источника — нет"""
+        store.add_items([{"id": "https://shop.ru/a", "title": "A", "source": "shop.ru"}])
+
+        assert store.relisted_ids([
+            {"id": "https://shop.ru/a-copy", "title": "A", "source": "shop.ru"},
+            {"id": "https://shop.ru/a/", "title": "A", "source": "shop.ru"},
+            {"id": "https://other.ru/a", "title": "A", "source": "other.ru"},
+            {"id": "https://shop.ru/b", "title": "", "source": "shop.ru"},
+        ]) == {"https://shop.ru/a-copy"}
+
+    def test_items_in_state_format(self, store):
+        """Позиции отдаются в формате known_items"""
+        store.import_state(NEW_FORMAT)
+
+        assert store.items() == {
+            "https://shop.ru/a": {"added_at": "2026-03-01T10:00:00", "title": "A", "source": "shop.ru"},
+            "https://shop.ru/b": {"added_at": "unknown", "title": "", "source": ""},
+        }
+
+    def test_import_json(self, tmp_path):
+        """Разовый перенос файла в базу"""
+        json_path = tmp_path / "state.json"
+        json_path.write_text(json.dumps(OLD_FORMAT), encoding="utf-8")
+
+        assert import_json(json_path, tmp_path / "state.db") == 2
+        with StateStore(tmp_path / "state.db") as store:
+            assert len(store) == 2
+
+
+class TestSqliteBackend:
+    """Тесты для STATE_BACKEND=sqlite в vinyl_monitor"""
+
+    @pytest.fixture(autouse=True)
+    def sqlite_backend(self, tmp_path):
+        state_path = tmp_path / "state.json"
+        state_path.write_text(json.dumps(NEW_FORMAT), encoding="utf-8")
+        with patch('vinyl_monitor.STATE_BACKEND', 'sqlite'), \
+                patch('vinyl_monitor.STATE_PATH', state_path), \
+                patch('s3_storage.S3Storage', side_effect=ValueError("no creds")):
+            yield state_path
+
+    def test_first_load_imports_json(self, sqlite_backend):
+        """Первая загрузка создает базу из state.json"""
+        from vinyl_monitor import load_state
+
+        assert load_state() == {"https://shop.ru/a", "https://shop.ru/b"}
+        assert sqlite_backend.with_suffix(".db").exists()
+
+    def test_save_writes_only_new_items(self, sqlite_backend):
+        """Сохранение дописывает новые позиции в базу, state.json не переписывается"""
+        from vinyl_monitor import get_item_info, load_state, save_state
+        load_state()
+        before = sqlite_backend.read_text(encoding="utf-8")
+
+        save_state({"https://shop.ru/a"}, [{"id": "https://shop.ru/new", "title": "New", "source": "shop.ru"}])
+
+        assert get_item_info("https://shop.ru/new")["title"] == "New"
+        assert load_state() == {"https://shop.ru/a", "https://shop.ru/b", "https://shop.ru/new"}
+        assert sqlite_backend.read_text(encoding="utf-8") == before
+
+    def test_same_title_in_two_stores_not_renotified(self, sqlite_backend):
+        """Тот же альбом в двух магазинах запоминается оба раза и не приходит повторно в следующем прогоне"""
+        from vinyl_monitor import load_state, notify_new_items, save_state
+        items = [{"id": "https://korobkavinyla.ru/x", "url": "https://korobkavinyla.ru/x", "title": "Album",
+                  "source": "korobkavinyla.ru", "price": "2 500 р."},
+                 {"id": "https://plastinka.com/x", "url": "https://plastinka.com/x", "title": "Album",
+                  "source": "plastinka.com", "price": "2 400 руб."}]
+
+        with patch('vinyl_monitor.send_telegram') as send:
+            known = load_state()
+            new_items, _ = notify_new_items(items, known)
+            save_state(known, new_items)
+            assert len(new_items) == 2 and send.call_count == 1
+
+            new_items, _ = notify_new_items(items, load_state())
+        assert new_items == [] and send.call_count == 1
+
+    def test_relisted_item_recorded_without_notification(self, sqlite_backend):
+        """Повтор названия у того же магазина под новым URL запоминается, но не отправляется"""
+        from vinyl_monitor import load_state, notify_new_items, save_state
+        relisted = [{"id": "https://shop.ru/a-copy", "url": "https://shop.ru/a-copy", "title": "A",
+                     "source": "shop.ru"}]
+
+        with patch('vinyl_monitor.send_telegram') as send:
+            known = load_state()
+            new_items, _ = notify_new_items(relisted, known)
+            save_state(known, new_items)
+
+        assert [item["id"] for item in new_items] == ["https://shop.ru/a-copy"]
+        assert not send.called
+        assert "https://shop.ru/a-copy" in load_state()
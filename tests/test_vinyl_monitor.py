@@ -19,6 +19,22 @@ from vinyl_monitor import (dedupe_keep_order, load_avito_config, load_state,
                            save_state, should_monitor_site)
 
 
+def main_with_sites(korobka, vinyltap):
+    """main, где korobkavinyla и vinyltap отдают позиции своих моков, а остальные каталоги реестра — пусто"""
+    from vinyl_monitor import main
+
+    sites = {"korobkavinyla": korobka, "vinyltap": vinyltap}
+
+    def scrape_site(adapter, browser=None, known_ids=None, browser_fallback=True):
+        site = sites.get(adapter.name)
+        return site(browser, known_ids) if site else []
+
+    # Отметки о проверке не пишутся в рабочий каталог: иначе следующим тестам «еще не пора»
+    with patch('vinyl_monitor.scrape_site', side_effect=scrape_site), \
+            patch('vinyl_monitor.update_last_check_time'), patch('vinyl_monitor.mark_full_crawl_done'):
+        main()
+
+
 class TestStateManagement:
     """Тесты для управления состоянием"""
 
@@ -1137,7 +1153,7 @@ class TestScrapingFunctionsExtended:
         mock_context.new_page.return_value = mock_page
 
         # Мокаем результат извлечения
-        with patch('vinyl_monitor.extract_items_from_dom') as mock_extract:
+        with patch('vinyl_monitor.extract_site_items') as mock_extract:
             mock_extract.return_value = [
                 {
                     "id": "https://korobkavinyla.ru/item1",
@@ -1149,7 +1165,9 @@ class TestScrapingFunctionsExtended:
 
             result = scrape_with_playwright()
 
-            assert len(result) == 20  # Два URL, каждый возвращает 10 элементов (1 элемент * 10 кликов)
+            # Один полный разбор на каждый URL; подгрузка не дублирует позиции
+            assert len(result) == 2
+            assert mock_extract.call_count == 2
             assert all(item["source"] == "korobkavinyla.ru" for item in result)
 
     @patch('vinyl_monitor.sync_playwright')
@@ -1183,7 +1201,7 @@ class TestScrapingFunctionsExtended:
         mock_context.new_page.return_value = mock_page
 
         # Мокаем результат извлечения
-        with patch('vinyl_monitor.extract_vinyltap_from_dom') as mock_extract:
+        with patch('vinyl_monitor.extract_site_items') as mock_extract:
             mock_extract.return_value = [
                 {
                     "id": "https://vinyltap.co.uk/item1",
@@ -1339,7 +1357,7 @@ class TestAdditionalScrapingTests:
         mock_btn.first = MagicMock()
 
         # Мокаем результат извлечения
-        with patch('vinyl_monitor.extract_items_from_dom') as mock_extract:
+        with patch('vinyl_monitor.extract_site_items') as mock_extract:
             mock_extract.return_value = [
                 {
                     "id": "https://korobkavinyla.ru/item1",
@@ -1351,7 +1369,10 @@ class TestAdditionalScrapingTests:
 
             result = scrape_with_playwright()
 
-            assert len(result) == 20  # Два URL, каждый возвращает 10 элементов (1 элемент * 10 кликов)
+            # Полный разбор один раз на URL, после нажатий забираются только новые карточки
+            assert len(result) == 2
+            assert mock_extract.call_count == 2
+            assert mock_btn.first.click.call_count == 40
             assert all(item["source"] == "korobkavinyla.ru" for item in result)
 
     @patch('vinyl_monitor.sync_playwright')
@@ -1375,7 +1396,7 @@ class TestAdditionalScrapingTests:
         mock_btn.first = MagicMock()
 
         # Мокаем результат извлечения
-        with patch('vinyl_monitor.extract_vinyltap_from_dom') as mock_extract:
+        with patch('vinyl_monitor.extract_site_items') as mock_extract:
             mock_extract.return_value = [
                 {
                     "id": "https://vinyltap.co.uk/item1",
@@ -1405,7 +1426,7 @@ class TestAdditionalScrapingTests:
         mock_context.new_page.return_value = mock_page
 
         # Мокаем исключение при извлечении
-        with patch('vinyl_monitor.extract_vinyltap_from_dom') as mock_extract:
+        with patch('vinyl_monitor.extract_site_items') as mock_extract:
             mock_extract.side_effect = Exception("Extraction error")
 
             result = scrape_vinyltap_with_playwright()
@@ -1545,15 +1566,13 @@ class TestAdvancedMainFunction:
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.update_last_check_time')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
-    @patch('vinyl_monitor.scrape_with_playwright')
+    @patch('vinyl_monitor.scrape_vinyltap')
+    @patch('vinyl_monitor.scrape_korobka')
     @patch('vinyl_monitor.should_monitor_site')
     def test_main_with_advanced_deduplication(self, mock_should_monitor, mock_scrape_korobka,
                                               mock_scrape_vinyltap, mock_scrape_avito,
                                               mock_update_avito, mock_load, mock_save, mock_send, mock_dedup):
         """Тест main с продвинутой дедупликацией"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load.return_value = set()
@@ -1578,7 +1597,7 @@ class TestAdvancedMainFunction:
         with patch('vinyl_monitor.KOROBKA_MONITOR_INTERVAL_HOURS', 24):
             with patch('vinyl_monitor.VINYLTAP_MONITOR_INTERVAL_HOURS', 3):
                 with patch('vinyl_monitor.AVITO_MONITOR_INTERVAL_HOURS', 6):
-                    main()
+                    main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что дедупликация была вызвана
         assert mock_dedup.called
@@ -1591,15 +1610,13 @@ class TestAdvancedMainFunction:
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.update_last_check_time')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
-    @patch('vinyl_monitor.scrape_with_playwright')
+    @patch('vinyl_monitor.scrape_vinyltap')
+    @patch('vinyl_monitor.scrape_korobka')
     @patch('vinyl_monitor.should_monitor_site')
     def test_main_with_message_chunking(self, mock_should_monitor, mock_scrape_korobka,
                                         mock_scrape_vinyltap, mock_scrape_avito,
                                         mock_update_avito, mock_load, mock_save, mock_send, mock_chunk):
         """Тест main с разбивкой сообщений"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load.return_value = set()
@@ -1616,7 +1633,7 @@ class TestAdvancedMainFunction:
         with patch('vinyl_monitor.KOROBKA_MONITOR_INTERVAL_HOURS', 24):
             with patch('vinyl_monitor.VINYLTAP_MONITOR_INTERVAL_HOURS', 3):
                 with patch('vinyl_monitor.AVITO_MONITOR_INTERVAL_HOURS', 6):
-                    main()
+                    main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что разбивка сообщений была вызвана
         assert mock_chunk.called
@@ -1628,15 +1645,13 @@ class TestAdvancedMainFunction:
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.update_last_check_time')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
-    @patch('vinyl_monitor.scrape_with_playwright')
+    @patch('vinyl_monitor.scrape_vinyltap')
+    @patch('vinyl_monitor.scrape_korobka')
     @patch('vinyl_monitor.should_monitor_site')
     def test_main_with_mixed_sources(self, mock_should_monitor, mock_scrape_korobka,
                                      mock_scrape_vinyltap, mock_scrape_avito,
                                      mock_update_avito, mock_load, mock_save, mock_send):
         """Тест main с элементами из разных источников"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load.return_value = set()
@@ -1654,7 +1669,7 @@ class TestAdvancedMainFunction:
         with patch('vinyl_monitor.KOROBKA_MONITOR_INTERVAL_HOURS', 24):
             with patch('vinyl_monitor.VINYLTAP_MONITOR_INTERVAL_HOURS', 3):
                 with patch('vinyl_monitor.AVITO_MONITOR_INTERVAL_HOURS', 6):
-                    main()
+                    main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что все источники были вызваны
         assert mock_scrape_korobka.called
@@ -1974,15 +1989,13 @@ class TestMainFunctionAdvanced:
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.update_last_check_time')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
-    @patch('vinyl_monitor.scrape_with_playwright')
+    @patch('vinyl_monitor.scrape_vinyltap')
+    @patch('vinyl_monitor.scrape_korobka')
     @patch('vinyl_monitor.should_monitor_site')
     def test_main_all_sites_monitored(self, mock_should_monitor, mock_scrape_korobka,
                                       mock_scrape_vinyltap, mock_scrape_avito,
                                       mock_update_avito, mock_load, mock_save, mock_send):
         """Тест main когда все сайты мониторятся"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load.return_value = set()
@@ -2000,7 +2013,7 @@ class TestMainFunctionAdvanced:
         with patch('vinyl_monitor.KOROBKA_MONITOR_INTERVAL_HOURS', 24):
             with patch('vinyl_monitor.VINYLTAP_MONITOR_INTERVAL_HOURS', 3):
                 with patch('vinyl_monitor.AVITO_MONITOR_INTERVAL_HOURS', 6):
-                    main()
+                    main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что все функции были вызваны
         assert mock_scrape_korobka.called
@@ -2014,15 +2027,13 @@ class TestMainFunctionAdvanced:
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.update_last_check_time')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
-    @patch('vinyl_monitor.scrape_with_playwright')
+    @patch('vinyl_monitor.scrape_vinyltap')
+    @patch('vinyl_monitor.scrape_korobka')
     @patch('vinyl_monitor.should_monitor_site')
     def test_main_no_sites_monitored(self, mock_should_monitor, mock_scrape_korobka,
                                      mock_scrape_vinyltap, mock_scrape_avito,
                                      mock_update_avito, mock_load, mock_save, mock_send):
         """Тест main когда ни один сайт не мониторится"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = False
         mock_load.return_value = set()
@@ -2030,13 +2041,13 @@ class TestMainFunctionAdvanced:
         with patch('vinyl_monitor.KOROBKA_MONITOR_INTERVAL_HOURS', 24):
             with patch('vinyl_monitor.VINYLTAP_MONITOR_INTERVAL_HOURS', 3):
                 with patch('vinyl_monitor.AVITO_MONITOR_INTERVAL_HOURS', 6):
-                    main()
+                    main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
-        # Проверяем, что scraping функции не были вызваны (кроме Авито, которое всегда вызывается)
+        # Ни одному сайту не пора: main выходит до загрузки состояния и сканирования
         assert not mock_scrape_korobka.called
         assert not mock_scrape_vinyltap.called
-        # Авито всегда вызывается в текущей реализации
-        assert mock_scrape_avito.called
+        assert not mock_scrape_avito.called
+        assert not mock_load.called
         assert not mock_send.called
         # save_state не вызывается, если нет новых элементов
         assert not mock_save.called
@@ -2046,15 +2057,13 @@ class TestMainFunctionAdvanced:
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.update_last_check_time')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
-    @patch('vinyl_monitor.scrape_with_playwright')
+    @patch('vinyl_monitor.scrape_vinyltap')
+    @patch('vinyl_monitor.scrape_korobka')
     @patch('vinyl_monitor.should_monitor_site')
     def test_main_with_duplicates(self, mock_should_monitor, mock_scrape_korobka,
                                   mock_scrape_vinyltap, mock_scrape_avito,
                                   mock_update_avito, mock_load, mock_save, mock_send):
         """Тест main с дубликатами"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load.return_value = {"test1"}  # Один элемент уже известен
@@ -2069,7 +2078,7 @@ class TestMainFunctionAdvanced:
         with patch('vinyl_monitor.KOROBKA_MONITOR_INTERVAL_HOURS', 24):
             with patch('vinyl_monitor.VINYLTAP_MONITOR_INTERVAL_HOURS', 3):
                 with patch('vinyl_monitor.AVITO_MONITOR_INTERVAL_HOURS', 6):
-                    main()
+                    main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что send_telegram был вызван с новыми элементами
         assert mock_send.called
@@ -2081,15 +2090,13 @@ class TestMainFunctionAdvanced:
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.update_last_check_time')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
-    @patch('vinyl_monitor.scrape_with_playwright')
+    @patch('vinyl_monitor.scrape_vinyltap')
+    @patch('vinyl_monitor.scrape_korobka')
     @patch('vinyl_monitor.should_monitor_site')
     def test_main_avito_only(self, mock_should_monitor, mock_scrape_korobka,
                              mock_scrape_vinyltap, mock_scrape_avito,
                              mock_update_avito, mock_load, mock_save, mock_send):
         """Тест main только с Авито"""
-        from vinyl_monitor import main
-
         # Настраиваем моки - только Авито мониторится
         def should_monitor_side_effect(site, interval):
             return site == "avito"
@@ -2104,7 +2111,7 @@ class TestMainFunctionAdvanced:
         with patch('vinyl_monitor.KOROBKA_MONITOR_INTERVAL_HOURS', 24):
             with patch('vinyl_monitor.VINYLTAP_MONITOR_INTERVAL_HOURS', 3):
                 with patch('vinyl_monitor.AVITO_MONITOR_INTERVAL_HOURS', 6):
-                    main()
+                    main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что только Авито было вызвано
         assert not mock_scrape_korobka.called
@@ -2565,8 +2572,8 @@ class TestMainFunctionErrorHandling:
     """Тесты для обработки ошибок в main функции"""
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -2575,8 +2582,6 @@ class TestMainFunctionErrorHandling:
                                      mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                      mock_should_monitor):
         """Тест main функции с ошибками скрапинга"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load_state.return_value = set()
@@ -2586,11 +2591,11 @@ class TestMainFunctionErrorHandling:
 
         # main должна поднять исключение, так как нет обработки ошибок
         with pytest.raises(Exception, match="Korobka failed"):
-            main()
+            main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -2599,8 +2604,6 @@ class TestMainFunctionErrorHandling:
                                     mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                     mock_should_monitor):
         """Тест main функции с ошибкой Telegram"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load_state.return_value = set()
@@ -2611,11 +2614,11 @@ class TestMainFunctionErrorHandling:
 
         # main должна поднять исключение, так как нет обработки ошибок
         with pytest.raises(Exception, match="Telegram failed"):
-            main()
+            main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -2624,8 +2627,6 @@ class TestMainFunctionErrorHandling:
                                       mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                       mock_should_monitor):
         """Тест main функции с ошибкой сохранения состояния"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load_state.return_value = set()
@@ -2636,7 +2637,7 @@ class TestMainFunctionErrorHandling:
 
         # main должна поднять исключение, так как нет обработки ошибок
         with pytest.raises(Exception, match="Save failed"):
-            main()
+            main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
 
 class TestTelegramErrorHandling:
@@ -2853,8 +2854,8 @@ class TestCompleteCoverage:
         assert result == []
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -2863,22 +2864,20 @@ class TestCompleteCoverage:
                                       mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                       mock_should_monitor):
         """Тест main функции с пропуском korobka по интервалу (строки 698, 702-703)"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.side_effect = lambda site, interval: site != "korobkavinyla"
         mock_load_state.return_value = set()
         mock_scrape_vinyltap.return_value = []
         mock_scrape_avito.return_value = []
 
-        main()
+        main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что korobka не был вызван
         mock_scrape_korobka.assert_not_called()
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -2887,22 +2886,20 @@ class TestCompleteCoverage:
                                        mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                        mock_should_monitor):
         """Тест main функции с пропуском vinyltap по интервалу"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.side_effect = lambda site, interval: site != "vinyltap"
         mock_load_state.return_value = set()
         mock_scrape_korobka.return_value = []
         mock_scrape_avito.return_value = []
 
-        main()
+        main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что vinyltap не был вызван
         mock_scrape_vinyltap.assert_not_called()
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -2911,8 +2908,6 @@ class TestCompleteCoverage:
                                     mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                     mock_should_monitor):
         """Тест main функции с пропуском avito по интервалу"""
-        from vinyl_monitor import main
-
         # Настраиваем моки - avito возвращает пустой список (пропуск по интервалу)
         mock_should_monitor.return_value = True
         mock_load_state.return_value = set()
@@ -2920,41 +2915,39 @@ class TestCompleteCoverage:
         mock_scrape_vinyltap.return_value = []
         mock_scrape_avito.return_value = []  # Avito пропускает по интервалу
 
-        main()
+        main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что avito был вызван, но вернул пустой список
         mock_scrape_avito.assert_called()
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
-    @patch('vinyl_monitor.scrape_plastinka_with_playwright')
+    @patch('vinyl_monitor.scrape_due_site')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
     @patch('vinyl_monitor.send_telegram')
     def test_main_no_new_items(self, mock_send_telegram, mock_save_state, mock_load_state,
-                               mock_scrape_plastinka, mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
+                               mock_scrape_due_site, mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                mock_should_monitor):
         """Тест main функции без новых элементов (строки 712-714)"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load_state.return_value = set(["existing_id"])
         mock_scrape_korobka.return_value = [{"id": "existing_id", "title": "Existing", "price": "100"}]
         mock_scrape_vinyltap.return_value = []
         mock_scrape_avito.return_value = []
-        mock_scrape_plastinka.return_value = []
+        mock_scrape_due_site.return_value = []
 
-        main()
+        main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что send_telegram не был вызван (нет новых элементов)
         mock_send_telegram.assert_not_called()
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -2963,8 +2956,6 @@ class TestCompleteCoverage:
                                        mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                        mock_should_monitor):
         """Тест форматирования элементов Avito в main функции (строки 776-782)"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load_state.return_value = set()
@@ -2974,14 +2965,14 @@ class TestCompleteCoverage:
             {"id": "avito1", "title": "Avito Item", "price": "200", "source": "avito", "query": "test query"}
         ]
 
-        main()
+        main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что send_telegram был вызван
         mock_send_telegram.assert_called()
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -2990,8 +2981,6 @@ class TestCompleteCoverage:
                                mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                mock_should_monitor):
         """Тест main функции с пустыми элементами Avito (строки 785-791)"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load_state.return_value = set()
@@ -2999,14 +2988,14 @@ class TestCompleteCoverage:
         mock_scrape_vinyltap.return_value = []
         mock_scrape_avito.return_value = []
 
-        main()
+        main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что send_telegram не был вызван для Avito
         # (так как нет элементов Avito)
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -3015,8 +3004,6 @@ class TestCompleteCoverage:
                                        mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                        mock_should_monitor):
         """Тест main функции с элементами Avito с запросом (строки 794-802)"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load_state.return_value = set()
@@ -3026,14 +3013,14 @@ class TestCompleteCoverage:
             {"id": "avito1", "title": "Avito Item", "price": "200", "source": "avito", "query": "test query"}
         ]
 
-        main()
+        main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что send_telegram был вызван с правильным форматированием
         mock_send_telegram.assert_called()
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -3042,8 +3029,6 @@ class TestCompleteCoverage:
                               mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                               mock_should_monitor):
         """Тест финального сообщения в main функции (строка 819)"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load_state.return_value = set()
@@ -3051,7 +3036,7 @@ class TestCompleteCoverage:
         mock_scrape_vinyltap.return_value = []
         mock_scrape_avito.return_value = []
 
-        main()
+        main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что send_telegram был вызван
         mock_send_telegram.assert_called()
@@ -3217,8 +3202,8 @@ class TestCompleteCoverage:
         assert result == []
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -3227,8 +3212,6 @@ class TestCompleteCoverage:
                                           mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                           mock_should_monitor):
         """Тест форматирования элементов korobka в main функции (строки 776-782)"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load_state.return_value = set()
@@ -3238,14 +3221,14 @@ class TestCompleteCoverage:
         mock_scrape_vinyltap.return_value = []
         mock_scrape_avito.return_value = []
 
-        main()
+        main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что send_telegram был вызван с правильным форматированием
         mock_send_telegram.assert_called()
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -3254,8 +3237,6 @@ class TestCompleteCoverage:
                                            mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                            mock_should_monitor):
         """Тест форматирования элементов vinyltap в main функции (строки 785-791)"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load_state.return_value = set()
@@ -3265,14 +3246,14 @@ class TestCompleteCoverage:
         ]
         mock_scrape_avito.return_value = []
 
-        main()
+        main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что send_telegram был вызван с правильным форматированием
         mock_send_telegram.assert_called()
 
     @patch('vinyl_monitor.should_monitor_site')
-    @patch('vinyl_monitor.scrape_with_playwright')
-    @patch('vinyl_monitor.scrape_vinyltap_with_playwright')
+    @patch('vinyl_monitor.scrape_korobka')
+    @patch('vinyl_monitor.scrape_vinyltap')
     @patch('vinyl_monitor.scrape_avito_with_playwright')
     @patch('vinyl_monitor.load_state')
     @patch('vinyl_monitor.save_state')
@@ -3281,8 +3262,6 @@ class TestCompleteCoverage:
                                                   mock_scrape_avito, mock_scrape_vinyltap, mock_scrape_korobka,
                                                   mock_should_monitor):
         """Тест форматирования элементов Avito с запросом в main функции (строки 794-802)"""
-        from vinyl_monitor import main
-
         # Настраиваем моки
         mock_should_monitor.return_value = True
         mock_load_state.return_value = set()
@@ -3292,7 +3271,7 @@ class TestCompleteCoverage:
             {"id": "avito1", "title": "Avito Item", "price": "300", "url": "https://avito.com/item1", "query": "test query"}
         ]
 
-        main()
+        main_with_sites(mock_scrape_korobka, mock_scrape_vinyltap)
 
         # Проверяем, что send_telegram был вызван с правильным форматированием
         mock_send_telegram.assert_called()
@@ -3438,5 +3417,308 @@ class TestConvertStateCoverage:
         mock_file.assert_called()
 
 
+class TestAsyncEngineIntegration:
+    """Тесты для параллельного сканирования в main"""
+
+    @patch('vinyl_monitor.should_monitor_site')
+    def test_get_due_sites(self, mock_should_monitor):
+        """Сайты, которым пора сканироваться; отключенный Авито пропускается"""
+        from vinyl_monitor import get_due_sites
+
+        mock_should_monitor.side_effect = lambda site, interval: site != "vinyltap"
+
+        assert get_due_sites({"enabled": True}) == ["korobkavinyla", "plastinka", "avito"]
+        assert get_due_sites({"enabled": False}) == ["korobkavinyla", "plastinka"]
+
+    def test_build_site_tasks(self):
+        """Одна задача на каждую страницу каталога и одна на весь поиск Авито"""
+        from vinyl_monitor import build_site_tasks
+
+        tasks = build_site_tasks(["korobkavinyla", "vinyltap", "avito", "plastinka"],
+                                 {"base_url": "https://www.avito.ru/sankt_peterburg_i_lo/"})
+
+        assert [task.site for task in tasks] == ["korobkavinyla", "korobkavinyla", "vinyltap", "vinyltap",
+                                                 "plastinka", "avito"]
+        assert {task.host for task in tasks} == {"korobkavinyla.ru", "vinyltap.co.uk", "avito.ru", "plastinka.com"}
+
+    def test_site_tasks_own_and_close_sessions(self):
+        """У каждой задачи API своя сессия, и задача закрывает ее — и после успеха, и после ошибки"""
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        from korobka_api import TildaStoreError
+        from vinyl_monitor import build_site_tasks
+
+        sessions = []
+        fetch = MagicMock(side_effect=[[{"id": "1"}], TildaStoreError("503")])
+
+        def fake_api_source(adapter):
+            sessions.append(MagicMock())
+            return sessions[-1], lambda session, url, known_ids: fetch(), TildaStoreError
+
+        with patch('vinyl_monitor.api_source', side_effect=fake_api_source), \
+                patch('vinyl_monitor.scrape_catalog_page_async', new=AsyncMock(return_value=[])):
+            tasks = build_site_tasks(["korobkavinyla"], {})
+            assert sessions == []
+            results = [asyncio.run(task.run(MagicMock())) for task in tasks]
+
+        assert results == [[{"id": "1"}], []]
+        assert len(sessions) == len(tasks) == 2
+        assert all(session.close.call_count == 1 for session in sessions)
+
+    def test_scrape_catalog_page_async(self):
+        """Страница загружается, кнопка подгрузки нажимается, извлечение одно"""
+        import asyncio
+        from contextlib import asynccontextmanager
+        from unittest.mock import AsyncMock
+
+        from vinyl_monitor import KOROBKA_ITEMS_JS, scrape_catalog_page_async
+
+        page = MagicMock()
+        page.goto = AsyncMock()
+        page.wait_for_timeout = AsyncMock()
+        btn = page.locator.return_value.or_.return_value.or_.return_value
+        btn.count = AsyncMock(side_effect=[1, 1, 0])
+        btn.first.scroll_into_view_if_needed = AsyncMock()
+        btn.first.click = AsyncMock()
+        full_scan = [
+            {"id": "https://korobkavinyla.ru/a/", "url": "https://korobkavinyla.ru/a/", "title": "A", "price": "1"},
+            {"id": "https://korobkavinyla.ru/a", "url": "https://korobkavinyla.ru/a", "title": "A", "price": "1"},
+        ]
+        # Полный разбор, установка наблюдателя, затем две порции новых карточек
+        page.evaluate = AsyncMock(side_effect=[
+            full_scan, None,
+            [{"id": "https://korobkavinyla.ru/b", "url": "https://korobkavinyla.ru/b", "title": "B", "price": "2"}],
+            [],
+        ])
+
+        browser = MagicMock()
+
+        @asynccontextmanager
+        async def site_page(site, timeout_ms=None):
+            yield page
+
+        browser.site_page = site_page
+
+        with patch('vinyl_monitor.asyncio.sleep', new=AsyncMock()):
+            result = asyncio.run(scrape_catalog_page_async(browser, "korobkavinyla", "https://korobkavinyla.ru/catalog",
+                                                           KOROBKA_ITEMS_JS, max_clicks=20))
+
+        assert btn.first.click.await_count == 2
+        # Полный разбор страницы только один раз
+        full_scans = [call for call in page.evaluate.await_args_list if call[0] == (KOROBKA_ITEMS_JS,)]
+        assert len(full_scans) == 1
+        assert result == [{"id": "https://korobkavinyla.ru/a", "url": "https://korobkavinyla.ru/a/",
+                           "title": "A", "price": "1"},
+                          {"id": "https://korobkavinyla.ru/b", "url": "https://korobkavinyla.ru/b",
+                           "title": "B", "price": "2"}]
+
+    def test_scrape_catalog_page_async_load_failure(self):
+        """Если страница не загрузилась, задача завершается ошибкой"""
+        import asyncio
+        from contextlib import asynccontextmanager
+        from unittest.mock import AsyncMock
+
+        from vinyl_monitor import scrape_catalog_page_async
+
+        page = MagicMock()
+        page.goto = AsyncMock(side_effect=Exception("Network error"))
+        browser = MagicMock()
+
+        @asynccontextmanager
+        async def site_page(site, timeout_ms=None):
+            yield page
+
+        browser.site_page = site_page
+
+        with patch('vinyl_monitor.asyncio.sleep', new=AsyncMock()):
+            with pytest.raises(RuntimeError):
+                asyncio.run(scrape_catalog_page_async(browser, "plastinka", "https://plastinka.com/lp", "js"))
+        assert page.goto.await_count == 3
+
+    @patch('vinyl_monitor.update_last_check_time')
+    @patch('vinyl_monitor.run_tasks')
+    def test_scrape_sites_async_merges_results(self, mock_run_tasks, mock_update):
+        """Источник проставляется, время проверки обновляется только у успешных сайтов"""
+        from vinyl_monitor import scrape_sites_async
+
+        mock_run_tasks.return_value = (
+            {"korobkavinyla": [{"id": "k1", "url": "k1", "title": "K"}], "plastinka": []},
+            {"plastinka"},
+        )
+
+        items = scrape_sites_async(["korobkavinyla", "plastinka"], {})
+
+        assert items == [{"id": "k1", "url": "k1", "title": "K", "source": "korobkavinyla.ru"}]
+        mock_update.assert_called_once_with("korobkavinyla")
+
+    @patch('vinyl_monitor.run_tasks')
+    def test_scrape_sites_async_nothing_due(self, mock_run_tasks):
+        """Если ни один сайт не пора сканировать, браузер не поднимается"""
+        from vinyl_monitor import scrape_sites_async
+
+        assert scrape_sites_async([], {}) == []
+        mock_run_tasks.assert_not_called()
+
+    @patch('vinyl_monitor.send_telegram')
+    @patch('vinyl_monitor.save_state')
+    @patch('vinyl_monitor.load_state')
+    @patch('vinyl_monitor.scrape_sites_async')
+    @patch('vinyl_monitor.get_due_sites')
+    @patch('vinyl_monitor.scrape_korobka')
+    def test_main_async_engine(self, mock_scrape_korobka, mock_due, mock_scrape_async,
+                               mock_load, mock_save, mock_send):
+        """С ASYNC_ENGINE main собирает позиции через параллельный движок"""
+        from vinyl_monitor import main
+
+        mock_load.return_value = set()
+        mock_due.return_value = ["korobkavinyla", "plastinka"]
+        mock_scrape_async.return_value = [
+            {"id": "k1", "url": "https://korobkavinyla.ru/k1", "title": "K", "price": "1", "source": "korobkavinyla.ru"},
+            {"id": "p1", "url": "https://plastinka.com/item/p1", "title": "P", "price": "2", "source": "plastinka.com"},
+        ]
+
+        with patch('vinyl_monitor.ASYNC_ENGINE', True), patch('vinyl_monitor.load_avito_config', return_value={}):
+            main()
+
+        mock_scrape_korobka.assert_not_called()
+        mock_scrape_async.assert_called_once_with(["korobkavinyla", "plastinka"], {}, set())
+        message = mock_send.call_args[0][0]
+        assert "korobkavinyla.ru" in message and "plastinka.com" in message
+        assert mock_save.called
+
+
+
+class TestIncrementalCrawl:
+    """Тесты для инкрементального обхода с остановкой на известных позициях"""
+
+    def test_batch_all_known(self):
+        """Проверяется только порция, которой еще не было"""
+        from vinyl_monitor import batch_all_known
+
+        seen = set()
+        known = {"https://a.ru/1", "https://a.ru/2"}
+
+        assert not batch_all_known([{"id": "https://a.ru/1/"}, {"id": "https://a.ru/3"}], seen, known)
+        # Повтор старых карточек плюс известная новая — порция целиком известна
+        assert batch_all_known([{"id": "https://a.ru/1"}, {"id": "https://a.ru/3"}, {"id": "https://a.ru/2"}],
+                               seen, known)
+        # Подгрузка ничего не добавила — это не повод останавливаться
+        assert not batch_all_known([{"id": "https://a.ru/1"}], seen, known)
+
+    @patch('vinyl_monitor.update_last_check_time')
+    @patch('vinyl_monitor.should_monitor_site')
+    def test_crawl_known_ids_schedule(self, mock_should_monitor, mock_update):
+        """Полный обход идет по своему расписанию"""
+        from vinyl_monitor import crawl_known_ids, mark_full_crawl_done
+
+        known = {"a"}
+        mock_should_monitor.return_value = False
+        assert crawl_known_ids("vinyltap", known) is known
+        mock_should_monitor.assert_called_with("full_vinyltap", 24)
+        mark_full_crawl_done("vinyltap", known)
+        mock_update.assert_not_called()
+
+        mock_should_monitor.return_value = True
+        assert crawl_known_ids("vinyltap", known) is None
+        mark_full_crawl_done("vinyltap", None)
+        mock_update.assert_called_once_with("full_vinyltap")
+
+        with patch('vinyl_monitor.INCREMENTAL_CRAWL', False):
+            mock_should_monitor.return_value = False
+            assert crawl_known_ids("vinyltap", known) is None
+
+    @patch('vinyl_monitor.sync_playwright')
+    def test_korobka_stops_on_known_page(self, mock_playwright):
+        """korobkavinyla не нажимает подгрузку, если первая порция уже известна"""
+        from vinyl_monitor import scrape_with_playwright
+
+        mock_page = MagicMock()
+        mock_playwright.return_value.__enter__.return_value.chromium.launch.return_value \
+            .new_context.return_value.new_page.return_value = mock_page
+        mock_btn = mock_page.locator.return_value.or_.return_value.or_.return_value
+        mock_btn.count.return_value = 1
+
+        with patch('vinyl_monitor.extract_site_items') as mock_extract, patch('vinyl_monitor.time.sleep'):
+            mock_extract.return_value = [{"id": "https://korobkavinyla.ru/item1", "url": "https://korobkavinyla.ru/item1",
+                                          "title": "Test Item", "price": "1000 руб"}]
+            result = scrape_with_playwright(known_ids={"https://korobkavinyla.ru/item1"})
+
+        assert len(result) == 2
+        mock_btn.first.click.assert_not_called()
+
+    @patch('vinyl_monitor.sync_playwright')
+    def test_korobka_stops_after_known_batch(self, mock_playwright):
+        """korobkavinyla останавливается, когда подгрузка принесла только известные позиции"""
+        from vinyl_monitor import scrape_with_playwright
+
+        mock_page = MagicMock()
+        mock_playwright.return_value.__enter__.return_value.chromium.launch.return_value \
+            .new_context.return_value.new_page.return_value = mock_page
+        mock_btn = mock_page.locator.return_value.or_.return_value.or_.return_value
+        mock_btn.count.return_value = 1
+
+        first = [{"id": "https://korobkavinyla.ru/new", "url": "https://korobkavinyla.ru/new", "title": "N"}]
+        # Наблюдатель после нажатия отдает только известную позицию
+        mock_page.evaluate.return_value = [{"id": "https://korobkavinyla.ru/old", "url": "https://korobkavinyla.ru/old",
+                                            "title": "O"}]
+        with patch('vinyl_monitor.extract_site_items', return_value=first), patch('vinyl_monitor.time.sleep'):
+            result = scrape_with_playwright(None, ["https://korobkavinyla.ru/catalog"],
+                                            known_ids={"https://korobkavinyla.ru/old"})
+
+        assert mock_btn.first.click.call_count == 1
+        assert [item["title"] for item in result] == ["N", "O"]
+
+    def test_async_catalog_page_stops(self):
+        """Асинхронная подгрузка останавливается на порции известных позиций"""
+        import asyncio
+        from contextlib import asynccontextmanager
+        from unittest.mock import AsyncMock
+
+        from vinyl_monitor import scrape_catalog_page_async
+
+        page = MagicMock()
+        page.goto = AsyncMock()
+        page.wait_for_timeout = AsyncMock()
+        # Полный разбор, установка наблюдателя, порция после первого нажатия
+        page.evaluate = AsyncMock(side_effect=[[{"id": "https://p.com/new"}], None, [{"id": "https://p.com/old"}]])
+        btn = page.locator.return_value.or_.return_value.or_.return_value
+        btn.count = AsyncMock(return_value=1)
+        btn.first.scroll_into_view_if_needed = AsyncMock()
+        btn.first.click = AsyncMock()
+        browser = MagicMock()
+
+        @asynccontextmanager
+        async def site_page(site, timeout_ms=None):
+            yield page
+
+        browser.site_page = site_page
+
+        with patch('vinyl_monitor.asyncio.sleep', new=AsyncMock()):
+            result = asyncio.run(scrape_catalog_page_async(browser, "plastinka", "https://p.com/lp", "js",
+                                                           known_ids={"https://p.com/old"}))
+
+        assert btn.first.click.await_count == 1
+        assert [item["id"] for item in result] == ["https://p.com/new", "https://p.com/old"]
+
+    @patch('vinyl_monitor.update_last_check_time')
+    @patch('vinyl_monitor.run_tasks')
+    @patch('vinyl_monitor.build_site_tasks')
+    @patch('vinyl_monitor.should_monitor_site')
+    def test_scrape_sites_async_full_crawl(self, mock_should_monitor, mock_build, mock_run_tasks, mock_update):
+        """Параллельный движок получает known по сайтам и отмечает полный обход"""
+        from vinyl_monitor import scrape_sites_async
+
+        mock_should_monitor.side_effect = lambda site, interval: site == "full_plastinka"
+        mock_build.return_value = [MagicMock()]
+        mock_run_tasks.return_value = ({"vinyltap": [], "plastinka": [], "avito": []}, set())
+        known = {"a"}
+
+        scrape_sites_async(["vinyltap", "avito", "plastinka"], {}, known)
+
+        assert mock_build.call_args[0][2] == {"vinyltap": known, "plastinka": None}
+        updated = [call[0][0] for call in mock_update.call_args_list]
+        assert updated == ["vinyltap", "avito", "plastinka", "full_plastinka"]
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,296 @@
+"""
+Тесты для vinyltap_api.py
+"""
+import os
+import sys
+from dataclasses import replace
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+# Добавляем путь к модулю
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from vinyltap_api import (VINYLTAP_PAGE_LIMIT, ShopifyJSONError,  # noqa: E402
+                          collection_products_url, fetch_collection_items,
+                          is_vinyl_product, make_session, product_price,
+                          product_to_item)
+
+
+def make_product(handle, title="Artist - Album - LP", product_type="LP", tags=None, prices=("24.99",)):
+    """Товар в формате Shopify products.json"""
+    return {
+        "handle": handle,
+        "title": title,
+        "product_type": product_type,
+        "tags": tags or [],
+        "variants": [{"price": price, "available": True} for price in prices],
+    }
+
+
+def make_response(products):
+    response = MagicMock()
+    response.json.return_value = {"products": products}
+    return response
+
+
+class TestCollectionUrl:
+    """Тесты для построения URL products.json"""
+
+    def test_collection_products_url(self):
+        """Параметры страницы добавляются к handle коллекции"""
+        url = collection_products_url("https://vinyltap.co.uk/collections/new-releases/", 2)
+        assert url == "https://vinyltap.co.uk/collections/new-releases/products.json?limit=250&page=2"
+
+    def test_not_a_collection(self):
+        """URL без /collections/ не поддерживается"""
+        with pytest.raises(ShopifyJSONError):
+            collection_products_url("https://vinyltap.co.uk/pages/about", 1)
+
+
+class TestVinylFilter:
+    """Тесты для фильтра форматов"""
+
+    @pytest.mark.parametrize("product_type", ["LP", "2LP", "12 Inch", "7 Inch", "Vinyl"])
+    def test_vinyl_product_types(self, product_type):
+        """Виниловые типы товара проходят фильтр"""
+        assert is_vinyl_product(make_product("a", title="Album", product_type=product_type))
+
+    @pytest.mark.parametrize("product_type", ["CD", "2CD", "Cassette", "DVD"])
+    def test_not_vinyl_product_types(self, product_type):
+        """CD, кассеты и DVD отбрасываются даже с виниловыми тегами"""
+        assert not is_vinyl_product(make_product("a", product_type=product_type, tags=["vinyl"]))
+
+    def test_tags_when_type_empty(self):
+        """Без типа товара решают теги"""
+        assert is_vinyl_product(make_product("a", title="Album", product_type="", tags=["New", "Vinyl"]))
+        assert not is_vinyl_product(make_product("a", title="Album", product_type="", tags=["Merch"]))
+
+    def test_tags_as_string(self):
+        """Теги строкой через запятую тоже разбираются"""
+        assert is_vinyl_product(make_product("a", title="Album", product_type="", tags="new, 12 inch"))
+
+    def test_title_fallback(self):
+        """Без типа и тегов решает название, короткие маркеры ищутся как слова"""
+        assert is_vinyl_product(make_product("a", title="Artist - Album - LP", product_type=""))
+        assert not is_vinyl_product(make_product("a", title="Help! - CD", product_type=""))
+        assert not is_vinyl_product(make_product("a", title="Helper Tote Bag", product_type=""))
+
+
+class TestPrices:
+    """Тесты для цен в GBP"""
+
+    def test_min_available_variant(self):
+        """Берется минимальная цена среди доступных вариантов"""
+        product = make_product("a", prices=("29.99", "24.50"))
+        product["variants"].append({"price": "9.99", "available": False})
+        assert product_price(product) == Decimal("24.50")
+
+    def test_all_sold_out(self):
+        """Если доступных вариантов нет, цена берется из всех"""
+        product = {"variants": [{"price": "19.99", "available": False}]}
+        assert product_price(product) == Decimal("19.99")
+
+    def test_no_price(self):
+        """Без вариантов цены нет"""
+        assert product_price({"variants": []}) is None
+        assert product_price({"variants": [{"price": None}]}) is None
+
+    def test_product_to_item(self):
+        """Позиция совпадает по id с DOM-скрапером и несет числовую цену"""
+        item = product_to_item(make_product("young-lovers", "Paul & Paula - Young Lovers - 7 Inch",
+                                            prices=("7.5",)), "https://vinyltap.co.uk")
+        assert item == {
+            "id": "https://vinyltap.co.uk/products/young-lovers",
+            "url": "https://vinyltap.co.uk/products/young-lovers",
+            "title": "Paul & Paula - Young Lovers - 7 Inch",
+            "price": "£7.50",
+            "price_amount": Decimal("7.5"),
+            "currency": "GBP",
+        }
+
+
+class TestFetchCollectionItems:
+    """Тесты для постраничной загрузки коллекции"""
+
+    def test_pages_until_short_page(self):
+        """Страницы запрашиваются, пока Shopify не вернет неполную страницу"""
+        full_page = [make_product(f"lp-{i}") for i in range(VINYLTAP_PAGE_LIMIT)]
+        last_page = [make_product("lp-last"), make_product("cd-1", product_type="CD")]
+        session = MagicMock()
+        session.get.side_effect = [make_response(full_page), make_response(last_page)]
+
+        items = fetch_collection_items(session, "https://vinyltap.co.uk/collections/new-releases")
+
+        assert len(items) == VINYLTAP_PAGE_LIMIT + 1
+        assert session.get.call_count == 2
+        assert session.get.call_args[0][0].endswith("page=2")
+        assert items[-1]["id"] == "https://vinyltap.co.uk/products/lp-last"
+
+    def test_max_pages(self):
+        """Число страниц ограничено"""
+        session = MagicMock()
+        session.get.return_value = make_response([make_product(f"lp-{i}") for i in range(VINYLTAP_PAGE_LIMIT)])
+
+        fetch_collection_items(session, "https://vinyltap.co.uk/collections/new-releases", max_pages=3)
+
+        assert session.get.call_count == 3
+
+    def test_stops_on_known_page(self):
+        """Страница, где все позиции известны, завершает листание"""
+        page = [make_product(f"lp-{i}") for i in range(VINYLTAP_PAGE_LIMIT)]
+        session = MagicMock()
+        session.get.return_value = make_response(page)
+        known = {f"https://vinyltap.co.uk/products/lp-{i}" for i in range(VINYLTAP_PAGE_LIMIT)}
+
+        items = fetch_collection_items(session, "https://vinyltap.co.uk/collections/new-releases", known_ids=known)
+
+        assert session.get.call_count == 1
+        assert len(items) == VINYLTAP_PAGE_LIMIT
+
+    def test_duplicate_handles(self):
+        """Повтор товара на соседних страницах не дублирует позицию"""
+        session = MagicMock()
+        session.get.return_value = make_response([make_product("a"), make_product("a")])
+
+        assert len(fetch_collection_items(session, "https://vinyltap.co.uk/collections/x")) == 1
+
+    def test_http_error(self):
+        """Ошибка HTTP превращается в ShopifyJSONError"""
+        session = MagicMock()
+        session.get.return_value.raise_for_status.side_effect = requests.HTTPError("404")
+
+        with pytest.raises(ShopifyJSONError):
+            fetch_collection_items(session, "https://vinyltap.co.uk/collections/x")
+
+    def test_html_instead_of_json(self):
+        """HTML вместо JSON (например, капча) превращается в ShopifyJSONError"""
+        session = MagicMock()
+        session.get.return_value.json.side_effect = ValueError("Expecting value")
+
+        with pytest.raises(ShopifyJSONError):
+            fetch_collection_items(session, "https://vinyltap.co.uk/collections/x")
+
+    def test_unexpected_payload(self):
+        """Ответ без списка products считается ошибкой"""
+        session = MagicMock()
+        session.get.return_value.json.return_value = {"errors": "Not Found"}
+
+        with pytest.raises(ShopifyJSONError):
+            fetch_collection_items(session, "https://vinyltap.co.uk/collections/x")
+
+
+class TestSession:
+    """Тесты для сессии с пулом соединений"""
+
+    def test_make_session(self):
+        """HTTPS-адаптер с пулом и повторами"""
+        session = make_session()
+        adapter = session.get_adapter("https://vinyltap.co.uk")
+
+        assert adapter._pool_maxsize == 8
+        assert adapter.max_retries.total == 3
+        assert session.headers["Accept"] == "application/json"
+
+
+def vinyltap_collections(*handles):
+    """Реестр сайтов, где у vinyltap только указанные коллекции"""
+    from vinyl_monitor import SITE_ADAPTERS
+
+    urls = tuple(f"https://vinyltap.co.uk/collections/{handle}" for handle in handles)
+    return {"vinyltap": replace(SITE_ADAPTERS["vinyltap"], urls=urls)}
+
+
+class TestScrapeVinyltap:
+    """Тесты для выбора JSON или браузера в vinyl_monitor"""
+
+    @patch('vinyl_monitor.scrape_site_with_playwright')
+    @patch('vinyl_monitor.fetch_collection_items')
+    def test_json_success_skips_browser(self, mock_fetch, mock_playwright):
+        """Если JSON отвечает, браузер не используется"""
+        from vinyl_monitor import scrape_vinyltap
+
+        mock_fetch.return_value = [{"id": "https://vinyltap.co.uk/products/a", "title": "A", "price": "£1.00"}]
+
+        with patch.dict('vinyl_monitor.SITE_ADAPTERS', vinyltap_collections("a", "b")):
+            result = scrape_vinyltap()
+
+        assert len(result) == 2
+        assert all(item["source"] == "vinyltap.co.uk" for item in result)
+        mock_playwright.assert_not_called()
+
+    @patch('vinyl_monitor.scrape_site_with_playwright')
+    @patch('vinyl_monitor.fetch_collection_items')
+    def test_fallback_only_for_failed_collections(self, mock_fetch, mock_playwright):
+        """Браузер сканирует только коллекции, где JSON не ответил"""
+        from vinyl_monitor import scrape_vinyltap
+
+        mock_fetch.side_effect = [[{"id": "a", "title": "A"}], ShopifyJSONError("503")]
+        mock_playwright.return_value = [{"id": "b", "title": "B", "source": "vinyltap.co.uk"}]
+        browser = MagicMock()
+        adapters = vinyltap_collections("a", "b")
+
+        with patch.dict('vinyl_monitor.SITE_ADAPTERS', adapters):
+            result = scrape_vinyltap(browser)
+
+        assert [item["id"] for item in result] == ["a", "b"]
+        mock_playwright.assert_called_once_with(adapters["vinyltap"], browser,
+                                                ["https://vinyltap.co.uk/collections/b"], None)
+
+    @patch('vinyl_monitor.scrape_site_with_playwright')
+    @patch('vinyl_monitor.fetch_collection_items')
+    def test_json_disabled(self, mock_fetch, mock_playwright):
+        """VINYLTAP_JSON_API=false возвращает старое поведение"""
+        from vinyl_monitor import SITE_ADAPTERS, scrape_vinyltap
+
+        mock_playwright.return_value = []
+        with patch('vinyl_monitor.VINYLTAP_JSON_API', False):
+            scrape_vinyltap()
+
+        mock_fetch.assert_not_called()
+        mock_playwright.assert_called_once_with(SITE_ADAPTERS["vinyltap"], None, known_ids=None)
+
+    @patch('vinyl_monitor.send_telegram')
+    @patch('vinyl_monitor.save_state')
+    @patch('vinyl_monitor.load_state', return_value=set())
+    @patch('vinyl_monitor.update_last_check_time')
+    @patch('vinyl_monitor.should_monitor_site', return_value=True)
+    @patch('vinyl_monitor.BrowserManager')
+    @patch('vinyl_monitor.scrape_site_with_playwright')
+    @patch('vinyl_monitor.fetch_collection_items')
+    def test_main_without_playwright(self, mock_fetch, mock_playwright, mock_browser, mock_should_monitor,
+                                     mock_update, mock_load, mock_save, mock_send):
+        """USE_PLAYWRIGHT=false: коллекции читаются через JSON, упавшая ждет следующего прогона без браузера"""
+        from vinyl_monitor import main
+
+        mock_fetch.side_effect = [[{"id": "https://vinyltap.co.uk/products/a", "url": "https://vinyltap.co.uk/products/a",
+                                    "title": "Artist - Album", "price": "£20.00"}], ShopifyJSONError("503")]
+
+        with patch.dict('vinyl_monitor.SITE_ADAPTERS', vinyltap_collections("a", "b")), \
+                patch('vinyl_monitor.USE_PLAYWRIGHT', False), patch('vinyl_monitor.KOROBKA_TILDA_API', False), \
+                patch('vinyl_monitor.load_avito_config', return_value={}):
+            main()
+
+        assert mock_fetch.call_count == 2
+        mock_playwright.assert_not_called()
+        mock_browser.assert_not_called()
+        mock_update.assert_any_call("vinyltap")
+        assert "Artist - Album" in mock_send.call_args[0][0]
+
+    def test_async_collection_fallback(self):
+        """В параллельном движке ошибка JSON переводит коллекцию на браузер"""
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        from vinyl_monitor import SITE_ADAPTERS, api_source, scrape_site_page_async
+
+        with patch('vinyl_monitor.fetch_collection_items', side_effect=ShopifyJSONError("503")), \
+                patch('vinyl_monitor.scrape_catalog_page_async', new=AsyncMock(return_value=[{"id": "b"}])) as mock_page:
+            adapter = SITE_ADAPTERS["vinyltap"]
+            result = asyncio.run(scrape_site_page_async(MagicMock(), adapter, "https://vinyltap.co.uk/collections/b",
+                                                        api_source(adapter)))
+
+        assert result == [{"id": "b"}]
+        assert mock_page.await_args[0][1:3] == ("vinyltap", "https://vinyltap.co.uk/collections/b")
@@ -1,14 +1,41 @@
+import asyncio
 import json
 import os
-import re
+import signal
+import sys
+import threading
 import time
+from datetime import datetime, timedelta
 from html import escape
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-import requests
 from dotenv import load_dotenv
 
+from adaptive_intervals import (ArrivalModel, IntervalPolicy,
+                                adaptive_interval, parse_site_policies)
+from async_engine import (AsyncBrowserManager, ConcurrencyLimiter, SiteTask,
+                          parse_host_limits, run_tasks)
+from browser_manager import BrowserManager, shared_or_own_browser
+from incremental_extractor import (IncrementalExtractor, click_load_more,
+                                   click_load_more_async)
+from item_model import Item, canonical_id, make_items
+from known_index import KNOWN_INDEX_KINDS, KnownIndex
+from monitor_state import (STATE_STATS, JsonFileBackend, MonitorState,
+                           S3Backend, SqliteBackend, parse_state_json)
+from price_parser import format_amount, format_price, item_price, parse_prices
+from rate_limiter import BLOCKED_PAGE_JS, RATE_LIMITER, HostLimit, host_of
+from release_index import ReleaseIndex
+from release_matching import ReleaseMatcher
+from scheduler import DueScheduler
+from site_adapters import (LOAD_MORE_LABELS_EN, LOAD_MORE_LABELS_RU,
+                           SiteAdapter, anchor_items_js, card_items_js)
+from state_format import latest_state_file
+from state_journal import JournalFileBackend, S3JournalBackend
+from state_shards import (LocalShardStore, S3ShardStore, ShardedBackend,
+                          shard_arrivals)
+from state_store import StateStore, normalize_url
+
 load_dotenv()
 
 
@@ -37,108 +64,347 @@ def validate_url(url: str) -> bool:
 
 
 USE_PLAYWRIGHT = os.getenv("USE_PLAYWRIGHT", "true").lower() == "true"
-if USE_PLAYWRIGHT:
-    from playwright.sync_api import sync_playwright
+
+
+# Тяжелые зависимости (Playwright, requests, boto3) импортируются, только когда сайту
+# пора сканироваться: прогон по cron, в котором все сайты пропущены, их не загружает.
+def sync_playwright():
+    """playwright.sync_api.sync_playwright() с импортом при первом запуске браузера"""
+    from playwright.sync_api import sync_playwright as start
+    return start()
+
+
+def async_playwright():
+    """playwright.async_api.async_playwright() с импортом при первом запуске браузера"""
+    from playwright.async_api import async_playwright as start
+    return start()
+
+
+def __getattr__(name: str):
+    # vinyl_monitor.requests по-прежнему доступен (в том числе для patch в тестах)
+    if name == "requests":
+        import requests
+        return requests
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 CATALOG_URL = os.getenv("CATALOG_URL", "https://korobkavinyla.ru/catalog")
 KOROBKA_SALE_URL = os.getenv("KOROBKA_SALE_URL", "https://korobkavinyla.ru/catalog?tfc_sort%5B771567999%5D=created:desc&tfc_quantity%5B771567999%5D=y&tfc_storepartuid%5B771567999%5D=Sale&tfc_div=:::")
+KOROBKA_TILDA_API = os.getenv("KOROBKA_TILDA_API", "true").lower() == "true"  # API магазина Tilda вместо браузера
 VINYLTAP_URLS = os.getenv("VINYLTAP_URLS", "https://vinyltap.co.uk/collections/new-releases,https://vinyltap.co.uk/collections/upcoming-releases").split(",")
+VINYLTAP_JSON_API = os.getenv("VINYLTAP_JSON_API", "true").lower() == "true"  # Shopify products.json вместо браузера
 PLASTINKA_URL = os.getenv("PLASTINKA_URL", "https://plastinka.com/lp")
+VINYLFAMILY_SALE_URL = os.getenv("VINYLFAMILY_SALE_URL", "https://vinylfamily.shop/catalog")
+VINYLFAMILY_ENABLED = os.getenv("VINYLFAMILY_ENABLED", "false").lower() == "true"
 STATE_PATH = Path(os.getenv("STATE_PATH", "./state.json")).expanduser().resolve()
+# Локальное состояние: "json" — state.json, "sqlite" — база с индексами (state_store.py)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "json").lower()
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "")  # По умолчанию state.db рядом со state.json
+# Журнал: прогон дописывает только дельту, снимок пересобирается по порогу (state_journal.py)
+STATE_FORMAT = os.getenv("STATE_FORMAT", "json").lower()  # json, compact, gzip или zstd (state_format.py)
+STATE_SHARDS = os.getenv("STATE_SHARDS", "false").lower() == "true"  # Отдельный шард на источник (state_shards.py)
+STATE_JOURNAL = os.getenv("STATE_JOURNAL", "false").lower() == "true"
+# Известные ID: "set" — множество строк в памяти; "bloom" — фильтр Блума, "hash" — mmap отсортированных хешей
+# перед базой (known_index.py, нужен STATE_BACKEND=sqlite)
+KNOWN_INDEX = os.getenv("KNOWN_INDEX", "set").lower()
+KNOWN_INDEX_FP_RATE = float(os.getenv("KNOWN_INDEX_FP_RATE", "0.01"))  # Доля ложных срабатываний фильтра Блума
+# Индекс релиз → последние цены магазинов: в уведомлении — где тот же релиз дешевле (release_index.py)
+PRICE_INDEX = os.getenv("PRICE_INDEX", "false").lower() == "true"
+STATE_JOURNAL_COMPACT_KB = int(os.getenv("STATE_JOURNAL_COMPACT_KB", "256"))  # Порог локального журнала
+STATE_JOURNAL_COMPACT_DELTAS = int(os.getenv("STATE_JOURNAL_COMPACT_DELTAS", "50"))  # Порог дельт в S3
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
 REQUEST_TIMEOUT_SEC = 120
 LOAD_MORE_MAX_CLICKS = 20
 LOAD_MORE_WAIT_MS = 1200
 
-# Интервалы мониторинга в часах
-KOROBKA_MONITOR_INTERVAL_HOURS = int(os.getenv("KOROBKA_MONITOR_INTERVAL_HOURS", "3"))  # 3 часа для korobkavinyla.ru
-VINYLTAP_MONITOR_INTERVAL_HOURS = int(os.getenv("VINYLTAP_MONITOR_INTERVAL_HOURS", "3"))  # 3 часа для vinyltap.co.uk
-AVITO_MONITOR_INTERVAL_HOURS = int(os.getenv("AVITO_MONITOR_INTERVAL_HOURS", "6"))  # 6 часов для Авито
-PLASTINKA_MONITOR_INTERVAL_HOURS = int(os.getenv("PLASTINKA_MONITOR_INTERVAL_HOURS", "6"))  # 6 часов для plastinka.com
+# Интервалы мониторинга в часах; дробные (0.25 — 15 минут) имеют смысл в режиме демона
+KOROBKA_MONITOR_INTERVAL_HOURS = float(os.getenv("KOROBKA_MONITOR_INTERVAL_HOURS", "3"))  # 3 часа для korobkavinyla.ru
+VINYLTAP_MONITOR_INTERVAL_HOURS = float(os.getenv("VINYLTAP_MONITOR_INTERVAL_HOURS", "3"))  # 3 часа для vinyltap.co.uk
+AVITO_MONITOR_INTERVAL_HOURS = float(os.getenv("AVITO_MONITOR_INTERVAL_HOURS", "6"))  # 6 часов для Авито
+PLASTINKA_MONITOR_INTERVAL_HOURS = float(os.getenv("PLASTINKA_MONITOR_INTERVAL_HOURS", "6"))  # 6 часов для plastinka.com
+VINYLFAMILY_MONITOR_INTERVAL_HOURS = float(os.getenv("VINYLFAMILY_MONITOR_INTERVAL_HOURS", "6"))  # 6 часов для vinylfamily.shop
+
+# Инкрементальный обход: листаем, пока попадаются новые позиции; полный обход реже
+INCREMENTAL_CRAWL = os.getenv("INCREMENTAL_CRAWL", "true").lower() == "true"
+FULL_CRAWL_INTERVAL_HOURS = int(os.getenv("FULL_CRAWL_INTERVAL_HOURS", "24"))
+
+# Адаптивные интервалы: по истории added_at вместо фиксированных *_MONITOR_INTERVAL_HOURS
+ADAPTIVE_INTERVALS = os.getenv("ADAPTIVE_INTERVALS", "false").lower() == "true"
+ADAPTIVE_DEFAULT_POLICY = IntervalPolicy(
+    target_latency_hours=float(os.getenv("ADAPTIVE_TARGET_LATENCY_HOURS", "1")),  # Ожидаемая задержка обнаружения
+    min_hours=float(os.getenv("ADAPTIVE_MIN_INTERVAL_HOURS", "0.25")),
+    max_hours=float(os.getenv("ADAPTIVE_MAX_INTERVAL_HOURS", "24")),
+)
+# Переопределения по сайтам: "avito=3:1:12" — цель:мин:макс в часах
+ADAPTIVE_SITE_POLICIES = parse_site_policies(os.getenv("ADAPTIVE_SITE_POLICIES", ""), ADAPTIVE_DEFAULT_POLICY)
+ADAPTIVE_HISTORY_DAYS = int(os.getenv("ADAPTIVE_HISTORY_DAYS", "56"))
 
+# Режим демона: новые позиции сохраняются не чаще раза в N минут (0 — после каждого сканирования)
+DAEMON_SAVE_INTERVAL_MINUTES = float(os.getenv("DAEMON_SAVE_INTERVAL_MINUTES", "0"))
 
-def load_state() -> Set[str]:
-    """Загружает состояние из S3 или локального файла"""
+# Асинхронный движок: все сайты прогона сканируются параллельно
+ASYNC_ENGINE = os.getenv("ASYNC_ENGINE", "false").lower() == "true"
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "4"))  # Всего параллельных страниц
+SCRAPE_PER_HOST_CONCURRENCY = int(os.getenv("SCRAPE_PER_HOST_CONCURRENCY", "2"))  # Страниц на один хост
+SCRAPE_HOST_LIMITS = os.getenv("SCRAPE_HOST_LIMITS", "avito.ru=1")  # Переопределения по хостам
+# Лимит частоты Авито, если в avito_config.json нет секции rate_limit: запрос в минуту
+AVITO_DEFAULT_RATE_LIMIT = HostLimit(requests_per_minute=1, burst=1)
+
+
+_state: Optional[MonitorState] = None
+_known_index: Optional[KnownIndex] = None
+_release_index: Optional[ReleaseIndex] = None
+
+
+def known_index_enabled() -> bool:
+    """Известные ID проверяются фильтром и базой, а не множеством в памяти"""
+    return KNOWN_INDEX in KNOWN_INDEX_KINDS and STATE_BACKEND == "sqlite"
+
+
+def state_backends(sources: Optional[Iterable[str]] = None) -> List:
+    """Хранилища состояния в порядке загрузки: S3, затем локальное.
+
+    sources — источники, которые нужны прогону; учитываются только шардами.
+    """
+    if known_index_enabled():
+        # Состояние не загружается в память целиком, а state.json в S3 переписывается только целиком
+        print(f"ℹ️ KNOWN_INDEX={KNOWN_INDEX}: состояние только в базе, S3 не используется")
+        return [SqliteBackend(open_state_store)]
+    if STATE_BACKEND == "sqlite":
+        # База и так пишет только новые позиции
+        local = SqliteBackend(open_state_store)
+    elif STATE_SHARDS:
+        local = ShardedBackend(LocalShardStore(state_shards_dir()), sources,
+                               JsonFileBackend(STATE_PATH, clean_duplicates_in_state, STATE_FORMAT),
+                               STATE_FORMAT, clean_duplicates_in_state, ADAPTIVE_HISTORY_DAYS)
+    elif STATE_JOURNAL:
+        local = JournalFileBackend(STATE_PATH, STATE_JOURNAL_COMPACT_KB * 1024, clean_duplicates_in_state,
+                                   STATE_FORMAT)
+    else:
+        local = JsonFileBackend(STATE_PATH, clean_duplicates_in_state, STATE_FORMAT)
+    backends = []
     try:
-        # Сначала пробуем загрузить из S3
         from s3_storage import S3Storage
         s3 = S3Storage()
-        known_items = s3.load_known_items()
-        if known_items:
-            print(f"📚 Загружено {len(known_items)} известных позиций из S3")
-            return known_items
+        if isinstance(local, ShardedBackend):
+            backends.append(ShardedBackend(S3ShardStore(s3), sources, S3Backend(s3), STATE_FORMAT,
+                                           clean_duplicates_in_state, ADAPTIVE_HISTORY_DAYS, optional=True))
+        elif STATE_JOURNAL:
+            backends.append(S3JournalBackend(s3, STATE_JOURNAL_COMPACT_DELTAS))
+        else:
+            # state.json хранит ETag копии S3: неизменившийся объект не скачивается
+            cache = local if isinstance(local, JsonFileBackend) else None
+            backends.append(S3Backend(s3, cache))
     except Exception as e:
-        print(f"⚠️ Ошибка загрузки из S3: {e}, пробуем локальный файл")
-    
-    # Fallback на локальный файл
-    if STATE_PATH.exists():
-        try:
-            with open(STATE_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            # Поддержка старого формата (массив ID) и нового формата (объект с timestamp)
-            if "known_ids" in data and isinstance(data["known_ids"], list):
-                # Старый формат - массив строк
-                result = set(data["known_ids"])
-                print(f"📚 Загружено {len(result)} известных позиций из локального файла (старый формат)")
-                return result
-            elif "known_items" in data and isinstance(data["known_items"], dict):
-                # Новый формат - объект с timestamp
-                result = {normalize_url(item_id) for item_id in data["known_items"].keys()}
-                print(f"📚 Загружено {len(result)} известных позиций из локального файла")
-                return result
-            else:
-                return set()
-        except Exception:
-            return set()
-    return set()
+        print(f"⚠️ S3 недоступно: {e}, используем только локальное состояние")
+    backends.append(local)
+    return backends
+
+
+def current_state() -> MonitorState:
+    """Состояние прогона; загружается при первом обращении"""
+    global _state
+    if _state is None:
+        _state = MonitorState.load(state_backends())
+    return _state
+
+
+def load_state(sources: Optional[Iterable[str]] = None) -> Set[str]:
+    """Загружает состояние из S3 или локального хранилища (один раз на прогон).
+
+    С STATE_SHARDS и sources загружаются только шарды этих источников.
+    С KNOWN_INDEX позиции в память не загружаются: возвращается KnownIndex
+    с тем же интерфейсом (in, len, |=, union).
+    """
+    global _state, _known_index
+    if KNOWN_INDEX in KNOWN_INDEX_KINDS and not known_index_enabled():
+        print(f"⚠️ KNOWN_INDEX={KNOWN_INDEX} работает только со STATE_BACKEND=sqlite, используем множество")
+    if known_index_enabled():
+        _state = MonitorState({}, state_backends(sources))
+        _known_index = KnownIndex.open(state_db_path(), open_state_store, KNOWN_INDEX, KNOWN_INDEX_FP_RATE)
+        print(f"📚 Известных позиций в базе: {len(_known_index)}")
+        return _known_index
+    _known_index = None
+    _state = MonitorState.load(state_backends(sources))
+    return set(_state.known_ids)
+
+
+def due_sources(avito_config: Dict) -> Optional[List[str]]:
+    """Источники сайтов, которые пора сканировать; None — состояние не разбито на шарды, грузится целиком"""
+    if not STATE_SHARDS:
+        return None
+    return [SITE_SOURCES[site] for site in get_due_sites(avito_config)]
 
 
 def get_item_info(item_id: str) -> Dict:
-    """Получить информацию о позиции из state.json"""
-    if STATE_PATH.exists():
-        try:
-            with open(STATE_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if "known_items" in data and item_id in data["known_items"]:
-                    return data["known_items"][item_id]
-        except Exception:
-            pass
-    return {}
+    """Получить информацию о позиции из состояния в памяти (с KNOWN_INDEX — из базы)"""
+    info = current_state().info(item_id)
+    if not info and _known_index is not None:
+        info = _known_index.info(item_id)
+    return info
 
 
-def should_monitor_site(site_name: str, interval_hours: int) -> bool:
-    """Проверить, нужно ли мониторить сайт сейчас"""
-    from datetime import datetime, timedelta
+def relisted_ids(items: List[Dict]) -> Set[str]:
+    """Новые позиции, уже известные у того же источника под другим URL (с STATE_BACKEND=sqlite).
+
+    База хранит каждый ID, а дубль по названию отсекается здесь: такая позиция
+    запоминается, но уведомление о ней не отправляется.
+    """
+    if STATE_BACKEND != "sqlite" or not items:
+        return set()
+    with open_state_store() as store:
+        return store.relisted_ids(items)
+
+
+def release_index() -> Optional[ReleaseIndex]:
+    """Индекс релизов и цен (PRICE_INDEX); новая база один раз строится по known_items"""
+    global _release_index
+    if not PRICE_INDEX:
+        return None
+    if _release_index is None:
+        _release_index = ReleaseIndex(STATE_PATH.with_name(STATE_PATH.stem + ".releases.db"))
+        if not _release_index.built:
+            if known_index_enabled():
+                with open_state_store() as store:
+                    history = store.items()
+            else:
+                history = current_state().items
+            print(f"🔗 Индекс релизов построен по {len(history)} известным позициям: "
+                  f"{_release_index.build(history)} релизов")
+    return _release_index
+
 
+def state_shards_dir() -> Path:
+    """Каталог шардов состояния рядом со state.json"""
+    return STATE_PATH.with_name(STATE_PATH.stem + ".shards")
+
+
+def state_db_path() -> Path:
+    """Путь к базе состояния: STATE_DB_PATH или state.db рядом со state.json"""
+    return Path(STATE_DB_PATH).expanduser().resolve() if STATE_DB_PATH else STATE_PATH.with_suffix(".db")
+
+
+def open_state_store() -> StateStore:
+    """Открывает базу состояния; новая база сразу получает позиции из state.json"""
+    db_path = state_db_path()
+    created = not db_path.exists()
+    store = StateStore(db_path)
+    state_file = latest_state_file(STATE_PATH) if created else None
+    if state_file is not None:
+        try:
+            with open(state_file, "rb") as f:
+                imported = store.import_state(parse_state_json(f))
+            print(f"📦 {state_file.name} перенесен в {db_path.name}: {imported} позиций")
+        except Exception as e:
+            print(f"⚠️ Не удалось перенести {state_file.name} в базу: {e}")
+    return store
+
+
+def read_last_check_time(site_name: str) -> Optional[datetime]:
+    """Время последней проверки сайта; None — файла нет или он поврежден"""
     # Путь к файлу с временем последнего мониторинга
     last_check_file = STATE_PATH.parent / f"last_check_{site_name}.txt"
 
     if not last_check_file.exists():
-        # Если файла нет, значит мониторим впервые
-        return True
+        return None
 
     try:
         with open(last_check_file, "r") as f:
-            last_check_str = f.read().strip()
-            last_check = datetime.fromisoformat(last_check_str)
+            return datetime.fromisoformat(f.read().strip())
+    except Exception:
+        return None
 
-        # Проверяем, прошло ли достаточно времени
-        time_since_last = datetime.now() - last_check
-        return time_since_last >= timedelta(hours=interval_hours)
 
-    except Exception:
-        # Если ошибка при чтении, мониторим
+def should_monitor_site(site_name: str, interval_hours: float) -> bool:
+    """Проверить, нужно ли мониторить сайт сейчас"""
+    last_check = read_last_check_time(site_name)
+    if last_check is None:
+        # Если файла нет (или он не читается), значит мониторим впервые
         return True
 
+    # Проверяем, прошло ли достаточно времени
+    time_since_last = datetime.now() - last_check
+    return time_since_last >= timedelta(hours=interval_hours)
+
+
+_arrival_model: Optional[ArrivalModel] = None
+
+
+def load_arrival_history() -> List[Tuple[str, datetime]]:
+    """Пары (сайт, время добавления) из состояния прогона"""
+    site_by_source = {source: name for name, source in SITE_SOURCES.items()}
+    # С шардами история берется из манифеста: загружать ради нее все шарды незачем
+    arrivals = shard_arrivals(_state.backends if _state else state_backends()) if STATE_SHARDS else None
+    if arrivals is None and known_index_enabled():
+        # Позиции не в памяти: недавние поступления — запросом по индексу added_at
+        since = (datetime.now() - timedelta(days=ADAPTIVE_HISTORY_DAYS)).isoformat()
+        with open_state_store() as store:
+            arrivals = store.recent_arrivals(since)
+    if arrivals is None:
+        arrivals = [(info.get("source"), info.get("added_at", "")) for info in current_state().items.values()]
+    history = []
+    for source, added_at in arrivals:
+        site = site_by_source.get(source)
+        try:
+            history.append((site, datetime.fromisoformat(added_at)))
+        except (TypeError, ValueError):
+            continue  # "unknown" и записи старого формата
+    return [(site, when) for site, when in history if site]
+
+
+def arrival_model() -> ArrivalModel:
+    """Модель поступлений, построенная один раз на процесс"""
+    global _arrival_model
+    if _arrival_model is None:
+        _arrival_model = ArrivalModel.from_history(load_arrival_history(), history_days=ADAPTIVE_HISTORY_DAYS)
+    return _arrival_model
+
+
+def monitor_interval(site_name: str, fixed_hours: float, since: Optional[datetime] = None) -> float:
+    """Интервал сайта в часах: фиксированный или, с ADAPTIVE_INTERVALS, по истории поступлений.
+
+    since — момент, от которого отсчитывается интервал (по умолчанию последняя проверка).
+    """
+    if not ADAPTIVE_INTERVALS:
+        return fixed_hours
+    since = since or read_last_check_time(site_name) or datetime.now()
+    policy = ADAPTIVE_SITE_POLICIES.get(site_name, ADAPTIVE_DEFAULT_POLICY)
+    return adaptive_interval(arrival_model(), site_name, policy, since, fixed_hours)
+
 
 def update_last_check_time(site_name: str):
-    """Обновить время последней проверки сайта"""
-    from datetime import datetime
+    """Обновить время последней проверки сайта.
 
+    С ADAPTIVE_INTERVALS рядом (last_check_next_<сайт>.txt) записывается и срок следующей
+    проверки: по нему sites_maybe_due решает, не загружая состояние ради истории поступлений.
+    """
+    now = datetime.now()
     last_check_file = STATE_PATH.parent / f"last_check_{site_name}.txt"
     with open(last_check_file, "w") as f:
-        f.write(datetime.now().isoformat())
+        f.write(now.isoformat())
+
+    fixed_hours = site_intervals(load_avito_config()).get(site_name) if ADAPTIVE_INTERVALS else None
+    if fixed_hours is not None:
+        next_check = now + timedelta(hours=monitor_interval(site_name, fixed_hours, since=now))
+        with open(STATE_PATH.parent / f"last_check_next_{site_name}.txt", "w") as f:
+            f.write(next_check.isoformat())
+
+
+def crawl_known_ids(site_name: str, known: Set[str]) -> Optional[Set[str]]:
+    """Известные ID для инкрементального обхода сайта; None — пора обойти сайт на полную глубину"""
+    if not INCREMENTAL_CRAWL:
+        return None
+    if should_monitor_site(f"full_{site_name}", FULL_CRAWL_INTERVAL_HOURS):
+        print(f"🔭 {site_name}: полный обход (раз в {FULL_CRAWL_INTERVAL_HOURS} ч)")
+        return None
+    return known
+
+
+def mark_full_crawl_done(site_name: str, crawl_known: Optional[Set[str]]) -> None:
+    """Запоминает время полного обхода, если он только что прошел"""
+    if INCREMENTAL_CRAWL and crawl_known is None:
+        update_last_check_time(f"full_{site_name}")
 
 
 def load_avito_config() -> Dict:
@@ -161,7 +427,66 @@ def load_avito_config() -> Dict:
     }
 
 
-def scrape_avito_with_playwright() -> List[Dict]:
+def configure_avito_rate_limit(config: Dict) -> str:
+    """Применяет секцию rate_limit из avito_config.json и возвращает хост Авито"""
+    host = host_of(config.get("base_url", "https://www.avito.ru/sankt_peterburg_i_lo"))
+    RATE_LIMITER.configure(host, HostLimit.from_dict(config.get("rate_limit") or {}, AVITO_DEFAULT_RATE_LIMIT))
+    return host
+
+
+AVITO_ITEMS_JS = """
+    (query) => {
+      const items = [];
+      const listings = document.querySelectorAll('[data-marker="item"]');
+
+      for (const listing of listings) {
+        const titleEl = listing.querySelector('[data-marker="item-title"]');
+        const priceEl = listing.querySelector('[data-marker="item-price"]');
+        const linkEl = listing.querySelector('a[data-marker="item-title"]');
+
+        if (titleEl && linkEl) {
+          const title = titleEl.textContent.trim();
+          const price = priceEl ? priceEl.textContent.trim() : '';
+          const url = linkEl.href;
+
+          // Проверяем, что это виниловая пластинка
+          if (title.toLowerCase().includes('винил') ||
+              title.toLowerCase().includes('lp') ||
+              title.toLowerCase().includes('vinyl') ||
+              title.toLowerCase().includes('пластинка')) {
+            items.push({
+              id: url,
+              url: url,
+              title: title,
+              price: price,
+              query: query
+            });
+          }
+        }
+      }
+
+      return items;
+    }
+    """
+
+
+def _response_status(response) -> Optional[int]:
+    status = getattr(response, "status", None)
+    return status if isinstance(status, int) else None
+
+
+def page_blocked(page, response, host: str) -> bool:
+    """Сообщает лимитеру об ответе хоста; True — вместо выдачи 429, капча или файрвол"""
+    return RATE_LIMITER.feedback(host, _response_status(response),
+                                 blocked=page.evaluate(BLOCKED_PAGE_JS) is True)
+
+
+async def page_blocked_async(page, response, host: str) -> bool:
+    return RATE_LIMITER.feedback(host, _response_status(response),
+                                 blocked=await page.evaluate(BLOCKED_PAGE_JS) is True)
+
+
+def scrape_avito_with_playwright(browser: Optional[BrowserManager] = None) -> List[Dict]:
     """Сканировать Авито на предмет виниловых пластинок"""
     config = load_avito_config()
 
@@ -169,105 +494,52 @@ def scrape_avito_with_playwright() -> List[Dict]:
         print("⏰ Авито: отключен в конфигурации")
         return []
 
-    if not should_monitor_site("avito", config.get("monitor_interval_hours", 6)):
-        print("⏰ Авито: пропуск (интервал 6 часов)")
+    hours = monitor_interval("avito", config.get("monitor_interval_hours", 6))
+    if not should_monitor_site("avito", hours):
+        print(f"⏰ Авито: пропуск (интервал {hours:g} ч)")
         return []
 
     print("🔍 Сканирование Авито...")
+    items = scrape_avito(browser, config)
+    update_last_check_time("avito")
+    return items
 
+
+def scrape_avito(browser: Optional[BrowserManager], config: Dict) -> List[Dict]:
+    """Поиск по всем запросам Авито без проверки интервала"""
     items = []
     search_queries = config.get("search_queries", [])
     base_url = config.get("base_url", "https://www.avito.ru/sankt_peterburg_i_lo")
     category = config.get("category", "kollektsionirovanie")
+    host = configure_avito_rate_limit(config)
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            locale="ru-RU",
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-            extra_http_headers={
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
-                "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
-                "Accept-Encoding": "gzip, deflate, br",
-                "DNT": "1",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "Sec-Fetch-Dest": "document",
-                "Sec-Fetch-Mode": "navigate",
-                "Sec-Fetch-Site": "none",
-                "Cache-Control": "max-age=0",
-            }
-        )
-        page = context.new_page()
-        page.set_default_timeout(REQUEST_TIMEOUT_SEC * 1000)
-
+    with shared_or_own_browser(browser, sync_playwright) as browser, browser.site_page("avito", REQUEST_TIMEOUT_SEC * 1000) as page:
         for query in search_queries:
             try:
                 # Формируем URL для поиска
                 search_url = f"{base_url}{category}?cd=1&q={query.replace(' ', '+')}"
                 print(f"  Поиск: {query}")
 
-                # Загружаем страницу
-                page.goto(search_url, wait_until="load", timeout=REQUEST_TIMEOUT_SEC * 1000)
+                # Пауза только перед запросом, если лимит хоста исчерпан; после последнего — нет
+                RATE_LIMITER.wait(host, "Авито")
+                response = page.goto(search_url, wait_until="load", timeout=REQUEST_TIMEOUT_SEC * 1000)
                 time.sleep(2)
 
+                if page_blocked(page, response, host):
+                    print(f"    ⚠️ Авито: капча или ограничение доступа по запросу '{query}'")
+                    continue
+
                 # Извлекаем результаты
-                js = """
-                () => {
-                  const items = [];
-                  const listings = document.querySelectorAll('[data-marker="item"]');
-
-                  for (const listing of listings) {
-                    const titleEl = listing.querySelector('[data-marker="item-title"]');
-                    const priceEl = listing.querySelector('[data-marker="item-price"]');
-                    const linkEl = listing.querySelector('a[data-marker="item-title"]');
-
-                    if (titleEl && linkEl) {
-                      const title = titleEl.textContent.trim();
-                      const price = priceEl ? priceEl.textContent.trim() : '';
-                      const url = linkEl.href;
-
-                      // Проверяем, что это виниловая пластинка
-                      if (title.toLowerCase().includes('винил') ||
-                          title.toLowerCase().includes('lp') ||
-                          title.toLowerCase().includes('vinyl') ||
-                          title.toLowerCase().includes('пластинка')) {
-                        items.push({
-                          id: url,
-                          url: url,
-                          title: title,
-                          price: price,
-                          query: arguments[0]
-                        });
-                      }
-                    }
-                  }
-
-                  return items;
-                }
-                """
-
-                query_items = page.evaluate(js, query)
+                query_items = page.evaluate(AVITO_ITEMS_JS, query)
                 items.extend(query_items)
                 print(f"    Найдено: {len(query_items)} позиций")
-                
-                # Задержка 60 секунд между запросами для избежания блокировки
-                if len(search_queries) > 1:  # Только если запросов больше одного
-                    print("    ⏳ Ожидание 60 секунд перед следующим запросом...")
-                    time.sleep(60)
 
             except Exception as e:
                 print(f"    Ошибка при поиске '{query}': {e}")
                 continue
 
-        browser.close()
-
-    # Добавляем источник
-    for item in items:
-        item["source"] = "avito.ru"
-
+    items = make_items(items, "avito.ru")
     print(f"📦 Найдено {len(items)} позиций на Авито")
-    update_last_check_time("avito")
     return items
 
 
@@ -300,82 +572,26 @@ def clean_duplicates_in_state(data: dict) -> dict:
     return data
 
 
-def normalize_url(url: str) -> str:
-    """Нормализует URL, убирая параметры запроса и якоря"""
-    if not url:
-        return url
-    
-    normalized = url.split('?')[0].split('#')[0]
-    normalized = normalized.rstrip('/')
-    
-    return normalized
-
-
 def save_state(known_ids: Set[str], new_items: List[Dict] = None) -> None:
-    """Сохраняет состояние в S3 и локальный файл"""
-    
-    # Сначала пробуем сохранить в S3
-    try:
-        from s3_storage import S3Storage
-        s3 = S3Storage()
-        if s3.save_new_items(known_ids, new_items or []):
-            print(f"💾 Состояние обновлено в S3")
-            # Также сохраняем локально как backup
-            _save_local_state(known_ids, new_items)
-            return
-    except Exception as e:
-        print(f"⚠️ Ошибка сохранения в S3: {e}, сохраняем локально")
-    
-    # Fallback на локальное сохранение
-    _save_local_state(known_ids, new_items)
-
-
-def _save_local_state(known_ids: Set[str], new_items: List[Dict] = None) -> None:
-    """Локальное сохранение state.json"""
-    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    """Добавляет новые позиции в состояние прогона и записывает его в S3 и локально.
 
-    # Загружаем существующие данные
-    existing_data = {}
-    if STATE_PATH.exists():
-        try:
-            with open(STATE_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if "known_items" in data:
-                    existing_data = data["known_items"]
-                elif "known_ids" in data:
-                    # Конвертируем старый формат в новый
-                    for item_id in data["known_ids"]:
-                        existing_data[item_id] = {"added_at": "unknown"}
-        except Exception:
-            pass
-
-    # Добавляем новые элементы с timestamp
-    if new_items:
-        from datetime import datetime
-        current_time = datetime.now().isoformat()
-        for item in new_items:
-            item_id = item.get("id", "")
-            if item_id:
-                normalized_id = normalize_url(item_id)
-                existing_data[normalized_id] = {
-                    "added_at": current_time,
-                    "title": item.get("title", ""),
-                    "source": item.get("source", "")
-                }
-
-    # Очищаем дубли перед сохранением
-    data_to_save = {"known_items": existing_data}
-    data_to_save = clean_duplicates_in_state(data_to_save)
-    
-    # Сохраняем в новом формате
-    with open(STATE_PATH, "w", encoding="utf-8") as f:
-        json.dump(data_to_save, f, ensure_ascii=False, indent=2)
+    known_ids оставлен для совместимости: известные ID уже есть в состоянии в памяти.
+    """
+    state = current_state()
+    state.add_items(new_items or [])
+    state.save()
+    if _known_index is not None:
+        # Фильтр на диске должен знать все, что уже в базе, иначе следующий прогон сочтет позиции новыми
+        _known_index.update(item["id"] for item in new_items or [] if item.get("id"))
+        _known_index.save()
+        print(_known_index.report())
 
 
 def send_telegram(text: str) -> None:
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         print("Telegram creds missing; skip notify")
         return
+    import requests
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     try:
         requests.post(
@@ -406,16 +622,9 @@ def dedupe_keep_order(items: List[Dict]) -> List[Dict]:
     duplicates_count = 0
     
     for it in items:
-        # Нормализуем URL для более надежной дедупликации
-        url = it.get("url", "")
-        if url:
-            # Убираем параметры запроса и якоря
-            normalized_url = url.split('?')[0].split('#')[0]
-            # Убираем trailing slash
-            normalized_url = normalized_url.rstrip('/')
-        else:
-            normalized_url = it.get("id", "")
-        
+        # Канонический ID: URL без параметров, якоря и завершающего слеша
+        normalized_url = canonical_id(it)
+
         if normalized_url and normalized_url not in seen:
             seen.add(normalized_url)
             # Обновляем ID на нормализованный URL
@@ -431,6 +640,21 @@ def dedupe_keep_order(items: List[Dict]) -> List[Dict]:
     return out
 
 
+def batch_all_known(items: List[Dict], seen: Set[str], known_ids: Set[str]) -> bool:
+    """Порция позиций, которых еще не было в seen, целиком состоит из известных.
+
+    seen пополняется этой порцией, так что после очередной подгрузки
+    проверяются только новые карточки.
+    """
+    batch = []
+    for item in items:
+        item_id = normalize_url(item["id"])
+        if item_id not in seen:
+            seen.add(item_id)
+            batch.append(item_id)
+    return bool(batch) and all(item_id in known_ids for item_id in batch)
+
+
 def advanced_deduplication(items: List[Dict]) -> List[Dict]:
     """Продвинутая дедупликация по содержимому и URL"""
     seen_urls = set()
@@ -439,31 +663,12 @@ def advanced_deduplication(items: List[Dict]) -> List[Dict]:
     duplicates_count = 0
     
     for it in items:
-        # Нормализуем URL
-        url = it.get("url", "")
-        if url:
-            normalized_url = url.split('?')[0].split('#')[0].rstrip('/')
-        else:
-            normalized_url = it.get("id", "")
-        
-        # Создаем ключ содержимого для дополнительной проверки
+        normalized_url = canonical_id(it)
+
+        # Ключ содержимого: название и сумма (валюта и повторы в строке цены не важны)
         title = it.get("title", "").strip().lower()
-        price = it.get("price", "").strip()
-        
-        # Нормализуем цену для сравнения (убираем валютные символы и дубли)
-        normalized_price = price.lower()
-        # Убираем валютные символы
-        normalized_price = normalized_price.replace('€', '').replace('£', '').replace('$', '').replace('руб', '')
-        normalized_price = normalized_price.replace('eur', '').replace('gbp', '').replace('usd', '')
-        # Убираем лишние пробелы
-        normalized_price = ' '.join(normalized_price.split())
-        # Убираем дублированные части (если есть повторяющиеся числа)
-        # Ищем повторяющиеся числа и убираем дубли
-        numbers = re.findall(r'\d+\.?\d*', normalized_price)
-        if len(numbers) > 1 and len(set(numbers)) == 1:  # Все числа одинаковые
-            normalized_price = numbers[0]  # Берем только одно число
-        
-        content_key = f"{title}|{normalized_price}"
+        parsed = item_price(it)
+        content_key = (title, parsed.amount if parsed else it.get("price", "").strip().lower())
         
         # Проверяем дубликаты по URL и содержимому
         is_duplicate = False
@@ -471,7 +676,7 @@ def advanced_deduplication(items: List[Dict]) -> List[Dict]:
         if normalized_url in seen_urls:
             is_duplicate = True
             print(f"Дубликат по URL: {normalized_url}")
-        elif content_key in seen_content and content_key != "|":
+        elif content_key in seen_content and content_key != ("", ""):
             is_duplicate = True
             print(f"Дубликат по содержимому: {title}")
         
@@ -489,58 +694,18 @@ def advanced_deduplication(items: List[Dict]) -> List[Dict]:
     return out
 
 
-def extract_items_from_dom(page) -> List[Dict]:
-    js = r"""
-    () => {
-      const anchors = Array.from(document.querySelectorAll('a'))
-        .filter(a => a.href && a.href.includes('/catalog/') && a.textContent.trim().length > 0);
+# Карточки магазина Tilda (korobkavinyla.ru, vinylfamily.shop)
+TILDA_CARD_SELECTOR = ".t-store__card"
+TILDA_TITLE_SELECTOR = ".js-store-prod-name"
+TILDA_PRICE_SELECTOR = ".t-store__card__price"
 
-      const items = [];
-      const seen = new Set();
-
-      for (const a of anchors) {
-        // Нормализуем URL: убираем параметры запроса и якоря, убираем trailing slash
-        const url = a.href.split('?')[0].split('#')[0].replace(/\/$/, '');
-        if (seen.has(url)) continue;
-        seen.add(url);
-
-        let title = a.textContent.trim();
-        let el = a;
-        for (let i = 0; i < 5 && el; i++) {
-          if (el.querySelector) {
-            const t = el.querySelector('h1,h2,h3,.title,.product-title,[class*="title"]');
-            if (t && t.textContent.trim().length > 3) {
-              title = t.textContent.trim();
-              break;
-            }
-          }
-          el = el.parentElement;
-        }
+KOROBKA_ANCHOR_JS = anchor_items_js(["/catalog/"], price_selector='.price,[class*="price"],[data-price]')
+KOROBKA_ITEMS_JS = card_items_js(TILDA_CARD_SELECTOR, ["/catalog/"], title_selector=TILDA_TITLE_SELECTOR,
+                                 price_selector=TILDA_PRICE_SELECTOR, fallback_js=KOROBKA_ANCHOR_JS)
 
-        el = a;
-        let price = '';
-        for (let i = 0; i < 5 && el; i++) {
-          if (el.querySelector) {
-            const p = el.querySelector('.price,[class*="price"],[data-price]');
-            if (p && p.textContent) {
-              price = p.textContent.trim().replace(/\s+/g, ' ');
-              break;
-            }
-          }
-          el = el.parentElement;
-        }
 
-        items.push({
-          id: url,
-          url,
-          title,
-          price
-        });
-      }
-      return items;
-    }
-    """
-    items = page.evaluate(js)
+def extract_items_from_dom(page) -> List[Dict]:
+    items = page.evaluate(KOROBKA_ITEMS_JS)
     return dedupe_keep_order(items)
 
 
@@ -614,24 +779,16 @@ def validate_message_format(message: str) -> bool:
 def format_item_message(item: Dict, source: str) -> str:
     """Унифицированное форматирование сообщения о товаре"""
     title = item.get('title', '(без названия)')
-    price = item.get('price', '')
     url = item['url']
     safe_title = escape(title)
-    
-    # Форматируем цену в зависимости от источника
-    if source == "vinyltap.co.uk":
-        # Исправляем валюту для vinyltap.co.uk (должна быть £, а не €)
-        if price and '€' in price:
-            price = price.replace('€', '£')
-            price = price.replace('EUR', 'GBP')
-        price_str = f" — {price}" if price else ''
-    elif source == "plastinka.com":
-        # Форматируем цену для скидок
-        if price and '→' in price:
-            price_str = f" — 💰 {price}"
-        else:
-            price_str = f" — {price}" if price else ''
-    elif source == "avito.ru":
+
+    # Цена из чисел: в валюте магазина (vinyltap.co.uk — £, даже если витрина показала €), скидка — «было → стало»
+    parsed = item_price(item, source)
+    price = format_price(parsed) if parsed else item.get('price', '')
+    if parsed and parsed.original_amount is not None:
+        price = f"💰 {price}"
+
+    if source == "avito.ru":
         # Добавляем информацию о поиске для Авито
         query = item.get('query', '')
         query_info = f" (поиск: {query})" if query else ''
@@ -639,6 +796,11 @@ def format_item_message(item: Dict, source: str) -> str:
     else:
         # Стандартный формат для остальных сайтов
         price_str = f" — {price}" if price else ''
+
+    offer = item.get('cheapest_elsewhere')
+    if offer:
+        price_str += f" (дешевле всего в другом магазине: {format_amount(offer.amount, offer.currency)}" \
+                     f" на {escape(offer.source)})"
     
     return f"- <a href=\"{url}\">{safe_title}</a>{price_str}"
 
@@ -663,585 +825,581 @@ def chunk_messages(text: str, limit: int = 4096) -> List[str]:
     return chunks
 
 
-def extract_vinyltap_from_dom(page) -> List[Dict]:
-    js = r"""
-    () => {
-      const anchors = Array.from(document.querySelectorAll('a'))
-        .filter(a => a.href && a.href.includes('/products/') && a.textContent.trim().length > 0);
+# Фильтр винила vinyltap.co.uk; цену («Regular price … Sale price …») разбирает price_parser.py
+VINYLTAP_REFINE_JS = r"""
+    (card, item) => {
+      // ФИЛЬТРАЦИЯ: только виниловые пластинки (LP, Vinyl, 7 Inch, 12 Inch)
+      const titleLower = item.title.toLowerCase();
+      const isVinyl = titleLower.includes('lp') ||
+                     titleLower.includes('vinyl') ||
+                     titleLower.includes('7 inch') ||
+                     titleLower.includes('12 inch') ||
+                     titleLower.includes('7"') ||
+                     titleLower.includes('12"') ||
+                     (titleLower.includes('inch') && !titleLower.includes('cd') && !titleLower.includes('dvd'));
+
+      // Исключаем CD, DVD, кассеты
+      const isNotVinyl = titleLower.includes('cd') ||
+                        titleLower.includes('dvd') ||
+                        titleLower.includes('cassette') ||
+                        titleLower.includes('tape');
+
+      if (!isVinyl || isNotVinyl) {
+        return null; // Пропускаем невиниловые товары
+      }
 
-      const items = [];
-      const seen = new Set();
-
-      for (const a of anchors) {
-        // Нормализуем URL: убираем параметры запроса и якоря, убираем trailing slash
-        const url = a.href.split('?')[0].split('#')[0].replace(/\/$/, '');
-        if (seen.has(url)) continue;
-        seen.add(url);
-
-        let title = a.textContent.trim();
-        let el = a;
-        for (let i = 0; i < 5 && el; i++) {
-          if (el.querySelector) {
-            const t = el.querySelector('h1,h2,h3,.title,.product-title,[class*="title"],.card__heading');
-            if (t && t.textContent.trim().length > 3) {
-              title = t.textContent.trim();
-              break;
-            }
-          }
-          el = el.parentElement;
-        }
+      return item;
+    }
+    """
 
-        // ФИЛЬТРАЦИЯ: только виниловые пластинки (LP, Vinyl, 7 Inch, 12 Inch)
-        const titleLower = title.toLowerCase();
-        const isVinyl = titleLower.includes('lp') ||
-                       titleLower.includes('vinyl') ||
-                       titleLower.includes('7 inch') ||
-                       titleLower.includes('12 inch') ||
-                       titleLower.includes('7"') ||
-                       titleLower.includes('12"') ||
-                       (titleLower.includes('inch') && !titleLower.includes('cd') && !titleLower.includes('dvd'));
-
-        // Исключаем CD, DVD, кассеты
-        const isNotVinyl = titleLower.includes('cd') ||
-                          titleLower.includes('dvd') ||
-                          titleLower.includes('cassette') ||
-                          titleLower.includes('tape');
-
-        if (!isVinyl || isNotVinyl) {
-          continue; // Пропускаем невиниловые товары
-        }
+VINYLTAP_ANCHOR_JS = anchor_items_js(["/products/"],
+                                     title_selector='h1,h2,h3,.title,.product-title,[class*="title"],.card__heading',
+                                     price_selector='.price,.money,[class*="price"]',
+                                     refine_js=VINYLTAP_REFINE_JS)
+VINYLTAP_ITEMS_JS = card_items_js(".card-wrapper", ["/products/"], title_selector=".card__heading",
+                                  price_selector=".price", refine_js=VINYLTAP_REFINE_JS,
+                                  fallback_js=VINYLTAP_ANCHOR_JS)
 
-        el = a;
-        let price = '';
-        for (let i = 0; i < 5 && el; i++) {
-          if (el.querySelector) {
-            const p = el.querySelector('.price,.money,[class*="price"]');
-            if (p && p.textContent) {
-              price = p.textContent.trim().replace(/\s+/g, ' ');
-              // Очищаем цену от лишнего текста и дублирования
-              price = price.replace(/Regular price\s*/gi, '')
-                          .replace(/Sale price\s*/gi, '')
-                          .replace(/Unit price\s*\/\s*per\s*/gi, '')
-                          .replace(/\s+/g, ' ')
-                          .trim();
-
-              // Убираем дублирование цены (если есть повторяющиеся части)
-              // Ищем символы валют: £, €, $, руб
-              const currencySymbols = ['£', '€', '$', 'руб'];
-              let foundCurrency = null;
-              for (const symbol of currencySymbols) {
-                if (price.includes(symbol)) {
-                  foundCurrency = symbol;
-                  break;
-                }
-              }
-
-              if (foundCurrency) {
-                // Разбиваем по символу валюты
-                const priceParts = price.split(foundCurrency);
-                if (priceParts.length > 2) {
-                  // Берем только первую цену (часть до первого символа валюты + символ + часть после)
-                  price = priceParts[0] + foundCurrency + priceParts[1];
-                }
-
-                // Дополнительная проверка на дублирование EUR/GBP
-                if (price.includes('EUR') && price.includes('€')) {
-                  // Убираем дублирование EUR после €
-                  price = price.replace(/€([^€]*?)EUR\s*€\1EUR/g, '€$1EUR');
-                  // Если все еще есть дублирование, берем только первую часть
-                  if (price.includes('€') && price.split('€').length > 2) {
-                    const parts = price.split('€');
-                    price = parts[0] + '€' + parts[1];
-                  }
-                }
-                
-                // Аналогично для GBP
-                if (price.includes('GBP') && price.includes('£')) {
-                  price = price.replace(/£([^£]*?)GBP\s*£\1GBP/g, '£$1GBP');
-                  if (price.includes('£') && price.split('£').length > 2) {
-                    const parts = price.split('£');
-                    price = parts[0] + '£' + parts[1];
-                  }
-                }
-              }
-              break;
-            }
-          }
-          el = el.parentElement;
-        }
 
-        items.push({ id: url, url, title, price });
+def extract_vinyltap_from_dom(page) -> List[Dict]:
+    items = page.evaluate(VINYLTAP_ITEMS_JS)
+    return dedupe_keep_order(items)
+
+
+# Карточка plastinka.com: «исполнитель — альбом — лейбл», цена со скидкой — «старая → новая»
+PLASTINKA_REFINE_JS = r"""
+    (card, item) => {
+      const text = selector => {
+        const el = card.querySelector(selector);
+        return el ? el.textContent.trim() : '';
+      };
+      const artist = text('.products-grid-item__artist a');
+      const album = text('.products-grid-item__title a');
+      // Лейбл — первая строка в params
+      const label = text('.products-grid-item__params a').split('\n')[0].trim();
+      if (artist && album) {
+        item.title = artist + ' — ' + album;
+        if (label && label !== artist && label !== album) item.title += ' — ' + label;
       }
-      return items;
+
+      const priceMatch = item.price.match(/(\d+[\s,]*\d*)\s*руб\.?\s*(\d+[\s,]*\d*)\s*руб\.?/);
+      if (priceMatch) {
+        item.price = priceMatch[1].replace(/\s/g, '') + ' руб. → ' + priceMatch[2].replace(/\s/g, '') + ' руб.';
+      }
+      return item;
     }
     """
-    items = page.evaluate(js)
-    return dedupe_keep_order(items)
+
+# Ссылки меню и подборок, которые при обходе по ссылкам могут выглядеть как товар
+PLASTINKA_NAV_WORDS = ("меню", "каталог", "главная", "контакты", "style/", "интересный выбор", "новые поступления",
+                       "оригинальный винил", "подарочные издания", "record store day")
+PLASTINKA_ANCHOR_JS = anchor_items_js(
+    ["/item/"],
+    title_selector='.t-store__prod-snippet__title,h1,h2,h3,h4,h5,h6,.title,.product-title,[class*="title"]',
+    price_selector='.t-store__prod-snippet__price,.price,.money,[class*="price"]',
+    min_title_length=4,
+    refine_js=r"""
+    (card, item) => {
+      const title = item.title.toLowerCase();
+      if (%s.some(word => title.includes(word))) return null;
+      return (%s)(card, item);
+    }
+    """ % (json.dumps(list(PLASTINKA_NAV_WORDS), ensure_ascii=False), PLASTINKA_REFINE_JS.strip()),
+)
+PLASTINKA_ITEMS_JS = card_items_js(".products-grid-item", ["/item/"], title_selector=".products-grid-item__title a",
+                                   price_selector='.t-store__prod-snippet__price,.price,.money,[class*="price"]',
+                                   min_title_length=4, refine_js=PLASTINKA_REFINE_JS,
+                                   fallback_js=PLASTINKA_ANCHOR_JS)
+
+
+def extract_plastinka_from_dom(page) -> List[Dict]:
+    """Извлекает данные о товарах с plastinka.com"""
+    return page.evaluate(PLASTINKA_ITEMS_JS)
+
+
+VINYLFAMILY_ANCHOR_JS = anchor_items_js(
+    ["/catalog/"],
+    title_selector='h1,h2,h3,.title,.product-title,[class*="title"],.t-store__prod-snippet__title',
+    price_selector='.price,.money,[class*="price"],.t-store__prod-snippet__price',
+    min_title_length=4,
+)
+VINYLFAMILY_ITEMS_JS = card_items_js(TILDA_CARD_SELECTOR, ["/catalog/"], title_selector=TILDA_TITLE_SELECTOR,
+                                     price_selector=TILDA_PRICE_SELECTOR, min_title_length=4,
+                                     fallback_js=VINYLFAMILY_ANCHOR_JS)
+
+# Сайты-каталоги: все сканируются общим движком по своему описанию
+SITE_ADAPTERS: Dict[str, SiteAdapter] = {adapter.name: adapter for adapter in (
+    SiteAdapter("korobkavinyla", "korobkavinyla.ru", (CATALOG_URL, KOROBKA_SALE_URL), KOROBKA_ITEMS_JS,
+                KOROBKA_MONITOR_INTERVAL_HOURS, max_clicks=LOAD_MORE_MAX_CLICKS, api="tilda"),
+    SiteAdapter("vinyltap", "vinyltap.co.uk", tuple(VINYLTAP_URLS), VINYLTAP_ITEMS_JS,
+                VINYLTAP_MONITOR_INTERVAL_HOURS, LOAD_MORE_LABELS_EN, wait_until="domcontentloaded", api="shopify"),
+    SiteAdapter("plastinka", "plastinka.com", (PLASTINKA_URL,), PLASTINKA_ITEMS_JS,
+                PLASTINKA_MONITOR_INTERVAL_HOURS),
+    SiteAdapter("vinylfamily", "vinylfamily.shop", (VINYLFAMILY_SALE_URL,), VINYLFAMILY_ITEMS_JS,
+                VINYLFAMILY_MONITOR_INTERVAL_HOURS, enabled=VINYLFAMILY_ENABLED),
+)}
+
+# Источники по именам сайтов (имя сайта используется в last_check_<site>.txt)
+SITE_SOURCES = {name: adapter.source for name, adapter in SITE_ADAPTERS.items() if adapter.enabled}
+SITE_SOURCES["avito"] = "avito.ru"
+# У Авито одна страница на запрос, листать нечего
+INCREMENTAL_SITES = tuple(name for name, adapter in SITE_ADAPTERS.items() if adapter.incremental)
+
+
+def extract_site_items(page, adapter: SiteAdapter) -> List[Dict]:
+    """Полный разбор страницы функцией извлечения сайта"""
+    return dedupe_keep_order(page.evaluate(adapter.items_js))
+
+
+def extract_with_load_more(page, adapter: SiteAdapter, known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """Полный разбор страницы один раз, затем подгрузка с извлечением только новых карточек"""
+    items = extract_site_items(page, adapter)
+    if not adapter.load_more_labels:
+        return items
+    extractor = IncrementalExtractor(page, adapter.items_js)
+    extractor.install(items)
+    seen: Set[str] = set()
+    should_stop = (lambda batch: batch_all_known(batch, seen, known_ids)) if known_ids else None
+    click_load_more(page, adapter.load_more_labels, adapter.max_clicks, LOAD_MORE_WAIT_MS, extractor, items, should_stop)
+    return items
+
+
+def _goto_with_retries(page, url: str, wait_until: str = "load") -> bool:
+    """Загружает страницу с тремя попытками"""
+    for attempt in range(3):
+        try:
+            RATE_LIMITER.wait(url)
+            response = page.goto(url, wait_until=wait_until, timeout=REQUEST_TIMEOUT_SEC * 1000)
+            RATE_LIMITER.feedback(url, _response_status(response))
+            return True
+        except Exception as e:
+            print(f"    Попытка {attempt + 1} загрузки неудачна: {e}")
+            if attempt < 2:
+                time.sleep(2)
+    print(f"    Не удалось загрузить {url} после 3 попыток")
+    return False
 
 
-def scrape_with_playwright() -> List[Dict]:
+def scrape_site_with_playwright(adapter: SiteAdapter, browser: Optional[BrowserManager] = None,
+                                urls: Optional[List[str]] = None,
+                                known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """Общий движок: страницы сайта (по умолчанию все из описания) сканируются браузером"""
     all_items = []
-    urls = [CATALOG_URL, KOROBKA_SALE_URL]
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            locale="ru-RU",
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            extra_http_headers={
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "ru-RU,ru;q=0.9,en;q=0.8",
-                "Accept-Encoding": "gzip, deflate, br",
-                "DNT": "1",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-            }
-        )
-        page = context.new_page()
-        page.set_default_timeout(REQUEST_TIMEOUT_SEC * 1000)
 
-        for url in urls:
+    with shared_or_own_browser(browser, sync_playwright) as browser, browser.site_page(adapter.name, REQUEST_TIMEOUT_SEC * 1000) as page:
+        for url in (adapter.urls if urls is None else urls):
             try:
-                section_name = "каталог" if "Sale" not in url else "скидки"
-                print(f"  Сканирование {section_name}: {url}")
-
-                # Пытаемся загрузить страницу с повторными попытками
-                for attempt in range(3):
-                    try:
-                        page.goto(url, wait_until="load", timeout=REQUEST_TIMEOUT_SEC * 1000)
-                        break
-                    except Exception as e:
-                        print(f"    Попытка {attempt + 1} загрузки неудачна: {e}")
-                        if attempt < 2:
-                            time.sleep(2)
-                        else:
-                            print(f"    Не удалось загрузить {section_name} после 3 попыток")
-                            continue
+                print(f"  Сканирование: {url}")
+                if not _goto_with_retries(page, url, adapter.wait_until):
+                    continue
+                time.sleep(1.2)
+
+                items = extract_with_load_more(page, adapter, known_ids)
+                print(f"    Найдено: {len(items)} позиций")
+                all_items.extend(items)
             except Exception as e:
-                print(f"    Ошибка при обработке {section_name}: {e}")
-                continue
+                print(f"    Ошибка при сканировании {url}: {e}")
 
-        time.sleep(1.2)
+    return make_items(all_items, adapter.source)
 
-        clicks = 0
-        while clicks < LOAD_MORE_MAX_CLICKS:
-            btn = page.locator("text=Load more").or_(page.locator("text=Загрузить ещё")).or_(page.locator("text=Показать ещё"))
-            if btn.count() == 0:
-                break
-            try:
-                btn.first.scroll_into_view_if_needed()
-                btn.first.click()
-                clicks += 1
-                page.wait_for_timeout(LOAD_MORE_WAIT_MS)
-            except Exception:
-                break
 
-            items = extract_items_from_dom(page)
-            print(f"    Найдено: {len(items)} позиций")
-            all_items.extend(items)
+def fetch_catalog_items(session, catalog_url: str, known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """korobka_api.fetch_catalog_items (модуль с requests импортируется при первом вызове)"""
+    from korobka_api import fetch_catalog_items as fetch
+    return fetch(session, catalog_url, known_ids)
 
-        browser.close()
 
-        # Добавляем источник
-        for item in all_items:
-            item["source"] = "korobkavinyla.ru"
+def fetch_collection_items(session, collection_url: str, known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """vinyltap_api.fetch_collection_items (модуль с requests импортируется при первом вызове)"""
+    from vinyltap_api import fetch_collection_items as fetch
+    return fetch(session, collection_url, known_ids=known_ids)
 
-        return all_items
 
+def api_enabled(adapter: SiteAdapter) -> bool:
+    """У сайта есть включенный источник без браузера"""
+    return {"tilda": KOROBKA_TILDA_API, "shopify": VINYLTAP_JSON_API}.get(adapter.api, False)
 
-def scrape_plastinka_with_playwright() -> List[Dict]:
-    """Сканировать plastinka.com на предмет виниловых пластинок"""
-    if not should_monitor_site("plastinka", PLASTINKA_MONITOR_INTERVAL_HOURS):
-        print("⏰ plastinka.com: пропуск (интервал 6 часов)")
-        return []
 
-    print("🔍 Сканирование plastinka.com...")
-    all_items = []
+def api_source(adapter: SiteAdapter):
+    """Источник сайта без браузера: (сессия, загрузка одной страницы, ошибка источника) или None"""
+    if not api_enabled(adapter):
+        return None
+    if adapter.api == "tilda":
+        from korobka_api import TildaStoreError
+        from korobka_api import make_session as make_tilda_session
+        return make_tilda_session(adapter.urls[0]), fetch_catalog_items, TildaStoreError
+    from vinyltap_api import ShopifyJSONError, make_session
+    return (make_session(),
+            lambda session, url, known_ids: fetch_collection_items(session, url, known_ids=known_ids),
+            ShopifyJSONError)
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            locale="ru-RU",
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            extra_http_headers={
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "ru-RU,ru;q=0.9,en;q=0.8",
-                "Accept-Encoding": "gzip, deflate, br",
-                "DNT": "1",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-            }
-        )
-        page = context.new_page()
-        page.set_default_timeout(REQUEST_TIMEOUT_SEC * 1000)
 
-        try:
-            print(f"  Сканирование: {PLASTINKA_URL}")
-
-            # Пытаемся загрузить страницу с повторными попытками
-            for attempt in range(3):
-                try:
-                    page.goto(PLASTINKA_URL, wait_until="load", timeout=REQUEST_TIMEOUT_SEC * 1000)
-                    break
-                except Exception as e:
-                    print(f"    Попытка {attempt + 1} загрузки неудачна: {e}")
-                    if attempt < 2:
-                        time.sleep(2)
-                    else:
-                        print("    Не удалось загрузить plastinka.com после 3 попыток")
-                        continue
-
-            time.sleep(1.2)
-
-            # Попробуем нажать кнопку подгрузки, если есть
-            try:
-                for _ in range(3):
-                    btn = page.locator("text=Load more").or_(page.locator("text=Загрузить ещё")).or_(page.locator("text=Показать ещё"))
-                    if btn.count() == 0:
-                        break
-                    btn.first.scroll_into_view_if_needed()
-                    btn.first.click()
-                    page.wait_for_timeout(LOAD_MORE_WAIT_MS)
-            except Exception as e:
-                print(f"    Ошибка при нажатии кнопки 'Load more': {e}")
+def scrape_site(adapter: SiteAdapter, browser: Optional[BrowserManager] = None,
+                known_ids: Optional[Set[str]] = None, browser_fallback: bool = True) -> List[Dict]:
+    """Сайт целиком: страницы через API, если он есть; остальные и те, где API не ответил, — браузером.
 
+    С browser_fallback=False (USE_PLAYWRIGHT=false) браузер не поднимается: сайт без API
+    пропускается, а страницы, где API не ответил, ждут следующего прогона.
+    """
+    api = api_source(adapter)
+    if api is None:
+        if not browser_fallback:
+            return []
+        return scrape_site_with_playwright(adapter, browser, known_ids=known_ids)
+
+    session, fetch, api_error = api
+    all_items = []
+    fallback_urls = []
+    try:
+        for url in adapter.urls:
             try:
-                items = extract_plastinka_from_dom(page)
-                print(f"    Найдено: {len(items)} позиций")
+                items = fetch(session, url, known_ids)
+                print(f"  API: {url} — {len(items)} позиций")
                 all_items.extend(items)
-            except Exception as e:
-                print(f"    Ошибка при извлечении данных: {e}")
+            except api_error as e:
+                if not browser_fallback:
+                    print(f"    ⚠️ API недоступен ({e}), браузер отключен — страница пропущена")
+                    continue
+                print(f"    ⚠️ API недоступен ({e}), переходим на браузер")
+                fallback_urls.append(url)
+    finally:
+        session.close()
+
+    all_items = make_items(all_items, adapter.source)
+    if fallback_urls:
+        all_items.extend(scrape_site_with_playwright(adapter, browser, fallback_urls, known_ids))
+    return all_items
+
+
+def scrape_due_site(adapter: SiteAdapter, browser: Optional[BrowserManager] = None,
+                    known_ids: Optional[Set[str]] = None, browser_fallback: bool = True) -> List[Dict]:
+    """scrape_site, если сайту пора сканироваться по интервалу"""
+    hours = monitor_interval(adapter.name, adapter.interval_hours)
+    if not should_monitor_site(adapter.name, hours):
+        print(f"⏰ {adapter.source}: пропуск (интервал {hours:g} ч)")
+        return []
 
-        except Exception as e:
-            print(f"    Ошибка при сканировании plastinka.com: {e}")
+    print(f"🔍 Сканирование {adapter.source}...")
+    items = scrape_site(adapter, browser, known_ids, browser_fallback)
+    print(f"📦 Найдено {len(items)} позиций на {adapter.source}")
+    update_last_check_time(adapter.name)
+    return items
 
-        browser.close()
 
-        # Добавляем источник
-        for item in all_items:
-            item["source"] = "plastinka.com"
+def scrape_with_playwright(browser: Optional[BrowserManager] = None,
+                           urls: Optional[List[str]] = None,
+                           known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """korobkavinyla.ru браузером"""
+    return scrape_site_with_playwright(SITE_ADAPTERS["korobkavinyla"], browser, urls, known_ids)
 
-        return all_items
 
+def scrape_korobka(browser: Optional[BrowserManager] = None,
+                   known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """korobkavinyla.ru через API магазина Tilda; страницы, где API не ответил, сканируются браузером"""
+    return scrape_site(SITE_ADAPTERS["korobkavinyla"], browser, known_ids)
 
-def extract_plastinka_from_dom(page) -> List[Dict]:
-    """Извлекает данные о товарах с plastinka.com"""
-    js = r"""
-    () => {
-      const anchors = Array.from(document.querySelectorAll('a'))
-        .filter(a => a.href && (a.href.includes('/product/') || a.href.includes('/lp/')) && a.textContent.trim().length > 0);
 
-      const items = [];
-      const seen = new Set();
+def scrape_vinyltap_with_playwright(browser: Optional[BrowserManager] = None,
+                                    urls: Optional[List[str]] = None,
+                                    known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """vinyltap.co.uk браузером"""
+    return scrape_site_with_playwright(SITE_ADAPTERS["vinyltap"], browser, urls, known_ids)
 
-      for (const a of anchors) {
-        // Нормализуем URL: убираем параметры запроса и якоря, убираем trailing slash
-        const url = a.href.split('?')[0].split('#')[0].replace(/\/$/, '');
-        if (seen.has(url)) continue;
-        seen.add(url);
 
-        let title = a.textContent.trim();
-        let el = a;
-        
-        // Ищем название в самом элементе и его ближайших родителях
-        let currentEl = a;
-        for (let i = 0; i < 3 && currentEl; i++) {
-          if (currentEl.querySelector) {
-            // Ищем различные селекторы для названий в текущем элементе
-            const titleSelectors = [
-              '.t-store__prod-snippet__title',
-              '.t-store__prod-snippet__title a',
-              '.t-store__prod-snippet__title span',
-              '.t-store__prod-snippet__title div',
-              'h1,h2,h3,h4,h5,h6',
-              '.title,.product-title,[class*="title"]',
-              '.t-store__prod-snippet__title-wrapper',
-              '.t-store__prod-snippet__title-wrapper a',
-              '.t-store__prod-snippet__title-wrapper span'
-            ];
-            
-            for (const selector of titleSelectors) {
-              const t = currentEl.querySelector(selector);
-              if (t && t.textContent && t.textContent.trim().length > 3) {
-                const foundTitle = t.textContent.trim();
-                // Проверяем, что это не просто год или короткий текст
-                if (foundTitle.length > title.length && !foundTitle.match(/^\\d{2,4}$/)) {
-                  title = foundTitle;
-                  break;
-                }
-              }
-            }
-            
-            // Также проверяем атрибуты title и alt
-            if (currentEl.title && currentEl.title.trim().length > title.length) {
-              title = currentEl.title.trim();
-            }
-            if (currentEl.alt && currentEl.alt.trim().length > title.length) {
-              title = currentEl.alt.trim();
-            }
-          }
-          currentEl = currentEl.parentElement;
-        }
-        
-        // Если название все еще короткое, пытаемся извлечь из URL
-        if (title.length < 20 && a.href) {
-          const urlParts = a.href.split('/');
-          const lastPart = urlParts[urlParts.length - 1];
-          if (lastPart && lastPart.includes('-')) {
-            // Убираем ID в начале и преобразуем дефисы в пробелы
-            const urlTitle = lastPart.replace(/^\\d+-/, '').replace(/-/g, ' ').trim();
-            // Используем URL только если он значительно длиннее и не содержит ID
-            if (urlTitle.length > title.length + 5 && !urlTitle.match(/^\\d+/)) {
-              title = urlTitle;
-            }
-          }
-        }
-        
-        // Дополнительная проверка: если название слишком общее, пытаемся найти уникальные элементы
-        if (title.length < 15 || title.includes('Boccherini/Bach')) {
-          // Ищем уникальные элементы в соседних элементах
-          const parent = a.parentElement;
-          if (parent) {
-            const siblings = Array.from(parent.children);
-            for (const sibling of siblings) {
-              if (sibling !== a && sibling.textContent) {
-                const siblingText = sibling.textContent.trim();
-                if (siblingText.length > title.length && 
-                    !siblingText.toLowerCase().includes('руб') &&
-                    !siblingText.toLowerCase().includes('купить') &&
-                    !siblingText.toLowerCase().includes('в корзину')) {
-                  title = siblingText;
-                  break;
-                }
-              }
-            }
-          }
-        }
-        
-        // Улучшенная логика извлечения полных названий для plastinka.com
-        if (title.length < 50) {
-          // Ищем главный контейнер товара (products-grid-item)
-          const mainContainer = a.closest('.products-grid-item');
-          if (mainContainer) {
-            let artist = '';
-            let album = '';
-            let label = '';
-            
-            // Извлекаем исполнителя
-            const artistEl = mainContainer.querySelector('.products-grid-item__artist a');
-            if (artistEl && artistEl.textContent) {
-              artist = artistEl.textContent.trim();
-            }
-            
-            // Извлекаем название альбома
-            const albumEl = mainContainer.querySelector('.products-grid-item__title a');
-            if (albumEl && albumEl.textContent) {
-              album = albumEl.textContent.trim();
-            }
-            
-            // Извлекаем лейбл (первая строка в params)
-            const paramsEl = mainContainer.querySelector('.products-grid-item__params a');
-            if (paramsEl && paramsEl.textContent) {
-              const paramsText = paramsEl.textContent.trim();
-              // Берем только первую строку (лейбл)
-              label = paramsText.split('\\n')[0].trim();
-            }
-            
-            // Собираем полное название
-            let fullTitle = '';
-            if (artist && album) {
-              fullTitle = artist + ' — ' + album;
-              if (label && label !== artist && label !== album) {
-                fullTitle += ' — ' + label;
-              }
-            }
-            
-            // Если нашли более полное название, используем его
-            if (fullTitle && fullTitle.length > title.length) {
-              title = fullTitle;
-            }
-          }
-        }
+def scrape_vinyltap(browser: Optional[BrowserManager] = None,
+                    known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """vinyltap.co.uk через Shopify JSON; коллекции, где JSON не ответил, сканируются браузером"""
+    return scrape_site(SITE_ADAPTERS["vinyltap"], browser, known_ids)
 
-        let price = '';
-        let originalPrice = '';
-        let discountPrice = '';
-        el = a;
-        for (let i = 0; i < 5 && el; i++) {
-          if (el.querySelector) {
-            // Ищем цену со скидкой
-            const discountEl = el.querySelector('.t-store__prod-snippet__price, .price, .money, [class*="price"]');
-            if (discountEl && discountEl.textContent) {
-              const priceText = discountEl.textContent.trim();
-              
-              // Проверяем, есть ли две цены (оригинальная и со скидкой)
-              const priceMatch = priceText.match(/(\d+[\s,]*\d*)\s*руб\.?\s*(\d+[\s,]*\d*)\s*руб\.?/);
-              if (priceMatch) {
-                originalPrice = priceMatch[1].replace(/\s/g, '') + ' руб.';
-                discountPrice = priceMatch[2].replace(/\s/g, '') + ' руб.';
-                price = `${originalPrice} → ${discountPrice}`;
-              } else {
-                price = priceText.replace(/\s+/g, ' ');
-              }
-              break;
-            }
-          }
-          el = el.parentElement;
-        }
 
-        // Фильтруем элементы меню и навигации
-        if (title && title.length > 3 && 
-            !title.toLowerCase().includes('меню') && 
-            !title.toLowerCase().includes('каталог') &&
-            !title.toLowerCase().includes('главная') &&
-            !title.toLowerCase().includes('контакты') &&
-            !title.toLowerCase().includes('style/') &&
-            !title.toLowerCase().includes('интересный выбор') &&
-            !title.toLowerCase().includes('новые поступления') &&
-            !title.toLowerCase().includes('оригинальный винил') &&
-            !title.toLowerCase().includes('подарочные издания') &&
-            !title.toLowerCase().includes('record store day') &&
-            !url.includes('/style/') &&
-            url.includes('/item/')) {  // Только товары
-          items.push({
-            id: url,
-            url: url,
-            title: title,
-            price: price
-          });
-        }
-      }
+def scrape_plastinka_with_playwright(browser: Optional[BrowserManager] = None,
+                                     known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """Сканировать plastinka.com на предмет виниловых пластинок"""
+    return scrape_due_site(SITE_ADAPTERS["plastinka"], browser, known_ids)
 
-      return items;
-    }
-    """
-    return page.evaluate(js)
+
+async def _goto_with_retries_async(page, url: str, wait_until: str = "load") -> bool:
+    """Загружает страницу с тремя попытками"""
+    for attempt in range(3):
+        try:
+            await RATE_LIMITER.wait_async(url)
+            response = await page.goto(url, wait_until=wait_until, timeout=REQUEST_TIMEOUT_SEC * 1000)
+            RATE_LIMITER.feedback(url, _response_status(response))
+            return True
+        except Exception as e:
+            print(f"    Попытка {attempt + 1} загрузки {url} неудачна: {e}")
+            if attempt < 2:
+                await asyncio.sleep(2)
+    print(f"    Не удалось загрузить {url} после 3 попыток")
+    return False
+
+
+async def scrape_catalog_page_async(browser: AsyncBrowserManager, site: str, url: str, extract_js: str,
+                                    labels=LOAD_MORE_LABELS_RU, max_clicks: int = 3,
+                                    wait_until: str = "load",
+                                    known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """Сканирует одну страницу каталога: загрузка, полный разбор, подгрузка только новых карточек"""
+    async with browser.site_page(site, REQUEST_TIMEOUT_SEC * 1000) as page:
+        if not await _goto_with_retries_async(page, url, wait_until):
+            raise RuntimeError(f"страница не загрузилась: {url}")
+        await asyncio.sleep(1.2)
+        # Полный разбор один раз, после каждого нажатия — только новые карточки
+        items = await page.evaluate(extract_js)
+        if labels:
+            extractor = IncrementalExtractor(page, extract_js)
+            await extractor.install_async(items)
+            seen: Set[str] = set()
+            should_stop = (lambda batch: batch_all_known(batch, seen, known_ids)) if known_ids else None
+            await click_load_more_async(page, labels, max_clicks, LOAD_MORE_WAIT_MS, extractor, items, should_stop)
+    return dedupe_keep_order(items)
 
 
-def scrape_vinyltap_with_playwright() -> List[Dict]:
-    all_items = []
+async def scrape_site_page_async(browser: AsyncBrowserManager, adapter: SiteAdapter, url: str, api,
+                                 known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """Страница сайта через API в отдельном потоке; при ошибке API или без него — браузером.
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            locale="en-GB",
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            extra_http_headers={
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-GB,en;q=0.9,en-US;q=0.8",
-                "Accept-Encoding": "gzip, deflate, br",
-                "DNT": "1",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-            }
-        )
-        page = context.new_page()
-        page.set_default_timeout(REQUEST_TIMEOUT_SEC * 1000)
+    Сессию api задача закрывает сама.
+    """
+    if api is not None:
+        session, fetch, api_error = api
+        try:
+            return await asyncio.to_thread(fetch, session, url, known_ids)
+        except api_error as e:
+            print(f"    ⚠️ API недоступен ({e}), переходим на браузер")
+        finally:
+            session.close()
+    return await scrape_catalog_page_async(browser, adapter.name, url, adapter.items_js, adapter.load_more_labels,
+                                           adapter.max_clicks, adapter.wait_until, known_ids)
 
-        for url in VINYLTAP_URLS:
-            try:
-                print(f"  Сканирование: {url}")
-                
-                # Пытаемся загрузить страницу с повторными попытками
-                for attempt in range(3):
-                    try:
-                        page.goto(url, wait_until="domcontentloaded", timeout=REQUEST_TIMEOUT_SEC * 1000)
-                        break
-                    except Exception as e:
-                        print(f"    Попытка {attempt + 1} загрузки неудачна: {e}")
-                        if attempt < 2:
-                            time.sleep(2)
-                        else:
-                            print(f"    Не удалось загрузить {url} после 3 попыток")
-                            continue
-                
-                time.sleep(1.2)
 
-                # Попробуем нажать кнопку подгрузки, если есть
-                try:
-                    for _ in range(3):
-                        btn = page.locator("text=Load more").or_(page.locator("text=Show more")).or_(page.locator("text=More"))
-                        if btn.count() == 0:
-                            break
-                        btn.first.scroll_into_view_if_needed()
-                        btn.first.click()
-                        page.wait_for_timeout(LOAD_MORE_WAIT_MS)
-                except Exception as e:
-                    print(f"    Ошибка при нажатии кнопки 'Load more': {e}")
-
-                try:
-                    items = extract_vinyltap_from_dom(page)
-                    print(f"    Найдено: {len(items)} позиций")
-                    all_items.extend(items)
-                except Exception as e:
-                    print(f"    Ошибка при извлечении данных: {e}")
+async def scrape_avito_async(browser: AsyncBrowserManager, config: Dict) -> List[Dict]:
+    """Поиск по всем запросам Авито в одной странице, с паузами по лимиту частоты хоста"""
+    items: List[Dict] = []
+    search_queries = config.get("search_queries", [])
+    base_url = config.get("base_url", "https://www.avito.ru/sankt_peterburg_i_lo")
+    category = config.get("category", "kollektsionirovanie")
+    if not search_queries:
+        return items
+    host = configure_avito_rate_limit(config)
 
+    async with browser.site_page("avito", REQUEST_TIMEOUT_SEC * 1000) as page:
+        for query in search_queries:
+            try:
+                search_url = f"{base_url}{category}?cd=1&q={query.replace(' ', '+')}"
+                print(f"  Поиск: {query}")
+                await RATE_LIMITER.wait_async(host, "Авито")
+                response = await page.goto(search_url, wait_until="load", timeout=REQUEST_TIMEOUT_SEC * 1000)
+                await asyncio.sleep(2)
+                if await page_blocked_async(page, response, host):
+                    print(f"    ⚠️ Авито: капча или ограничение доступа по запросу '{query}'")
+                    continue
+                query_items = await page.evaluate(AVITO_ITEMS_JS, query)
+                items.extend(query_items)
+                print(f"    Найдено: {len(query_items)} позиций по запросу '{query}'")
             except Exception as e:
-                print(f"    Ошибка при сканировании {url}: {e}")
+                print(f"    Ошибка при поиске '{query}': {e}")
+    return items
+
+
+def _host_of(url: str) -> str:
+    """Хост без www. — ключ для лимитов параллельности"""
+    return host_of(url)
+
+
+def site_intervals(avito_config: Dict) -> Dict[str, float]:
+    """Интервалы (в часах) всех включенных сайтов: каталоги реестра, затем Авито"""
+    intervals = {name: adapter.interval_hours for name, adapter in SITE_ADAPTERS.items() if adapter.enabled}
+    if avito_config.get("enabled", True):
+        intervals["avito"] = avito_config.get("monitor_interval_hours", 6)
+    return intervals
+
+
+def sites_maybe_due(avito_config: Dict) -> List[str]:
+    """Сайты, которым может быть пора, — только по last_check_* и интервалам, без загрузки состояния.
+
+    С ADAPTIVE_INTERVALS точный интервал зависит от истории поступлений, поэтому берется срок,
+    записанный при прошлой проверке (last_check_next_<сайт>.txt), а без него — нижняя граница
+    интервала: сайт, проверенный позже нее, сканировать точно рано.
+    """
+    due = []
+    for name, hours in site_intervals(avito_config).items():
+        if ADAPTIVE_INTERVALS:
+            next_check = read_last_check_time(f"next_{name}")
+            if next_check is not None:
+                if datetime.now() >= next_check:
+                    due.append(name)
                 continue
+            hours = min(hours, ADAPTIVE_SITE_POLICIES.get(name, ADAPTIVE_DEFAULT_POLICY).min_hours)
+        if should_monitor_site(name, hours):
+            due.append(name)
+    return due
 
-            browser.close()
-        
-        # Добавляем источник
-        for item in all_items:
-            item["source"] = "vinyltap.co.uk"
 
-        return all_items
+def get_due_sites(avito_config: Dict) -> List[str]:
+    """Список сайтов, которые пора сканировать в этом прогоне"""
+    return [name for name, hours in site_intervals(avito_config).items()
+            if should_monitor_site(name, monitor_interval(name, hours))]
+
+
+def build_site_tasks(due_sites: List[str], avito_config: Dict,
+                     known_by_site: Optional[Dict[str, Optional[Set[str]]]] = None) -> List[SiteTask]:
+    """Задачи движка: по одной на каждую страницу каталога и одна на весь поиск Авито.
+
+    known_by_site — известные ID для инкрементального обхода по сайтам
+    (None у сайта — обход на полную глубину).
+    """
+    known_by_site = known_by_site or {}
+    tasks: List[SiteTask] = []
+    for name, adapter in SITE_ADAPTERS.items():
+        if name not in due_sites:
+            continue
+        for url in adapter.urls:
+            # Своя сессия у каждой задачи: страницы сайта идут в разных потоках, а requests.Session
+            # не потокобезопасна. Задача закрывает ее сама
+            tasks.append(SiteTask(
+                name, _host_of(url),
+                lambda b, adapter=adapter, url=url: scrape_site_page_async(
+                    b, adapter, url, api_source(adapter), known_by_site.get(adapter.name)),
+                label=f"{adapter.source} {url}",
+            ))
+    if "avito" in due_sites:
+        tasks.append(SiteTask(
+            "avito", _host_of(avito_config.get("base_url", "https://www.avito.ru")),
+            lambda b: scrape_avito_async(b, avito_config),
+            label="avito.ru",
+        ))
+    return tasks
+
+
+def scrape_sites_async(due_sites: List[str], avito_config: Dict,
+                       known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """Сканирует все сайты прогона параллельно и возвращает общий список позиций"""
+    for site in SITE_SOURCES:
+        if site not in due_sites:
+            print(f"⏰ {SITE_SOURCES[site]}: пропуск (интервал)")
+
+    known_by_site = {}
+    if known_ids is not None:
+        known_by_site = {site: crawl_known_ids(site, known_ids) for site in due_sites if site in INCREMENTAL_SITES}
+    tasks = build_site_tasks(due_sites, avito_config, known_by_site)
+    if not tasks:
+        return []
+
+    print(f"🔍 Параллельное сканирование: {', '.join(SITE_SOURCES[site] for site in due_sites)}")
+    limiter = ConcurrencyLimiter(SCRAPE_CONCURRENCY, SCRAPE_PER_HOST_CONCURRENCY, parse_host_limits(SCRAPE_HOST_LIMITS))
+    results, failed = run_tasks(tasks, async_playwright, limiter)
+
+    items: List[Item] = []
+    for site in due_sites:
+        site_items = make_items(results.get(site, []), SITE_SOURCES[site])
+        print(f"📦 Найдено {len(site_items)} позиций на {SITE_SOURCES[site]}")
+        items.extend(site_items)
+        if site in failed:
+            print(f"⚠️ {SITE_SOURCES[site]}: были ошибки, время проверки не обновлено")
+        else:
+            update_last_check_time(site)
+            if site in known_by_site:
+                mark_full_crawl_done(site, known_by_site[site])
+    return items
+
+
+def scrape_registry_sites(browser: Optional[BrowserManager], known: Set[str],
+                          browser_fallback: bool = True) -> List[Dict]:
+    """Каталоги реестра, которым пора: интервал, дообход и отметка о проверке — в scrape_due_site.
+
+    Без браузера (browser_fallback=False) сканируются только сайты с API.
+    """
+    items = []
+    for adapter in SITE_ADAPTERS.values():
+        if not adapter.enabled or not (browser_fallback or api_enabled(adapter)):
+            continue
+        crawl_known = crawl_known_ids(adapter.name, known)
+        site_items = scrape_due_site(adapter, browser, crawl_known, browser_fallback)
+        items.extend(site_items)
+        if site_items:
+            # Пустой список — сайт пропущен по интервалу или не загрузился
+            mark_full_crawl_done(adapter.name, crawl_known)
+    return items
 
 
 def main():
     print("🎵 Запуск монитора виниловых пластинок...")
-    known = load_state()
+    avito_config = load_avito_config()
+    if not sites_maybe_due(avito_config):
+        # Тик cron, в котором всем сайтам рано: ни состояния, ни S3, ни браузера
+        print("⏰ Ни одному сайту еще не пора, выходим")
+        return
+    known = load_state(due_sources(avito_config))
     print(f"📚 Загружено {len(known)} известных позиций из состояния")
 
     items: List[Dict] = []
-    if USE_PLAYWRIGHT:
-        # Проверяем, нужно ли мониторить korobkavinyla.ru
-        if should_monitor_site("korobkavinyla", KOROBKA_MONITOR_INTERVAL_HOURS):
-            print("🔍 Сканирование korobkavinyla.ru...")
-            korobka_items = scrape_with_playwright()
-            print(f"📦 Найдено {len(korobka_items)} позиций на korobkavinyla.ru")
-            items.extend(korobka_items)
-            update_last_check_time("korobkavinyla")
-        else:
-            print("⏰ korobkavinyla.ru: пропуск (интервал 24 часа)")
-            korobka_items = []
-        
-        # Проверяем, нужно ли мониторить vinyltap.co.uk
-        if should_monitor_site("vinyltap", VINYLTAP_MONITOR_INTERVAL_HOURS):
-            print("🔍 Сканирование vinyltap.co.uk...")
-            vinyltap_items = scrape_vinyltap_with_playwright()
-            print(f"📦 Найдено {len(vinyltap_items)} позиций на vinyltap.co.uk")
-            items.extend(vinyltap_items)
-            update_last_check_time("vinyltap")
-        else:
-            print("⏰ vinyltap.co.uk: пропуск (интервал 3 часа)")
-            vinyltap_items = []
+    if USE_PLAYWRIGHT and ASYNC_ENGINE:
+        # Все сайты прогона параллельно: время прогона ≈ время самого медленного сайта
+        items = scrape_sites_async(get_due_sites(avito_config), avito_config, known)
+    elif USE_PLAYWRIGHT:
+        # Один браузер на весь прогон: каждый сайт получает свой контекст
+        with BrowserManager(sync_playwright) as browser:
+            items = scrape_registry_sites(browser, known)
+
+            # Проверяем, нужно ли мониторить Авито
+            items.extend(scrape_avito_with_playwright(browser))
+        print(browser.usage_report())
+        print(browser.traffic_report())
+    else:
+        # Без Playwright — сайты с API (korobkavinyla.ru, vinyltap.co.uk); Авито и остальные пропускаются
+        items = scrape_registry_sites(None, known, browser_fallback=False)
+    if RATE_LIMITER.waited_sec or RATE_LIMITER.backoffs:
+        print(RATE_LIMITER.report())
+
+    if STATE_SHARDS:
+        # Сайт мог стать «пора» уже после загрузки: его шард догружается до отбора новых
+        known |= current_state().load_sources({it.get("source", "") for it in items})
+    new_ids, current_ids = notify_new_items(items, known)
+    if new_ids:
+        # Обновляем состояние только с новыми ID; копия known ради числа позиций не нужна
+        total = len(known) + len(new_ids)
+        save_state(known, new_ids)
+        print(f"💾 Состояние обновлено: {total} известных позиций")
+        print(f"✅ Найдено новых: {len(new_ids)}")
+    print(STATE_STATS.report())
 
-        # Проверяем, нужно ли мониторить Авито
-        avito_items = scrape_avito_with_playwright()
-        items.extend(avito_items)
 
-        # Проверяем, нужно ли мониторить plastinka.com
-        plastinka_items = scrape_plastinka_with_playwright()
-        items.extend(plastinka_items)
-    else:
-        items = []
+def notify_new_items(items: List[Dict], known: Set[str]) -> Tuple[List[Dict], Set[str]]:
+    """Дедупликация, отбор новых позиций и уведомление в Telegram.
 
+    Возвращает новые позиции и нормализованные ID всех найденных; состояние
+    сохраняет вызывающий.
+    """
     print(f"🔄 Дедупликация {len(items)} позиций...")
-    items = advanced_deduplication(items)
+    items = advanced_deduplication(parse_prices(make_items(items)))
     print(f"✅ После дедупликации: {len(items)} уникальных позиций")
-
-    current_ids = {normalize_url(it["id"]) for it in items}
-    new_ids = [it for it in items if normalize_url(it["id"]) not in known]
+    index = release_index()
+    cross_store = (index or ReleaseMatcher()).assign(items)
+    if cross_store:
+        print(f"🔗 Релизов сразу в нескольких магазинах: {len(cross_store)}")
+
+    current_ids = {canonical_id(it) for it in items}
+    new_ids = [it for it in items if canonical_id(it) not in known]
+    if index is not None:
+        # Сначала цены прогона: позиция того же релиза в другом магазине в этом же прогоне — самая свежая цена
+        print(f"🔗 Цен записано в индекс релизов: {index.record(items)}")
+        for it in new_ids:
+            offer = index.cheapest_elsewhere(it)
+            if offer:
+                it["cheapest_elsewhere"] = offer
     
     print(f"🆕 Найдено {len(new_ids)} новых позиций из {len(items)} общих")
+    relisted = relisted_ids(new_ids)
+    announced = [it for it in new_ids if canonical_id(it) not in relisted]
+    if relisted:
+        print(f"🔁 Уже известны под другим URL: {len(relisted)}, без уведомления")
 
-    if new_ids:
+    if announced:
         lines = ["Новые позиции:"]
-        kor_items = [it for it in new_ids if it.get("source") == "korobkavinyla.ru"]
-        tap_items = [it for it in new_ids if it.get("source") == "vinyltap.co.uk"]
-        avito_items = [it for it in new_ids if it.get("source") == "avito.ru"]
+        kor_items = [it for it in announced if it.get("source") == "korobkavinyla.ru"]
+        tap_items = [it for it in announced if it.get("source") == "vinyltap.co.uk"]
+        avito_items = [it for it in announced if it.get("source") == "avito.ru"]
+        plastinka_items = [it for it in announced if it.get("source") == "plastinka.com"]
 
         if kor_items:
             lines.append("🎵 korobkavinyla.ru:")
@@ -1264,18 +1422,172 @@ def main():
                 lines.append(format_item_message(it, "plastinka.com"))
 
         message = "\n".join(lines)
-        print(f"📤 Отправка {len(new_ids)} новых позиций в Telegram...")
+        print(f"📤 Отправка {len(announced)} новых позиций в Telegram...")
         for chunk in chunk_messages(message):
             send_telegram(chunk)
-        
-        # Обновляем состояние только с новыми ID
-        updated_known = known.union(current_ids)
-        save_state(updated_known, new_ids)
-        print(f"💾 Состояние обновлено: {len(updated_known)} известных позиций")
-        print(f"✅ Найдено новых: {len(new_ids)}")
     else:
         print("ℹ️ Новых позиций не найдено.")
+    return new_ids, current_ids
+
+
+def scrape_site_now(name: str, browser: BrowserManager, known: Set[str], avito_config: Dict) -> List[Dict]:
+    """Сканирует один сайт без проверки интервала (срок решает расписание демона)"""
+    if name == "avito":
+        print("🔍 Сканирование Авито...")
+        items = scrape_avito(browser, avito_config)
+    else:
+        adapter = SITE_ADAPTERS[name]
+        print(f"🔍 Сканирование {adapter.source}...")
+        crawl_known = crawl_known_ids(name, known)
+        items = scrape_site(adapter, browser, crawl_known)
+        if items:
+            mark_full_crawl_done(name, crawl_known)
+    # Файлы last_check_* остаются актуальными для перезапуска и для запуска по cron
+    update_last_check_time(name)
+    return items
+
+
+class MonitorDaemon:
+    """Долгоживущий монитор: состояние, конфигурация и браузер в памяти, сон до ближайшего срока.
+
+    SIGHUP перечитывает avito_config.json и перестраивает расписание,
+    SIGTERM/SIGINT завершают текущий сайт, сохраняют состояние и выходят.
+    """
+
+    def __init__(self, browser: BrowserManager, clock=time.time):
+        self.browser = browser
+        self.clock = clock
+        self.scheduler = DueScheduler()
+        self.known: Set[str] = set()
+        self.avito_config: Dict = {}
+        self.intervals: Dict[str, float] = {}
+        self.pending: List[Dict] = []  # Новые позиции, еще не сохраненные в состоянии
+        self.last_saved = clock()
+        self._stop = False
+        self._reload = False
+        self._wake = threading.Event()
+
+    def request_stop(self, *_) -> None:
+        self._stop = True
+        self._wake.set()
+
+    def request_reload(self, *_) -> None:
+        self._reload = True
+        self._wake.set()
+
+    def install_signal_handlers(self) -> None:
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.request_reload)
+
+    def load(self) -> None:
+        """Загружает состояние один раз на весь срок работы демона"""
+        self.known = load_state()
+        print(f"📚 Загружено {len(self.known)} известных позиций из состояния")
+        self.reload_config()
+
+    def reload_config(self) -> None:
+        """Перечитывает конфигурацию и назначает сроки по last_check_* и интервалам"""
+        self.avito_config = load_avito_config()
+        self.intervals = site_intervals(self.avito_config)
+        now = self.clock()
+        for site in self.scheduler.sites():
+            if site not in self.intervals:
+                self.scheduler.cancel(site)
+        for site, hours in self.intervals.items():
+            last_check = read_last_check_time(site)
+            due_at = last_check.timestamp() + monitor_interval(site, hours, last_check) * 3600 if last_check else now
+            self.scheduler.schedule(site, due_at)
+        print(f"🗓️ Расписание: {', '.join(f'{site} каждые {hours:g} ч' for site, hours in self.intervals.items())}")
+
+    def run_due(self) -> None:
+        """Сканирует все сайты, срок которых наступил, и отправляет одно уведомление"""
+        due_sites = self.scheduler.pop_due(self.clock())
+        if not due_sites:
+            return
+        items: List[Dict] = []
+        for site in due_sites:
+            if self._stop:
+                # Не начатые сайты вернутся в расписание при следующем запуске
+                break
+            try:
+                items.extend(scrape_site_now(site, self.browser, self.known, self.avito_config))
+            except Exception as e:
+                print(f"❌ {site}: {e}")
+            now = self.clock()
+            interval = monitor_interval(site, self.intervals[site], datetime.fromtimestamp(now))
+            self.scheduler.schedule(site, now + interval * 3600)
+            if interval != self.intervals[site]:
+                print(f"🗓️ {site}: следующее сканирование через {interval * 60:.0f} мин (по истории поступлений)")
+
+        new_ids, current_ids = notify_new_items(items, self.known)
+        if ADAPTIVE_INTERVALS:
+            self.record_arrivals(new_ids)
+        self.known |= current_ids
+        self.pending.extend(new_ids)
+        if self.clock() - self.last_saved >= DAEMON_SAVE_INTERVAL_MINUTES * 60:
+            self.flush()
+
+    def record_arrivals(self, new_items: List[Dict]) -> None:
+        """Новые позиции дописываются в модель поступлений без перечитывания состояния"""
+        site_by_source = {source: name for name, source in SITE_SOURCES.items()}
+        when = datetime.fromtimestamp(self.clock())
+        for item in new_items:
+            site = site_by_source.get(item.get("source"))
+            if site:
+                arrival_model().record(site, when)
+
+    def flush(self) -> None:
+        """Сохраняет накопленные новые позиции"""
+        if self.pending:
+            save_state(self.known, self.pending)
+            print(f"💾 Состояние обновлено: {len(self.known)} известных позиций")
+            self.pending = []
+        self.last_saved = self.clock()
+
+    def sleep_until_next(self) -> None:
+        """Спит до ближайшего срока; сигнал будит раньше"""
+        wait = self.scheduler.seconds_until_next(self.clock())
+        if wait is None:
+            print("💤 Нет включенных сайтов, ждем SIGHUP или SIGTERM")
+        elif wait > 0:
+            _, site = self.scheduler.peek()
+            print(f"💤 Следующий: {site} через {wait / 60:.1f} мин")
+        self._wake.wait(wait)
+        self._wake.clear()
+
+    def run(self) -> None:
+        self.load()
+        try:
+            while not self._stop:
+                if self._reload:
+                    self._reload = False
+                    print("🔄 SIGHUP: перечитываем конфигурацию")
+                    self.reload_config()
+                self.run_due()
+                if not self._stop:
+                    self.sleep_until_next()
+        finally:
+            self.flush()
+            print("👋 Демон остановлен")
+
+
+def run_daemon() -> None:
+    """python vinyl_monitor.py --daemon"""
+    if not USE_PLAYWRIGHT:
+        print("❌ Режим демона требует USE_PLAYWRIGHT=true")
+        return
+    print("🎵 Запуск монитора виниловых пластинок в режиме демона...")
+    with BrowserManager(sync_playwright) as browser:
+        daemon = MonitorDaemon(browser)
+        daemon.install_signal_handlers()
+        daemon.run()
+        print(browser.usage_report())
 
 
 if __name__ == "__main__":
-    main()
+    if "--daemon" in sys.argv[1:]:
+        run_daemon()
+    else:
+        main()
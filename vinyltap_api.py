@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Быстрый источник vinyltap.co.uk через Shopify JSON (без браузера)
+"""
+import os
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from http_client import limited_get
+from http_client import make_session as make_http_session
+
+VINYLTAP_PAGE_LIMIT = 250  # Максимум, который отдает Shopify за одну страницу
+VINYLTAP_MAX_PAGES = int(os.getenv("VINYLTAP_MAX_PAGES", "20"))
+VINYLTAP_JSON_TIMEOUT_SEC = 30
+VINYLTAP_CURRENCY = "GBP"
+
+# Признаки винила и форматов, которые не отслеживаем (как в фильтре extract_vinyltap_from_dom)
+VINYL_MARKERS = ("lp", "vinyl", "7 inch", "12 inch", "10 inch", '7"', '10"', '12"')
+NOT_VINYL_MARKERS = ("cd", "dvd", "cassette", "tape", "blu-ray")
+
+
+class ShopifyJSONError(Exception):
+    """JSON-эндпоинт коллекции недоступен или вернул неожиданный ответ"""
+
+
+def make_session() -> requests.Session:
+    """Сессия с пулом соединений для JSON-эндпоинтов Shopify"""
+    return make_http_session({
+        "Accept": "application/json",
+        "Accept-Language": "en-GB,en;q=0.9",
+    })
+
+
+def collection_base(collection_url: str) -> Tuple[str, str]:
+    """Возвращает (https://host, handle) для URL вида /collections/<handle>"""
+    parsed = urlparse(collection_url.strip())
+    parts = [part for part in parsed.path.split("/") if part]
+    if len(parts) < 2 or parts[0] != "collections":
+        raise ShopifyJSONError(f"не похоже на коллекцию Shopify: {collection_url}")
+    return f"{parsed.scheme or 'https'}://{parsed.netloc}", parts[1]
+
+
+def collection_products_url(collection_url: str, page: int) -> str:
+    """URL страницы products.json для коллекции"""
+    base, handle = collection_base(collection_url)
+    return f"{base}/collections/{handle}/products.json?limit={VINYLTAP_PAGE_LIMIT}&page={page}"
+
+
+def iter_collection_pages(session: requests.Session, collection_url: str,
+                          max_pages: int = VINYLTAP_MAX_PAGES) -> Iterator[List[Dict]]:
+    """Отдает страницы товаров коллекции, пока Shopify не вернет неполную страницу"""
+    for page in range(1, max_pages + 1):
+        url = collection_products_url(collection_url, page)
+        try:
+            response = limited_get(session, url, timeout=VINYLTAP_JSON_TIMEOUT_SEC)
+            response.raise_for_status()
+            products = response.json().get("products")
+        except (requests.RequestException, ValueError, AttributeError) as e:
+            raise ShopifyJSONError(f"{url}: {e}") from e
+        if not isinstance(products, list):
+            raise ShopifyJSONError(f"{url}: в ответе нет списка products")
+
+        yield products
+        if len(products) < VINYLTAP_PAGE_LIMIT:
+            return
+
+
+def _product_tags(product: Dict) -> List[str]:
+    tags = product.get("tags") or []
+    if isinstance(tags, str):
+        # В некоторых эндпоинтах Shopify теги приходят строкой через запятую
+        tags = tags.split(",")
+    return [str(tag).strip().lower() for tag in tags if str(tag).strip()]
+
+
+def _has_marker(text: str, markers) -> bool:
+    for marker in markers:
+        # Короткие маркеры (lp, cd) ищем как отдельные слова, допуская "2lp"/"3cd",
+        # чтобы не ловить "help" или "cdr"
+        if len(marker) <= 3 and marker.isalpha():
+            if re.search(rf"(?<![a-z]){marker}(?![a-z])", text):
+                return True
+        elif marker in text:
+            return True
+    return False
+
+
+def is_vinyl_product(product: Dict) -> bool:
+    """Винил определяется по типу товара, затем по тегам и только потом по названию"""
+    product_type = (product.get("product_type") or "").strip().lower()
+    if product_type:
+        if _has_marker(product_type, NOT_VINYL_MARKERS):
+            return False
+        if _has_marker(product_type, VINYL_MARKERS):
+            return True
+
+    tags = " ".join(_product_tags(product))
+    if tags:
+        if _has_marker(tags, VINYL_MARKERS) and not _has_marker(tags, NOT_VINYL_MARKERS):
+            return True
+
+    title = (product.get("title") or "").lower()
+    return _has_marker(title, VINYL_MARKERS) and not _has_marker(title, NOT_VINYL_MARKERS)
+
+
+def product_price(product: Dict) -> Optional[Decimal]:
+    """Минимальная цена среди доступных вариантов (или всех, если доступных нет)"""
+    variants = product.get("variants") or []
+    available = [v for v in variants if v.get("available", True)] or variants
+    prices = []
+    for variant in available:
+        try:
+            prices.append(Decimal(str(variant.get("price"))))
+        except (InvalidOperation, TypeError):
+            continue
+    return min(prices) if prices else None
+
+
+def product_to_item(product: Dict, base_url: str) -> Dict:
+    """Позиция в формате скраперов; url совпадает с тем, что дает DOM (/products/<handle>)"""
+    url = f"{base_url}/products/{product['handle']}"
+    amount = product_price(product)
+    return {
+        "id": url,
+        "url": url,
+        "title": (product.get("title") or "").strip(),
+        "price": f"£{amount:.2f}" if amount is not None else "",
+        "price_amount": amount,
+        "currency": VINYLTAP_CURRENCY,
+    }
+
+
+def fetch_collection_items(session: requests.Session, collection_url: str,
+                           max_pages: int = VINYLTAP_MAX_PAGES,
+                           known_ids: Optional[Set[str]] = None) -> List[Dict]:
+    """Все виниловые позиции одной коллекции; ShopifyJSONError, если JSON недоступен.
+
+    С known_ids листание останавливается на странице, где все позиции уже
+    известны: коллекции новинок идут от новых к старым.
+    """
+    base, _ = collection_base(collection_url)
+    items = []
+    seen = set()
+    for products in iter_collection_pages(session, collection_url, max_pages):
+        page_items = []
+        for product in products:
+            if not product.get("handle") or product["handle"] in seen:
+                continue
+            seen.add(product["handle"])
+            if is_vinyl_product(product):
+                page_items.append(product_to_item(product, base))
+        items.extend(page_items)
+        if known_ids and page_items and all(item["id"] in known_ids for item in page_items):
+            print(f"    {collection_url}: все позиции страницы уже известны, дальше не листаем")
+            break
+    return items